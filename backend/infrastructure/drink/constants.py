@@ -1 +1,14 @@
 SERVICE_NAME = "awsome-generative-drink-app"
+
+# Variáveis do Powertools comuns a todas as funções: as métricas EMF de todas as etapas ficam no mesmo namespace
+POWERTOOLS_ENVIRONMENT = {
+    "POWERTOOLS_SERVICE_NAME": SERVICE_NAME,
+    "POWERTOOLS_METRICS_NAMESPACE": SERVICE_NAME,
+}
+
+# Limite de duração do fluxo síncrono (Express): abaixo dos 29 segundos de integração do API Gateway,
+# com folga para a função da API ler o resultado ou iniciar o fluxo padrão
+SYNC_WORKFLOW_TIMEOUT_SECONDS = 20
+
+# Chave de contexto do CDK que escolhe como o fluxo assíncrono é implantado: "stepfunctions" (padrão) ou "lambda" (função única)
+WORKFLOW_MODE_CONTEXT_KEY = "drink:workflow_mode"
@@ -0,0 +1,95 @@
+from typing import Dict, Optional
+
+from aws_cdk import Duration, Stack
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_sqs as sqs
+from aws_cdk import aws_ssm as ssm
+from aws_cdk import aws_stepfunctions as sfn
+from constructs import Construct
+from infrastructure.drink.constants import POWERTOOLS_ENVIRONMENT
+from service.drink.models.drink_request import PRIORITY_LANES
+
+# Timeout do consumidor agendado: cada invocação consome as filas por quase um minuto, até a próxima invocação; a
+# rajada do token bucket de admissão (10 segundos de ritmo) cobre o intervalo entre as invocações
+ADMISSION_CONSUMER_TIMEOUT_SECONDS = 60
+
+
+class DrinkAdmissionConstruct(Construct):
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        lambda_layer: _lambda.LayerVersion,
+        state_machine: sfn.StateMachine,
+        bedrock_limiter_table: dynamodb.Table,
+        settings_parameter: ssm.StringParameter,
+        pipeline_lambda: Optional[_lambda.Function] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        # Criar uma fila de admissão por faixa de prioridade, com uma fila de mensagens mortas comum para entradas inválidas
+        self.admission_dead_letter_queue = sqs.Queue(
+            self,
+            "DrinkAdmissionDeadLetterQueue",
+            retention_period=Duration.days(14),
+        )
+        self.admission_queues: Dict[str, sqs.Queue] = {
+            lane: sqs.Queue(
+                self,
+                f"DrinkAdmission{lane.capitalize()}Queue",
+                visibility_timeout=Duration.seconds(ADMISSION_CONSUMER_TIMEOUT_SECONDS),
+                retention_period=Duration.days(1),
+                # As mensagens devolvidas à fila ao fim de cada invocação também contam como recebidas; o limite fica folgado
+                dead_letter_queue=sqs.DeadLetterQueue(queue=self.admission_dead_letter_queue, max_receive_count=100),
+            )
+            # Uma fila por classe de prioridade do DrinkRequest (a mesma definição usada pela API e pelo consumidor)
+            for lane in PRIORITY_LANES
+        }
+
+        # Criar função Lambda que escolhe, entre as faixas, as execuções a iniciar no ritmo suportado pelo Bedrock
+        environment = {
+            **POWERTOOLS_ENVIRONMENT,
+            "ADMISSION_QUEUE_URLS": Stack.of(self).to_json_string({lane: queue.queue_url for lane, queue in self.admission_queues.items()}),
+            "DRINK_RECIPE_STEP_FUNCTION_ARN": state_machine.state_machine_arn,
+            "BEDROCK_LIMITER_TABLE": bedrock_limiter_table.table_name,
+            "DRINK_SETTINGS_PARAMETER": settings_parameter.parameter_name,
+            "CONFIG_CACHE_TTL_SECONDS": "300",
+        }
+        if pipeline_lambda:
+            environment["DRINK_PIPELINE_FUNCTION_NAME"] = pipeline_lambda.function_name
+
+        self.start_queued_executions_lambda = _lambda.Function(
+            self,
+            "StartQueuedExecutionsFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            code=_lambda.Code.from_asset(".build/lambda"),
+            handler="service.drink.handlers.handle_start_queued_executions.lambda_handler",
+            layers=[lambda_layer],
+            timeout=Duration.seconds(ADMISSION_CONSUMER_TIMEOUT_SECONDS),
+            memory_size=256,
+            reserved_concurrent_executions=1,  # Um único escalonador vê todas as faixas e decide a ordem de início
+            environment=environment,
+        )
+
+        # Conceder permissões para a função Lambda consumir as filas, iniciar e listar as execuções, usar o limitador e
+        # ler as configurações
+        for queue in self.admission_queues.values():
+            queue.grant_consume_messages(self.start_queued_executions_lambda)
+        state_machine.grant_start_execution(self.start_queued_executions_lambda)
+        state_machine.grant_read(self.start_queued_executions_lambda)
+        bedrock_limiter_table.grant_read_write_data(self.start_queued_executions_lambda)
+        settings_parameter.grant_read(self.start_queued_executions_lambda)
+        if pipeline_lambda:
+            pipeline_lambda.grant_invoke(self.start_queued_executions_lambda)
+
+        # Executar o consumidor a cada minuto
+        events.Rule(
+            self,
+            "StartQueuedExecutionsSchedule",
+            schedule=events.Schedule.rate(Duration.minutes(1)),
+            targets=[targets.LambdaFunction(self.start_queued_executions_lambda)],
+        )
@@ -1,12 +1,36 @@
-from aws_cdk import Duration
+from typing import Dict, Optional
+
+from aws_cdk import Duration, Stack
 from aws_cdk import aws_apigateway as apigw
+from aws_cdk import aws_dynamodb as dynamodb
 from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_sqs as sqs
+from aws_cdk import aws_ssm as ssm
 from aws_cdk import aws_stepfunctions as sfn
 from constructs import Construct
+from infrastructure.drink.constants import (
+    POWERTOOLS_ENVIRONMENT,
+    SYNC_WORKFLOW_TIMEOUT_SECONDS,
+)
 
 
 class DrinkApiConstruct(Construct):
-    def __init__(self, scope: Construct, construct_id: str, lambda_layer: _lambda.LayerVersion, state_machine: sfn.StateMachine, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        lambda_layer: _lambda.LayerVersion,
+        state_machine: sfn.StateMachine,
+        express_state_machine: sfn.StateMachine,
+        recipes_table: dynamodb.Table,
+        idempotency_table: dynamodb.Table,
+        admission_queues: Dict[str, sqs.Queue],
+        recipes_bucket: s3.Bucket,
+        settings_parameter: ssm.StringParameter,
+        pipeline_lambda: Optional[_lambda.Function] = None,
+        **kwargs
+    ) -> None:
         super().__init__(scope, construct_id)
 
         # Criar função Lambda para receber a solicitação da API
@@ -17,15 +41,67 @@ class DrinkApiConstruct(Construct):
             code=_lambda.Code.from_asset(".build/lambda"),
             handler="service.drink.handlers.handle_create_drink.lambda_handler",
             layers=[lambda_layer],
-            timeout=Duration.seconds(10),
-            memory_size=128,
+            timeout=Duration.seconds(29),
+            memory_size=256,
             environment={
+                **POWERTOOLS_ENVIRONMENT,
                 "DRINK_RECIPE_STEP_FUNCTION_ARN": state_machine.state_machine_arn,
+                "DRINK_RECIPE_EXPRESS_STEP_FUNCTION_ARN": express_state_machine.state_machine_arn,
+                # A leitura da execução síncrona espera um pouco além do timeout do fluxo Express
+                "SYNC_EXECUTION_READ_TIMEOUT_SECONDS": str(SYNC_WORKFLOW_TIMEOUT_SECONDS + 4),
+                "RECIPES_BUCKET": recipes_bucket.bucket_name,
+                "PRESIGNED_URL_EXPIRATION_SECONDS": "900",
+                "DRINK_BATCH_MAX_ITEMS": "500",
+                "DRINK_BATCH_MAX_WORKERS": "16",
+                "DRINK_SETTINGS_PARAMETER": settings_parameter.parameter_name,
+                "IDEMPOTENCY_TABLE": idempotency_table.table_name,
+                "IDEMPOTENCY_TTL_SECONDS": "86400",
+                "IDEMPOTENCY_IN_PROGRESS_SECONDS": "30",
+                # As solicitações assíncronas passam pela fila da faixa de prioridade; a receita fica QUEUED na tabela até iniciar
+                "ADMISSION_QUEUE_URLS": Stack.of(self).to_json_string({lane: queue.queue_url for lane, queue in admission_queues.items()}),
+                "DRINK_RECIPES_TABLE": recipes_table.table_name,
             },
         )
 
-        # Conceder permissões para a função Lambda iniciar o Step Functions
+        # Conceder permissões para a função Lambda iniciar o Step Functions (assíncrono e síncrono), ler as configurações,
+        # gravar os registros de idempotência, enfileirar as solicitações (registrando-as como QUEUED) e, no modo síncrono,
+        # ler o texto da receita e assinar a URL da imagem
         state_machine.grant_start_execution(self.create_drink_lambda)
+        express_state_machine.grant_start_sync_execution(self.create_drink_lambda)
+        recipes_bucket.grant_read(self.create_drink_lambda)
+        settings_parameter.grant_read(self.create_drink_lambda)
+        idempotency_table.grant_read_write_data(self.create_drink_lambda)
+        for admission_queue in admission_queues.values():
+            admission_queue.grant_send_messages(self.create_drink_lambda)
+            admission_queue.grant(self.create_drink_lambda, "sqs:GetQueueAttributes")
+        recipes_table.grant_write_data(self.create_drink_lambda)
+
+        # No modo monolítico, as solicitações assíncronas são enviadas à Lambda única em vez da máquina de estado padrão
+        if pipeline_lambda:
+            self.create_drink_lambda.add_environment("DRINK_PIPELINE_FUNCTION_NAME", pipeline_lambda.function_name)
+            pipeline_lambda.grant_invoke(self.create_drink_lambda)
+
+        # Criar função Lambda para consultar o status e o resultado de uma receita
+        self.get_drink_lambda = _lambda.Function(
+            self,
+            "GetDrinkFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            code=_lambda.Code.from_asset(".build/lambda"),
+            handler="service.drink.handlers.handle_get_drink.lambda_handler",
+            layers=[lambda_layer],
+            timeout=Duration.seconds(10),
+            memory_size=128,
+            environment={
+                **POWERTOOLS_ENVIRONMENT,
+                "DRINK_RECIPES_TABLE": recipes_table.table_name,
+                "RECIPES_BUCKET": recipes_bucket.bucket_name,
+                "PRESIGNED_URL_EXPIRATION_SECONDS": "900",
+            },
+        )
+
+        # Conceder permissões para ler o item da receita e assinar URLs de leitura da imagem
+        recipes_table.grant_read_data(self.get_drink_lambda)
+        recipes_bucket.grant_read(self.get_drink_lambda)
 
         # Criar API Gateway
         self.api = apigw.RestApi(
@@ -36,9 +112,15 @@ class DrinkApiConstruct(Construct):
             default_cors_preflight_options=apigw.CorsOptions(
                 allow_origins=apigw.Cors.ALL_ORIGINS,
                 allow_methods=apigw.Cors.ALL_METHODS,
+                # Cabeçalhos usados pelo cliente para que repetições do POST /drink não criem outra receita
+                allow_headers=[*apigw.Cors.DEFAULT_HEADERS, "Idempotency-Key", "X-Client-Id"],
             ),
         )
 
         # Adicionar recursos e métodos à API
         drinks_resource = self.api.root.add_resource("drink")
         drinks_resource.add_method("POST", apigw.LambdaIntegration(self.create_drink_lambda))
+        drinks_resource.add_resource("{recipe_id}").add_method("GET", apigw.LambdaIntegration(self.get_drink_lambda))
+
+        batch_resource = self.api.root.add_resource("drinks").add_resource("batch")
+        batch_resource.add_method("POST", apigw.LambdaIntegration(self.create_drink_lambda))
@@ -0,0 +1,67 @@
+import json
+
+from aws_cdk import aws_ssm as ssm
+from constructs import Construct
+
+
+class DrinkConfigConstruct(Construct):
+    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+        super().__init__(scope, construct_id)
+
+        # Criar parâmetro com as configurações ajustáveis em tempo de execução (lidas pelos handlers com cache e TTL)
+        self.settings_parameter = ssm.StringParameter(
+            self,
+            "DrinkSettingsParameter",
+            description="Runtime settings for the drink recipe handlers (Bedrock models, inference, quotas, admission and feature toggles)",
+            string_value=json.dumps(
+                {
+                    "bedrock": {
+                        "text_model_id": "anthropic.claude-3-sonnet-20240229-v1:0",
+                        "text_max_tokens": 1000,
+                        "image_model_id": "stability.stable-diffusion-xl-v1",
+                        "image_cfg_scale": 7,
+                        "image_steps": 50,
+                        "image_seed": 0,
+                        "image_width": 1024,
+                        "image_height": 1024,
+                        # O SDXL 1.0 não aceita 512x512: a prévia usa a menor resolução suportada e economiza nos passos
+                        "image_draft": {"steps": 15, "width": 1024, "height": 1024},
+                        "quotas": {
+                            "anthropic.claude-3-sonnet-20240229-v1:0": {"requests_per_minute": 500, "tokens_per_minute": 1000000},
+                            "anthropic.claude-3-haiku-20240307-v1:0": {"requests_per_minute": 1000, "tokens_per_minute": 2000000},
+                            "stability.stable-diffusion-xl-v1": {"requests_per_minute": 60},
+                        },
+                        "breaker_failure_threshold": 3,
+                        "breaker_cooldown_seconds": 15,
+                        "capacity_max_wait_seconds": 10,
+                        "text_routing": {
+                            "enabled": True,
+                            "tiers": [
+                                {"model_id": "anthropic.claude-3-haiku-20240307-v1:0", "min_complexity": 0},
+                                {"model_id": "anthropic.claude-3-sonnet-20240229-v1:0", "min_complexity": 8},
+                            ],
+                            "latency_slo_seconds": 12,
+                            "fallback_max_wait_seconds": 0,
+                        },
+                    },
+                    "features": {
+                        "recipe_cache_enabled": True,
+                        "recipe_text_streaming": True,
+                        "notification_delivery_mode": "link",
+                        "image_two_phase": True,
+                        "recipe_similarity_enabled": True,
+                    },
+                    "admission": {
+                        "quota_utilization": 0.9,
+                        "max_in_flight": 100,
+                        "lanes": {
+                            "vip": {"weight": 6, "max_in_flight": 40, "max_wait_seconds": 30, "max_backlog": 100},
+                            "standard": {"weight": 3, "max_in_flight": 60, "max_wait_seconds": 120, "max_backlog": 500},
+                            "bulk": {"weight": 1, "max_in_flight": 30, "max_wait_seconds": 900, "max_backlog": 2000},
+                        },
+                    },
+                    "batch_max_items": 500,
+                    "recipe_similarity_threshold": 0.85,
+                }
+            ),
+        )
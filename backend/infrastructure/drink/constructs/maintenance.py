@@ -0,0 +1,81 @@
+from aws_cdk import Duration, Size
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_s3 as s3
+from constructs import Construct
+from infrastructure.drink.constants import POWERTOOLS_ENVIRONMENT
+
+
+class DrinkMaintenanceConstruct(Construct):
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        lambda_layer: _lambda.LayerVersion,
+        image_store_table: dynamodb.Table,
+        recipes_bucket: s3.Bucket,
+        **kwargs
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        # Criar função Lambda para remover imagens compartilhadas sem referências
+        self.collect_images_lambda = _lambda.Function(
+            self,
+            "CollectImagesFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            code=_lambda.Code.from_asset(".build/lambda"),
+            handler="service.drink.handlers.handle_collect_images.lambda_handler",
+            layers=[lambda_layer],
+            timeout=Duration.minutes(5),
+            memory_size=256,
+            environment={
+                **POWERTOOLS_ENVIRONMENT,
+                "RECIPES_BUCKET": recipes_bucket.bucket_name,
+                "IMAGE_STORE_TABLE": image_store_table.table_name,
+                "IMAGE_GC_GRACE_SECONDS": str(7 * 24 * 3600),
+            },
+        )
+
+        # Conceder permissões para a função Lambda ler e remover registros e versões de objetos das imagens
+        image_store_table.grant_read_write_data(self.collect_images_lambda)
+        recipes_bucket.grant_delete(self.collect_images_lambda, "images/*")
+
+        # Executar a coleta uma vez por dia
+        events.Rule(
+            self,
+            "CollectImagesSchedule",
+            schedule=events.Schedule.rate(Duration.days(1)),
+            targets=[targets.LambdaFunction(self.collect_images_lambda)],
+        )
+
+        # Criar função Lambda para consolidar as receitas recém-geradas no índice de similaridade
+        self.build_similarity_index_lambda = _lambda.Function(
+            self,
+            "BuildSimilarityIndexFunction",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            code=_lambda.Code.from_asset(".build/lambda"),
+            handler="service.drink.handlers.handle_build_similarity_index.lambda_handler",
+            layers=[lambda_layer],
+            timeout=Duration.minutes(5),
+            memory_size=2048,  # O snapshot completo é reescrito a cada consolidação
+            ephemeral_storage_size=Size.gibibytes(4),  # Snapshot atual e novo snapshot em /tmp
+            reserved_concurrent_executions=1,  # Apenas uma consolidação por vez publica o ponteiro do snapshot
+            environment={
+                **POWERTOOLS_ENVIRONMENT,
+                "RECIPES_BUCKET": recipes_bucket.bucket_name,
+            },
+        )
+
+        # Conceder permissões para a função Lambda ler, gravar e remover os objetos do índice
+        recipes_bucket.grant_read_write(self.build_similarity_index_lambda, "similarity-index/*")
+        recipes_bucket.grant_delete(self.build_similarity_index_lambda, "similarity-index/*")
+
+        # Consolidar o índice a cada hora (sem receitas pendentes, a execução termina sem publicar um snapshot)
+        events.Rule(
+            self,
+            "BuildSimilarityIndexSchedule",
+            schedule=events.Schedule.rate(Duration.hours(1)),
+            targets=[targets.LambdaFunction(self.build_similarity_index_lambda)],
+        )
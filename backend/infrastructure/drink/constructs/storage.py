@@ -1,4 +1,4 @@
-from aws_cdk import RemovalPolicy
+from aws_cdk import Duration, RemovalPolicy
 from aws_cdk import aws_dynamodb as dynamodb
 from aws_cdk import aws_s3 as s3
 from constructs import Construct
@@ -16,6 +16,10 @@ class DrinkStorageConstruct(Construct):
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
             encryption=s3.BucketEncryption.S3_MANAGED,
             versioned=True,
+            lifecycle_rules=[
+                # Snapshots substituídos e receitas já indexadas do índice de similaridade não precisam de versões antigas
+                s3.LifecycleRule(prefix="similarity-index/", noncurrent_version_expiration=Duration.days(1)),
+            ],
         )
 
         # Criar tabela DynamoDB para armazenar as receitas
@@ -26,3 +30,41 @@ class DrinkStorageConstruct(Construct):
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.RETAIN,
         )
+
+        # Criar tabela DynamoDB para o cache compartilhado de receitas (itens expiram via TTL)
+        self.recipe_cache_table = dynamodb.Table(
+            self,
+            "DrinkRecipeCacheTable",
+            partition_key=dynamodb.Attribute(name="cache_key", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        # Criar tabela DynamoDB com o registro e as referências das imagens compartilhadas (endereçadas por conteúdo)
+        self.image_store_table = dynamodb.Table(
+            self,
+            "DrinkImageStoreTable",
+            partition_key=dynamodb.Attribute(name="image_hash", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
+        # Criar tabela DynamoDB com o estado compartilhado do rate limiter e do circuit breaker do Bedrock
+        self.bedrock_limiter_table = dynamodb.Table(
+            self,
+            "DrinkBedrockLimiterTable",
+            partition_key=dynamodb.Attribute(name="limiter_id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        # Criar tabela DynamoDB com os registros de idempotência do POST /drink (itens expiram via TTL)
+        self.idempotency_table = dynamodb.Table(
+            self,
+            "DrinkIdempotencyTable",
+            partition_key=dynamodb.Attribute(name="idempotency_key", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            removal_policy=RemovalPolicy.DESTROY,
+        )
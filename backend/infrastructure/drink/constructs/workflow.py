@@ -1,12 +1,20 @@
-from aws_cdk import Duration
+from aws_cdk import Duration, Size
 from aws_cdk import aws_dynamodb as dynamodb
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_logs as logs
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_secretsmanager as secretsmanager
+from aws_cdk import aws_ssm as ssm
 from aws_cdk import aws_stepfunctions as sfn
 from aws_cdk import aws_stepfunctions_tasks as tasks
 from constructs import Construct
+from infrastructure.drink.constants import (
+    POWERTOOLS_ENVIRONMENT,
+    SYNC_WORKFLOW_TIMEOUT_SECONDS,
+    WORKFLOW_MODE_CONTEXT_KEY,
+)
+from service.drink.workflow.runner import COMPLETED_RECIPE_FIELDS
 
 
 class DrinkWorkflowConstruct(Construct):
@@ -16,13 +24,23 @@ class DrinkWorkflowConstruct(Construct):
         construct_id: str,
         lambda_layer: _lambda.LayerVersion,
         recipes_table: dynamodb.Table,
+        recipe_cache_table: dynamodb.Table,
+        bedrock_limiter_table: dynamodb.Table,
+        image_store_table: dynamodb.Table,
         recipes_bucket: s3.Bucket,
         sendgrid_secret: secretsmanager.Secret,
-        **kwargs
+        settings_parameter: ssm.StringParameter,
+        **kwargs,
     ) -> None:
         super().__init__(scope, construct_id)
 
         # Criar função Lambda para persistir a solicitação inicial
+        persist_environment = {
+            **POWERTOOLS_ENVIRONMENT,
+            "DRINK_RECIPES_TABLE": recipes_table.table_name,
+            "RECIPES_BUCKET": recipes_bucket.bucket_name,
+            "PAYLOAD_OFFLOAD_THRESHOLD_BYTES": "32768",
+        }
         self.persist_initial_lambda = _lambda.Function(
             self,
             "PersistInitialRequestFunction",
@@ -32,15 +50,30 @@ class DrinkWorkflowConstruct(Construct):
             layers=[lambda_layer],
             timeout=Duration.seconds(30),
             memory_size=128,
-            environment={
-                "DRINK_RECIPES_TABLE": recipes_table.table_name,
-            },
+            environment=persist_environment,
         )
 
-        # Conceder permissões para a função Lambda acessar a tabela DynamoDB
+        # Conceder permissões para a função Lambda acessar a tabela DynamoDB e os payloads retirados do evento (claim-check)
         recipes_table.grant_write_data(self.persist_initial_lambda)
+        recipes_bucket.grant_read_write(self.persist_initial_lambda, "recipes/*")
 
         # Criar função Lambda para gerar o texto da receita
+        text_environment = {
+            **POWERTOOLS_ENVIRONMENT,
+            "RECIPES_BUCKET": recipes_bucket.bucket_name,
+            "BEDROCK_TEXT_MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
+            "RECIPE_CACHE_TABLE": recipe_cache_table.table_name,
+            "RECIPE_CACHE_TTL_SECONDS": "86400",
+            "RECIPE_TEXT_STREAMING": "true",
+            "RECIPE_TEXT_CHECKPOINT_SECONDS": "1.0",
+            "RECIPE_SIMILARITY_ENABLED": "true",
+            "SIMILARITY_INDEX_REFRESH_SECONDS": "300",
+            "BEDROCK_LIMITER_TABLE": bedrock_limiter_table.table_name,
+            "DRINK_RECIPES_TABLE": recipes_table.table_name,
+            "DRINK_SETTINGS_PARAMETER": settings_parameter.parameter_name,
+            "CONFIG_CACHE_TTL_SECONDS": "300",
+            "PAYLOAD_OFFLOAD_THRESHOLD_BYTES": "32768",
+        }
         self.generate_recipe_text_lambda = _lambda.Function(
             self,
             "GenerateRecipeTextFunction",
@@ -49,23 +82,38 @@ class DrinkWorkflowConstruct(Construct):
             handler="service.drink.handlers.handle_generate_recipe_text.lambda_handler",
             layers=[lambda_layer],
             timeout=Duration.seconds(60),
-            memory_size=256,
-            environment={
-                "RECIPES_BUCKET": recipes_bucket.bucket_name,
-                "BEDROCK_TEXT_MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
-            },
+            memory_size=512,  # O índice de similaridade é mapeado do disco; as páginas lidas ocupam a memória da função
+            ephemeral_storage_size=Size.gibibytes(2),  # Snapshot do índice de similaridade em /tmp
+            environment=text_environment,
         )
 
-        # Conceder permissões para a função Lambda acessar o bucket S3 e o Bedrock
-        recipes_bucket.grant_write(self.generate_recipe_text_lambda)
+        # Conceder permissões para a função Lambda acessar o bucket S3, as tabelas (receitas, cache e rate limiter) e o Bedrock
+        # (a leitura do bucket é usada pelo índice de similaridade e pelo texto das receitas reaproveitadas)
+        recipes_bucket.grant_read_write(self.generate_recipe_text_lambda)
+        recipe_cache_table.grant_read_write_data(self.generate_recipe_text_lambda)
+        recipes_table.grant_write_data(self.generate_recipe_text_lambda)
+        bedrock_limiter_table.grant_read_write_data(self.generate_recipe_text_lambda)
+        settings_parameter.grant_read(self.generate_recipe_text_lambda)
         self.generate_recipe_text_lambda.add_to_role_policy(
             iam.PolicyStatement(
-                actions=["bedrock:InvokeModel"],
+                actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
                 resources=["*"],  # Idealmente, restringir a ARNs específicos de modelos
             )
         )
 
         # Criar função Lambda para gerar a imagem da receita
+        image_environment = {
+            **POWERTOOLS_ENVIRONMENT,
+            "RECIPES_BUCKET": recipes_bucket.bucket_name,
+            "BEDROCK_IMAGE_MODEL_ID": "stability.stable-diffusion-xl-v1",
+            "BEDROCK_LIMITER_TABLE": bedrock_limiter_table.table_name,
+            "DRINK_RECIPES_TABLE": recipes_table.table_name,
+            "IMAGE_STORE_TABLE": image_store_table.table_name,
+            "IMAGE_TWO_PHASE": "true",
+            "DRINK_SETTINGS_PARAMETER": settings_parameter.parameter_name,
+            "CONFIG_CACHE_TTL_SECONDS": "300",
+            "PAYLOAD_OFFLOAD_THRESHOLD_BYTES": "32768",
+        }
         self.generate_recipe_image_lambda = _lambda.Function(
             self,
             "GenerateRecipeImageFunction",
@@ -74,15 +122,17 @@ class DrinkWorkflowConstruct(Construct):
             handler="service.drink.handlers.handle_generate_recipe_image.lambda_handler",
             layers=[lambda_layer],
             timeout=Duration.seconds(60),
-            memory_size=256,
-            environment={
-                "RECIPES_BUCKET": recipes_bucket.bucket_name,
-                "BEDROCK_IMAGE_MODEL_ID": "stability.stable-diffusion-xl-v1",
-            },
+            memory_size=1024,  # Mais memória também significa mais CPU para codificar as versões da imagem
+            environment=image_environment,
         )
 
-        # Conceder permissões para a função Lambda acessar o bucket S3 e o Bedrock
+        # Conceder permissões para a função Lambda acessar o bucket S3, as tabelas, as configurações e o Bedrock
         recipes_bucket.grant_write(self.generate_recipe_image_lambda)
+        recipes_bucket.grant_read(self.generate_recipe_image_lambda, "recipes/*")
+        recipes_table.grant_write_data(self.generate_recipe_image_lambda)
+        image_store_table.grant_read_write_data(self.generate_recipe_image_lambda)
+        bedrock_limiter_table.grant_read_write_data(self.generate_recipe_image_lambda)
+        settings_parameter.grant_read(self.generate_recipe_image_lambda)
         self.generate_recipe_image_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["bedrock:InvokeModel"],
@@ -91,6 +141,16 @@ class DrinkWorkflowConstruct(Construct):
         )
 
         # Criar função Lambda para enviar notificação
+        notification_environment = {
+            **POWERTOOLS_ENVIRONMENT,
+            "RECIPES_BUCKET": recipes_bucket.bucket_name,
+            "SENDGRID_SECRET_NAME": sendgrid_secret.secret_name,
+            "NOTIFICATION_DELIVERY_MODE": "link",
+            "NOTIFICATION_LINK_EXPIRATION_SECONDS": "43200",
+            "DRINK_SETTINGS_PARAMETER": settings_parameter.parameter_name,
+            "CONFIG_CACHE_TTL_SECONDS": "300",
+            "PAYLOAD_OFFLOAD_THRESHOLD_BYTES": "32768",
+        }
         self.send_notification_lambda = _lambda.Function(
             self,
             "SendNotificationFunction",
@@ -100,52 +160,222 @@ class DrinkWorkflowConstruct(Construct):
             layers=[lambda_layer],
             timeout=Duration.seconds(30),
             memory_size=256,
-            environment={
-                "RECIPES_BUCKET": recipes_bucket.bucket_name,
-                "SENDGRID_SECRET_NAME": sendgrid_secret.secret_name,
-            },
+            environment=notification_environment,
         )
 
-        # Conceder permissões para a função Lambda acessar o bucket S3 e o Secrets Manager
+        # Conceder permissões para a função Lambda acessar o bucket S3, o Secrets Manager e as configurações
         recipes_bucket.grant_read(self.send_notification_lambda)
+        recipes_bucket.grant_put(self.send_notification_lambda, "recipes/*")
         sendgrid_secret.grant_read(self.send_notification_lambda)
+        settings_parameter.grant_read(self.send_notification_lambda)
+
+        # Fluxo padrão (Standard): assíncrono, com a versão final da imagem e depois a notificação por e-mail na mesma
+        # execução, para que o e-mail leve à versão final
+        persist_task, generate_content, mark_completed_task, render_full_image_task = self._define_generation_states("", recipes_table)
+
+        send_notification_task = tasks.LambdaInvoke(
+            self,
+            "SendNotification",
+            lambda_function=self.send_notification_lambda,
+            output_path="$.Payload",
+        )
 
-        # Definir as tarefas do Step Functions
+        # Uma falha na versão final não impede a notificação, que segue com a prévia
+        render_full_image_task.add_catch(send_notification_task, result_path="$.error")
+
+        # Definir o fluxo do Step Functions
+        workflow_definition = persist_task.next(generate_content).next(mark_completed_task).next(render_full_image_task).next(send_notification_task)
+
+        # Criar a máquina de estado do Step Functions
+        self.state_machine = sfn.StateMachine(
+            self,
+            "DrinkRecipeStateMachine",
+            definition=workflow_definition,
+            timeout=Duration.minutes(5),
+        )
+
+        # Fluxo síncrono (Express, iniciado com StartSyncExecution pela API com ?wait=true): devolve o texto e a prévia
+        # da imagem na resposta HTTP, sem notificação; a versão final da imagem é disparada de forma assíncrona.
+        # O timeout fica abaixo do prazo da API para que a função ainda consiga recorrer ao fluxo padrão
+        sync_persist_task, sync_generate_content, sync_mark_completed_task, sync_render_full_image_task = self._define_generation_states(
+            "Sync", recipes_table, full_image_invocation_type=tasks.LambdaInvocationType.EVENT
+        )
+        sync_render_full_image_task.add_catch(sfn.Succeed(self, "SyncKeepDraftImage"), result_path="$.error")
+        sync_workflow_definition = sync_persist_task.next(sync_generate_content).next(sync_mark_completed_task).next(sync_render_full_image_task)
+
+        self.express_state_machine = sfn.StateMachine(
+            self,
+            "DrinkRecipeExpressStateMachine",
+            definition=sync_workflow_definition,
+            state_machine_type=sfn.StateMachineType.EXPRESS,
+            timeout=Duration.seconds(SYNC_WORKFLOW_TIMEOUT_SECONDS),
+            logs=sfn.LogOptions(
+                destination=logs.LogGroup(self, "DrinkRecipeExpressLogs", retention=logs.RetentionDays.ONE_WEEK),
+                level=sfn.LogLevel.ERROR,
+            ),
+        )
+
+        # Modo monolítico (contexto "drink:workflow_mode" igual a "lambda"): o fluxo inteiro roda em uma única função,
+        # com as mesmas etapas e repetições, o que dispensa as transições de estado em ambientes de baixo volume
+        self.pipeline_lambda = None
+        if self.node.try_get_context(WORKFLOW_MODE_CONTEXT_KEY) == "lambda":
+            self.pipeline_lambda = _lambda.Function(
+                self,
+                "RunWorkflowFunction",
+                runtime=_lambda.Runtime.PYTHON_3_12,
+                code=_lambda.Code.from_asset(".build/lambda"),
+                handler="service.drink.handlers.handle_run_workflow.lambda_handler",
+                layers=[lambda_layer],
+                timeout=Duration.minutes(5),
+                memory_size=1024,
+                ephemeral_storage_size=Size.gibibytes(2),
+                environment={**persist_environment, **text_environment, **image_environment, **notification_environment},
+            )
+
+            # As mesmas permissões das quatro funções do fluxo, mais a atualização do status da receita
+            recipes_table.grant_read_write_data(self.pipeline_lambda)
+            recipes_bucket.grant_read_write(self.pipeline_lambda)
+            recipe_cache_table.grant_read_write_data(self.pipeline_lambda)
+            bedrock_limiter_table.grant_read_write_data(self.pipeline_lambda)
+            image_store_table.grant_read_write_data(self.pipeline_lambda)
+            settings_parameter.grant_read(self.pipeline_lambda)
+            sendgrid_secret.grant_read(self.pipeline_lambda)
+            self.pipeline_lambda.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
+                    resources=["*"],  # Idealmente, restringir a ARNs específicos de modelos
+                )
+            )
+
+    def _define_generation_states(
+        self,
+        prefix: str,
+        recipes_table: dynamodb.Table,
+        full_image_invocation_type: tasks.LambdaInvocationType = tasks.LambdaInvocationType.REQUEST_RESPONSE,
+    ):
+        """
+        Cria os estados comuns aos fluxos padrão e síncrono: persistência, geração paralela de texto e imagem,
+        registro do resultado (ou da falha) e a versão final da imagem.
+
+        Args:
+            prefix: Prefixo dos ids dos estados (cada máquina de estado precisa de estados próprios)
+            recipes_table: Tabela das receitas
+            full_image_invocation_type: Invocação da versão final da imagem (EVENT para não bloquear o fluxo)
+
+        Returns:
+            tuple: Estados de persistência, geração do conteúdo, conclusão e versão final da imagem (sem Catch)
+        """
+        # A imagem é gerada em duas fases: a prévia rápida entra no ramo paralelo e libera a resposta;
+        # a versão final é gerada depois que a receita é concluída e substitui a prévia no item da receita.
+        # Cada fluxo define o Catch da versão final (o fluxo padrão ainda notifica o cliente depois dela)
         persist_task = tasks.LambdaInvoke(
             self,
-            "PersistInitialRequest",
+            f"{prefix}PersistInitialRequest",
             lambda_function=self.persist_initial_lambda,
             output_path="$.Payload",
         )
 
         generate_text_task = tasks.LambdaInvoke(
             self,
-            "GenerateRecipeText",
+            f"{prefix}GenerateRecipeText",
             lambda_function=self.generate_recipe_text_lambda,
             output_path="$.Payload",
         )
 
         generate_image_task = tasks.LambdaInvoke(
             self,
-            "GenerateRecipeImage",
+            f"{prefix}GenerateRecipeImage",
             lambda_function=self.generate_recipe_image_lambda,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "recipe_id": sfn.JsonPath.string_at("$.recipe_id"),
+                    "timestamp": sfn.JsonPath.string_at("$.timestamp"),
+                    "request": sfn.JsonPath.object_at("$.request"),
+                    "image_profile": "draft",
+                }
+            ),
             output_path="$.Payload",
         )
 
-        send_notification_task = tasks.LambdaInvoke(
+        full_image_waits = full_image_invocation_type == tasks.LambdaInvocationType.REQUEST_RESPONSE
+        render_full_image_task = tasks.LambdaInvoke(
             self,
-            "SendNotification",
-            lambda_function=self.send_notification_lambda,
-            output_path="$.Payload",
+            f"{prefix}RenderFullQualityImage",
+            lambda_function=self.generate_recipe_image_lambda,
+            invocation_type=full_image_invocation_type,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "recipe_id": sfn.JsonPath.string_at("$.recipe_id"),
+                    "timestamp": sfn.JsonPath.string_at("$.timestamp"),
+                    "request": sfn.JsonPath.object_at("$.request"),
+                    "recipe": sfn.JsonPath.object_at("$.recipe"),
+                    "image_profile": "full",
+                }
+            ),
+            # Na invocação síncrona, o evento com a versão final segue para o próximo estado
+            output_path="$.Payload" if full_image_waits else None,
+            result_path=None if full_image_waits else sfn.JsonPath.DISCARD,
         )
 
-        # Definir o fluxo do Step Functions
-        workflow_definition = persist_task.next(generate_text_task).next(generate_image_task).next(send_notification_task)
+        # Sem capacidade no Bedrock, as funções descartam a chamada com BedrockOverloadedError;
+        # a máquina de estado repete com backoff exponencial e jitter em vez de insistir dentro da Lambda
+        # (na invocação assíncrona, as repetições ficam a cargo do próprio Lambda)
+        retried_tasks = [generate_text_task, generate_image_task]
+        if full_image_waits:
+            retried_tasks.append(render_full_image_task)
+        for generate_task in retried_tasks:
+            generate_task.add_retry(
+                errors=["BedrockOverloadedError"],
+                interval=Duration.seconds(5),
+                backoff_rate=2,
+                max_attempts=6,
+                jitter_strategy=sfn.JitterType.FULL,
+            )
 
-        # Criar a máquina de estado do Step Functions
-        self.state_machine = sfn.StateMachine(
+        # Gerar texto e imagem em paralelo: o prompt da imagem depende apenas da solicitação,
+        # então a latência total passa a ser max(texto, imagem) em vez da soma dos dois
+        generate_content = sfn.Parallel(
             self,
-            "DrinkRecipeStateMachine",
-            definition=workflow_definition,
-            timeout=Duration.minutes(5),
+            f"{prefix}GenerateRecipeContent",
+            result_selector={
+                "recipe_id": sfn.JsonPath.string_at("$[0].recipe_id"),
+                "timestamp": sfn.JsonPath.string_at("$[0].timestamp"),
+                "request": sfn.JsonPath.object_at("$[0].request"),
+                "recipe": sfn.JsonPath.json_merge(sfn.JsonPath.object_at("$[0].recipe"), sfn.JsonPath.object_at("$[1].recipe")),
+            },
         )
+        generate_content.branch(generate_text_task)
+        generate_content.branch(generate_image_task)
+
+        # Registrar o resultado no item da receita para a API de consulta (GET /drink/{recipe_id})
+        mark_completed_task = tasks.DynamoUpdateItem(
+            self,
+            f"{prefix}MarkRecipeCompleted",
+            table=recipes_table,
+            key={"recipe_id": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.recipe_id"))},
+            # Os mesmos atributos gravados pelo fluxo em uma única Lambda (COMPLETED_RECIPE_FIELDS)
+            update_expression="SET #status = :status" + "".join(f", {attribute} = :{attribute}" for attribute in COMPLETED_RECIPE_FIELDS),
+            expression_attribute_names={"#status": "status"},
+            expression_attribute_values={
+                ":status": tasks.DynamoAttributeValue.from_string("COMPLETED"),
+                **{
+                    f":{attribute}": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at(f"$.recipe.{field}"))
+                    for attribute, field in COMPLETED_RECIPE_FIELDS.items()
+                },
+            },
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        mark_failed_task = tasks.DynamoUpdateItem(
+            self,
+            f"{prefix}MarkRecipeFailed",
+            table=recipes_table,
+            key={"recipe_id": tasks.DynamoAttributeValue.from_string(sfn.JsonPath.string_at("$.recipe_id"))},
+            update_expression="SET #status = :status",
+            expression_attribute_names={"#status": "status"},
+            expression_attribute_values={":status": tasks.DynamoAttributeValue.from_string("FAILED")},
+            result_path=sfn.JsonPath.DISCARD,
+        ).next(sfn.Fail(self, f"{prefix}RecipeGenerationFailed"))
+        generate_content.add_catch(mark_failed_task, result_path="$.error")
+
+        return persist_task, generate_content, mark_completed_task, render_full_image_task
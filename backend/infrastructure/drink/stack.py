@@ -2,7 +2,10 @@ from aws_cdk import CfnOutput, Stack
 from aws_cdk import aws_lambda as _lambda
 from aws_cdk.aws_lambda_python_alpha import PythonLayerVersion
 from constructs import Construct
+from infrastructure.drink.constructs.admission import DrinkAdmissionConstruct
 from infrastructure.drink.constructs.api import DrinkApiConstruct
+from infrastructure.drink.constructs.config import DrinkConfigConstruct
+from infrastructure.drink.constructs.maintenance import DrinkMaintenanceConstruct
 from infrastructure.drink.constructs.secrets import DrinkSecretsConstruct
 from infrastructure.drink.constructs.storage import DrinkStorageConstruct
 from infrastructure.drink.constructs.workflow import DrinkWorkflowConstruct
@@ -24,14 +27,29 @@ class AwesomeGenerativeDrinkStack(Stack):
         # Criar constructs
         storage = DrinkStorageConstruct(self, "DrinkStorage")
         secrets = DrinkSecretsConstruct(self, "DrinkSecrets")
+        config = DrinkConfigConstruct(self, "DrinkConfig")
 
         workflow = DrinkWorkflowConstruct(
             self,
             "DrinkWorkflow",
             lambda_layer=lambda_layer,
             recipes_table=storage.recipes_table,
+            recipe_cache_table=storage.recipe_cache_table,
+            bedrock_limiter_table=storage.bedrock_limiter_table,
+            image_store_table=storage.image_store_table,
             recipes_bucket=storage.recipes_bucket,
             sendgrid_secret=secrets.sendgrid_secret,
+            settings_parameter=config.settings_parameter,
+        )
+
+        admission = DrinkAdmissionConstruct(
+            self,
+            "DrinkAdmission",
+            lambda_layer=lambda_layer,
+            state_machine=workflow.state_machine,
+            pipeline_lambda=workflow.pipeline_lambda,
+            bedrock_limiter_table=storage.bedrock_limiter_table,
+            settings_parameter=config.settings_parameter,
         )
 
         DrinkApiConstruct(
@@ -39,6 +57,21 @@ class AwesomeGenerativeDrinkStack(Stack):
             "DrinkApi",
             lambda_layer=lambda_layer,
             state_machine=workflow.state_machine,
+            express_state_machine=workflow.express_state_machine,
+            pipeline_lambda=workflow.pipeline_lambda,
+            recipes_table=storage.recipes_table,
+            idempotency_table=storage.idempotency_table,
+            admission_queues=admission.admission_queues,
+            recipes_bucket=storage.recipes_bucket,
+            settings_parameter=config.settings_parameter,
+        )
+
+        DrinkMaintenanceConstruct(
+            self,
+            "DrinkMaintenance",
+            lambda_layer=lambda_layer,
+            image_store_table=storage.image_store_table,
+            recipes_bucket=storage.recipes_bucket,
         )
 
         # Exportar recursos para testes de integração
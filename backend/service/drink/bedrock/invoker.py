@@ -0,0 +1,150 @@
+import os
+import random
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError, EventStreamError
+from service.drink.bedrock.rate_limiter import (
+    BedrockOverloadedError,
+    BucketLimit,
+    CircuitBreaker,
+    TokenBucketLimiter,
+)
+from service.drink.clients import get_client, get_table
+from service.drink.config import DrinkSettings
+
+logger = Logger(child=True)
+
+# Tabela com o estado compartilhado do rate limiter e do circuit breaker (será definida via variável de ambiente)
+BEDROCK_LIMITER_TABLE = os.environ.get("BEDROCK_LIMITER_TABLE")
+
+# Códigos de erro do Bedrock que indicam falta de capacidade, e não um problema na requisição
+THROTTLING_ERROR_CODES = {"ThrottlingException", "ServiceQuotaExceededException", "ModelNotReadyException", "TooManyRequestsException"}
+
+# Erros de falta de capacidade que o Bedrock informa no meio do stream de resposta (eventos de exceção do stream)
+STREAM_THROTTLING_ERROR_CODES = {"throttlingException", "modelStreamErrorException"}
+
+
+class BedrockInvoker:
+    """
+    Camada de invocação do Bedrock usada pelos handlers de texto e imagem.
+
+    Expõe a mesma interface do cliente bedrock-runtime (invoke_model e invoke_model_with_response_stream),
+    mas antes de cada chamada consulta o circuit breaker e consome a cota do token bucket distribuído.
+    Quando não há capacidade dentro do tempo máximo de espera, a chamada é descartada com BedrockOverloadedError,
+    que a máquina de estado repete com backoff. Em streaming, o resultado da chamada só é registrado no circuit
+    breaker ao fim do stream, já que o Bedrock também pode recusar a chamada no meio dele.
+    """
+
+    def __init__(
+        self,
+        bedrock_runtime,
+        limiter: Optional[TokenBucketLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_wait_seconds: float = 10.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.bedrock_runtime = bedrock_runtime
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_wait_seconds = max_wait_seconds
+        self.sleep = sleep
+        self.clock = clock
+
+    def invoke_model(self, *, modelId: str, estimated_tokens: int = 0, max_wait_seconds: Optional[float] = None, **kwargs) -> dict:
+        return self._invoke("invoke_model", modelId, estimated_tokens, max_wait_seconds, kwargs)
+
+    def invoke_model_with_response_stream(
+        self, *, modelId: str, estimated_tokens: int = 0, max_wait_seconds: Optional[float] = None, **kwargs
+    ) -> dict:
+        return self._invoke("invoke_model_with_response_stream", modelId, estimated_tokens, max_wait_seconds, kwargs)
+
+    def _invoke(self, operation: str, model_id: str, estimated_tokens: int, max_wait_seconds: Optional[float], kwargs: dict) -> dict:
+        # Um limite de espera menor por chamada permite que o roteador passe logo para outro modelo
+        self._wait_for_capacity(
+            model_id, {"requests": 1, "tokens": estimated_tokens}, self.max_wait_seconds if max_wait_seconds is None else max_wait_seconds
+        )
+
+        try:
+            response = getattr(self.bedrock_runtime, operation)(modelId=model_id, **kwargs)
+        except ClientError as error:
+            if error.response["Error"]["Code"] not in THROTTLING_ERROR_CODES:
+                raise
+            if self.breaker:
+                self.breaker.record_throttle(model_id)
+            raise BedrockOverloadedError(f"Bedrock throttled {model_id}: {error.response['Error']['Code']}") from error
+
+        if operation == "invoke_model_with_response_stream":
+            return {**response, "body": self._watch_stream(model_id, response["body"])}
+
+        if self.breaker:
+            self.breaker.record_success(model_id)
+        return response
+
+    def _watch_stream(self, model_id: str, events: Iterable[dict]) -> Iterator[dict]:
+        """
+        Repassa os eventos do stream, tratando um throttling no meio do stream como o da abertura da chamada.
+        """
+        try:
+            yield from events
+        except EventStreamError as error:
+            if error.response["Error"]["Code"] not in STREAM_THROTTLING_ERROR_CODES:
+                raise
+            if self.breaker:
+                self.breaker.record_throttle(model_id)
+            raise BedrockOverloadedError(f"Bedrock throttled {model_id} mid-stream: {error.response['Error']['Code']}") from error
+
+        if self.breaker:
+            self.breaker.record_success(model_id)
+
+    def _wait_for_capacity(self, model_id: str, cost: dict, max_wait_seconds: float) -> None:
+        deadline = self.clock() + max_wait_seconds
+
+        while True:
+            wait_seconds = self.breaker.remaining_open_seconds(model_id) if self.breaker else 0.0
+            if not wait_seconds and self.limiter:
+                wait_seconds = self.limiter.try_acquire(model_id, cost)
+            if not wait_seconds:
+                return
+
+            # Sem capacidade dentro do prazo, a carga é descartada para ser repetida mais tarde pela máquina de estado
+            if self.clock() + wait_seconds > deadline:
+                raise BedrockOverloadedError(f"No Bedrock capacity for {model_id} within {max_wait_seconds}s")
+
+            # O jitter evita que containers em espera acordem todos ao mesmo tempo
+            self.sleep(wait_seconds + random.uniform(0, min(wait_seconds, 1.0)))
+
+
+def create_bedrock_invoker(settings: DrinkSettings) -> BedrockInvoker:
+    """
+    Cria a camada de invocação com as cotas e parâmetros do circuit breaker atuais da configuração.
+
+    Args:
+        settings: Configurações tipadas dos handlers
+
+    Returns:
+        BedrockInvoker: Invocador pronto para uso (sem coordenação quando a tabela não está configurada)
+    """
+    bedrock_settings = settings.bedrock
+    limiter = None
+    breaker = None
+
+    if BEDROCK_LIMITER_TABLE:
+        table = get_table(BEDROCK_LIMITER_TABLE)
+        limits = {}
+        for model_id, quota in bedrock_settings.quotas.items():
+            limits[model_id] = {"requests": BucketLimit.per_minute(quota.requests_per_minute)}
+            if quota.tokens_per_minute:
+                limits[model_id]["tokens"] = BucketLimit.per_minute(quota.tokens_per_minute)
+        limiter = TokenBucketLimiter(table, limits)
+        breaker = CircuitBreaker(
+            table,
+            failure_threshold=bedrock_settings.breaker_failure_threshold,
+            cooldown_seconds=bedrock_settings.breaker_cooldown_seconds,
+        )
+
+    return BedrockInvoker(
+        get_client("bedrock-runtime"), limiter=limiter, breaker=breaker, max_wait_seconds=bedrock_settings.capacity_max_wait_seconds
+    )
@@ -0,0 +1,200 @@
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict
+
+from aws_lambda_powertools import Logger
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+logger = Logger(child=True)
+
+
+class BedrockOverloadedError(Exception):
+    """
+    Capacidade do Bedrock indisponível: cota local esgotada, circuit breaker aberto ou throttling do serviço.
+
+    O nome da exceção é usado nas políticas de Retry da máquina de estado.
+    """
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    """
+    Capacidade máxima e taxa de reposição de uma dimensão do token bucket (por exemplo, requisições ou tokens).
+    """
+
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, amount: float) -> "BucketLimit":
+        return cls(capacity=amount, refill_per_second=amount / 60)
+
+
+def compare_and_set(table, key: dict, mutate: Callable[[dict], dict], max_attempts: int = 10):
+    """
+    Lê um item, aplica a alteração e grava com controle otimista de concorrência (atributo "version").
+
+    Args:
+        table: Tabela do DynamoDB (ou o substituto local)
+        key: Chave primária do item
+        mutate: Função que recebe o item atual (vazio se não existir) e retorna o novo item, ou None para não gravar
+        max_attempts: Tentativas antes de desistir quando outro container grava ao mesmo tempo
+
+    Returns:
+        dict | None: Item gravado, ou None quando mutate decidiu não gravar
+    """
+    for _ in range(max_attempts):
+        current = table.get_item(Key=key, ConsistentRead=True).get("Item") or {}
+        updated = mutate(dict(current))
+        if updated is None:
+            return None
+
+        version = int(current.get("version", 0))
+        condition = Attr("version").not_exists() if not current else Attr("version").eq(current["version"])
+        try:
+            table.put_item(Item={**updated, **key, "version": version + 1}, ConditionExpression=condition)
+            return updated
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    raise BedrockOverloadedError(f"Could not update rate limiter state for {key} after {max_attempts} attempts")
+
+
+def refilled_levels(item: dict, limits: Dict[str, BucketLimit], now: float) -> Dict[str, float]:
+    """
+    Calcula o nível de cada dimensão do bucket no instante informado, somando a reposição desde a última gravação.
+    """
+    elapsed = max(0.0, now - float(item.get("updated_at", now)))
+    return {
+        dimension: min(limit.capacity, float(item.get(dimension, limit.capacity)) + elapsed * limit.refill_per_second)
+        for dimension, limit in limits.items()
+    }
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket distribuído: o estado fica em um item do DynamoDB por modelo e é atualizado com gravações condicionais,
+    de forma que todos os containers respeitem juntos as cotas de requisições (RPM) e tokens (TPM) da conta.
+    """
+
+    def __init__(self, table, limits: Dict[str, Dict[str, BucketLimit]], clock: Callable[[], float] = time.time):
+        self.table = table
+        self.limits = limits
+        self.clock = clock
+
+    def try_acquire(self, model_id: str, cost: Dict[str, float]) -> float:
+        """
+        Tenta consumir a capacidade necessária para uma chamada.
+
+        Args:
+            model_id: Modelo do Bedrock (cada modelo tem seu próprio bucket)
+            cost: Quantidade consumida por dimensão, por exemplo {"requests": 1, "tokens": 1500}
+
+        Returns:
+            float: 0 se a capacidade foi consumida; caso contrário, segundos até haver capacidade suficiente
+        """
+        limits = self.limits.get(model_id)
+        if not limits:
+            return 0.0
+
+        # Uma chamada maior que a capacidade do bucket nunca seria liberada; ela passa a consumir o bucket inteiro
+        cost = {dimension: min(amount, limits[dimension].capacity) for dimension, amount in cost.items() if dimension in limits}
+
+        wait = {"seconds": 0.0}
+
+        def consume(item: dict):
+            now = self.clock()
+            levels = refilled_levels(item, limits, now)
+
+            missing = {dimension: cost.get(dimension, 0) - levels[dimension] for dimension in limits}
+            wait["seconds"] = max(
+                (missing[dimension] / limits[dimension].refill_per_second for dimension in limits if missing[dimension] > 0), default=0.0
+            )
+            if wait["seconds"] > 0:
+                return None
+
+            updated = {dimension: Decimal(str(round(levels[dimension] - cost.get(dimension, 0), 6))) for dimension in limits}
+            updated["updated_at"] = Decimal(str(round(now, 6)))
+            return updated
+
+        compare_and_set(self.table, {"limiter_id": f"bucket#{model_id}"}, consume)
+        return wait["seconds"]
+
+    def release(self, model_id: str, cost: Dict[str, float]) -> None:
+        """
+        Devolve ao bucket a capacidade consumida por uma chamada que não chegou a ser feita.
+
+        Args:
+            model_id: Modelo do Bedrock (ou bucket) da capacidade consumida
+            cost: Quantidade devolvida por dimensão, a mesma informada a try_acquire
+        """
+        limits = self.limits.get(model_id)
+        if not limits:
+            return
+
+        def refund(item: dict):
+            now = self.clock()
+            levels = refilled_levels(item, limits, now)
+            updated = {
+                dimension: Decimal(str(round(min(limit.capacity, levels[dimension] + cost.get(dimension, 0)), 6)))
+                for dimension, limit in limits.items()
+            }
+            updated["updated_at"] = Decimal(str(round(now, 6)))
+            return updated
+
+        compare_and_set(self.table, {"limiter_id": f"bucket#{model_id}"}, refund)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker compartilhado entre containers: após uma sequência de erros de throttling do Bedrock,
+    o circuito abre por um período e as novas chamadas são adiadas ou descartadas em vez de agravar o throttling.
+    """
+
+    def __init__(self, table, failure_threshold: int = 3, cooldown_seconds: float = 15.0, clock: Callable[[], float] = time.time):
+        self.table = table
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._last_seen_failures = {}
+
+    def remaining_open_seconds(self, model_id: str) -> float:
+        """
+        Retorna quantos segundos faltam para o circuito do modelo fechar (0 quando está fechado).
+        """
+        item = self.table.get_item(Key={"limiter_id": f"breaker#{model_id}"}, ConsistentRead=True).get("Item") or {}
+        self._last_seen_failures[model_id] = int(item.get("failures", 0))
+        return max(0.0, float(item.get("open_until", 0)) - self.clock())
+
+    def record_throttle(self, model_id: str) -> None:
+        """
+        Registra um erro de throttling e abre o circuito quando o limite de falhas consecutivas é atingido.
+        """
+
+        def increment(item: dict):
+            failures = int(item.get("failures", 0)) + 1
+            if failures >= self.failure_threshold:
+                logger.warning(f"Opening Bedrock circuit breaker for {model_id} during {self.cooldown_seconds}s")
+                return {"failures": 0, "open_until": Decimal(str(round(self.clock() + self.cooldown_seconds, 6)))}
+            return {"failures": failures, "open_until": item.get("open_until", 0)}
+
+        updated = compare_and_set(self.table, {"limiter_id": f"breaker#{model_id}"}, increment)
+        self._last_seen_failures[model_id] = int(updated["failures"])
+
+    def record_success(self, model_id: str) -> None:
+        """
+        Zera a contagem de falhas consecutivas (sem gravar quando ela já estava zerada).
+        """
+        if not self._last_seen_failures.get(model_id):
+            return
+
+        def reset(item: dict):
+            if not int(item.get("failures", 0)):
+                return None
+            return {"failures": 0, "open_until": item.get("open_until", 0)}
+
+        compare_and_set(self.table, {"limiter_id": f"breaker#{model_id}"}, reset)
+        self._last_seen_failures[model_id] = 0
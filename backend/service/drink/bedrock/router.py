@@ -0,0 +1,166 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+from service.drink.bedrock.rate_limiter import BedrockOverloadedError, CircuitBreaker
+from service.drink.config import BedrockSettings
+from service.drink.models.drink_request import DrinkRequest
+
+logger = Logger(child=True)
+
+# Peso extra de sabores que exigem mais do modelo (equilíbrio de amargor, combinações menos óbvias)
+FLAVOR_COMPLEXITY = {"complex": 4, "bitter": 2}
+
+# Erros do Bedrock (além do BedrockOverloadedError) que indicam lentidão do modelo, e não uma requisição inválida
+FAILOVER_ERROR_CODES = {"ModelTimeoutException", "ServiceUnavailableException"}
+
+
+def score_complexity(drink_request: DrinkRequest) -> int:
+    """
+    Calcula a complexidade da solicitação: número de ingredientes mais o peso do sabor.
+
+    Args:
+        drink_request: Solicitação validada
+
+    Returns:
+        int: Pontuação de complexidade
+    """
+    ingredient_count = sum(len(values or []) for values in (drink_request.fruit, drink_request.liquids, drink_request.syrups, drink_request.leaves))
+    return ingredient_count + FLAVOR_COMPLEXITY.get(drink_request.flavor, 0)
+
+
+def is_failover_error(error: Exception) -> bool:
+    """
+    Indica se o erro deve fazer o roteador tentar o próximo modelo (throttling, falta de capacidade ou timeout).
+    """
+    if isinstance(error, (BedrockOverloadedError, ReadTimeoutError, ConnectTimeoutError)):
+        return True
+    return isinstance(error, ClientError) and error.response["Error"]["Code"] in FAILOVER_ERROR_CODES
+
+
+class LatencyTracker:
+    """
+    Média móvel exponencial da latência observada por modelo, mantida no container entre invocações.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latencies: Dict[str, float] = {}
+
+    def observe(self, model_id: str, seconds: float) -> None:
+        previous = self.latencies.get(model_id)
+        self.latencies[model_id] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+
+    def get(self, model_id: str) -> Optional[float]:
+        return self.latencies.get(model_id)
+
+
+@dataclass
+class RoutedResult:
+    model_id: str
+    output: Any
+    latency_seconds: float
+    failed_models: List[str] = field(default_factory=list)
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de texto para cada solicitação e faz failover para os demais.
+
+    A política considera, nesta ordem:
+    1. Complexidade: o modelo mais capaz cuja complexidade mínima é atendida pela solicitação.
+    2. SLO de latência: se a latência observada do modelo escolhido passa do SLO, desce um nível
+       (desde que o modelo mais rápido esteja dentro do SLO ou ainda não tenha sido medido).
+    3. Carga: modelos com o circuit breaker aberto vão para o fim da lista.
+
+    O failover segue para os modelos mais rápidos primeiro e depois para os mais capazes.
+    """
+
+    def __init__(
+        self,
+        bedrock_settings: BedrockSettings,
+        breaker: Optional[CircuitBreaker] = None,
+        latency_tracker: Optional[LatencyTracker] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.bedrock_settings = bedrock_settings
+        self.routing = bedrock_settings.text_routing
+        self.breaker = breaker
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        self.clock = clock
+
+    def plan(self, complexity: int) -> List[str]:
+        """
+        Retorna os modelos candidatos, na ordem em que devem ser tentados.
+
+        Args:
+            complexity: Complexidade da solicitação (ver score_complexity)
+
+        Returns:
+            List[str]: IDs dos modelos
+        """
+        if not self.routing.enabled:
+            return [self.bedrock_settings.text_model_id]
+
+        tiers = sorted(self.routing.tiers, key=lambda tier: tier.min_complexity)
+        chosen = max((index for index, tier in enumerate(tiers) if tier.min_complexity <= complexity), default=0)
+
+        if chosen > 0:
+            observed = self.latency_tracker.get(tiers[chosen].model_id)
+            faster = self.latency_tracker.get(tiers[chosen - 1].model_id)
+            if (
+                observed is not None
+                and observed > self.routing.latency_slo_seconds
+                and (faster is None or faster <= self.routing.latency_slo_seconds)
+            ):
+                logger.info(f"Model {tiers[chosen].model_id} is above the latency SLO ({observed:.1f}s), routing to a faster tier")
+                chosen -= 1
+
+        order = [chosen, *reversed(range(chosen)), *range(chosen + 1, len(tiers))]
+        models = [tiers[index].model_id for index in order]
+
+        if self.breaker:
+            open_models = [model_id for model_id in models if self.breaker.remaining_open_seconds(model_id) > 0]
+            models = [model_id for model_id in models if model_id not in open_models] + open_models
+
+        return models
+
+    def invoke(self, complexity: int, call: Callable[[str, float], Any]) -> RoutedResult:
+        """
+        Executa a chamada no primeiro modelo disponível, fazendo failover em throttling ou timeout.
+
+        Args:
+            complexity: Complexidade da solicitação
+            call: Função que recebe o ID do modelo e o tempo máximo de espera por capacidade e executa a chamada
+
+        Returns:
+            RoutedResult: Modelo que atendeu, resultado da chamada e modelos que falharam antes dele
+        """
+        candidates = self.plan(complexity)
+        failed_models = []
+
+        for index, model_id in enumerate(candidates):
+            is_last = index == len(candidates) - 1
+            # Apenas o último candidato espera pela cota; os anteriores cedem a vez rapidamente ao próximo modelo
+            max_wait_seconds = self.bedrock_settings.capacity_max_wait_seconds if is_last else self.routing.fallback_max_wait_seconds
+            start = self.clock()
+
+            try:
+                output = call(model_id, max_wait_seconds)
+            except Exception as error:
+                if isinstance(error, (ReadTimeoutError, ConnectTimeoutError)):
+                    self.latency_tracker.observe(model_id, self.clock() - start)
+                if is_last or not is_failover_error(error):
+                    raise
+                logger.warning(f"Model {model_id} unavailable ({type(error).__name__}), failing over to {candidates[index + 1]}")
+                failed_models.append(model_id)
+                continue
+
+            latency_seconds = self.clock() - start
+            self.latency_tracker.observe(model_id, latency_seconds)
+            return RoutedResult(model_id=model_id, output=output, latency_seconds=latency_seconds, failed_models=failed_models)
+
+        # Sem candidatos (lista de modelos vazia) não há o que executar
+        raise BedrockOverloadedError("No text model available")
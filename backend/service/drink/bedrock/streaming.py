@@ -0,0 +1,129 @@
+import json
+import time
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+from service.drink.metrics import record_model_invocation
+
+logger = Logger(child=True)
+
+
+def stream_recipe_text(
+    bedrock_runtime,
+    model_id: str,
+    body: dict,
+    on_checkpoint: Optional[Callable[[str], None]] = None,
+    checkpoint_interval_seconds: float = 1.0,
+    invoke_options: Optional[dict] = None,
+) -> str:
+    """
+    Gera o texto da receita com invoke_model_with_response_stream, montando o texto incrementalmente.
+
+    O primeiro trecho recebido gera um checkpoint imediato (para o cliente ver os primeiros tokens o quanto antes);
+    depois disso, os checkpoints respeitam o intervalo mínimo configurado. Um checkpoint final sempre é emitido.
+    A latência até o último trecho e os tokens informados nos eventos do stream são publicados por modelo.
+
+    Args:
+        bedrock_runtime: Cliente do Bedrock Runtime (ou o stub local)
+        model_id: ID do modelo de texto
+        body: Corpo da requisição no formato da Messages API da Anthropic
+        on_checkpoint: Função chamada com o texto acumulado a cada checkpoint
+        checkpoint_interval_seconds: Intervalo mínimo entre checkpoints intermediários
+        invoke_options: Parâmetros extras repassados à camada de invocação (por exemplo, estimated_tokens para o controle de cota)
+
+    Returns:
+        str: Texto completo da receita
+    """
+    started = time.perf_counter()
+    response = bedrock_runtime.invoke_model_with_response_stream(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(body),
+        **(invoke_options or {}),
+    )
+
+    parts = []
+    last_checkpoint = None
+    checkpointed_length = 0
+    usage = {}
+
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+
+        payload = json.loads(chunk["bytes"].decode("utf-8"))
+        if payload.get("type") != "content_block_delta":
+            collect_stream_usage(payload, usage)
+            continue
+
+        parts.append(payload["delta"].get("text", ""))
+
+        now = time.monotonic()
+        if on_checkpoint and (last_checkpoint is None or now - last_checkpoint >= checkpoint_interval_seconds):
+            text = "".join(parts)
+            on_checkpoint(text)
+            last_checkpoint = now
+            checkpointed_length = len(text)
+
+    text = "".join(parts)
+    record_model_invocation(model_id, (time.perf_counter() - started) * 1000, usage.get("input_tokens"), usage.get("output_tokens"))
+    if on_checkpoint and len(text) != checkpointed_length:
+        on_checkpoint(text)
+
+    return text
+
+
+def collect_stream_usage(payload: dict, usage: dict) -> None:
+    """
+    Extrai os tokens de um evento do stream: input_tokens no message_start, output_tokens no message_delta e, no
+    último evento, as métricas que o Bedrock acrescenta (amazon-bedrock-invocationMetrics), que têm prioridade.
+
+    Args:
+        payload: Evento do stream na Messages API da Anthropic
+        usage: Tokens encontrados até aqui (alterado no próprio objeto)
+    """
+    if payload.get("type") == "message_start":
+        usage.setdefault("input_tokens", payload.get("message", {}).get("usage", {}).get("input_tokens"))
+    elif payload.get("type") == "message_delta":
+        usage["output_tokens"] = payload.get("usage", {}).get("output_tokens", usage.get("output_tokens"))
+
+    invocation_metrics = payload.get("amazon-bedrock-invocationMetrics")
+    if invocation_metrics:
+        usage["input_tokens"] = invocation_metrics.get("inputTokenCount", usage.get("input_tokens"))
+        usage["output_tokens"] = invocation_metrics.get("outputTokenCount", usage.get("output_tokens"))
+
+
+class RecipeTextCheckpointWriter:
+    """
+    Persiste checkpoints do texto parcial da receita no item da receita no DynamoDB.
+
+    Os checkpoints não vão para o S3: o objeto da receita é gravado uma única vez, com o texto final, em vez de
+    acumular uma versão por checkpoint no bucket versionado.
+    """
+
+    def __init__(self, table, recipe_id: str, render: Optional[Callable[[str], str]] = None):
+        self.table = table
+        self.recipe_id = recipe_id
+        self.render = render
+
+    def __call__(self, text: str) -> None:
+        """
+        Grava um checkpoint com o texto acumulado da resposta do modelo (convertido por render, quando informado).
+        """
+        self.write(self.render(text) if self.render else text)
+
+    def write(self, text: str) -> None:
+        """
+        Grava o texto informado como está (por exemplo, a receita final já convertida).
+        """
+        try:
+            self.table.update_item(
+                Key={"recipe_id": self.recipe_id},
+                UpdateExpression="SET partial_text = :text, partial_text_length = :length",
+                ExpressionAttributeValues={":text": text, ":length": len(text)},
+            )
+        except Exception:
+            # O texto parcial é apenas informativo; falhas não devem interromper a geração
+            logger.exception("Error updating partial recipe text")
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from aws_lambda_powertools import Logger, Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from service.drink.clients import get_table
+
+logger = Logger(child=True)
+
+# Campos da solicitação que influenciam a receita gerada (customer_name fica de fora)
+CACHE_KEY_SCALAR_FIELDS = ("mood", "flavor")
+CACHE_KEY_LIST_FIELDS = ("fruit", "liquids", "syrups", "leaves")
+
+
+def normalize_request(request_data: dict) -> dict:
+    """
+    Normaliza os campos da solicitação que influenciam a receita.
+
+    As listas de ingredientes ficam sem diferenciar maiúsculas/minúsculas, sem espaços extras, sem duplicatas
+    e ordenadas; o nome do cliente é ignorado.
+
+    Args:
+        request_data: Dados da solicitação da receita (DrinkRequest serializado)
+
+    Returns:
+        dict: Campos escalares e listas normalizados
+    """
+    normalized = {field: str(request_data.get(field) or "").strip().casefold() for field in CACHE_KEY_SCALAR_FIELDS}
+    for field in CACHE_KEY_LIST_FIELDS:
+        normalized[field] = sorted({item.strip().casefold() for item in request_data.get(field) or [] if item.strip()})
+    return normalized
+
+
+def build_cache_key(request_data: dict) -> str:
+    """
+    Gera a chave canônica do cache a partir dos dados da solicitação.
+
+    A solicitação é normalizada por normalize_request, de forma que solicitações equivalentes
+    compartilhem a mesma receita.
+
+    Args:
+        request_data: Dados da solicitação da receita (DrinkRequest serializado)
+
+    Returns:
+        str: Hash SHA-256 hexadecimal da solicitação normalizada
+    """
+    canonical = json.dumps(normalize_request(request_data), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RecipeCache:
+    """
+    Cache de receitas em dois níveis: um LRU local por container e uma tabela DynamoDB compartilhada com TTL.
+
+    O texto da receita já está salvo no S3; o cache guarda apenas a chave do objeto existente e o texto,
+    para que um acerto evite tanto a chamada ao Bedrock quanto uma nova escrita no S3.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        table_name: Optional[str] = None,
+        ttl_seconds: int = 86400,
+        max_local_entries: int = 256,
+        metrics: Optional[Metrics] = None,
+    ):
+        self._table = table
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self.metrics = metrics
+        self._local = OrderedDict()
+
+    @property
+    def table(self):
+        # A tabela compartilhada é resolvida apenas no primeiro uso
+        if self._table is None and self.table_name:
+            self._table = get_table(self.table_name)
+        return self._table
+
+    def get(self, cache_key: str) -> Optional[dict]:
+        """
+        Busca uma receita no cache local e, se necessário, no nível compartilhado.
+
+        Args:
+            cache_key: Chave canônica gerada por build_cache_key
+
+        Returns:
+            dict | None: Entrada com "text" e "s3_key", ou None em caso de falha no cache
+        """
+        now = int(time.time())
+
+        entry = self._local.get(cache_key)
+        if entry and entry["expires_at"] > now:
+            self._local.move_to_end(cache_key)
+            self._record("RecipeCacheHit", tier="local")
+            return entry
+        self._local.pop(cache_key, None)
+
+        if self.table is not None:
+            try:
+                item = self.table.get_item(Key={"cache_key": cache_key}).get("Item")
+            except Exception:
+                # O cache nunca deve impedir a geração da receita
+                logger.exception("Error reading recipe cache")
+                item = None
+
+            # O TTL do DynamoDB remove itens expirados com atraso, então a validade é conferida aqui também
+            if item and int(item["expires_at"]) > now:
+                entry = {"text": item["text"], "s3_key": item["s3_key"], "expires_at": int(item["expires_at"])}
+                self._remember(cache_key, entry)
+                self._record("RecipeCacheHit", tier="shared")
+                return entry
+
+        self._record("RecipeCacheMiss")
+        return None
+
+    def put(self, cache_key: str, text: str, s3_key: str) -> None:
+        """
+        Armazena uma receita recém-gerada nos dois níveis do cache.
+
+        Args:
+            cache_key: Chave canônica gerada por build_cache_key
+            text: Texto da receita
+            s3_key: Chave do objeto da receita no S3
+        """
+        entry = {"text": text, "s3_key": s3_key, "expires_at": int(time.time()) + self.ttl_seconds}
+        self._remember(cache_key, entry)
+
+        if self.table is not None:
+            try:
+                self.table.put_item(Item={"cache_key": cache_key, **entry})
+            except Exception:
+                logger.exception("Error writing recipe cache")
+
+    def _remember(self, cache_key: str, entry: dict) -> None:
+        self._local[cache_key] = entry
+        self._local.move_to_end(cache_key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    def _record(self, metric_name: str, tier: Optional[str] = None) -> None:
+        logger.debug(f"{metric_name} (tier={tier})")
+        if self.metrics is not None:
+            self.metrics.add_metric(name=metric_name, unit=MetricUnit.Count, value=1)
+            if tier:
+                self.metrics.add_metadata(key="recipe_cache_tier", value=tier)
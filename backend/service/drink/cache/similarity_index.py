@@ -0,0 +1,338 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+from service.drink.cache.recipe_cache import (
+    CACHE_KEY_LIST_FIELDS,
+    CACHE_KEY_SCALAR_FIELDS,
+    normalize_request,
+)
+
+logger = Logger(child=True)
+
+# Prefixo do índice no bucket: snapshots imutáveis, um ponteiro para o snapshot atual e as receitas ainda não indexadas
+SIMILARITY_INDEX_PREFIX = "similarity-index"
+SIMILARITY_INDEX_POINTER_KEY = f"{SIMILARITY_INDEX_PREFIX}/current.json"
+SIMILARITY_INDEX_PENDING_PREFIX = f"{SIMILARITY_INDEX_PREFIX}/pending"
+SIMILARITY_INDEX_VECTORS_FILE = "vectors.npy"
+SIMILARITY_INDEX_ENTRIES_FILE = "entries.json"
+
+# Dimensão dos vetores (feature hashing): 1M receitas ocupam ~1 GB em float32
+SIMILARITY_INDEX_DIMENSIONS = 256
+
+# Peso dos termos de cada ingrediente em relação ao ingrediente completo ("sparkling water" também conta como "water")
+INGREDIENT_WORD_WEIGHT = 0.5
+
+
+def request_features(request_data: dict) -> Dict[str, float]:
+    """
+    Extrai as características da solicitação usadas na comparação por similaridade.
+
+    Humor e sabor entram como características do próprio campo; cada ingrediente entra com o campo
+    (fruit:mango) e sem ele (ingredient:mango), além de cada palavra do nome com peso menor, para que
+    ingredientes parecidos ou informados em outra lista ainda aproximem as solicitações.
+
+    Args:
+        request_data: Dados da solicitação da receita (DrinkRequest serializado)
+
+    Returns:
+        dict: Peso de cada característica
+    """
+    normalized = normalize_request(request_data)
+    features = {f"{field}:{normalized[field]}": 1.0 for field in CACHE_KEY_SCALAR_FIELDS if normalized[field]}
+    for field in CACHE_KEY_LIST_FIELDS:
+        for item in normalized[field]:
+            features[f"{field}:{item}"] = 1.0
+            features[f"ingredient:{item}"] = 1.0
+            for word in item.split():
+                features[f"word:{word}"] = features.get(f"word:{word}", 0.0) + INGREDIENT_WORD_WEIGHT
+    return features
+
+
+def vectorize_request(request_data: dict, dimensions: int = SIMILARITY_INDEX_DIMENSIONS) -> np.ndarray:
+    """
+    Converte a solicitação em um vetor unitário por feature hashing (sem vocabulário nem chamada a modelos).
+
+    Args:
+        request_data: Dados da solicitação da receita
+        dimensions: Dimensão do vetor
+
+    Returns:
+        np.ndarray: Vetor float32 com norma 1 (ou nulo, quando não há características)
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, weight in request_features(request_data).items():
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        # O bit de sinal faz as colisões se cancelarem em média, em vez de sempre aumentarem a similaridade
+        vector[digest % dimensions] += weight if digest >> 63 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def index_entry(recipe_id: str, request_data: dict, s3_key: str) -> dict:
+    """
+    Monta a entrada do índice de uma receita, com a solicitação normalizada para conferir os resultados da busca.
+
+    Args:
+        recipe_id: ID da receita
+        request_data: Solicitação que gerou a receita
+        s3_key: Chave do texto da receita no S3
+
+    Returns:
+        dict: Entrada do índice
+    """
+    return {"recipe_id": recipe_id, "s3_key": s3_key, "request": normalize_request(request_data)}
+
+
+def covers_request(entry: dict, request_data: dict) -> bool:
+    """
+    Indica se a receita do índice atende à solicitação: o mesmo humor e sabor e todos os ingredientes pedidos.
+
+    A similaridade de cosseno aproxima solicitações que diferem em um único campo (happy/sad, mint/basil);
+    a conferência exata evita reaproveitar uma receita que contradiz o que foi pedido. A receita pode ter
+    ingredientes a mais.
+
+    Args:
+        entry: Entrada do índice (index_entry); entradas sem a solicitação nunca atendem
+        request_data: Dados da solicitação consultada
+
+    Returns:
+        bool: True quando a receita pode ser reaproveitada
+    """
+    indexed = entry.get("request")
+    if not indexed:
+        return False
+    normalized = normalize_request(request_data)
+    if any(normalized[field] != indexed.get(field) for field in CACHE_KEY_SCALAR_FIELDS):
+        return False
+    return all(set(normalized[field]) <= set(indexed.get(field) or []) for field in CACHE_KEY_LIST_FIELDS)
+
+
+@dataclass(frozen=True)
+class SimilarMatch:
+    """
+    Receita do índice e sua similaridade de cosseno com a solicitação consultada.
+    """
+
+    score: float
+    entry: dict
+
+
+class SimilarityIndex:
+    """
+    Índice vetorial em memória para busca exata por similaridade de cosseno.
+
+    Os vetores de um snapshot ficam em uma matriz NumPy (em geral mapeada do disco, sem copiar para a memória);
+    as receitas adicionadas depois do carregamento ficam em uma lista separada até o próximo snapshot.
+    """
+
+    def __init__(self, vectors: Optional[np.ndarray] = None, entries: Optional[List[dict]] = None, dimensions: int = SIMILARITY_INDEX_DIMENSIONS):
+        self.vectors = vectors if vectors is not None else np.zeros((0, dimensions), dtype=np.float32)
+        self.entries = list(entries or [])
+        if len(self.vectors) != len(self.entries):
+            raise ValueError(f"Similarity index has {len(self.vectors)} vectors but {len(self.entries)} entries")
+        self._added_vectors: List[np.ndarray] = []
+        self._added_entries: List[dict] = []
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.entries) + len(self._added_entries)
+
+    def add(self, vector: np.ndarray, entry: dict) -> None:
+        """
+        Adiciona uma receita ao índice.
+
+        Args:
+            vector: Vetor da solicitação (vectorize_request)
+            entry: Dados da receita (index_entry)
+        """
+        self._added_vectors.append(np.asarray(vector, dtype=np.float32))
+        self._added_entries.append(entry)
+
+    def query(self, vector: np.ndarray, top_k: int = 1) -> List[SimilarMatch]:
+        """
+        Busca as receitas mais parecidas com a solicitação.
+
+        Args:
+            vector: Vetor da solicitação consultada
+            top_k: Quantidade máxima de resultados
+
+        Returns:
+            list: Resultados em ordem decrescente de similaridade
+        """
+        if not len(self):
+            return []
+
+        scores = self.vectors @ vector
+        if self._added_vectors:
+            scores = np.concatenate([scores, np.stack(self._added_vectors) @ vector])
+
+        # argpartition seleciona os k maiores em tempo linear; apenas eles são ordenados
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(scores, -top_k)[-top_k:]
+        best = best[np.argsort(scores[best])[::-1]]
+        entries = self.entries + self._added_entries
+        return [SimilarMatch(score=float(scores[position]), entry=entries[position]) for position in best]
+
+    def save(self, directory: str) -> None:
+        """
+        Grava o índice completo (snapshot e receitas adicionadas) em um diretório local.
+
+        Args:
+            directory: Diretório de destino
+        """
+        os.makedirs(directory, exist_ok=True)
+        vectors = np.concatenate([self.vectors, np.stack(self._added_vectors)]) if self._added_vectors else self.vectors
+        np.save(os.path.join(directory, SIMILARITY_INDEX_VECTORS_FILE), np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(os.path.join(directory, SIMILARITY_INDEX_ENTRIES_FILE), "w", encoding="utf-8") as entries_file:
+            json.dump(self.entries + self._added_entries, entries_file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "SimilarityIndex":
+        """
+        Carrega um índice gravado por save.
+
+        Args:
+            directory: Diretório do índice
+            mmap: Mapeia os vetores do disco em vez de lê-los para a memória
+
+        Returns:
+            SimilarityIndex: Índice carregado
+        """
+        vectors = np.load(os.path.join(directory, SIMILARITY_INDEX_VECTORS_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(directory, SIMILARITY_INDEX_ENTRIES_FILE), encoding="utf-8") as entries_file:
+            entries = json.load(entries_file)
+        return cls(vectors, entries, dimensions=vectors.shape[1])
+
+
+def read_index_pointer(s3_client, bucket: str) -> Optional[str]:
+    """
+    Retorna o prefixo do snapshot atual do índice, ou None se nenhum snapshot foi publicado.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=SIMILARITY_INDEX_POINTER_KEY)
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+    return json.loads(response["Body"].read())["snapshot"]
+
+
+def download_index(s3_client, bucket: str, snapshot: str, cache_dir: str) -> SimilarityIndex:
+    """
+    Baixa um snapshot do índice para o disco local (uma única vez por container) e o carrega mapeado em memória.
+
+    Args:
+        s3_client: Cliente do S3
+        bucket: Bucket do índice
+        snapshot: Prefixo do snapshot no bucket
+        cache_dir: Diretório local (por exemplo, em /tmp)
+
+    Returns:
+        SimilarityIndex: Índice carregado
+    """
+    directory = os.path.join(cache_dir, snapshot.rsplit("/", 1)[-1])
+    if not os.path.exists(os.path.join(directory, SIMILARITY_INDEX_ENTRIES_FILE)):
+        os.makedirs(directory, exist_ok=True)
+        # O arquivo de entradas é baixado por último: sua presença indica um download completo
+        for file_name in (SIMILARITY_INDEX_VECTORS_FILE, SIMILARITY_INDEX_ENTRIES_FILE):
+            s3_client.download_file(bucket, f"{snapshot}/{file_name}", os.path.join(directory, file_name))
+    return SimilarityIndex.load(directory, mmap=True)
+
+
+def upload_index(index: SimilarityIndex, s3_client, bucket: str, snapshot: str, work_dir: str) -> None:
+    """
+    Publica o índice como um novo snapshot e só então aponta o ponteiro para ele.
+
+    Args:
+        index: Índice a publicar
+        s3_client: Cliente do S3
+        bucket: Bucket do índice
+        snapshot: Prefixo do novo snapshot no bucket
+        work_dir: Diretório local temporário
+    """
+    index.save(work_dir)
+    for file_name in (SIMILARITY_INDEX_VECTORS_FILE, SIMILARITY_INDEX_ENTRIES_FILE):
+        s3_client.upload_file(os.path.join(work_dir, file_name), bucket, f"{snapshot}/{file_name}")
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=SIMILARITY_INDEX_POINTER_KEY,
+        Body=json.dumps({"snapshot": snapshot, "size": len(index)}).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def put_pending_recipe(s3_client, bucket: str, recipe_id: str, request_data: dict, s3_key: str) -> None:
+    """
+    Registra uma receita recém-gerada para entrar no próximo snapshot do índice.
+
+    Cada receita tem o próprio objeto (repetições da mesma execução o sobrescrevem), o que evita disputa
+    entre containers pela escrita do snapshot; a consolidação fica com a função agendada.
+
+    Args:
+        s3_client: Cliente do S3
+        bucket: Bucket do índice
+        recipe_id: ID da receita
+        request_data: Solicitação que gerou a receita
+        s3_key: Chave do texto da receita no S3
+    """
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{SIMILARITY_INDEX_PENDING_PREFIX}/{recipe_id}.json",
+        Body=json.dumps(index_entry(recipe_id, request_data, s3_key)).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+class SimilarityIndexCache:
+    """
+    Mantém o índice carregado no container, conferindo o ponteiro do snapshot atual no máximo uma vez por intervalo.
+    """
+
+    def __init__(
+        self, s3_client_factory: Callable, bucket: Optional[str], cache_dir: str, refresh_seconds: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.s3_client_factory = s3_client_factory
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.index: Optional[SimilarityIndex] = None
+        self.snapshot: Optional[str] = None
+        self._checked_at: Optional[float] = None
+
+    def get(self) -> SimilarityIndex:
+        """
+        Retorna o índice atual (vazio enquanto nenhum snapshot foi publicado ou se o carregamento falhar).
+        """
+        now = self.clock()
+        if self.index is not None and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return self.index
+        self._checked_at = now
+
+        try:
+            snapshot = read_index_pointer(self.s3_client_factory(), self.bucket)
+            if snapshot and snapshot != self.snapshot:
+                self.index = download_index(self.s3_client_factory(), self.bucket, snapshot, self.cache_dir)
+                previous_snapshot, self.snapshot = self.snapshot, snapshot
+                if previous_snapshot:
+                    # Os arquivos do snapshot anterior continuam acessíveis até o mapeamento ser descartado
+                    shutil.rmtree(os.path.join(self.cache_dir, previous_snapshot.rsplit("/", 1)[-1]), ignore_errors=True)
+                logger.info(f"Similarity index loaded from {snapshot} ({len(self.index)} recipes)")
+        except Exception:
+            # Sem o índice, as receitas continuam sendo geradas normalmente
+            logger.exception("Error loading similarity index")
+
+        if self.index is None:
+            self.index = SimilarityIndex()
+        return self.index
@@ -0,0 +1,223 @@
+import json
+import os
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Catálogo de ingredientes distribuído com o código (ids canônicos em inglês, com aliases em inglês, português e espanhol)
+INGREDIENT_CATALOG_FILE = os.path.join(os.path.dirname(__file__), "ingredients.json")
+
+# Quantidade de nomes informados cuja canonicalização fica em cache no container
+CANONICAL_CACHE_SIZE = 8192
+
+
+def fold_name(name: str) -> str:
+    """
+    Normaliza um nome de ingrediente para comparação: sem acentos, sem diferenciar maiúsculas/minúsculas,
+    com hífens e sublinhados como espaços e sem espaços repetidos.
+
+    Args:
+        name: Nome informado
+
+    Returns:
+        str: Nome normalizado ("Hortelã " -> "hortela")
+    """
+    decomposed = unicodedata.normalize("NFKD", name.replace("-", " ").replace("_", " "))
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(without_accents.casefold().split())
+
+
+@dataclass(frozen=True)
+class IngredientEntry:
+    """
+    Ingrediente do catálogo com seu id canônico, a lista a que normalmente pertence e os nomes alternativos.
+    """
+
+    id: str
+    category: str
+    aliases: Tuple[str, ...] = ()
+
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    ingredient_id: Optional[str] = None
+
+
+class IngredientCatalog:
+    """
+    Catálogo de ingredientes com busca exata por nome/alias, sugestões por prefixo e correspondência aproximada.
+
+    Todos os nomes (ids e aliases, normalizados por fold_name) ficam em um dicionário para a busca exata e em
+    uma trie para as buscas por prefixo e por distância de edição; a busca aproximada percorre a trie calculando
+    uma linha da distância de Levenshtein por nó, a partir do ramo da primeira letra, e descarta os ramos que já
+    passaram do limite, sem comparar o nome com cada entrada do catálogo.
+    """
+
+    def __init__(self, entries: Iterable[IngredientEntry]):
+        self.entries: Dict[str, IngredientEntry] = {}
+        self._names: Dict[str, str] = {}
+        self._trie = _TrieNode()
+        for entry in entries:
+            self.entries[entry.id] = entry
+            for name in (entry.id, *entry.aliases):
+                self._add_name(fold_name(name), entry.id)
+
+    def _add_name(self, folded: str, ingredient_id: str) -> None:
+        existing = self._names.get(folded)
+        if existing and existing != ingredient_id:
+            raise ValueError(f"Ingredient name '{folded}' is used by both '{existing}' and '{ingredient_id}'")
+        self._names[folded] = ingredient_id
+
+        node = self._trie
+        for char in folded:
+            node = node.children.setdefault(char, _TrieNode())
+        node.ingredient_id = ingredient_id
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Busca o id canônico de um nome ou alias exato (após a normalização).
+        """
+        return self._names.get(fold_name(name))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Lista ids canônicos cujos nomes começam com o prefixo (por exemplo, para autocompletar no app).
+
+        Args:
+            prefix: Início do nome digitado
+            limit: Quantidade máxima de sugestões
+
+        Returns:
+            list: Ids canônicos sem repetição, na ordem alfabética dos nomes
+        """
+        node = self._trie
+        for char in fold_name(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        suggestions, stack = [], [node]
+        while stack and len(suggestions) < limit:
+            node = stack.pop()
+            if node.ingredient_id and node.ingredient_id not in suggestions:
+                suggestions.append(node.ingredient_id)
+            stack.extend(child for _, child in sorted(node.children.items(), reverse=True))
+        return suggestions
+
+    def fuzzy_match(self, name: str, max_distance: int) -> Optional[str]:
+        """
+        Busca o ingrediente com o nome mais próximo dentro da distância de edição máxima.
+
+        Args:
+            name: Nome informado
+            max_distance: Distância de Levenshtein máxima aceita
+
+        Returns:
+            str | None: Id canônico, ou None quando não há candidato ou quando dois ingredientes empatam
+        """
+        folded = fold_name(name)
+        best: Dict[str, int] = {}
+        root = self._trie.children.get(folded[:1])
+        if root is None:
+            return None
+
+        # A primeira letra precisa coincidir (erros de digitação raramente estão nela), o que limita a busca a um ramo da trie
+        first_row = list(range(len(folded) + 1))
+        stack = [(folded[0], root, first_row)]
+
+        while stack:
+            char, node, previous_row = stack.pop()
+            row = [previous_row[0] + 1]
+            for column in range(1, len(folded) + 1):
+                substitution = previous_row[column - 1] + (folded[column - 1] != char)
+                row.append(min(row[column - 1] + 1, previous_row[column] + 1, substitution))
+
+            if node.ingredient_id and row[-1] <= max_distance:
+                best[node.ingredient_id] = min(row[-1], best.get(node.ingredient_id, row[-1]))
+            # Nenhum nome deste ramo pode ficar dentro do limite se a linha inteira já o ultrapassou
+            if min(row) <= max_distance:
+                stack.extend((next_char, child, row) for next_char, child in node.children.items())
+
+        if not best:
+            return None
+        ranked = sorted(best.items(), key=lambda item: item[1])
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+    def canonicalize(self, name: str) -> str:
+        """
+        Converte um nome de ingrediente no id canônico do catálogo.
+
+        A busca exata cobre ids, aliases e traduções; sem ela, erros de digitação são corrigidos por distância
+        de edição (nenhuma em nomes curtos, 1 até 8 caracteres e 2 acima disso). Ingredientes fora do catálogo
+        são mantidos, apenas normalizados.
+
+        Args:
+            name: Nome informado na solicitação
+
+        Returns:
+            str: Id canônico, ou o nome normalizado (sem alterar acentos) quando não há correspondência
+        """
+        folded = fold_name(name)
+        ingredient_id = self._names.get(folded)
+        if ingredient_id:
+            return ingredient_id
+
+        max_distance = 0 if len(folded) < 5 else 1 if len(folded) <= 8 else 2
+        if max_distance:
+            ingredient_id = self.fuzzy_match(folded, max_distance)
+        return ingredient_id or " ".join(name.casefold().split())
+
+    @classmethod
+    def from_file(cls, path: str = INGREDIENT_CATALOG_FILE) -> "IngredientCatalog":
+        """
+        Carrega o catálogo de um arquivo JSON com uma lista de objetos {"id", "category", "aliases"}.
+        """
+        with open(path, encoding="utf-8") as catalog_file:
+            raw_entries = json.load(catalog_file)
+        return cls(IngredientEntry(id=item["id"], category=item["category"], aliases=tuple(item.get("aliases", []))) for item in raw_entries)
+
+
+@lru_cache(maxsize=1)
+def get_ingredient_catalog() -> IngredientCatalog:
+    """
+    Retorna o catálogo distribuído com o código, carregado uma única vez por container.
+    """
+    return IngredientCatalog.from_file()
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def _canonicalize_cached(name: str) -> str:
+    return get_ingredient_catalog().canonicalize(name)
+
+
+def canonicalize_ingredients(names: Optional[List[str]]) -> List[str]:
+    """
+    Converte uma lista de ingredientes em ids canônicos, removendo repetições e mantendo a ordem.
+
+    Args:
+        names: Ingredientes informados na solicitação
+
+    Returns:
+        list: Ids canônicos (ou nomes normalizados, para ingredientes fora do catálogo)
+    """
+    canonical = []
+    for name in names or []:
+        ingredient_id = _canonicalize_cached(name)
+        if ingredient_id not in canonical:
+            canonical.append(ingredient_id)
+    return canonical
+
+
+def reset_ingredient_catalog() -> None:
+    """
+    Descarta o catálogo carregado e o cache de canonicalização (usado em testes e benchmarks).
+    """
+    get_ingredient_catalog.cache_clear()
+    _canonicalize_cached.cache_clear()
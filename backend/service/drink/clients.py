@@ -0,0 +1,138 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+# Tamanho do pool de conexões HTTP por cliente (compartilhado entre threads do mesmo container)
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_CLIENT_MAX_POOL_CONNECTIONS", "32"))
+
+# Configuração padrão: conexões reaproveitadas (keep-alive), retries adaptativos e timeouts curtos
+DEFAULT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    connect_timeout=3,
+    read_timeout=15,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+)
+
+# Configurações específicas por serviço, combinadas com a padrão
+SERVICE_CONFIGS = {
+    # Chamadas ao Bedrock são longas (texto em streaming e SDXL levam dezenas de segundos). Sem retries no botocore:
+    # cada throttling precisa chegar ao limitador e ao circuit breaker do BedrockInvoker, e a espera entre tentativas
+    # fica com o Retry da máquina de estado
+    "bedrock-runtime": DEFAULT_CONFIG.merge(Config(connect_timeout=5, read_timeout=120, retries={"total_max_attempts": 1, "mode": "standard"})),
+    # URLs pré-assinadas precisam de SigV4
+    "s3": DEFAULT_CONFIG.merge(Config(signature_version="s3v4")),
+    # StartSyncExecution fica bloqueado até o fim do fluxo Express; sem retries, para não iniciar a mesma receita duas vezes
+    "stepfunctions-sync": DEFAULT_CONFIG.merge(
+        Config(read_timeout=int(os.environ.get("SYNC_EXECUTION_READ_TIMEOUT_SECONDS", "24")), retries={"total_max_attempts": 1, "mode": "standard"})
+    ),
+}
+
+# Clientes adicionais de um mesmo serviço, com configuração própria (nome do cliente -> serviço da AWS)
+CLIENT_SERVICES = {"stepfunctions-sync": "stepfunctions"}
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_tables = {}
+
+
+def _get_session() -> boto3.session.Session:
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name: str):
+    """
+    Retorna o cliente boto3 do serviço, criando-o no primeiro uso e reaproveitando-o no container.
+
+    Args:
+        service_name: Nome do serviço (por exemplo "s3" ou "bedrock-runtime") ou de um cliente de CLIENT_SERVICES
+
+    Returns:
+        Cliente boto3 configurado para o serviço
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _get_session().client(
+                    CLIENT_SERVICES.get(service_name, service_name), config=SERVICE_CONFIGS.get(service_name, DEFAULT_CONFIG)
+                )
+                _clients[service_name] = client
+    return client
+
+
+def get_dynamodb_resource():
+    """
+    Retorna o resource do DynamoDB, criado no primeiro uso e reaproveitado no container.
+    """
+    resource = _clients.get("dynamodb-resource")
+    if resource is None:
+        with _lock:
+            resource = _clients.get("dynamodb-resource")
+            if resource is None:
+                resource = _get_session().resource("dynamodb", config=SERVICE_CONFIGS.get("dynamodb", DEFAULT_CONFIG))
+                _clients["dynamodb-resource"] = resource
+    return resource
+
+
+def get_table(table_name: str):
+    """
+    Retorna a referência para a tabela do DynamoDB, reaproveitada entre invocações.
+
+    Args:
+        table_name: Nome da tabela
+
+    Returns:
+        Objeto Table do boto3
+    """
+    table = _tables.get(table_name)
+    if table is None:
+        table = get_dynamodb_resource().Table(table_name)
+        _tables[table_name] = table
+    return table
+
+
+def register_client(service_name: str, client) -> None:
+    """
+    Substitui o cliente de um serviço (usado por testes e pelos substitutos locais da AWS).
+
+    Args:
+        service_name: Nome do serviço, ou "dynamodb-resource" para o resource do DynamoDB
+        client: Objeto que será devolvido por get_client/get_dynamodb_resource
+    """
+    with _lock:
+        _clients[service_name] = client
+        if service_name == "dynamodb-resource":
+            _tables.clear()
+
+
+def get_registered_client(name: str):
+    """
+    Retorna o cliente registrado com o nome informado, sem criar um cliente boto3 (usado para clientes de fora da AWS,
+    como o SendGrid, que só têm um substituto quando registrado).
+
+    Args:
+        name: Nome do cliente
+
+    Returns:
+        Cliente registrado, ou None
+    """
+    return _clients.get(name)
+
+
+def reset_clients() -> None:
+    """
+    Descarta todos os clientes em cache, forçando a recriação no próximo uso.
+    """
+    global _session
+    with _lock:
+        _clients.clear()
+        _tables.clear()
+        _session = None
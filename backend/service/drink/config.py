@@ -0,0 +1,248 @@
+import os
+from typing import Dict, List, Literal, Optional
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.parameters import SecretsProvider, SSMProvider
+from pydantic import BaseModel, Field, ValidationError
+from service.drink.clients import get_client
+from service.drink.metrics import timed
+
+logger = Logger(child=True)
+
+# Tempo (em segundos) que configurações e segredos ficam em cache no container antes de serem buscados novamente
+CONFIG_CACHE_TTL_SECONDS = int(os.environ.get("CONFIG_CACHE_TTL_SECONDS", "300"))
+
+# Parâmetro do SSM com as configurações ajustáveis em tempo de execução (JSON) e secret do SendGrid
+DRINK_SETTINGS_PARAMETER = os.environ.get("DRINK_SETTINGS_PARAMETER")
+SENDGRID_SECRET_NAME = os.environ.get("SENDGRID_SECRET_NAME")
+
+
+class BedrockQuota(BaseModel):
+    """
+    Cota da conta para um modelo do Bedrock (compartilhada por todos os containers).
+    """
+
+    requests_per_minute: int = Field(..., gt=0)
+    tokens_per_minute: Optional[int] = Field(default=None, gt=0)
+
+
+def default_bedrock_quotas() -> Dict[str, BedrockQuota]:
+    # Valores padrão das cotas on-demand; devem ser ajustados às cotas reais da conta via parâmetro do SSM
+    return {
+        "anthropic.claude-3-sonnet-20240229-v1:0": BedrockQuota(requests_per_minute=500, tokens_per_minute=1_000_000),
+        "anthropic.claude-3-haiku-20240307-v1:0": BedrockQuota(requests_per_minute=1000, tokens_per_minute=2_000_000),
+        "stability.stable-diffusion-xl-v1": BedrockQuota(requests_per_minute=60),
+    }
+
+
+class TextModelTier(BaseModel):
+    """
+    Modelo de texto disponível para o roteador e a complexidade mínima de solicitação a partir da qual ele é escolhido.
+    """
+
+    model_id: str
+    min_complexity: int = Field(default=0, ge=0)
+
+
+class TextRoutingSettings(BaseModel):
+    """
+    Política de roteamento entre modelos de texto (do mais rápido para o mais capaz).
+    """
+
+    enabled: bool = Field(default_factory=lambda: os.environ.get("BEDROCK_TEXT_ROUTING_ENABLED", "true").lower() == "true")
+    tiers: List[TextModelTier] = Field(
+        default_factory=lambda: [
+            TextModelTier(model_id="anthropic.claude-3-haiku-20240307-v1:0", min_complexity=0),
+            TextModelTier(model_id="anthropic.claude-3-sonnet-20240229-v1:0", min_complexity=8),
+        ],
+        min_length=1,
+    )
+    latency_slo_seconds: float = Field(default=12.0, gt=0)
+    fallback_max_wait_seconds: float = Field(default=0.0, ge=0)
+
+
+class ImageQualityProfile(BaseModel):
+    """
+    Parâmetros de inferência do SDXL para um nível de qualidade da imagem.
+
+    O SDXL 1.0 no Bedrock só aceita as resoluções de ~1 megapixel da lista do modelo (1024x1024, 1152x896, ...);
+    512x512 é recusado. A prévia fica mais rápida pelo número de passos, que domina o tempo de inferência.
+    """
+
+    steps: int = Field(..., ge=10, le=150)
+    width: int = Field(default=1024, gt=0)
+    height: int = Field(default=1024, gt=0)
+
+
+class BedrockSettings(BaseModel):
+    """
+    Modelos, parâmetros de inferência e controle de capacidade do Bedrock.
+    """
+
+    text_model_id: str = Field(default_factory=lambda: os.environ.get("BEDROCK_TEXT_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0"))
+    text_max_tokens: int = Field(default=1000, gt=0)
+    image_model_id: str = Field(default_factory=lambda: os.environ.get("BEDROCK_IMAGE_MODEL_ID", "stability.stable-diffusion-xl-v1"))
+    image_cfg_scale: float = Field(default=7, ge=0, le=35)
+    image_steps: int = Field(default=50, ge=10, le=150)
+    image_seed: int = Field(default=0, ge=0)
+    image_width: int = Field(default=1024, gt=0)
+    image_height: int = Field(default=1024, gt=0)
+    image_draft: ImageQualityProfile = Field(default_factory=lambda: ImageQualityProfile(steps=15))
+    quotas: Dict[str, BedrockQuota] = Field(default_factory=default_bedrock_quotas)
+    breaker_failure_threshold: int = Field(default=3, gt=0)
+    breaker_cooldown_seconds: float = Field(default=15.0, gt=0)
+    capacity_max_wait_seconds: float = Field(default=10.0, ge=0)
+    text_routing: TextRoutingSettings = Field(default_factory=TextRoutingSettings)
+
+    def image_profile(self, name: str) -> ImageQualityProfile:
+        """
+        Retorna o perfil de qualidade da imagem ("draft" para a prévia rápida, "full" para a versão final).
+        """
+        if name == "draft":
+            return self.image_draft
+        return ImageQualityProfile(steps=self.image_steps, width=self.image_width, height=self.image_height)
+
+
+class FeatureToggles(BaseModel):
+    """
+    Funcionalidades que podem ser ligadas ou desligadas sem novo deploy.
+    """
+
+    recipe_cache_enabled: bool = Field(default_factory=lambda: os.environ.get("RECIPE_CACHE_ENABLED", "true").lower() == "true")
+    recipe_text_streaming: bool = Field(default_factory=lambda: os.environ.get("RECIPE_TEXT_STREAMING", "false").lower() == "true")
+    notification_delivery_mode: Literal["link", "inline", "attachment"] = Field(
+        default_factory=lambda: os.environ.get("NOTIFICATION_DELIVERY_MODE", "link")
+    )
+    image_two_phase: bool = Field(default_factory=lambda: os.environ.get("IMAGE_TWO_PHASE", "true").lower() == "true")
+    recipe_similarity_enabled: bool = Field(default_factory=lambda: os.environ.get("RECIPE_SIMILARITY_ENABLED", "false").lower() == "true")
+
+
+class LaneSettings(BaseModel):
+    """
+    Faixa de prioridade da fila de admissão.
+    """
+
+    # Peso na divisão do ritmo de admissão entre as faixas com solicitações à espera
+    weight: float = Field(..., gt=0)
+    # Execuções da faixa em andamento ao mesmo tempo
+    max_in_flight: int = Field(..., gt=0)
+    # Espera a partir da qual a faixa é atendida antes das demais, independentemente do peso (proteção contra inanição)
+    max_wait_seconds: float = Field(..., gt=0)
+    # Solicitações à espera na fila da faixa a partir das quais novas solicitações são recusadas
+    max_backlog: int = Field(..., gt=0)
+
+
+def default_admission_lanes() -> Dict[str, LaneSettings]:
+    # Uma faixa por classe de prioridade do DrinkRequest; o lote sem prioridade explícita vai para a faixa bulk
+    return {
+        "vip": LaneSettings(weight=6, max_in_flight=40, max_wait_seconds=30, max_backlog=100),
+        "standard": LaneSettings(weight=3, max_in_flight=60, max_wait_seconds=120, max_backlog=500),
+        "bulk": LaneSettings(weight=1, max_in_flight=30, max_wait_seconds=900, max_backlog=2000),
+    }
+
+
+class AdmissionSettings(BaseModel):
+    """
+    Controle de admissão das solicitações assíncronas: ritmo de início das execuções e faixas de prioridade.
+    """
+
+    # Sem um valor fixo, o ritmo é derivado das cotas do Bedrock (chamadas de texto e de imagem por receita)
+    executions_per_minute: Optional[float] = Field(default=None, gt=0)
+    quota_utilization: float = Field(default=0.9, gt=0, le=1)
+    max_in_flight: int = Field(default_factory=lambda: int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "100")), gt=0)
+    lanes: Dict[str, LaneSettings] = Field(default_factory=default_admission_lanes)
+
+
+class DrinkSettings(BaseModel):
+    """
+    Configurações tipadas compartilhadas pelos handlers.
+
+    Os valores padrão vêm das variáveis de ambiente definidas no deploy; o parâmetro do SSM sobrescreve
+    apenas os campos presentes nele.
+    """
+
+    bedrock: BedrockSettings = Field(default_factory=BedrockSettings)
+    features: FeatureToggles = Field(default_factory=FeatureToggles)
+    admission: AdmissionSettings = Field(default_factory=AdmissionSettings)
+    batch_max_items: int = Field(default_factory=lambda: int(os.environ.get("DRINK_BATCH_MAX_ITEMS", "500")), gt=0)
+    recipe_similarity_threshold: float = Field(default=0.85, gt=0, le=1)
+
+
+class SendGridSettings(BaseModel):
+    """
+    Credenciais do SendGrid armazenadas no Secrets Manager.
+    """
+
+    api_key: str
+    sender_email: str
+
+
+_ssm_provider: Optional[SSMProvider] = None
+_secrets_provider: Optional[SecretsProvider] = None
+
+
+def _get_ssm_provider() -> SSMProvider:
+    global _ssm_provider
+    if _ssm_provider is None:
+        _ssm_provider = SSMProvider(boto3_client=get_client("ssm"))
+    return _ssm_provider
+
+
+def _get_secrets_provider() -> SecretsProvider:
+    global _secrets_provider
+    if _secrets_provider is None:
+        _secrets_provider = SecretsProvider(boto3_client=get_client("secretsmanager"))
+    return _secrets_provider
+
+
+def get_settings(force_fetch: bool = False) -> DrinkSettings:
+    """
+    Retorna as configurações tipadas, buscando o parâmetro do SSM no máximo uma vez por TTL.
+
+    Args:
+        force_fetch: Ignora o cache e busca o parâmetro novamente
+
+    Returns:
+        DrinkSettings: Configurações validadas
+    """
+    if not DRINK_SETTINGS_PARAMETER:
+        return DrinkSettings()
+
+    try:
+        overrides = _get_ssm_provider().get(DRINK_SETTINGS_PARAMETER, max_age=CONFIG_CACHE_TTL_SECONDS, transform="json", force_fetch=force_fetch)
+    except Exception:
+        # Sem o parâmetro, os handlers continuam com os valores definidos no deploy
+        logger.exception("Error retrieving drink settings, using deployment defaults")
+        return DrinkSettings()
+
+    try:
+        return DrinkSettings.model_validate(overrides or {})
+    except ValidationError:
+        # Um valor inválido no parâmetro não deve chegar ao Bedrock nem derrubar o fluxo
+        logger.exception("Invalid drink settings, using deployment defaults")
+        return DrinkSettings()
+
+
+def get_sendgrid_settings(force_fetch: bool = False) -> SendGridSettings:
+    """
+    Retorna as credenciais do SendGrid, buscando o secret no máximo uma vez por TTL.
+
+    Args:
+        force_fetch: Ignora o cache (por exemplo, após um erro de autenticação causado por rotação do secret)
+
+    Returns:
+        SendGridSettings: Credenciais validadas
+    """
+    # A duração inclui os acertos do cache do provider (próximos de zero); as buscas aparecem nos percentis altos
+    with timed("SecretFetchDuration"):
+        secret = _get_secrets_provider().get(SENDGRID_SECRET_NAME, max_age=CONFIG_CACHE_TTL_SECONDS, transform="json", force_fetch=force_fetch)
+    return SendGridSettings.model_validate(secret)
+
+
+def reset_config_cache() -> None:
+    """
+    Descarta os providers e seus caches (usado em testes).
+    """
+    global _ssm_provider, _secrets_provider
+    _ssm_provider = None
+    _secrets_provider = None
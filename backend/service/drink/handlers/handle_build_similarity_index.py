@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import time
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from service.drink.cache.similarity_index import (
+    SIMILARITY_INDEX_DIMENSIONS,
+    SIMILARITY_INDEX_PENDING_PREFIX,
+    SIMILARITY_INDEX_PREFIX,
+    SimilarityIndex,
+    download_index,
+    index_entry,
+    read_index_pointer,
+    upload_index,
+    vectorize_request,
+)
+from service.drink.clients import get_client
+from service.drink.metrics import instrument_stage
+
+logger = Logger()
+tracer = Tracer()
+
+# Nome do bucket S3 (será definido via variável de ambiente)
+RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
+
+# Limite de objetos por chamada de DeleteObjects
+S3_DELETE_BATCH_SIZE = 1000
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@instrument_stage("BuildSimilarityIndex")
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    """
+    Lambda function agendada para consolidar as receitas recém-geradas em um novo snapshot do índice de similaridade.
+
+    Args:
+        event: Evento do agendamento (não utilizado)
+        context: Contexto da função Lambda
+
+    Returns:
+        dict: Snapshot publicado, quantidade de receitas adicionadas e tamanho do índice
+    """
+    try:
+        s3_client = get_client("s3")
+        pending_keys = list_pending_keys(s3_client)
+        if not pending_keys:
+            logger.info("No pending recipes, similarity index unchanged")
+            return {"snapshot": None, "added": 0}
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            # Partir do snapshot atual (ou de um índice vazio) e adicionar as receitas pendentes
+            previous_snapshot = read_index_pointer(s3_client, RECIPES_BUCKET)
+            if previous_snapshot:
+                index = download_index(s3_client, RECIPES_BUCKET, previous_snapshot, os.path.join(work_dir, "current"))
+            else:
+                index = SimilarityIndex(dimensions=SIMILARITY_INDEX_DIMENSIONS)
+
+            # Uma receita regravada após uma repetição da execução não é indexada duas vezes
+            indexed_recipes = {entry["recipe_id"] for entry in index.entries}
+            for key in pending_keys:
+                pending = json.loads(s3_client.get_object(Bucket=RECIPES_BUCKET, Key=key)["Body"].read())
+                if pending["recipe_id"] not in indexed_recipes:
+                    index.add(
+                        vectorize_request(pending["request"], index.dimensions),
+                        index_entry(pending["recipe_id"], pending["request"], pending["s3_key"]),
+                    )
+                    indexed_recipes.add(pending["recipe_id"])
+
+            snapshot = f"{SIMILARITY_INDEX_PREFIX}/snapshots/{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}"
+            upload_index(index, s3_client, RECIPES_BUCKET, snapshot, os.path.join(work_dir, "next"))
+
+        # As receitas pendentes só são removidas depois que o novo snapshot passou a ser o atual
+        delete_keys(s3_client, pending_keys)
+        if previous_snapshot and previous_snapshot != snapshot:
+            delete_keys(s3_client, list_keys(s3_client, f"{previous_snapshot}/"))
+
+        logger.info(f"Similarity index published to {snapshot} ({len(pending_keys)} pending recipes, {len(index)} total)")
+        return {"snapshot": snapshot, "added": len(pending_keys), "size": len(index)}
+
+    except Exception as error:
+        logger.exception("Error building similarity index")
+        raise error
+
+
+def list_pending_keys(s3_client) -> list:
+    """
+    Lista as receitas registradas para entrar no próximo snapshot.
+    """
+    return list_keys(s3_client, f"{SIMILARITY_INDEX_PENDING_PREFIX}/")
+
+
+def list_keys(s3_client, prefix: str) -> list:
+    keys = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=RECIPES_BUCKET, Prefix=prefix):
+        keys.extend(item["Key"] for item in page.get("Contents", []))
+    return keys
+
+
+def delete_keys(s3_client, keys: list) -> None:
+    while keys:
+        batch, keys = keys[:S3_DELETE_BATCH_SIZE], keys[S3_DELETE_BATCH_SIZE:]
+        s3_client.delete_objects(Bucket=RECIPES_BUCKET, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True})
@@ -0,0 +1,45 @@
+import os
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from service.drink.clients import get_client, get_table
+from service.drink.images.image_store import ImageStore
+from service.drink.metrics import instrument_stage
+
+logger = Logger()
+tracer = Tracer()
+
+# Bucket e tabela do armazenamento de imagens compartilhadas (serão definidos via variáveis de ambiente)
+RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
+IMAGE_STORE_TABLE = os.environ.get("IMAGE_STORE_TABLE")
+
+# Carência antes de remover uma imagem sem referências (maior que a validade dos links enviados por e-mail)
+IMAGE_GC_GRACE_SECONDS = int(os.environ.get("IMAGE_GC_GRACE_SECONDS", str(7 * 24 * 3600)))
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@instrument_stage("CollectImages")
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    """
+    Lambda function agendada para remover imagens compartilhadas que nenhuma receita referencia mais.
+
+    Args:
+        event: Evento do agendamento (não utilizado)
+        context: Contexto da função Lambda
+
+    Returns:
+        dict: Quantidade de imagens removidas
+    """
+    try:
+        logger.info("Collecting unreferenced drink images")
+
+        image_store = ImageStore(get_table(IMAGE_STORE_TABLE), get_client("s3"), RECIPES_BUCKET)
+        collected = image_store.collect_garbage(IMAGE_GC_GRACE_SECONDS)
+
+        logger.info(f"Unreferenced images collected: {collected}")
+        return {"collected": collected}
+
+    except Exception as error:
+        logger.exception("Error collecting unreferenced drink images")
+        raise error
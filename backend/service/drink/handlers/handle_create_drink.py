@@ -1,50 +1,431 @@
 import json
 import os
 import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, List, Optional, Union
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
-from aws_lambda_powertools.event_handler import APIGatewayRestResolver
+from aws_lambda_powertools.event_handler import (
+    APIGatewayRestResolver,
+    Response,
+    content_types,
+)
 from aws_lambda_powertools.logging import correlation_paths
-from aws_lambda_powertools.utilities.parser import parse
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from service.drink.models.drink_request import DrinkRequest
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import BotoCoreError, ClientError
+from pydantic import TypeAdapter, ValidationError
+from service.drink.clients import MAX_POOL_CONNECTIONS, get_client, get_table
+from service.drink.config import get_settings
+from service.drink.handlers.handle_get_drink import build_recipe_response
+from service.drink.idempotency.idempotency_store import (
+    IdempotencyRecord,
+    IdempotencyStore,
+    build_idempotency_key,
+    build_request_hash,
+)
+from service.drink.metrics import add_request_dimensions, instrument_stage, metrics
+from service.drink.models.drink_request import (
+    DEFAULT_PRIORITY,
+    PRIORITY_LANES,
+    DrinkRequest,
+)
+from service.drink.workflow.admission import (
+    AdmissionQueue,
+    AdmissionRejectedError,
+    lane_rate_per_minute,
+)
+from service.drink.workflow.claim_check import load_recipe_text
 
 logger = Logger()
 tracer = Tracer()
 app = APIGatewayRestResolver()
-sfn_client = boto3.client("stepfunctions")
+
+# Execuções iniciadas em paralelo pelo endpoint de lote (o limite de itens vem da configuração).
+# O cliente é compartilhado entre as threads do lote, então o número de workers não passa do pool de conexões
+BATCH_MAX_WORKERS = min(int(os.environ.get("DRINK_BATCH_MAX_WORKERS", "16")), MAX_POOL_CONNECTIONS)
 
 # Nome da máquina de estado do Step Functions (será definido via variável de ambiente)
 STEP_FUNCTION_ARN = os.environ.get("DRINK_RECIPE_STEP_FUNCTION_ARN")
 
+# Lambda única que executa o fluxo inteiro (modo monolítico); quando definida, substitui a máquina de estado padrão
+PIPELINE_FUNCTION_NAME = os.environ.get("DRINK_PIPELINE_FUNCTION_NAME")
+
+# Máquina de estado Express usada no modo síncrono (POST /drink?wait=true); sem ela, o modo síncrono fica desativado
+EXPRESS_STEP_FUNCTION_ARN = os.environ.get("DRINK_RECIPE_EXPRESS_STEP_FUNCTION_ARN")
+
+# Filas de admissão, uma por faixa de prioridade (JSON com a URL da fila de cada faixa): quando definidas, as execuções
+# assíncronas são enfileiradas na faixa da solicitação e iniciadas pelo consumidor das filas no ritmo suportado pelo
+# Bedrock; a receita fica registrada como QUEUED na tabela até a primeira etapa do fluxo
+ADMISSION_QUEUE_URLS = json.loads(os.environ.get("ADMISSION_QUEUE_URLS") or "{}")
+DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
+admission_queues = {lane: AdmissionQueue(queue_url) for lane, queue_url in ADMISSION_QUEUE_URLS.items()}
+
+# Validador do lote compilado uma vez por container (valida a lista inteira em uma única chamada)
+DRINK_REQUESTS = TypeAdapter(List[DrinkRequest])
+
+# Prioridade dos itens do lote que não informam uma (lotes costumam ser trabalho sem pressa)
+BATCH_DEFAULT_PRIORITY = "bulk"
+
+# Contexto do autorizador da API com a prioridade do cliente (chave do contexto de um autorizador Lambda, ou claim
+# de um autorizador do Cognito); sem autorizador, o cliente tem a prioridade padrão
+AUTHORIZER_PRIORITY_KEY = "priority"
+AUTHORIZER_PRIORITY_CLAIM = "custom:priority"
+
+# Tabela de idempotência do POST /drink (sem ela, toda requisição inicia uma nova receita), validade dos registros
+# e prazo para que uma requisição interrompida libere a chave (igual ao timeout da função)
+IDEMPOTENCY_TABLE = os.environ.get("IDEMPOTENCY_TABLE")
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_IN_PROGRESS_SECONDS = int(os.environ.get("IDEMPOTENCY_IN_PROGRESS_SECONDS", "30"))
+
+
+def build_execution_input(recipe_id: str, timestamp: str, drink_request: DrinkRequest, resume: bool = False) -> str:
+    """
+    Serializa o input do Step Function sem passar por um dicionário intermediário.
+
+    A solicitação é serializada pelo núcleo do pydantic (model_dump_json) e inserida no envelope, cujos
+    demais campos são strings simples; o resultado é igual ao json.dumps do dicionário equivalente.
+
+    Args:
+        recipe_id: ID da receita
+        timestamp: Data e hora da solicitação (ISO 8601)
+        drink_request: Solicitação de receita validada
+        resume: Indica que a execução continua uma execução síncrona que não respondeu a tempo (as etapas
+            reaproveitam o que ela já gravou)
+
+    Returns:
+        str: JSON do input da execução
+    """
+    resume_field = ',"resume":true' if resume else ""
+    return f'{{"recipe_id":{json.dumps(recipe_id)},"timestamp":{json.dumps(timestamp)},"request":{drink_request.model_dump_json()}{resume_field}}}'
+
+
+def start_recipe_execution(
+    drink_request: DrinkRequest, recipe_id: Optional[str] = None, timestamp: Optional[str] = None, resume: bool = False
+) -> str:
+    """
+    Inicia a execução do Step Function para uma solicitação de receita já validada.
+
+    Args:
+        drink_request: Solicitação de receita validada
+        recipe_id: ID da receita (gerado quando não informado; informado quando o modo síncrono recorre a este fluxo)
+        timestamp: Data e hora da solicitação (ISO 8601)
+        resume: A execução continua uma execução síncrona da mesma receita (build_execution_input)
+
+    Returns:
+        str: ID da receita da execução
+    """
+    # Gerar ID único para a receita
+    recipe_id = recipe_id or str(uuid.uuid4())
+
+    timestamp = timestamp or datetime.utcnow().isoformat()
+    execution_input = build_execution_input(recipe_id, timestamp, drink_request, resume)
+
+    # Com as filas de admissão, o consumidor inicia a execução (no fluxo padrão ou na Lambda única) no ritmo do Bedrock
+    if admission_queues:
+        if DRINK_RECIPES_TABLE:
+            record_queued_recipe(recipe_id, timestamp)
+        get_admission_queue(drink_request.priority).enqueue(recipe_id, execution_input)
+        return recipe_id
+
+    # No modo monolítico, o mesmo input vai para a Lambda única, invocada de forma assíncrona
+    if PIPELINE_FUNCTION_NAME:
+        get_client("lambda").invoke(FunctionName=PIPELINE_FUNCTION_NAME, InvocationType="Event", Payload=execution_input.encode("utf-8"))
+        logger.info(f"Pipeline function invoked for recipe {recipe_id}")
+        return recipe_id
+
+    # Iniciar execução do Step Function
+    response = get_client("stepfunctions").start_execution(
+        stateMachineArn=STEP_FUNCTION_ARN,
+        name=f"DrinkRecipe-{recipe_id}",
+        input=execution_input,
+    )
+
+    logger.info(f"Step Function execution started: {response['executionArn']}")
+
+    return recipe_id
+
+
+def record_queued_recipe(recipe_id: str, timestamp: str) -> None:
+    """
+    Registra a receita como QUEUED para que GET /drink/{recipe_id} a encontre enquanto ela aguarda na fila.
+
+    O registro não sobrescreve um item existente (no modo síncrono, o fluxo Express pode ter gravado a receita antes).
+    """
+    try:
+        get_table(DRINK_RECIPES_TABLE).put_item(
+            Item={"recipe_id": recipe_id, "timestamp": timestamp, "status": "QUEUED"},
+            ConditionExpression=Attr("recipe_id").not_exists(),
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def get_admission_queue(lane: str) -> AdmissionQueue:
+    """
+    Retorna a fila da faixa de prioridade (a da faixa padrão quando a faixa não tem fila própria).
+    """
+    return admission_queues.get(lane) or admission_queues[DEFAULT_PRIORITY]
+
+
+def check_admission(lane_counts: Dict[str, int]) -> Optional[Response]:
+    """
+    Verifica se as filas de admissão das faixas comportam mais solicitações.
+
+    Cada faixa tem o próprio limite de fila, então uma faixa cheia (por exemplo, um grande lote bulk) não recusa
+    as solicitações das demais.
+
+    Args:
+        lane_counts: Quantidade de solicitações que serão enfileiradas em cada faixa
+
+    Returns:
+        Response | None: Resposta 429 com Retry-After quando alguma fila está acima do limite; None quando há espaço
+    """
+    if not admission_queues:
+        return None
+
+    settings = get_settings()
+    try:
+        for lane, count in lane_counts.items():
+            lane = lane if lane in admission_queues and lane in settings.admission.lanes else DEFAULT_PRIORITY
+            get_admission_queue(lane).ensure_capacity(settings.admission.lanes[lane].max_backlog, lane_rate_per_minute(settings, lane), count)
+    except AdmissionRejectedError as error:
+        metrics.add_metric(name="AdmissionRejected", unit=MetricUnit.Count, value=sum(lane_counts.values()))
+        logger.warning(f"Lane {lane}: {error}")
+        return Response(
+            status_code=429,
+            content_type=content_types.APPLICATION_JSON,
+            body=json.dumps({"message": "Too many drink requests are waiting, please retry later", "retry_after": error.retry_after_seconds}),
+            headers={"Retry-After": str(error.retry_after_seconds)},
+        )
+    return None
+
+
+def get_caller_priority() -> str:
+    """
+    Retorna a prioridade máxima do cliente, definida pelo autorizador da API (nunca pelo corpo da requisição).
+
+    Returns:
+        str: Prioridade do contexto do autorizador, ou DEFAULT_PRIORITY para clientes sem autorização
+    """
+    authorizer = (app.current_event.raw_event.get("requestContext") or {}).get("authorizer") or {}
+    priority = authorizer.get(AUTHORIZER_PRIORITY_KEY) or (authorizer.get("claims") or {}).get(AUTHORIZER_PRIORITY_CLAIM)
+    return priority if priority in PRIORITY_LANES else DEFAULT_PRIORITY
+
+
+def apply_caller_priority(drink_request: DrinkRequest, caller_priority: str, default_priority: Optional[str] = None) -> Optional[DrinkRequest]:
+    """
+    Define a faixa da solicitação a partir da prioridade do cliente.
+
+    Sem prioridade no corpo, a solicitação fica na faixa do cliente (ou na default_priority, quando ela é mais baixa);
+    o corpo só pode pedir a faixa do cliente ou uma mais baixa.
+
+    Args:
+        drink_request: Solicitação validada
+        caller_priority: Prioridade máxima do cliente (get_caller_priority)
+        default_priority: Prioridade usada quando o corpo não informa uma (por exemplo, a dos itens de lote)
+
+    Returns:
+        DrinkRequest | None: Solicitação com a faixa definida, ou None quando ela pede uma faixa acima da do cliente
+    """
+    if "priority" not in drink_request.model_fields_set:
+        lanes = [caller_priority] + ([default_priority] if default_priority else [])
+        return drink_request.model_copy(update={"priority": max(lanes, key=PRIORITY_LANES.index)})
+    if PRIORITY_LANES.index(drink_request.priority) < PRIORITY_LANES.index(caller_priority):
+        return None
+    return drink_request
+
+
+def priority_not_allowed_error(priority: str) -> dict:
+    """
+    Erro de validação (no formato do pydantic) de uma prioridade acima da permitida para o cliente.
+    """
+    return {"type": "priority_not_allowed", "loc": ["priority"], "msg": f"Priority '{priority}' is not allowed for this client", "input": priority}
+
+
+def validate_batch_items(items: list) -> List[Union[DrinkRequest, List[dict]]]:
+    """
+    Valida os itens do lote com uma única chamada ao validador, mantendo a semântica de sucesso parcial.
+
+    Quando algum item é inválido, os erros são separados pelo índice do item e os itens restantes são validados
+    de novo, também em uma única chamada.
+
+    Args:
+        items: Itens do lote já lidos do corpo da requisição
+
+    Returns:
+        list: DrinkRequest de cada item válido ou a lista de erros de cada item inválido, na ordem do lote
+    """
+    try:
+        return DRINK_REQUESTS.validate_python(items)
+    except ValidationError as error:
+        errors = {}
+        for item_error in error.errors(include_url=False, include_context=False):
+            index, *loc = item_error["loc"]
+            errors.setdefault(index, []).append({**item_error, "loc": tuple(loc)})
+
+    valid_requests = iter(DRINK_REQUESTS.validate_python([item for index, item in enumerate(items) if index not in errors]))
+    return [errors[index] if index in errors else next(valid_requests) for index in range(len(items))]
+
+
+def get_request_header(name: str) -> Optional[str]:
+    """
+    Retorna o valor de um cabeçalho da requisição atual (sem diferenciar maiúsculas de minúsculas), ou None.
+    """
+    headers = app.current_event.headers or {}
+    value = next((value for header, value in headers.items() if header.lower() == name.lower()), "")
+    return value.strip() or None
+
+
+def build_replay_response(record: IdempotencyRecord, request_hash: str):
+    """
+    Monta a resposta de uma requisição repetida a partir do registro de idempotência existente.
+
+    Args:
+        record: Registro criado pela primeira requisição com a mesma chave
+        request_hash: Hash da solicitação repetida
+
+    Returns:
+        Resposta da requisição original (202 com o mesmo recipe_id), 422 quando a chave foi usada em outra
+        solicitação ou 409 enquanto a primeira requisição ainda está iniciando a execução
+    """
+    if record.request_hash != request_hash:
+        return {"message": "Idempotency-Key was already used with a different drink request"}, 422
+
+    if not record.accepted:
+        return Response(
+            status_code=409,
+            content_type=content_types.APPLICATION_JSON,
+            body=json.dumps({"message": "A drink request with this Idempotency-Key is still being processed"}),
+            headers={"Retry-After": "1"},
+        )
+
+    metrics.add_metric(name="IdempotentReplay", unit=MetricUnit.Count, value=1)
+    logger.info(f"Repeated drink request replayed for recipe {record.recipe_id}")
+    return {
+        "statusCode": 202,
+        "body": {
+            "message": "Drink recipe generation started",
+            "recipe_id": record.recipe_id,
+        },
+    }
+
+
+def run_recipe_sync(drink_request: DrinkRequest, recipe_id: str, timestamp: str) -> Optional[dict]:
+    """
+    Executa o fluxo Express com StartSyncExecution e aguarda o resultado dentro do prazo da API.
+
+    Args:
+        drink_request: Solicitação de receita validada
+        recipe_id: ID da receita
+        timestamp: Data e hora da solicitação (ISO 8601)
+
+    Returns:
+        dict | None: Saída da execução, ou None quando ela não terminou com sucesso a tempo
+    """
+    try:
+        response = get_client("stepfunctions-sync").start_sync_execution(
+            stateMachineArn=EXPRESS_STEP_FUNCTION_ARN,
+            name=f"DrinkRecipe-{recipe_id}",
+            input=build_execution_input(recipe_id, timestamp, drink_request),
+        )
+    except (BotoCoreError, ClientError):
+        logger.exception(f"Synchronous execution for recipe {recipe_id} did not return in time")
+        return None
+
+    if response["status"] != "SUCCEEDED":
+        logger.warning(f"Synchronous execution {response['executionArn']} ended with {response['status']}: {response.get('error')}")
+        return None
+    return json.loads(response["output"])
+
+
+def build_sync_response(output: dict) -> dict:
+    """
+    Monta a resposta do modo síncrono no mesmo formato de GET /drink/{recipe_id}, com o texto e a URL da imagem.
+
+    Args:
+        output: Saída da execução do fluxo Express
+
+    Returns:
+        dict: Corpo da resposta
+    """
+    recipe = output.get("recipe", {})
+    return build_recipe_response(
+        {
+            "recipe_id": output["recipe_id"],
+            "status": "COMPLETED",
+            "timestamp": output.get("timestamp"),
+            "partial_text": load_recipe_text(recipe),
+            "recipe_s3_key": recipe.get("s3_key"),
+            "image_s3_key": recipe.get("image_s3_key"),
+            "image_quality": recipe.get("image_quality"),
+            "text_model_id": recipe.get("model_id"),
+        }
+    )
+
 
 @app.post("/drink")
 @tracer.capture_method
 def handle_create_drink():
+    """
+    Recebe uma solicitação de receita e inicia o fluxo assíncrono (202), ou, com ?wait=true, executa o fluxo
+    síncrono e devolve a receita pronta (200), recorrendo ao fluxo assíncrono quando ela não fica pronta no prazo.
+    """
     try:
-        # Parse do corpo da requisição
-        drink_request = parse(event=app.current_event.body, model=DrinkRequest)
+        # Validar o corpo bruto da requisição em uma única passada (sem json.loads nem dicionário intermediário)
+        drink_request = DrinkRequest.model_validate_json(app.current_event.body or "")
+    except ValidationError as error:
+        return {"message": "Invalid drink request", "errors": error.errors(include_url=False, include_context=False)}, 400
 
-        # Gerar ID único para a receita
-        recipe_id = str(uuid.uuid4())
+    # A faixa de prioridade vem da identidade do cliente; o corpo só pode pedir uma faixa igual ou mais baixa
+    requested_priority = drink_request.priority
+    drink_request = apply_caller_priority(drink_request, get_caller_priority())
+    if drink_request is None:
+        return {"message": "Priority not allowed", "errors": [priority_not_allowed_error(requested_priority)]}, 403
 
-        # Preparar input para o Step Function
-        step_function_input = {
-            "recipe_id": recipe_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "request": drink_request.model_dump(),
-        }
+    add_request_dimensions({"mood": drink_request.mood, "flavor": drink_request.flavor})
+    recipe_id, timestamp = str(uuid.uuid4()), datetime.utcnow().isoformat()
 
-        # Iniciar execução do Step Function
-        response = sfn_client.start_execution(
-            stateMachineArn=STEP_FUNCTION_ARN,
-            name=f"DrinkRecipe-{recipe_id}",
-            input=json.dumps(step_function_input),
-        )
+    # Repetições da mesma solicitação (mesmo Idempotency-Key, ou mesmo corpo do mesmo cliente) reaproveitam a receita
+    request_hash = build_request_hash(drink_request.model_dump_json())
+    idempotency_key = build_idempotency_key(get_request_header("Idempotency-Key"), get_request_header("X-Client-Id"), request_hash)
+    idempotency_store, started = None, False
+    try:
+        if idempotency_key and IDEMPOTENCY_TABLE:
+            store = IdempotencyStore(get_table(IDEMPOTENCY_TABLE), IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_IN_PROGRESS_SECONDS)
+            record = store.claim(idempotency_key, request_hash, recipe_id, timestamp)
+            if not record.claimed:
+                return build_replay_response(record, request_hash)
+            idempotency_store = store
 
-        logger.info(f"Step Function execution started: {response['executionArn']}")
+        # Com a fila de admissão cheia, a solicitação é recusada (uma repetição já aceita continua recebendo a receita original)
+        rejection = check_admission({drink_request.priority: 1})
+        if rejection:
+            if idempotency_store:
+                idempotency_store.release(idempotency_key, recipe_id)
+            return rejection
+
+        wait = (app.current_event.get_query_string_value("wait") or "").lower() == "true"
+        sync_attempted = wait and bool(EXPRESS_STEP_FUNCTION_ARN)
+        if sync_attempted:
+            output = run_recipe_sync(drink_request, recipe_id, timestamp)
+            if output:
+                started = True
+                if idempotency_store:
+                    idempotency_store.accept(idempotency_key, recipe_id)
+                return build_sync_response(output), 200
+
+        # A mesma receita segue no fluxo padrão; no modo síncrono, o cliente acompanha o resultado por GET /drink/{recipe_id}.
+        # As tarefas já iniciadas pelo fluxo Express continuam depois do timeout, então o fluxo padrão reaproveita o
+        # texto que elas gravarem (e a imagem, pelo armazenamento endereçado por conteúdo) em vez de gerá-los de novo
+        start_recipe_execution(drink_request, recipe_id, timestamp, resume=sync_attempted)
+        started = True
+        if idempotency_store:
+            idempotency_store.accept(idempotency_key, recipe_id)
 
         # Retornar resposta para o cliente
         return {
@@ -56,10 +437,91 @@ def handle_create_drink():
         }
     except Exception:
         logger.exception("Error processing drink recipe request")
+        if idempotency_store and not started:
+            # A execução não foi iniciada, então a próxima tentativa com a mesma chave pode iniciar a receita
+            try:
+                idempotency_store.release(idempotency_key, recipe_id)
+            except Exception:
+                logger.exception(f"Error releasing idempotency record for recipe {recipe_id}")
         return {"statusCode": 500, "body": {"message": "Error processing request"}}
 
 
+@app.post("/drinks/batch")
+@tracer.capture_method
+def handle_create_drinks_batch():
+    """
+    Recebe um lote de solicitações de receita e inicia as execuções em paralelo.
+
+    O lote tem semântica de sucesso parcial: itens inválidos ou que falharem ao iniciar não impedem os demais.
+    Cada item da resposta traz o índice original e o recipe_id ou o erro correspondente.
+    """
+    # Caminho rápido: um lote enviado como lista e todo válido é validado direto do corpo bruto, sem passar por dicts
+    try:
+        items = DRINK_REQUESTS.validate_json(app.current_event.body or "")
+    except ValidationError:
+        items = None
+
+    if items is None:
+        try:
+            body = app.current_event.json_body
+        except ValueError:
+            return {"message": "Request body must be valid JSON"}, 400
+        items = body.get("requests") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return {"message": "Request body must be a non-empty list of drink requests"}, 400
+    batch_max_items = get_settings().batch_max_items
+    if len(items) > batch_max_items:
+        return {"message": f"Batch size exceeds the limit of {batch_max_items} drink requests"}, 400
+
+    results = [None] * len(items)
+
+    # Itens que não vieram do caminho rápido são validados todos de uma vez antes de iniciar qualquer execução
+    if not all(isinstance(item, DrinkRequest) for item in items):
+        items = validate_batch_items(items)
+    caller_priority = get_caller_priority()
+    valid_requests = []
+    for index, drink_request in enumerate(items):
+        if not isinstance(drink_request, DrinkRequest):
+            results[index] = {"index": index, "status": "INVALID", "errors": drink_request}
+            continue
+        prioritized_request = apply_caller_priority(drink_request, caller_priority, BATCH_DEFAULT_PRIORITY)
+        if prioritized_request is None:
+            results[index] = {"index": index, "status": "INVALID", "errors": [priority_not_allowed_error(drink_request.priority)]}
+        else:
+            valid_requests.append((index, prioritized_request))
+
+    # Iniciar as execuções válidas com um pool de threads limitado e o cliente compartilhado
+    def start(indexed_request):
+        index, drink_request = indexed_request
+        try:
+            return {"index": index, "status": "ACCEPTED", "recipe_id": start_recipe_execution(drink_request)}
+        except Exception as error:
+            logger.exception(f"Error starting drink recipe execution for batch item {index}")
+            return {"index": index, "status": "FAILED", "error": str(error)}
+
+    if valid_requests:
+        # O lote é aceito ou recusado inteiro pelas filas de admissão, antes de iniciar qualquer execução
+        rejection = check_admission(Counter(drink_request.priority for _, drink_request in valid_requests))
+        if rejection:
+            return rejection
+
+        with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(valid_requests))) as executor:
+            for result in executor.map(start, valid_requests):
+                results[result["index"]] = result
+
+    accepted = sum(1 for result in results if result["status"] == "ACCEPTED")
+    logger.info(f"Drink batch processed: {accepted} of {len(items)} accepted")
+
+    return {
+        "message": "Drink recipe batch processed",
+        "accepted": accepted,
+        "rejected": len(items) - accepted,
+        "results": results,
+    }, (202 if accepted == len(items) else 207)
+
+
 @logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
 @tracer.capture_lambda_handler
+@instrument_stage("CreateDrink")
 def lambda_handler(event: dict, context: LambdaContext) -> dict:
     return app.resolve(event, context)
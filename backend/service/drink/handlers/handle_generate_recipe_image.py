@@ -1,82 +1,126 @@
 import base64
 import json
 import os
+import time
+from typing import Optional
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
+from service.drink.bedrock.invoker import create_bedrock_invoker
+from service.drink.clients import get_client, get_table
+from service.drink.config import get_settings
+from service.drink.images.image_store import ImageStore, build_image_hash
+from service.drink.images.renditions import render_image_renditions
+from service.drink.metrics import (
+    instrument_stage,
+    metrics,
+    record_model_invocation,
+    timed,
+)
+from service.drink.models.drink_request import DrinkRequest
+from service.drink.prompts.recipe_prompt import compile_image_prompt
+from service.drink.workflow.claim_check import claim_check
 
 logger = Logger()
 tracer = Tracer()
 
-# Configurações do Bedrock
-BEDROCK_MODEL_ID = os.environ.get("BEDROCK_IMAGE_MODEL_ID", "stability.stable-diffusion-xl-v1")
-s3_client = boto3.client("s3")
-bedrock_runtime = boto3.client("bedrock-runtime")
 
-# Nome do bucket S3 (será definido via variável de ambiente)
+# Nome do bucket S3 e das tabelas de receitas e de imagens compartilhadas (serão definidos via variáveis de ambiente)
 RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
+DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
+IMAGE_STORE_TABLE = os.environ.get("IMAGE_STORE_TABLE")
 
 
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@instrument_stage("GenerateRecipeImage")
+@claim_check
 def lambda_handler(event: dict, context: LambdaContext) -> dict:
     """
     Lambda function para gerar a imagem da receita usando Amazon Bedrock.
 
+    A imagem é gerada em duas fases: uma prévia rápida ("draft", com menos passos de inferência) que libera
+    a notificação e a API de consulta, e a versão final ("full"), gerada depois que a receita é concluída.
+
     Args:
-        event: Evento contendo os dados da receita
+        event: Evento contendo os dados da receita e o perfil de qualidade (image_profile)
         context: Contexto da função Lambda
 
     Returns:
         dict: Evento original com informações adicionais sobre a imagem gerada
     """
     try:
-        logger.info("Generating drink recipe image with Bedrock")
-
         # Obter dados do evento
         recipe_id = event["recipe_id"]
         request_data = event["request"]
-        recipe_text = event["recipe"].get("text", "")
-
-        # Construir prompt para o modelo de imagem
-        prompt = create_image_prompt(request_data, recipe_text)
-
-        # Chamar o Bedrock para gerar a imagem
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(
-                {
-                    "text_prompts": [{"text": prompt, "weight": 1.0}],
-                    "cfg_scale": 7,
-                    "steps": 50,
-                    "seed": 0,
-                    "width": 1024,
-                    "height": 1024,
-                }
-            ),
-        )
-
-        # Processar resposta do Bedrock
-        response_body = json.loads(response["body"].read().decode("utf-8"))
-        image_base64 = response_body["artifacts"][0]["base64"]
-        image_data = base64.b64decode(image_base64)
-
-        # Salvar imagem no S3
-        image_key = f"recipes/{recipe_id}/image.jpg"
-        s3_client.put_object(
-            Bucket=RECIPES_BUCKET,
-            Key=image_key,
-            Body=image_data,
-            ContentType="image/jpeg",
-        )
-
-        logger.info(f"Recipe image generated and saved to S3: {image_key}")
+        recipe = event.setdefault("recipe", {})
+
+        # Com as duas fases desligadas, a primeira chamada já gera a versão final e a segunda não tem o que fazer
+        settings = get_settings()
+        requested_profile = event.get("image_profile", "full")
+        if requested_profile == "full" and recipe.get("image_quality") == "full":
+            logger.info("Full quality image already generated, skipping")
+            return event
+        profile_name = requested_profile if settings.features.image_two_phase else "full"
+
+        logger.info(f"Generating drink recipe image with Bedrock ({profile_name} profile)")
+
+        # Construir prompt para o modelo de imagem (depende apenas da solicitação, não do texto da receita,
+        # o que permite gerar a imagem em paralelo com o texto)
+        prompt = create_image_prompt(request_data)
+
+        # A mesma seed nos dois perfis mantém a composição da prévia na versão final
+        bedrock_settings = settings.bedrock
+        profile = bedrock_settings.image_profile(profile_name)
+        generation_params = {
+            "cfg_scale": bedrock_settings.image_cfg_scale,
+            "steps": profile.steps,
+            "seed": bedrock_settings.image_seed,
+            "width": profile.width,
+            "height": profile.height,
+        }
+
+        # Com a seed fixa, o mesmo prompt e os mesmos parâmetros geram os mesmos pixels: a imagem é
+        # reaproveitada do armazenamento endereçado por conteúdo quando já existe
+        image_store = get_image_store()
+        image_hash = build_image_hash(bedrock_settings.image_model_id, prompt, generation_params)
+        renditions = image_store.acquire(image_hash, recipe_id) if image_store else None
+        image_reused = renditions is not None
+        if image_store:
+            metrics.add_metric(name="ImageStoreHit" if image_reused else "ImageStoreMiss", unit=MetricUnit.Count, value=1)
+
+        if image_reused:
+            logger.info(f"Reusing stored image {image_hash}")
+        else:
+            image_data = generate_image(settings, prompt, generation_params)
+            if image_store:
+                renditions = save_renditions(image_data, ImageStore.key_prefix(image_hash))
+                image_store.publish(image_hash, recipe_id, renditions)
+            else:
+                # Sem o armazenamento compartilhado, cada receita guarda as próprias versões
+                # (a prévia fica em um prefixo próprio para não ser confundida com a versão final)
+                key_prefix = f"recipes/{recipe_id}/draft" if profile_name == "draft" else f"recipes/{recipe_id}"
+                renditions = save_renditions(image_data, key_prefix)
+
+        image_key = renditions["full"]["s3_key"]
+        logger.info(f"Recipe image ready in S3: {image_key} ({len(renditions)} renditions, {profile.steps} steps, reused: {image_reused})")
+
+        # A receita deixa de referenciar a prévia quando a versão final fica pronta: a chave da prévia sai do item da
+        # receita antes de a referência ser liberada, para que a coleta de imagens não apague um objeto ainda citado
+        previous_hash = recipe.get("image_hash")
+        release_previous = bool(image_store and previous_hash and previous_hash != image_hash)
+        recorded = record_image_quality(recipe_id, profile_name, image_key, clear_profile=recipe.get("image_quality") if release_previous else None)
+        if release_previous and recorded:
+            image_store.release(previous_hash, recipe_id)
 
         # Adicionar informações da imagem ao evento para o próximo passo
-        event["recipe"]["image_s3_key"] = image_key
+        # (o ramo de texto roda em paralelo e as duas saídas são combinadas pela máquina de estado)
+        recipe["image_s3_key"] = image_key
+        recipe["image_renditions"] = renditions
+        recipe["image_quality"] = profile_name
+        recipe["image_hash"] = image_hash
+        recipe["image_reused"] = image_reused
 
         return event
 
@@ -85,28 +129,122 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
         raise error
 
 
-def create_image_prompt(request_data, recipe_text):
+def get_image_store():
+    """
+    Retorna o armazenamento de imagens compartilhado, ou None quando a tabela não está configurada.
+    """
+    if not IMAGE_STORE_TABLE:
+        return None
+    return ImageStore(get_table(IMAGE_STORE_TABLE), get_client("s3"), RECIPES_BUCKET)
+
+
+def generate_image(settings, prompt: str, generation_params: dict) -> bytes:
+    """
+    Gera a imagem no Bedrock (a cota do modelo de imagem é contada apenas em requisições).
+
+    Args:
+        settings: Configurações tipadas dos handlers
+        prompt: Prompt da imagem
+        generation_params: cfg_scale, steps, seed, width e height
+
+    Returns:
+        bytes: PNG gerado pelo modelo
+    """
+    started = time.perf_counter()
+    response = create_bedrock_invoker(settings).invoke_model(
+        modelId=settings.bedrock.image_model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps({"text_prompts": [{"text": prompt, "weight": 1.0}], **generation_params}),
+    )
+
+    # Processar resposta do Bedrock
+    response_body = json.loads(response["body"].read().decode("utf-8"))
+    image_data = base64.b64decode(response_body["artifacts"][0]["base64"])
+    record_model_invocation(settings.bedrock.image_model_id, (time.perf_counter() - started) * 1000)
+    metrics.add_metric(name="GeneratedImageSize", unit=MetricUnit.Bytes, value=len(image_data))
+    return image_data
+
+
+def save_renditions(image_data: bytes, key_prefix: str) -> dict:
+    """
+    Converte o PNG gerado em versões JPEG/WebP de tamanhos diferentes e salva todas no S3.
+
+    Args:
+        image_data: PNG gerado pelo modelo
+        key_prefix: Prefixo das chaves no bucket
+
+    Returns:
+        dict: Versões salvas, por nome (chave, versão do objeto, tipo, tamanho e dimensões)
+    """
+    renditions = {}
+    for rendered in render_image_renditions(image_data):
+        rendition_key = f"{key_prefix}/{rendered.rendition.file_name}"
+        with timed("S3PutDuration"):
+            response = get_client("s3").put_object(
+                Bucket=RECIPES_BUCKET,
+                Key=rendition_key,
+                Body=rendered.data,
+                ContentType=rendered.rendition.content_type,
+            )
+        metrics.add_metric(name="ImageRenditionSize", unit=MetricUnit.Bytes, value=len(rendered.data))
+        renditions[rendered.rendition.name] = {
+            "s3_key": rendition_key,
+            "version_id": (response or {}).get("VersionId"),
+            "content_type": rendered.rendition.content_type,
+            "size_bytes": len(rendered.data),
+            "width": rendered.width,
+            "height": rendered.height,
+        }
+    return renditions
+
+
+def record_image_quality(recipe_id: str, profile_name: str, image_key: str, clear_profile: Optional[str] = None) -> bool:
+    """
+    Registra no item da receita a imagem mais recente e a chave de cada perfil gerado.
+
+    Com isso, a API de consulta mostra a prévia assim que ela fica pronta e passa para a versão final depois.
+
+    Args:
+        recipe_id: ID da receita
+        profile_name: Perfil de qualidade gerado ("draft" ou "full")
+        image_key: Chave da imagem principal no S3
+        clear_profile: Perfil cuja chave sai do item (a prévia cuja imagem deixa de ser referenciada)
+
+    Returns:
+        bool: True quando o item foi atualizado (ou não há tabela configurada)
+    """
+    if not DRINK_RECIPES_TABLE:
+        return True
+
+    update_expression = "SET image_s3_key = :key, image_quality = :quality, #profile_key = :key"
+    names = {"#profile_key": f"{profile_name}_image_s3_key"}
+    if clear_profile and clear_profile != profile_name:
+        update_expression += " REMOVE #cleared_key"
+        names["#cleared_key"] = f"{clear_profile}_image_s3_key"
+
+    try:
+        get_table(DRINK_RECIPES_TABLE).update_item(
+            Key={"recipe_id": recipe_id},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={":key": image_key, ":quality": profile_name},
+        )
+    except Exception:
+        # O registro é apenas informativo; a máquina de estado também grava a imagem ao concluir a receita
+        logger.exception("Error recording recipe image quality")
+        return False
+    return True
+
+
+def create_image_prompt(request_data):
     """
     Cria o prompt para o modelo de imagem gerar a visualização da receita.
 
     Args:
         request_data: Dados da solicitação da receita
-        recipe_text: Texto da receita gerada
 
     Returns:
         str: Prompt formatado para geração de imagem
     """
-    name = request_data.get("name", "")
-    base_spirit = request_data.get("base_spirit", "")
-    flavor_profile = request_data.get("flavor_profile", "")
-
-    prompt = (
-        f"A professional, high-quality photograph of a cocktail named '{name}' "
-        f"made with {base_spirit} with a {flavor_profile} flavor profile. "
-        f"The cocktail should be in an appropriate glass, garnished beautifully, "
-        f"with perfect lighting and composition. The image should look like it belongs "
-        f"in a high-end cocktail recipe book or luxury bar menu. "
-        f"Studio lighting, high resolution, photorealistic."
-    )
-
-    return prompt
+    return compile_image_prompt(DrinkRequest.model_validate(request_data))
@@ -1,24 +1,84 @@
 import json
 import os
+import time
+from typing import Optional
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
+from botocore.exceptions import ClientError
+from service.drink.bedrock.invoker import create_bedrock_invoker
+from service.drink.bedrock.router import LatencyTracker, ModelRouter, score_complexity
+from service.drink.bedrock.streaming import (
+    RecipeTextCheckpointWriter,
+    stream_recipe_text,
+)
+from service.drink.cache.recipe_cache import RecipeCache, build_cache_key
+from service.drink.cache.similarity_index import (
+    SimilarityIndexCache,
+    covers_request,
+    index_entry,
+    put_pending_recipe,
+    vectorize_request,
+)
+from service.drink.clients import get_client, get_table
+from service.drink.config import get_settings
+from service.drink.metrics import (
+    instrument_stage,
+    metrics,
+    record_model_invocation,
+    timed,
+)
+from service.drink.models.drink_request import DrinkRequest
+from service.drink.prompts.recipe_prompt import (
+    compile_recipe_prompt,
+    parse_recipe_output,
+    render_partial_recipe_text,
+    render_recipe_text,
+)
+from service.drink.workflow.claim_check import claim_check
 
 logger = Logger()
 tracer = Tracer()
 
-# Configurações do Bedrock
-BEDROCK_MODEL_ID = os.environ.get("BEDROCK_TEXT_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
-s3_client = boto3.client("s3")
-bedrock_runtime = boto3.client("bedrock-runtime")
-
 # Nome do bucket S3 (será definido via variável de ambiente)
 RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
 
+# Cache de receitas (tabela compartilhada opcional, definida via variável de ambiente)
+RECIPE_CACHE_TABLE = os.environ.get("RECIPE_CACHE_TABLE")
+RECIPE_CACHE_TTL_SECONDS = int(os.environ.get("RECIPE_CACHE_TTL_SECONDS", "86400"))
+recipe_cache = RecipeCache(
+    table_name=RECIPE_CACHE_TABLE,
+    ttl_seconds=RECIPE_CACHE_TTL_SECONDS,
+    metrics=metrics,
+)
+
+# Índice de similaridade das solicitações já atendidas (snapshot no S3, carregado no container e conferido periodicamente)
+SIMILARITY_INDEX_REFRESH_SECONDS = float(os.environ.get("SIMILARITY_INDEX_REFRESH_SECONDS", "300"))
+similarity_index = SimilarityIndexCache(
+    s3_client_factory=lambda: get_client("s3"),
+    bucket=RECIPES_BUCKET,
+    cache_dir="/tmp/similarity-index",
+    refresh_seconds=SIMILARITY_INDEX_REFRESH_SECONDS,
+)
+# Receitas mais parecidas conferidas contra a solicitação antes de desistir do reaproveitamento
+SIMILARITY_CANDIDATES = 10
+
+# Metadado do objeto do texto no S3 com o modelo que o gerou (lido quando uma execução reaproveita o texto)
+MODEL_ID_METADATA = "model-id"
+
+# Modo streaming (ligado via configuração): o texto parcial é gravado no item da receita enquanto o modelo responde
+RECIPE_TEXT_CHECKPOINT_SECONDS = float(os.environ.get("RECIPE_TEXT_CHECKPOINT_SECONDS", "1.0"))
+DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
+
+# Latência observada por modelo, mantida entre invocações do mesmo container para a política de SLO do roteador
+model_latencies = LatencyTracker()
+
 
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@instrument_stage("GenerateRecipeText")
+@claim_check
 def lambda_handler(event: dict, context: LambdaContext) -> dict:
     """
     Lambda function para gerar o texto da receita usando Amazon Bedrock.
@@ -37,40 +97,91 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
         recipe_id = event["recipe_id"]
         request_data = event["request"]
 
-        # Construir prompt para o modelo
-        prompt = create_recipe_prompt(request_data)
-
-        # Chamar o Bedrock para gerar a receita
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(
-                {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1000,
-                    "messages": [{"role": "user", "content": prompt}],
-                }
-            ),
+        # Configurações ajustáveis em tempo de execução (modelo, parâmetros e funcionalidades)
+        settings = get_settings()
+        recipe_key = f"recipes/{recipe_id}/recipe.txt"
+
+        # Continuação de uma execução síncrona que não respondeu a tempo: o texto que ela já gravou é reaproveitado
+        # (não conta como acerto de cache) com o modelo que o gerou
+        stored_recipe = get_stored_recipe_text(recipe_key) if event.get("resume") else None
+        if stored_recipe is not None:
+            logger.info(f"Recipe text already generated by the synchronous execution: {recipe_key}")
+            event["recipe"] = {"s3_key": recipe_key, "cache_hit": False, "resumed": True, "model_id": stored_recipe.get(MODEL_ID_METADATA)}
+            return event
+
+        # Reaproveitar uma receita já gerada para uma solicitação equivalente
+        cache_key = build_cache_key(request_data)
+        cached_recipe = recipe_cache.get(cache_key) if settings.features.recipe_cache_enabled else None
+        if cached_recipe:
+            logger.info(f"Recipe cache hit, reusing S3 object: {cached_recipe['s3_key']}")
+            event["recipe"] = {"s3_key": cached_recipe["s3_key"], "cache_hit": True}
+            return event
+
+        # Reaproveitar a receita de uma solicitação parecida (o mesmo humor e sabor, com um ingrediente a menos)
+        if settings.features.recipe_similarity_enabled:
+            similar_recipe = find_similar_recipe(request_data, settings.recipe_similarity_threshold)
+            if similar_recipe:
+                event["recipe"] = similar_recipe
+                return event
+
+        # Compilar o prompt a partir dos campos da solicitação, com limite de saída proporcional aos ingredientes
+        drink_request = DrinkRequest.model_validate(request_data)
+        compiled_prompt = compile_recipe_prompt(drink_request, settings.bedrock.text_max_tokens)
+
+        # A estimativa de tokens (entrada + saída máxima) é consumida do controle de cota compartilhado
+        bedrock = create_bedrock_invoker(settings)
+        checkpoint_writer = (
+            RecipeTextCheckpointWriter(get_table(DRINK_RECIPES_TABLE), recipe_id, render=render_partial_recipe_text)
+            if settings.features.recipe_text_streaming and DRINK_RECIPES_TABLE
+            else None
         )
 
-        # Processar resposta do Bedrock
-        response_body = json.loads(response["body"].read().decode("utf-8"))
-        recipe_text = response_body["content"][0]["text"]
+        def generate(model_id: str, max_wait_seconds: float) -> str:
+            return invoke_text_model(
+                bedrock,
+                model_id,
+                compiled_prompt.to_request_body(),
+                invoke_options={"estimated_tokens": compiled_prompt.estimated_total_tokens, "max_wait_seconds": max_wait_seconds},
+                checkpoint_writer=checkpoint_writer,
+            )
 
-        # Salvar receita no S3
-        recipe_key = f"recipes/{recipe_id}/recipe.txt"
-        s3_client.put_object(
-            Bucket=RECIPES_BUCKET,
-            Key=recipe_key,
-            Body=recipe_text.encode("utf-8"),
-            ContentType="text/plain",
+        # Escolher o modelo pela complexidade, latência observada e estado do circuit breaker, com failover entre eles
+        router = ModelRouter(settings.bedrock, breaker=bedrock.breaker, latency_tracker=model_latencies)
+        routed = router.invoke(score_complexity(drink_request), generate)
+        if routed.failed_models:
+            metrics.add_metric(name="RecipeTextModelFailover", unit=MetricUnit.Count, value=len(routed.failed_models))
+
+        # Converter a receita estruturada em texto; se o modelo não seguir o formato, a resposta é usada como veio
+        recipe = parse_recipe_output(routed.output)
+        recipe_text = render_recipe_text(recipe) if recipe else routed.output
+
+        # Salvar receita no S3 (e a versão final no texto parcial do item, substituindo o último checkpoint)
+        recipe_body = recipe_text.encode("utf-8")
+        metrics.add_metric(name="RecipeTextSize", unit=MetricUnit.Bytes, value=len(recipe_body))
+        with timed("S3PutDuration"):
+            get_client("s3").put_object(
+                Bucket=RECIPES_BUCKET,
+                Key=recipe_key,
+                Body=recipe_body,
+                ContentType="text/plain",
+                Metadata={MODEL_ID_METADATA: routed.model_id},
+            )
+        if checkpoint_writer:
+            checkpoint_writer.write(recipe_text)
+
+        logger.info(
+            f"Recipe text generated by {routed.model_id} and saved to S3: {recipe_key}",
+            extra={"max_tokens": compiled_prompt.max_tokens, "structured": bool(recipe), "latency_seconds": round(routed.latency_seconds, 3)},
         )
+        record_text_model(recipe_id, routed.model_id)
 
-        logger.info(f"Recipe text generated and saved to S3: {recipe_key}")
+        if settings.features.recipe_cache_enabled:
+            recipe_cache.put(cache_key, recipe_text, recipe_key)
+        if settings.features.recipe_similarity_enabled:
+            remember_recipe(recipe_id, request_data, recipe_key)
 
-        # Adicionar informações da receita ao evento para o próximo passo
-        event["recipe"] = {"text": recipe_text, "s3_key": recipe_key}
+        # Adicionar a chave da receita ao evento para o próximo passo (o texto fica no S3 e é lido apenas por quem precisa dele)
+        event["recipe"] = {"s3_key": recipe_key, "cache_hit": False, "model_id": routed.model_id}
 
         return event
 
@@ -79,38 +190,135 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
         raise error
 
 
-def create_recipe_prompt(request_data):
+def get_stored_recipe_text(recipe_key: str) -> Optional[dict]:
+    """
+    Retorna os metadados do texto da receita já gravado no S3 (o objeto só é gravado com o texto final).
+
+    Args:
+        recipe_key: Chave do texto da receita no S3
+
+    Returns:
+        dict | None: Metadados do objeto (com o modelo que gerou o texto), ou None quando o texto ainda não existe
+    """
+    try:
+        response = get_client("s3").head_object(Bucket=RECIPES_BUCKET, Key=recipe_key)
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+    return response.get("Metadata", {})
+
+
+def find_similar_recipe(request_data: dict, threshold: float) -> Optional[dict]:
     """
-    Cria o prompt para o modelo de linguagem gerar a receita.
+    Busca no índice de similaridade uma receita gerada para uma solicitação parecida.
+
+    Entre as receitas mais parecidas, só é reaproveitada a que tem o mesmo humor e sabor e todos os ingredientes
+    pedidos (covers_request): a similaridade sozinha não separa solicitações que trocam um único campo.
 
     Args:
         request_data: Dados da solicitação da receita
+        threshold: Similaridade de cosseno mínima para reaproveitar a receita
+
+    Returns:
+        dict | None: Dados da receita para o evento, ou None quando não há receita parecida o suficiente
+    """
+    try:
+        matches = similarity_index.get().query(vectorize_request(request_data), top_k=SIMILARITY_CANDIDATES)
+    except Exception:
+        # O índice nunca deve impedir a geração da receita
+        logger.exception("Error looking up similar recipe")
+        return None
+
+    match = next((match for match in matches if match.score >= threshold and covers_request(match.entry, request_data)), None)
+    if not match:
+        metrics.add_metric(name="RecipeSimilarityMiss", unit=MetricUnit.Count, value=1)
+        return None
+
+    logger.info(f"Reusing recipe {match.entry['recipe_id']} for a similar request (similarity {match.score:.3f})")
+    metrics.add_metric(name="RecipeSimilarityHit", unit=MetricUnit.Count, value=1)
+    return {
+        "s3_key": match.entry["s3_key"],
+        "cache_hit": True,
+        "similar_recipe_id": match.entry["recipe_id"],
+        "similarity": round(match.score, 4),
+    }
+
+
+def remember_recipe(recipe_id: str, request_data: dict, recipe_key: str) -> None:
+    """
+    Adiciona a receita recém-gerada ao índice do container e a registra para o próximo snapshot.
+
+    Args:
+        recipe_id: ID da receita
+        request_data: Solicitação que gerou a receita
+        recipe_key: Chave do texto da receita no S3
+    """
+    try:
+        similarity_index.get().add(vectorize_request(request_data), index_entry(recipe_id, request_data, recipe_key))
+        put_pending_recipe(get_client("s3"), RECIPES_BUCKET, recipe_id, request_data, recipe_key)
+    except Exception:
+        logger.exception("Error adding recipe to similarity index")
+
+
+def invoke_text_model(bedrock, model_id: str, request_body: dict, invoke_options: dict, checkpoint_writer=None) -> str:
+    """
+    Gera a resposta do modelo de texto, em streaming quando há um gravador de checkpoints.
+
+    Args:
+        bedrock: Camada de invocação do Bedrock
+        model_id: Modelo escolhido pelo roteador
+        request_body: Corpo da requisição na Messages API
+        invoke_options: Parâmetros da camada de invocação (estimated_tokens e max_wait_seconds)
+        checkpoint_writer: Gravador de checkpoints do texto parcial (apenas no modo streaming)
 
     Returns:
-        str: Prompt formatado
+        str: Texto retornado pelo modelo
+    """
+    if checkpoint_writer:
+        # Gerar a receita em streaming, gravando o texto parcial no item da receita no DynamoDB
+        return stream_recipe_text(
+            bedrock,
+            model_id,
+            request_body,
+            on_checkpoint=checkpoint_writer,
+            checkpoint_interval_seconds=RECIPE_TEXT_CHECKPOINT_SECONDS,
+            invoke_options=invoke_options,
+        )
+
+    started = time.perf_counter()
+    response = bedrock.invoke_model(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(request_body),
+        **invoke_options,
+    )
+
+    # Processar resposta do Bedrock
+    response_body = json.loads(response["body"].read().decode("utf-8"))
+    usage = response_body.get("usage", {})
+    record_model_invocation(model_id, (time.perf_counter() - started) * 1000, usage.get("input_tokens"), usage.get("output_tokens"))
+    return response_body["content"][0]["text"]
+
+
+def record_text_model(recipe_id: str, model_id: str) -> None:
+    """
+    Registra no item da receita qual modelo gerou o texto.
+
+    Args:
+        recipe_id: ID da receita
+        model_id: Modelo que atendeu a solicitação
     """
-    name = request_data.get("name", "")
-    base_spirit = request_data.get("base_spirit", "")
-    flavor_profile = request_data.get("flavor_profile", "")
-    difficulty_level = request_data.get("difficulty_level", "")
-    additional_notes = request_data.get("additional_notes", "")
-
-    prompt = f"""Create a detailed cocktail recipe with the following specifications:
-
-Name: {name}
-Base Spirit: {base_spirit}
-Flavor Profile: {flavor_profile}
-Difficulty Level: {difficulty_level}
-Additional Notes: {additional_notes}
-
-Please include:
-1. A brief introduction about the drink
-2. List of ingredients with precise measurements
-3. Step-by-step preparation instructions
-4. Serving suggestions
-5. Any interesting facts or history related to this type of cocktail
-
-Format the recipe in a clear, professional style suitable for a cocktail recipe book.
-"""
-
-    return prompt
+    if not DRINK_RECIPES_TABLE:
+        return
+
+    try:
+        get_table(DRINK_RECIPES_TABLE).update_item(
+            Key={"recipe_id": recipe_id},
+            UpdateExpression="SET text_model_id = :model_id",
+            ExpressionAttributeValues={":model_id": model_id},
+        )
+    except Exception:
+        # O registro do modelo é apenas informativo; falhas não devem interromper o fluxo
+        logger.exception("Error recording recipe text model")
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.event_handler import (
+    APIGatewayRestResolver,
+    Response,
+    content_types,
+)
+from aws_lambda_powertools.logging import correlation_paths
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from service.drink.clients import get_client, get_table
+from service.drink.metrics import instrument_stage
+from service.drink.workflow.claim_check import load_recipe_text
+
+logger = Logger()
+tracer = Tracer()
+app = APIGatewayRestResolver()
+
+# Nome da tabela, do bucket e validade das URLs pré-assinadas (serão definidos via variáveis de ambiente)
+DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
+RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
+PRESIGNED_URL_EXPIRATION_SECONDS = int(os.environ.get("PRESIGNED_URL_EXPIRATION_SECONDS", "900"))
+
+# Apenas os atributos necessários para a resposta são lidos do item (a solicitação original fica de fora)
+RECIPE_PROJECTION = "recipe_id, #status, #timestamp, partial_text, recipe_s3_key, image_s3_key, image_quality, text_model_id"
+RECIPE_PROJECTION_NAMES = {"#status": "status", "#timestamp": "timestamp"}
+
+
+@app.get("/drink/<recipe_id>")
+@tracer.capture_method
+def handle_get_drink(recipe_id: str):
+    """
+    Retorna o status e o resultado de uma receita, com suporte a GET condicional (ETag/If-None-Match).
+    """
+    item = (
+        get_table(DRINK_RECIPES_TABLE)
+        .get_item(
+            Key={"recipe_id": recipe_id},
+            ProjectionExpression=RECIPE_PROJECTION,
+            ExpressionAttributeNames=RECIPE_PROJECTION_NAMES,
+        )
+        .get("Item")
+    )
+
+    if not item:
+        return Response(
+            status_code=404,
+            content_type=content_types.APPLICATION_JSON,
+            body=json.dumps({"message": "Drink recipe not found", "recipe_id": recipe_id}),
+        )
+
+    # O ETag é calculado a partir do item, e não da resposta, porque a URL pré-assinada muda a cada chamada
+    etag = build_etag(item)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    request_headers = app.current_event.headers or {}
+    if_none_match = next((value for name, value in request_headers.items() if name.lower() == "if-none-match"), "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, content_type=None, body=None, headers=headers)
+
+    return Response(
+        status_code=200,
+        content_type=content_types.APPLICATION_JSON,
+        body=json.dumps(build_recipe_response(item), default=str),
+        headers=headers,
+    )
+
+
+def build_etag(item: dict) -> str:
+    """
+    Gera um ETag forte a partir do conteúdo projetado do item da receita.
+
+    Args:
+        item: Item da receita lido do DynamoDB
+
+    Returns:
+        str: ETag entre aspas, conforme a RFC 9110
+    """
+    digest = hashlib.sha256(json.dumps(item, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def build_recipe_response(item: dict) -> dict:
+    """
+    Monta o corpo da resposta com o status, o texto (ou a chave no S3) e a URL pré-assinada da imagem.
+
+    O texto parcial só é gravado no item com o streaming ligado; para uma receita concluída sem ele, o texto final
+    é lido do S3.
+
+    Args:
+        item: Item da receita lido do DynamoDB
+
+    Returns:
+        dict: Corpo da resposta
+    """
+    image_key = item.get("image_s3_key")
+    image_url = None
+    if image_key:
+        image_url = get_client("s3").generate_presigned_url(
+            "get_object",
+            Params={"Bucket": RECIPES_BUCKET, "Key": image_key},
+            ExpiresIn=PRESIGNED_URL_EXPIRATION_SECONDS,
+        )
+
+    recipe_text = item.get("partial_text")
+    if recipe_text is None and item.get("status") == "COMPLETED" and item.get("recipe_s3_key"):
+        recipe_text = load_recipe_text({"s3_key": item["recipe_s3_key"]}, bucket=RECIPES_BUCKET)
+
+    return {
+        "recipe_id": item["recipe_id"],
+        "status": item.get("status"),
+        "timestamp": item.get("timestamp"),
+        "recipe": {
+            "text": recipe_text,
+            "s3_key": item.get("recipe_s3_key"),
+            "model_id": item.get("text_model_id"),
+        },
+        "image": {
+            "s3_key": image_key,
+            "quality": item.get("image_quality"),
+            "url": image_url,
+            "expires_in": PRESIGNED_URL_EXPIRATION_SECONDS if image_url else None,
+        },
+    }
+
+
+@logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
+@tracer.capture_lambda_handler
+@instrument_stage("GetDrink")
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    return app.resolve(event, context)
@@ -1,12 +1,15 @@
 import os
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from service.drink.clients import get_table
+from service.drink.metrics import instrument_stage
+from service.drink.workflow.claim_check import claim_check
 
 logger = Logger()
 tracer = Tracer()
-dynamodb = boto3.resource("dynamodb")
 
 # Nome da tabela do DynamoDB (será definido via variável de ambiente)
 DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
@@ -14,6 +17,8 @@ DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
 
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@instrument_stage("PersistInitialRequest")
+@claim_check
 def lambda_handler(event: dict, context: LambdaContext) -> dict:
     """
     Lambda function para persistir a solicitação inicial no DynamoDB.
@@ -33,18 +38,21 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
         timestamp = event["timestamp"]
         request_data = event["request"]
 
-        # Referência para a tabela do DynamoDB
-        table = dynamodb.Table(DRINK_RECIPES_TABLE)
-
-        # Inserir item na tabela
-        table.put_item(
-            Item={
-                "recipe_id": recipe_id,
-                "timestamp": timestamp,
-                "request": request_data,
-                "status": "PROCESSING",
-            }
-        )
+        # Referência para a tabela do DynamoDB (reaproveitada entre invocações)
+        table = get_table(DRINK_RECIPES_TABLE)
+
+        if event.get("resume"):
+            persist_resumed_request(table, recipe_id, timestamp, request_data)
+        else:
+            # Inserir item na tabela
+            table.put_item(
+                Item={
+                    "recipe_id": recipe_id,
+                    "timestamp": timestamp,
+                    "request": request_data,
+                    "status": "PROCESSING",
+                }
+            )
 
         logger.info(f"Request persisted successfully with ID: {recipe_id}")
 
@@ -54,3 +62,30 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
     except Exception as error:
         logger.exception("Error persisting drink recipe request")
         raise error
+
+
+def persist_resumed_request(table, recipe_id: str, timestamp: str, request_data: dict) -> None:
+    """
+    Persiste a solicitação de uma execução que continua uma execução síncrona que não respondeu a tempo.
+
+    O item só é atualizado quando a execução síncrona não chegou a registrá-lo (ausente ou ainda QUEUED); caso
+    contrário, o status e o que ela já gravou (texto parcial, rascunho da imagem) são mantidos.
+
+    Args:
+        table: Tabela das receitas
+        recipe_id: ID da receita
+        timestamp: Data e hora da solicitação
+        request_data: Dados da solicitação da receita
+    """
+    try:
+        table.update_item(
+            Key={"recipe_id": recipe_id},
+            UpdateExpression="SET #timestamp = :timestamp, request = :request, #status = :status",
+            ConditionExpression=Attr("status").not_exists() | Attr("status").eq("QUEUED"),
+            ExpressionAttributeNames={"#timestamp": "timestamp", "#status": "status"},
+            ExpressionAttributeValues={":timestamp": timestamp, ":request": request_data, ":status": "PROCESSING"},
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        logger.info(f"Recipe {recipe_id} was already persisted by the synchronous execution, keeping its progress")
@@ -0,0 +1,35 @@
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from service.drink.metrics import instrument_stage
+from service.drink.workflow.runner import InProcessWorkflow
+
+logger = Logger()
+tracer = Tracer()
+
+# Fluxo executado no próprio processo, reaproveitado entre invocações do container (handlers e pool de threads)
+workflow = InProcessWorkflow()
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@instrument_stage("RunWorkflow")
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    """
+    Lambda function que executa o fluxo completo da receita em uma única função (modo monolítico, para ambientes
+    de baixo volume), com o mesmo input da máquina de estado e as mesmas etapas, repetições e tratamento de falhas.
+
+    Args:
+        event: Input da execução (recipe_id, timestamp e request)
+        context: Contexto da função Lambda
+
+    Returns:
+        dict: Saída final do fluxo, ou o status FAILED com o erro (a receita já fica marcada como falha)
+    """
+    result = workflow.execute(event)
+    logger.info(f"Workflow for recipe {result.recipe_id} finished with {result.status}", extra={"stage_seconds": result.stage_seconds})
+
+    if result.status != "SUCCEEDED":
+        # A invocação não falha para que o Lambda não repita o fluxo inteiro (a máquina de estado também não repetiria)
+        logger.error(f"Workflow for recipe {result.recipe_id} failed: {result.error}")
+        return {"recipe_id": result.recipe_id, "status": result.status, "error": result.error}
+    return result.output
@@ -1,34 +1,46 @@
 import base64
-import json
 import os
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
+from python_http_client.exceptions import ForbiddenError, UnauthorizedError
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import (
     Attachment,
+    ContentId,
     Disposition,
     FileContent,
     FileName,
     FileType,
     Mail,
 )
+from service.drink.clients import get_client, get_registered_client
+from service.drink.config import get_sendgrid_settings, get_settings
+from service.drink.metrics import instrument_stage, metrics, timed
+from service.drink.workflow.claim_check import claim_check, load_recipe_text
 
 logger = Logger()
 tracer = Tracer()
 
-# Configurações do S3 e Secrets Manager
-s3_client = boto3.client("s3")
-secrets_client = boto3.client("secretsmanager")
-
-# Nome do bucket S3 e secret (serão definidos via variáveis de ambiente)
+# Nome do bucket S3 (será definido via variável de ambiente)
 RECIPES_BUCKET = os.environ.get("RECIPES_BUCKET")
-SENDGRID_SECRET_NAME = os.environ.get("SENDGRID_SECRET_NAME")
+
+# A validade real da URL também é limitada pela duração das credenciais temporárias da função
+NOTIFICATION_LINK_EXPIRATION_SECONDS = int(os.environ.get("NOTIFICATION_LINK_EXPIRATION_SECONDS", "43200"))
+
+# Tamanho dos blocos lidos do S3 ao codificar anexos (múltiplo de 3 para o base64 não precisar de padding intermediário)
+ATTACHMENT_CHUNK_SIZE = 3 * 64 * 1024
+
+# Tamanho máximo de uma imagem anexada ao email: o SendGrid recebe o anexo inteiro em base64 no corpo JSON da
+# requisição, então o conteúdo codificado fica todo em memória; imagens maiores são entregues por link
+MAX_ATTACHMENT_BYTES = int(os.environ.get("NOTIFICATION_MAX_ATTACHMENT_BYTES", str(5 * 1024 * 1024)))
 
 
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@instrument_stage("SendNotification")
+@claim_check
 def lambda_handler(event: dict, context: LambdaContext) -> dict:
     """
     Lambda function para enviar notificação por email usando SendGrid.
@@ -45,40 +57,39 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
 
         # Obter dados do evento
         request_data = event["request"]
-        recipe_text = event["recipe"].get("text", "")
+        recipe_text = load_recipe_text(event["recipe"])
         recipe_image_key = event["recipe"].get("image_s3_key", "")
+        image_renditions = event["recipe"].get("image_renditions", {})
         recipient_email = request_data.get("email")
         drink_name = request_data.get("name", "Custom Drink")
 
-        # Obter credenciais do SendGrid do Secrets Manager
-        sendgrid_secret = get_sendgrid_secret()
-        sendgrid_api_key = sendgrid_secret["api_key"]
-        sender_email = sendgrid_secret["sender_email"]
-
-        # Baixar a imagem do S3
-        image_object = s3_client.get_object(Bucket=RECIPES_BUCKET, Key=recipe_image_key)
-        image_data = image_object["Body"].read()
+        # Obter credenciais do SendGrid (em cache no container, renovadas pelo TTL da configuração)
+        sendgrid_settings = get_sendgrid_settings()
 
-        # Criar email
+        # Criar email com a imagem entregue conforme o modo configurado:
+        # - "link": URL pré-assinada e com prazo de validade (padrão, sem anexo)
+        # - "inline": versão pequena da imagem embutida via CID
+        # - "attachment": imagem em tamanho original anexada (fallback opcional)
+        delivery_mode = get_settings().features.notification_delivery_mode
+        image_html, attachment = build_image_delivery(delivery_mode, drink_name, recipe_image_key, image_renditions)
         message = Mail(
-            from_email=sender_email,
+            from_email=sendgrid_settings.sender_email,
             to_emails=recipient_email,
             subject=f"Your Custom Drink Recipe: {drink_name}",
-            html_content=create_email_content(drink_name, recipe_text),
+            html_content=create_email_content(drink_name, recipe_text, image_html),
         )
-
-        # Anexar a imagem
-        encoded_image = base64.b64encode(image_data).decode()
-        attachment = Attachment()
-        attachment.file_content = FileContent(encoded_image)
-        attachment.file_type = FileType("image/jpeg")
-        attachment.file_name = FileName(f'{drink_name.replace(" ", "_")}.jpg')
-        attachment.disposition = Disposition("attachment")
-        message.attachment = attachment
-
-        # Enviar email
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        if attachment:
+            message.attachment = attachment
+
+        # Enviar email; uma recusa de autenticação pode indicar que o secret foi rotacionado,
+        # então as credenciais são buscadas novamente e o envio é repetido uma vez
+        with timed("SendGridDuration"):
+            try:
+                response = create_sendgrid_client(sendgrid_settings.api_key).send(message)
+            except (UnauthorizedError, ForbiddenError):
+                logger.warning("SendGrid rejected the cached credentials, refreshing secret")
+                sendgrid_settings = get_sendgrid_settings(force_fetch=True)
+                response = create_sendgrid_client(sendgrid_settings.api_key).send(message)
 
         logger.info(f"Email notification sent: {response.status_code}")
 
@@ -87,40 +98,125 @@ def lambda_handler(event: dict, context: LambdaContext) -> dict:
             "sent_to": recipient_email,
             "status": "SENT",
             "status_code": response.status_code,
+            "delivery_mode": delivery_mode,
         }
 
         return event
 
     except Exception as error:
         logger.exception("Error sending email notification")
+        metrics.add_metric(name="NotificationFailed", unit=MetricUnit.Count, value=1)
         # Adicionar informações do erro ao evento, mas não falhar o fluxo
         event["notification"] = {"status": "FAILED", "error": str(error)}
         return event
 
 
-def get_sendgrid_secret():
+def create_sendgrid_client(api_key: str):
+    """
+    Cria o cliente do SendGrid; um substituto registrado como "sendgrid" (execução local) tem prioridade.
+    """
+    return get_registered_client("sendgrid") or SendGridAPIClient(api_key)
+
+
+def build_image_delivery(mode, drink_name, image_key, image_renditions):
     """
-    Obtém as credenciais do SendGrid do AWS Secrets Manager.
+    Prepara a imagem da receita para o email de acordo com o modo de entrega.
+
+    Nos modos "attachment" e "inline", uma imagem maior que MAX_ATTACHMENT_BYTES é entregue por link.
+
+    Args:
+        mode: Modo de entrega ("link", "inline" ou "attachment")
+        drink_name: Nome da bebida
+        image_key: Chave da imagem em tamanho original no S3
+        image_renditions: Versões da imagem geradas pelo passo anterior (podem estar ausentes)
 
     Returns:
-        dict: Credenciais do SendGrid (api_key e sender_email)
+        tuple: Trecho HTML da imagem e o anexo do SendGrid (ou None quando não há anexo)
     """
-    try:
-        response = secrets_client.get_secret_value(SecretId=SENDGRID_SECRET_NAME)
-        secret_string = response["SecretString"]
-        return json.loads(secret_string)
-    except Exception as error:
-        logger.exception("Error retrieving SendGrid credentials")
-        raise error
+    # A versão de email (512 px) é preferida para exibição; sem ela, usa-se a imagem original
+    email_rendition = image_renditions.get("email") or {"s3_key": image_key, "content_type": "image/jpeg"}
+
+    if mode == "attachment":
+        file_content = encode_s3_object_base64(RECIPES_BUCKET, image_key, MAX_ATTACHMENT_BYTES)
+        if file_content is not None:
+            attachment = Attachment()
+            attachment.file_content = FileContent(file_content)
+            attachment.file_type = FileType("image/jpeg")
+            attachment.file_name = FileName(f'{drink_name.replace(" ", "_")}.jpg')
+            attachment.disposition = Disposition("attachment")
+            return "<p>We've attached an image of what your drink might look like. Enjoy!</p>", attachment
+
+    if mode == "inline":
+        file_content = encode_s3_object_base64(RECIPES_BUCKET, email_rendition["s3_key"], MAX_ATTACHMENT_BYTES)
+        if file_content is not None:
+            content_id = "drink-image"
+            attachment = Attachment()
+            attachment.file_content = FileContent(file_content)
+            attachment.file_type = FileType(email_rendition["content_type"])
+            attachment.file_name = FileName(f'{drink_name.replace(" ", "_")}.jpg')
+            attachment.disposition = Disposition("inline")
+            attachment.content_id = ContentId(content_id)
+            return f'<p><img src="cid:{content_id}" alt="{drink_name}" width="512" style="max-width: 100%;"></p>', attachment
+
+    s3_client = get_client("s3")
+    preview_url = s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": RECIPES_BUCKET, "Key": email_rendition["s3_key"]},
+        ExpiresIn=NOTIFICATION_LINK_EXPIRATION_SECONDS,
+    )
+    full_url = s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": RECIPES_BUCKET, "Key": image_key},
+        ExpiresIn=NOTIFICATION_LINK_EXPIRATION_SECONDS,
+    )
+    image_html = (
+        f'<p><a href="{full_url}"><img src="{preview_url}" alt="{drink_name}" width="512" style="max-width: 100%;"></a></p>'
+        f'<p>Here\'s what your drink might look like. <a href="{full_url}">View the full-size image</a> (link valid for a limited time).</p>'
+    )
+    return image_html, None
+
+
+def encode_s3_object_base64(bucket, key, max_bytes=None):
+    """
+    Lê um objeto do S3 em blocos e o codifica em base64 sem carregar o conteúdo original inteiro de uma vez.
+
+    O resultado codificado (4/3 do tamanho do objeto) fica inteiro em memória, então objetos maiores que max_bytes
+    não são lidos.
 
+    Args:
+        bucket: Nome do bucket
+        key: Chave do objeto
+        max_bytes: Tamanho máximo do objeto (sem limite quando None)
 
-def create_email_content(drink_name, recipe_text):
+    Returns:
+        str | None: Conteúdo do objeto codificado em base64, ou None quando o objeto passa de max_bytes
+    """
+    response = get_client("s3").get_object(Bucket=bucket, Key=key)
+    body = response["Body"]
+    if max_bytes is not None and response["ContentLength"] > max_bytes:
+        body.close()
+        logger.warning(f"Object {key} has {response['ContentLength']} bytes, above the {max_bytes} bytes attachment limit")
+        return None
+
+    encoded_parts = []
+    remainder = b""
+    for chunk in body.iter_chunks(chunk_size=ATTACHMENT_CHUNK_SIZE):
+        data = remainder + chunk
+        cut = len(data) - len(data) % 3
+        encoded_parts.append(base64.b64encode(data[:cut]).decode())
+        remainder = data[cut:]
+    encoded_parts.append(base64.b64encode(remainder).decode())
+    return "".join(encoded_parts)
+
+
+def create_email_content(drink_name, recipe_text, image_html=""):
     """
     Cria o conteúdo HTML do email.
 
     Args:
         drink_name: Nome da bebida
         recipe_text: Texto da receita
+        image_html: Trecho HTML com a imagem da bebida (link, imagem embutida ou aviso de anexo)
 
     Returns:
         str: Conteúdo HTML formatado
@@ -146,7 +242,7 @@ def create_email_content(drink_name, recipe_text):
                 <div class="recipe">
                     {formatted_recipe}
                 </div>
-                <p>We've attached an image of what your drink might look like. Enjoy!</p>
+                {image_html}
                 <div class="footer">
                     <p>This recipe was generated by AI and may need adjustments to suit your taste.</p>
                     <p>© Awesome Generative Drink App</p>
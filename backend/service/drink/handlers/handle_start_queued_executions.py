@@ -0,0 +1,203 @@
+import json
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from botocore.exceptions import ClientError
+from service.drink.clients import get_client, get_table
+from service.drink.config import get_settings
+from service.drink.metrics import dimensioned_metrics, instrument_stage, metrics
+from service.drink.workflow.admission import (
+    AdmissionQueue,
+    ExecutionAdmitter,
+    admission_rate_per_minute,
+    count_running_executions,
+    execution_name,
+    parse_queued_execution,
+    release_messages,
+)
+from service.drink.workflow.scheduler import WeightedFairScheduler
+
+logger = Logger()
+tracer = Tracer()
+
+# Filas das faixas de prioridade (JSON com a URL da fila de cada faixa), máquina de estado padrão (ou Lambda única)
+# e tabela do limitador (serão definidos via variáveis de ambiente)
+ADMISSION_QUEUE_URLS = json.loads(os.environ.get("ADMISSION_QUEUE_URLS") or "{}")
+STEP_FUNCTION_ARN = os.environ.get("DRINK_RECIPE_STEP_FUNCTION_ARN")
+PIPELINE_FUNCTION_NAME = os.environ.get("DRINK_PIPELINE_FUNCTION_NAME")
+BEDROCK_LIMITER_TABLE = os.environ.get("BEDROCK_LIMITER_TABLE")
+
+# Folga reservada no fim da invocação para devolver à fila as mensagens que não foram iniciadas
+DEADLINE_MARGIN_SECONDS = 5.0
+
+# Mensagens recebidas por vez de cada faixa (o máximo do ReceiveMessage) e intervalo mínimo entre leituras de uma
+# faixa vazia e entre pausas quando nenhuma faixa pode iniciar execuções
+RECEIVE_BATCH_SIZE = 10
+IDLE_POLL_SECONDS = 1.0
+
+# Intervalo entre recontagens das execuções em andamento (entre elas, a contagem local soma as execuções iniciadas)
+IN_FLIGHT_REFRESH_SECONDS = 5.0
+
+
+def create_admitter(settings) -> ExecutionAdmitter:
+    """
+    Cria o controle do ritmo de admissão com o valor atual da configuração.
+    """
+    return ExecutionAdmitter.for_rate(
+        get_table(BEDROCK_LIMITER_TABLE) if BEDROCK_LIMITER_TABLE else None,
+        admission_rate_per_minute(settings),
+        clock=time.time,
+        sleep=time.sleep,
+    )
+
+
+def count_in_flight(settings) -> Optional[Dict[str, int]]:
+    """
+    Conta as execuções em andamento por faixa.
+
+    No modo de Lambda única não há como listar as execuções em andamento; os limites de execuções não são aplicados
+    e apenas o ritmo controla a admissão.
+    """
+    if not STEP_FUNCTION_ARN or PIPELINE_FUNCTION_NAME:
+        return None
+    return count_running_executions(get_client("stepfunctions"), STEP_FUNCTION_ARN, ADMISSION_QUEUE_URLS, settings.admission.max_in_flight)
+
+
+def start_queued_execution(body: str, lane: str) -> str:
+    """
+    Inicia a execução de uma solicitação da fila.
+
+    A execução tem o nome derivado da faixa e do recipe_id, então uma mensagem entregue de novo pelo SQS não inicia
+    a receita duas vezes na máquina de estado padrão.
+
+    Args:
+        body: Corpo da mensagem (JSON do input da execução)
+        lane: Faixa de prioridade da fila de origem
+
+    Returns:
+        str: ID da receita
+    """
+    recipe_id = parse_queued_execution(body)["recipe_id"]
+
+    if PIPELINE_FUNCTION_NAME:
+        get_client("lambda").invoke(FunctionName=PIPELINE_FUNCTION_NAME, InvocationType="Event", Payload=body.encode("utf-8"))
+        return recipe_id
+
+    try:
+        get_client("stepfunctions").start_execution(stateMachineArn=STEP_FUNCTION_ARN, name=execution_name(recipe_id, lane), input=body)
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ExecutionAlreadyExists":
+            raise
+        logger.info(f"Execution for recipe {recipe_id} was already started")
+    return recipe_id
+
+
+def receive_lanes(scheduler: WeightedFairScheduler, visibility_seconds: int, polled_empty_at: Dict[str, float]) -> None:
+    """
+    Recebe mensagens das faixas sem solicitações no buffer local do escalonador.
+
+    As mensagens ficam invisíveis até o fim da invocação; uma faixa vazia é lida de novo só depois de IDLE_POLL_SECONDS.
+
+    Args:
+        scheduler: Escalonador com as solicitações recebidas
+        visibility_seconds: Tempo de invisibilidade das mensagens recebidas
+        polled_empty_at: Instante da última leitura sem mensagens de cada faixa
+    """
+    for lane, queue_url in ADMISSION_QUEUE_URLS.items():
+        if lane not in scheduler.lanes or scheduler.depth(lane) or time.time() - polled_empty_at.get(lane, -math.inf) < IDLE_POLL_SECONDS:
+            continue
+        response = get_client("sqs").receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=RECEIVE_BATCH_SIZE, VisibilityTimeout=visibility_seconds, AttributeNames=["SentTimestamp"]
+        )
+        messages = response.get("Messages", [])
+        if not messages:
+            polled_empty_at[lane] = time.time()
+        for message in messages:
+            scheduler.add(lane, message, int(message["Attributes"]["SentTimestamp"]) / 1000)
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@instrument_stage("StartQueuedExecutions")
+def lambda_handler(event: dict, context: LambdaContext) -> dict:
+    """
+    Lambda function agendada que consome as filas das faixas de prioridade e inicia as execuções no ritmo do Bedrock.
+
+    A cada vaga do ritmo de admissão, o escalonador ponderado escolhe a faixa da próxima execução, respeitando o
+    limite de execuções em andamento de cada faixa e o global. As mensagens recebidas e não iniciadas até o fim da
+    invocação voltam visíveis para a próxima invocação. Publica, com a dimensão Lane, o tamanho de cada fila
+    (LaneQueueDepth), a espera de cada solicitação iniciada (LaneWaitTime) e as execuções iniciadas (LaneStarted).
+
+    Args:
+        event: Evento do agendamento (ignorado)
+        context: Contexto da função Lambda
+
+    Returns:
+        dict: Execuções iniciadas e mensagens devolvidas à fila
+    """
+    settings = get_settings()
+    lanes = {lane: settings.admission.lanes[lane] for lane in ADMISSION_QUEUE_URLS if lane in settings.admission.lanes}
+    scheduler = WeightedFairScheduler(lanes, settings.admission.max_in_flight, clock=time.time)
+    admitter = create_admitter(settings)
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    visibility_seconds = math.ceil(deadline - time.time() + DEADLINE_MARGIN_SECONDS)
+
+    lane_metrics = {lane: dimensioned_metrics(Lane=lane) for lane in lanes}
+    for lane, lane_metric in lane_metrics.items():
+        lane_metric.add_metric(name="LaneQueueDepth", unit=MetricUnit.Count, value=AdmissionQueue(ADMISSION_QUEUE_URLS[lane]).backlog())
+
+    polled_empty_at = {}
+    in_flight, counted_at = count_in_flight(settings), time.time()
+    started = 0
+    try:
+        while time.time() < deadline:
+            receive_lanes(scheduler, visibility_seconds, polled_empty_at)
+            if in_flight is not None and time.time() - counted_at >= IN_FLIGHT_REFRESH_SECONDS:
+                in_flight, counted_at = count_in_flight(settings), time.time()
+            if not scheduler.ready(in_flight):
+                time.sleep(IDLE_POLL_SECONDS)
+                continue
+
+            if admitter.wait_for_capacity(deadline) is not None:
+                break
+            # Solicitações que chegaram durante a espera pelo ritmo também concorrem à vaga
+            receive_lanes(scheduler, visibility_seconds, polled_empty_at)
+            request = scheduler.next(in_flight)
+            message = request.item
+
+            try:
+                recipe_id = start_queued_execution(message["Body"], request.lane)
+            except Exception:
+                # A vaga volta para o ritmo e a mensagem fica visível de novo na hora, para outra tentativa ainda nesta
+                # invocação (uma mensagem que sempre falha vai para a DLQ após muitas tentativas)
+                logger.exception(f"Error starting queued execution from message {message['MessageId']}")
+                admitter.release()
+                release_messages(get_client("sqs"), ADMISSION_QUEUE_URLS[request.lane], [message["ReceiptHandle"]])
+                continue
+            get_client("sqs").delete_message(QueueUrl=ADMISSION_QUEUE_URLS[request.lane], ReceiptHandle=message["ReceiptHandle"])
+
+            started += 1
+            if in_flight is not None:
+                in_flight[request.lane] = in_flight.get(request.lane, 0) + 1
+            metrics.add_metric(name="ExecutionsAdmitted", unit=MetricUnit.Count, value=1)
+            lane_metrics[request.lane].add_metric(name="LaneStarted", unit=MetricUnit.Count, value=1)
+            lane_metrics[request.lane].add_metric(
+                name="LaneWaitTime", unit=MetricUnit.Milliseconds, value=round(request.wait_seconds(time.time()) * 1000)
+            )
+            logger.info(f"Queued drink recipe {recipe_id} started from lane {request.lane}")
+    finally:
+        pending = scheduler.drain()
+        for lane in lanes:
+            receipt_handles = [request.item["ReceiptHandle"] for request in pending if request.lane == lane]
+            if receipt_handles:
+                release_messages(get_client("sqs"), ADMISSION_QUEUE_URLS[lane], receipt_handles)
+        for lane_metric in lane_metrics.values():
+            lane_metric.flush_metrics()
+
+    logger.info(f"{started} queued drink requests started, {len(pending)} returned to the queues")
+    return {"started": started, "released": len(pending)}
@@ -0,0 +1,166 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+logger = Logger(child=True)
+
+# Estados do registro: IN_PROGRESS enquanto a primeira requisição inicia a execução; ACCEPTED depois que ela foi iniciada
+IN_PROGRESS = "IN_PROGRESS"
+ACCEPTED = "ACCEPTED"
+
+
+def build_idempotency_key(idempotency_key: Optional[str], client_id: Optional[str], request_hash: str) -> Optional[str]:
+    """
+    Define a chave de idempotência de uma solicitação.
+
+    Com o cabeçalho Idempotency-Key, a chave é a informada pelo cliente (restrita ao cliente, quando identificado);
+    sem ele, é o hash da solicitação junto com o ID do cliente. Sem nenhum dos dois não há como distinguir uma
+    repetição de dois pedidos iguais de clientes diferentes, então a solicitação não é deduplicada.
+
+    Args:
+        idempotency_key: Valor do cabeçalho Idempotency-Key
+        client_id: Identificação do cliente (cabeçalho X-Client-Id)
+        request_hash: Hash da solicitação validada
+
+    Returns:
+        str | None: Chave do registro na tabela, ou None quando a solicitação não deve ser deduplicada
+    """
+    if idempotency_key:
+        source = f"key:{client_id or ''}:{idempotency_key}"
+    elif client_id:
+        source = f"request:{client_id}:{request_hash}"
+    else:
+        return None
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def build_request_hash(canonical_request: str) -> str:
+    """
+    Calcula o hash da solicitação já validada e normalizada (a mesma serialização enviada ao fluxo).
+    """
+    return hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    """
+    Registro de uma solicitação: a receita atribuída a ela e se a execução já foi iniciada.
+    """
+
+    recipe_id: str
+    timestamp: str
+    request_hash: str
+    status: str
+    claimed: bool
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == ACCEPTED
+
+
+class IdempotencyStore:
+    """
+    Registro de idempotência das solicitações de receita em uma tabela DynamoDB com TTL.
+
+    A primeira requisição de uma chave grava o registro com uma escrita condicional (só passa se não houver
+    registro válido), então, entre requisições concorrentes com a mesma chave, apenas uma inicia a execução; as
+    demais recebem o registro existente. Um registro IN_PROGRESS que passou do prazo (a função que o criou
+    falhou antes de concluir) pode ser assumido por uma nova requisição. Como o TTL do DynamoDB remove os itens
+    com atraso, registros vencidos são tratados como inexistentes.
+    """
+
+    def __init__(self, table, ttl_seconds: int = 86400, in_progress_seconds: int = 30, clock: Callable[[], float] = time.time):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.in_progress_seconds = in_progress_seconds
+        self.clock = clock
+
+    def claim(self, key: str, request_hash: str, recipe_id: str, timestamp: str) -> IdempotencyRecord:
+        """
+        Reserva a chave para a receita informada ou retorna o registro de quem a reservou antes.
+
+        Args:
+            key: Chave de idempotência
+            request_hash: Hash da solicitação (para detectar a mesma chave usada em outra solicitação)
+            recipe_id: Receita que será criada caso a chave esteja livre
+            timestamp: Data e hora da solicitação (ISO 8601)
+
+        Returns:
+            IdempotencyRecord: Registro criado (claimed=True) ou existente (claimed=False)
+        """
+        now = int(self.clock())
+        available = (
+            Attr("idempotency_key").not_exists()
+            | Attr("expires_at").lt(Decimal(now))
+            | (Attr("record_status").eq(IN_PROGRESS) & Attr("in_progress_expires_at").lt(Decimal(now)))
+        )
+        try:
+            self.table.put_item(
+                Item={
+                    "idempotency_key": key,
+                    "recipe_id": recipe_id,
+                    "timestamp": timestamp,
+                    "request_hash": request_hash,
+                    "record_status": IN_PROGRESS,
+                    "in_progress_expires_at": Decimal(now + self.in_progress_seconds),
+                    "expires_at": Decimal(now + self.ttl_seconds),
+                },
+                ConditionExpression=available,
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        else:
+            return IdempotencyRecord(recipe_id=recipe_id, timestamp=timestamp, request_hash=request_hash, status=IN_PROGRESS, claimed=True)
+
+        item = self.table.get_item(Key={"idempotency_key": key}, ConsistentRead=True).get("Item")
+        if item is None:
+            # O registro foi liberado entre a escrita e a leitura (a outra requisição falhou); tenta de novo
+            return self.claim(key, request_hash, recipe_id, timestamp)
+        return IdempotencyRecord(
+            recipe_id=item["recipe_id"],
+            timestamp=item["timestamp"],
+            request_hash=item["request_hash"],
+            status=item["record_status"],
+            claimed=False,
+        )
+
+    def accept(self, key: str, recipe_id: str) -> None:
+        """
+        Marca o registro como concluído depois que a execução da receita foi iniciada.
+
+        Args:
+            key: Chave de idempotência
+            recipe_id: Receita do registro (o registro de outra receita não é alterado)
+        """
+        try:
+            self.table.update_item(
+                Key={"idempotency_key": key},
+                UpdateExpression="SET record_status = :accepted REMOVE in_progress_expires_at",
+                ConditionExpression=Attr("recipe_id").eq(recipe_id),
+                ExpressionAttributeValues={":accepted": ACCEPTED},
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logger.warning(f"Idempotency record for recipe {recipe_id} was taken over before it was accepted")
+
+    def release(self, key: str, recipe_id: str) -> None:
+        """
+        Remove o registro de uma requisição que não conseguiu iniciar a execução, liberando a chave para a próxima tentativa.
+
+        Args:
+            key: Chave de idempotência
+            recipe_id: Receita do registro (o registro de outra receita não é removido)
+        """
+        try:
+            self.table.delete_item(Key={"idempotency_key": key}, ConditionExpression=Attr("recipe_id").eq(recipe_id))
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import time
+from dataclasses import asdict
+from decimal import Decimal
+from typing import Callable, Dict, Optional
+
+from aws_lambda_powertools import Logger
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from service.drink.images.renditions import IMAGE_RENDITIONS
+
+logger = Logger(child=True)
+
+# Prefixo das imagens compartilhadas no bucket (cada imagem fica em images/{hash}/)
+IMAGE_STORE_PREFIX = "images"
+
+# Estados do registro da imagem: READY pode ser reaproveitada; DELETING está sendo removida pela coleta de lixo
+READY = "READY"
+DELETING = "DELETING"
+
+
+def build_image_hash(model_id: str, prompt: str, generation_params: dict, renditions=IMAGE_RENDITIONS) -> str:
+    """
+    Calcula o endereço de conteúdo da imagem a partir de tudo o que determina seus pixels.
+
+    Com seed fixa, o SDXL gera a mesma imagem para o mesmo modelo, prompt e parâmetros; as definições das
+    versões (tamanho, formato e qualidade) também entram no hash para que uma mudança nelas gere novos arquivos.
+
+    Args:
+        model_id: Modelo de imagem
+        prompt: Prompt enviado ao modelo
+        generation_params: cfg_scale, steps, seed, width e height
+        renditions: Versões geradas a partir da imagem
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    payload = {
+        "model_id": model_id,
+        "prompt": prompt,
+        "params": generation_params,
+        "renditions": [asdict(rendition) for rendition in renditions],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _is_conditional_check_failure(error: ClientError) -> bool:
+    return error.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+class ImageStore:
+    """
+    Armazenamento de imagens endereçado por conteúdo, com rastreamento de referências.
+
+    Cada imagem tem um item no DynamoDB com as versões salvas no S3 e o conjunto de receitas que a
+    referenciam (refs). Adicionar ou remover uma receita do conjunto é idempotente, então repetições
+    da máquina de estado não distorcem a contagem. A coleta de lixo só remove imagens sem referências
+    há mais tempo que o período de carência, marcando o item como DELETING com uma gravação condicional
+    antes de apagar os objetos; uma imagem nesse estado não pode mais ser adquirida.
+    """
+
+    def __init__(self, table, s3_client, bucket: str, clock: Callable[[], float] = time.time):
+        self.table = table
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.clock = clock
+
+    @staticmethod
+    def key_prefix(image_hash: str) -> str:
+        return f"{IMAGE_STORE_PREFIX}/{image_hash}"
+
+    def _now(self) -> Decimal:
+        return Decimal(int(self.clock()))
+
+    def acquire(self, image_hash: str, recipe_id: str) -> Optional[Dict[str, dict]]:
+        """
+        Adiciona a receita às referências de uma imagem existente.
+
+        Args:
+            image_hash: Endereço de conteúdo da imagem
+            recipe_id: Receita que passa a usar a imagem
+
+        Returns:
+            dict | None: Versões da imagem (como em render_image_renditions), ou None se a imagem não estiver disponível
+        """
+        try:
+            response = self.table.update_item(
+                Key={"image_hash": image_hash},
+                UpdateExpression="SET last_used_at = :now ADD refs :recipe",
+                ConditionExpression=Attr("image_status").eq(READY),
+                ExpressionAttributeValues={":now": self._now(), ":recipe": {recipe_id}},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as error:
+            if not _is_conditional_check_failure(error):
+                raise
+            return None
+
+        return json.loads(response["Attributes"]["renditions"])
+
+    def publish(self, image_hash: str, recipe_id: str, renditions: Dict[str, dict]) -> bool:
+        """
+        Registra uma imagem recém-gerada (com os objetos já gravados no S3) e a referência da receita.
+
+        Args:
+            image_hash: Endereço de conteúdo da imagem
+            recipe_id: Receita que gerou a imagem
+            renditions: Versões gravadas, incluindo s3_key e version_id de cada objeto
+
+        Returns:
+            bool: False quando a imagem está sendo removida pela coleta de lixo (os objetos ficam sem registro)
+        """
+        try:
+            self.table.update_item(
+                Key={"image_hash": image_hash},
+                UpdateExpression=(
+                    "SET image_status = :ready, renditions = :renditions, created_at = if_not_exists(created_at, :now), "
+                    "last_used_at = :now ADD refs :recipe"
+                ),
+                ConditionExpression=Attr("image_hash").not_exists() | Attr("image_status").eq(READY),
+                ExpressionAttributeValues={
+                    ":ready": READY,
+                    ":renditions": json.dumps(renditions, sort_keys=True),
+                    ":now": self._now(),
+                    ":recipe": {recipe_id},
+                },
+            )
+        except ClientError as error:
+            if not _is_conditional_check_failure(error):
+                raise
+            logger.warning(f"Image {image_hash} is being garbage-collected, keeping the new objects untracked")
+            return False
+        return True
+
+    def release(self, image_hash: str, recipe_id: str) -> None:
+        """
+        Remove a receita das referências da imagem (sem efeito se ela não estava no conjunto).
+
+        Args:
+            image_hash: Endereço de conteúdo da imagem
+            recipe_id: Receita que deixou de usar a imagem
+        """
+        try:
+            self.table.update_item(
+                Key={"image_hash": image_hash},
+                UpdateExpression="SET last_used_at = :now DELETE refs :recipe",
+                ConditionExpression=Attr("image_hash").exists(),
+                ExpressionAttributeValues={":now": self._now(), ":recipe": {recipe_id}},
+            )
+        except ClientError as error:
+            if not _is_conditional_check_failure(error):
+                raise
+
+    def collect_garbage(self, grace_seconds: float) -> int:
+        """
+        Remove imagens sem referências cujo último uso é anterior ao período de carência.
+
+        Args:
+            grace_seconds: Tempo mínimo sem uso (deve superar a validade dos links enviados por e-mail)
+
+        Returns:
+            int: Quantidade de imagens removidas
+        """
+        cutoff = Decimal(int(self.clock() - grace_seconds))
+        unreferenced = Attr("refs").not_exists() & Attr("last_used_at").lt(cutoff)
+        collected = 0
+
+        scan_kwargs = {"FilterExpression": unreferenced}
+        while True:
+            page = self.table.scan(**scan_kwargs)
+            for item in page.get("Items", []):
+                if self._delete(item["image_hash"], unreferenced):
+                    collected += 1
+            if "LastEvaluatedKey" not in page:
+                return collected
+            scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+    def _delete(self, image_hash: str, unreferenced) -> bool:
+        # A marcação condicional garante que nenhuma receita adquiriu a imagem desde a leitura do scan
+        try:
+            response = self.table.update_item(
+                Key={"image_hash": image_hash},
+                UpdateExpression="SET image_status = :deleting",
+                ConditionExpression=unreferenced & (Attr("image_status").eq(READY) | Attr("image_status").eq(DELETING)),
+                ExpressionAttributeValues={":deleting": DELETING},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as error:
+            if not _is_conditional_check_failure(error):
+                raise
+            return False
+
+        # Apenas as versões registradas são apagadas: se outra execução regravou os mesmos arquivos enquanto isso,
+        # a versão nova (atual) continua no bucket versionado
+        objects = []
+        for rendition in json.loads(response["Attributes"].get("renditions", "{}")).values():
+            version = {"VersionId": rendition["version_id"]} if rendition.get("version_id") else {}
+            objects.append({"Key": rendition["s3_key"], **version})
+        if objects:
+            self.s3_client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+
+        self.table.delete_item(Key={"image_hash": image_hash}, ConditionExpression=Attr("image_status").eq(DELETING))
+        logger.info(f"Garbage-collected unreferenced image {image_hash} ({len(objects)} objects)")
+        return True
@@ -0,0 +1,64 @@
+import io
+from dataclasses import dataclass
+from typing import List, Optional
+
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """
+    Definição de uma versão da imagem gerada (tamanho máximo, formato e qualidade de compressão).
+    """
+
+    name: str
+    file_name: str
+    image_format: str
+    content_type: str
+    quality: int
+    max_size: Optional[int] = None
+
+
+# Ordenadas da maior para a menor: cada redução parte da versão anterior, e não do original
+IMAGE_RENDITIONS = (
+    Rendition(name="full", file_name="image.jpg", image_format="JPEG", content_type="image/jpeg", quality=85),
+    Rendition(name="full_webp", file_name="image.webp", image_format="WEBP", content_type="image/webp", quality=80),
+    Rendition(name="email", file_name="image-512.jpg", image_format="JPEG", content_type="image/jpeg", quality=80, max_size=512),
+    Rendition(name="thumbnail", file_name="image-128.jpg", image_format="JPEG", content_type="image/jpeg", quality=75, max_size=128),
+)
+
+
+@dataclass
+class RenderedImage:
+    rendition: Rendition
+    data: bytes
+    width: int
+    height: int
+
+
+def render_image_renditions(image_data: bytes, renditions=IMAGE_RENDITIONS) -> List[RenderedImage]:
+    """
+    Decodifica a imagem gerada uma única vez e produz todas as versões configuradas em uma só passada.
+
+    Args:
+        image_data: Bytes da imagem original (PNG retornado pelo SDXL)
+        renditions: Versões a produzir, da maior para a menor
+
+    Returns:
+        list[RenderedImage]: Bytes codificados e dimensões de cada versão
+    """
+    with Image.open(io.BytesIO(image_data)) as source:
+        # JPEG não suporta canal alfa; a conversão é feita uma vez para todas as versões
+        current = source.convert("RGB")
+
+    rendered = []
+    for rendition in renditions:
+        if rendition.max_size and max(current.size) > rendition.max_size:
+            current = current.copy()
+            current.thumbnail((rendition.max_size, rendition.max_size), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        current.save(buffer, format=rendition.image_format, quality=rendition.quality, optimize=True)
+        rendered.append(RenderedImage(rendition=rendition, data=buffer.getvalue(), width=current.width, height=current.height))
+
+    return rendered
@@ -0,0 +1,116 @@
+import base64
+import io
+import json
+import random
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from botocore.exceptions import ClientError
+from PIL import Image
+
+# Resposta no mesmo formato JSON compacto pedido pelo prompt compilado
+DEFAULT_RECIPE_TEXT = json.dumps(
+    {
+        "name": "Tropical Sunrise",
+        "description": "A bright pineapple and mango cooler with fresh mint.",
+        "ingredients": ["60 ml pineapple juice", "60 ml mango puree", "90 ml soda", "4 mint leaves"],
+        "steps": ["Muddle the mint.", "Add the fruit and shake with ice.", "Top with soda and serve."],
+        "garnish": "Mint sprig in a highball glass",
+    },
+    separators=(",", ":"),
+)
+
+
+class FakeBedrockRuntime:
+    """
+    Stub local do cliente bedrock-runtime para executar o fluxo sem acesso à AWS.
+
+    Responde a invoke_model e invoke_model_with_response_stream no mesmo formato da Messages API da Anthropic,
+    dividindo o texto em trechos de tamanho fixo com um atraso configurável entre eles. Modelos da Stability
+    recebem um PNG liso do tamanho pedido, de cor sorteada (imagens distintas, como de prompts distintos), no
+    formato de resposta do SDXL. A latência de cada chamada pode ser
+    fixa ou sorteada por uma função (por exemplo, uma LatencyDistribution), para simular o tempo de inferência,
+    e uma fração das chamadas pode ser recusada com ThrottlingException, como quando a cota da conta se esgota.
+    """
+
+    def __init__(
+        self,
+        text: str = DEFAULT_RECIPE_TEXT,
+        chunk_size: int = 16,
+        chunk_delay_seconds: float = 0.0,
+        latency_seconds: Union[float, Callable[[str], float]] = 0.0,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.chunk_delay_seconds = chunk_delay_seconds
+        self.latency_seconds = latency_seconds
+        self.throttle_rate = throttle_rate
+        self.throttled = 0
+        self.calls = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> dict:
+        request_body = json.loads(body)
+        self.calls.append({"operation": "invoke_model", "modelId": modelId, "body": request_body})
+        self._delay(modelId)
+        if modelId.startswith("stability."):
+            image = self._image(request_body.get("width", 1024), request_body.get("height", 1024))
+            return {"body": io.BytesIO(json.dumps({"artifacts": [{"base64": image, "finishReason": "SUCCESS"}]}).encode("utf-8"))}
+
+        response_body = {
+            "content": [{"type": "text", "text": self.text}],
+            "usage": {"input_tokens": len(body) // 4, "output_tokens": len(self.text) // 4},
+        }
+        return {"body": io.BytesIO(json.dumps(response_body).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> dict:
+        self.calls.append({"operation": "invoke_model_with_response_stream", "modelId": modelId, "body": json.loads(body)})
+        self._delay(modelId)
+        return {"body": self._stream_events()}
+
+    def _delay(self, model_id: str) -> None:
+        if self.throttle_rate > 0:
+            with self._lock:
+                throttled = self._rng.random() < self.throttle_rate
+                self.throttled += throttled
+            if throttled:
+                error = {"Error": {"Code": "ThrottlingException", "Message": "Too many requests, please wait before trying again."}}
+                raise ClientError(error, "InvokeModel")
+        latency = self.latency_seconds(model_id) if callable(self.latency_seconds) else self.latency_seconds
+        if latency > 0:
+            time.sleep(latency)
+
+    def _image(self, width: int, height: int) -> str:
+        # Uma imagem lisa comprime bem, então o custo medido fica nas versões geradas pelo handler
+        with self._lock:
+            color = tuple(self._rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    def _stream_events(self):
+        # Mesma sequência de eventos do Bedrock, incluindo o uso de tokens e as métricas da invocação no último evento
+        input_tokens, output_tokens = 120, len(self.text) // 4
+        yield self._event({"type": "message_start", "message": {"role": "assistant", "usage": {"input_tokens": input_tokens, "output_tokens": 1}}})
+        yield self._event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for start in range(0, len(self.text), self.chunk_size):
+            if self.chunk_delay_seconds:
+                time.sleep(self.chunk_delay_seconds)
+            end = start + self.chunk_size
+            yield self._event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": self.text[start:end]}})
+        yield self._event({"type": "content_block_stop", "index": 0})
+        yield self._event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": output_tokens}})
+        yield self._event(
+            {
+                "type": "message_stop",
+                "amazon-bedrock-invocationMetrics": {"inputTokenCount": input_tokens, "outputTokenCount": output_tokens},
+            }
+        )
+
+    @staticmethod
+    def _event(payload: dict) -> dict:
+        return {"chunk": {"bytes": json.dumps(payload).encode("utf-8")}}
@@ -0,0 +1,192 @@
+import copy
+import re
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+class InMemoryTable:
+    """
+    Substituto local de uma tabela do DynamoDB (resource Table do boto3) para testes e execução offline.
+
+    Suporta get_item, put_item, update_item, delete_item e scan, incluindo ConditionExpression e
+    FilterExpression construídas com boto3.dynamodb.conditions (Attr/Key). Em update_item, as cláusulas
+    SET (com if_not_exists), ADD, DELETE e REMOVE são aceitas. As operações são atômicas entre threads,
+    como no DynamoDB; um atraso opcional por operação ajuda a provocar intercalações em testes de concorrência.
+    """
+
+    def __init__(self, key_name: str, latency_seconds: float = 0.0):
+        self.key_name = key_name
+        self.latency_seconds = latency_seconds
+        self.items = {}
+        self.operation_counts = {"get_item": 0, "put_item": 0, "update_item": 0, "delete_item": 0, "scan": 0, "conditional_check_failed": 0}
+        self._lock = threading.Lock()
+
+    def get_item(self, Key: dict, **kwargs) -> dict:
+        self._delay()
+        with self._lock:
+            self.operation_counts["get_item"] += 1
+            item = self.items.get(Key[self.key_name])
+            return {"Item": copy.deepcopy(item)} if item is not None else {}
+
+    def put_item(self, Item: dict, ConditionExpression=None, **kwargs) -> dict:
+        self._delay()
+        with self._lock:
+            self.operation_counts["put_item"] += 1
+            self._check_condition(self.items.get(Item[self.key_name]), ConditionExpression, "PutItem")
+            self.items[Item[self.key_name]] = copy.deepcopy(Item)
+            return {}
+
+    def update_item(
+        self,
+        Key: dict,
+        UpdateExpression: str,
+        ConditionExpression=None,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+        ReturnValues: str = "NONE",
+        **kwargs,
+    ) -> dict:
+        self._delay()
+        with self._lock:
+            self.operation_counts["update_item"] += 1
+            current = self.items.get(Key[self.key_name])
+            self._check_condition(current, ConditionExpression, "UpdateItem")
+            item = apply_update_expression(
+                copy.deepcopy(current) or dict(Key), UpdateExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+            )
+            self.items[Key[self.key_name]] = item
+            return {"Attributes": copy.deepcopy(item)} if ReturnValues == "ALL_NEW" else {}
+
+    def scan(self, FilterExpression=None, **kwargs) -> dict:
+        self._delay()
+        with self._lock:
+            self.operation_counts["scan"] += 1
+            items = [copy.deepcopy(item) for item in self.items.values() if FilterExpression is None or evaluate_condition(FilterExpression, item)]
+            return {"Items": items, "Count": len(items)}
+
+    def delete_item(self, Key: dict, ConditionExpression=None, **kwargs) -> dict:
+        self._delay()
+        with self._lock:
+            self.operation_counts["delete_item"] += 1
+            self._check_condition(self.items.get(Key[self.key_name]), ConditionExpression, "DeleteItem")
+            self.items.pop(Key[self.key_name], None)
+            return {}
+
+    def _delay(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _check_condition(self, item, condition, operation_name: str) -> None:
+        if condition is None or evaluate_condition(condition, item or {}):
+            return
+        self.operation_counts["conditional_check_failed"] += 1
+        raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}}, operation_name)
+
+
+def _split_actions(clause: str):
+    # Separa as ações por vírgula, ignorando vírgulas dentro de funções como if_not_exists(a, :v)
+    actions, depth, current = [], 0, ""
+    for char in clause:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            actions.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        actions.append(current.strip())
+    return actions
+
+
+def apply_update_expression(item: dict, expression: str, names: dict, values: dict) -> dict:
+    """
+    Aplica uma UpdateExpression (SET, ADD, DELETE e REMOVE) a um item em memória.
+
+    Args:
+        item: Item atual (com a chave, quando ainda não existe)
+        expression: UpdateExpression no formato do DynamoDB
+        names: ExpressionAttributeNames
+        values: ExpressionAttributeValues
+
+    Returns:
+        dict: Item atualizado
+    """
+
+    def name(token: str) -> str:
+        return names.get(token, token)
+
+    def operand(token: str):
+        token = token.strip()
+        match = re.fullmatch(r"if_not_exists\((.+),(.+)\)", token)
+        if match:
+            return item.get(name(match.group(1).strip()), operand(match.group(2)))
+        return values[token] if token.startswith(":") else item.get(name(token))
+
+    parts = re.split(r"\b(SET|ADD|DELETE|REMOVE)\b", expression)
+    for keyword, clause in zip(parts[1::2], parts[2::2]):
+        for action in _split_actions(clause):
+            if keyword == "SET":
+                target, value = action.split("=", 1)
+                item[name(target.strip())] = operand(value)
+            elif keyword == "REMOVE":
+                item.pop(name(action), None)
+            else:
+                target, value = action.split(None, 1)
+                attribute, value = name(target), operand(value)
+                if keyword == "ADD" and isinstance(value, set):
+                    item[attribute] = item.get(attribute, set()) | value
+                elif keyword == "ADD":
+                    item[attribute] = item.get(attribute, 0) + value
+                else:
+                    remaining = item.get(attribute, set()) - value
+                    if remaining:
+                        item[attribute] = remaining
+                    else:
+                        # Como no DynamoDB, um conjunto vazio remove o atributo
+                        item.pop(attribute, None)
+    return item
+
+
+def evaluate_condition(condition, item: dict) -> bool:
+    """
+    Avalia uma condição do boto3.dynamodb.conditions contra um item em memória.
+
+    Args:
+        condition: Condição construída com Attr/Key
+        item: Item atual (vazio quando não existe)
+
+    Returns:
+        bool: True quando a condição é satisfeita
+    """
+    expression = condition.get_expression()
+    operator = expression["operator"]
+    values = expression["values"]
+
+    if operator == "AND":
+        return evaluate_condition(values[0], item) and evaluate_condition(values[1], item)
+    if operator == "OR":
+        return evaluate_condition(values[0], item) or evaluate_condition(values[1], item)
+    if operator == "NOT":
+        return not evaluate_condition(values[0], item)
+    if operator == "attribute_exists":
+        return values[0].name in item
+    if operator == "attribute_not_exists":
+        return values[0].name not in item
+
+    name, expected = values[0].name, values[1]
+    if name not in item:
+        return False
+    actual = item[name]
+    comparisons = {
+        "=": lambda: actual == expected,
+        "<>": lambda: actual != expected,
+        "<": lambda: actual < expected,
+        "<=": lambda: actual <= expected,
+        ">": lambda: actual > expected,
+        ">=": lambda: actual >= expected,
+    }
+    if operator not in comparisons:
+        raise NotImplementedError(f"Condition operator not supported by InMemoryTable: {operator}")
+    return comparisons[operator]()
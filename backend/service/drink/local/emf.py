@@ -0,0 +1,71 @@
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+
+@dataclass(frozen=True)
+class EmfMetric:
+    """
+    Um valor de métrica de um registro EMF, com as dimensões do registro.
+    """
+
+    name: str
+    value: float
+    unit: str
+    dimensions: Dict[str, str] = field(default_factory=dict)
+
+
+def parse_emf_records(output: str) -> List[EmfMetric]:
+    """
+    Extrai as métricas dos registros EMF (uma linha JSON com a chave _aws) de uma saída, ignorando as demais linhas.
+
+    Args:
+        output: Texto impresso no stdout (logs e registros EMF misturados)
+
+    Returns:
+        list: Métricas, uma por valor (métricas com vários valores no mesmo registro geram várias entradas)
+    """
+    parsed = []
+    for line in output.splitlines():
+        line = line.strip()
+        if not line.startswith("{") or '"_aws"' not in line:
+            continue
+        record = json.loads(line)
+        for directive in record["_aws"]["CloudWatchMetrics"]:
+            dimension_names = {name for dimension_set in directive["Dimensions"] for name in dimension_set}
+            dimensions = {name: record[name] for name in sorted(dimension_names)}
+            for definition in directive["Metrics"]:
+                values = record[definition["Name"]]
+                for value in values if isinstance(values, list) else [values]:
+                    parsed.append(EmfMetric(name=definition["Name"], value=value, unit=definition.get("Unit", "None"), dimensions=dimensions))
+    return parsed
+
+
+class EmfCapture:
+    """
+    Coleta as métricas EMF impressas pelos handlers em execuções locais e testes.
+
+    Recebe a função que lê o que foi impresso desde a última leitura (por exemplo, lambda: capsys.readouterr().out)
+    e acumula as métricas encontradas, que podem ser filtradas por nome e dimensões.
+    """
+
+    def __init__(self, read_output: Callable[[], str]):
+        self.read_output = read_output
+        self.records: List[EmfMetric] = []
+
+    def collect(self) -> List[EmfMetric]:
+        self.records.extend(parse_emf_records(self.read_output()))
+        return self.records
+
+    def find(self, name: str, **dimensions) -> List[EmfMetric]:
+        """
+        Retorna as métricas com o nome informado cujas dimensões incluem as informadas.
+        """
+        return [
+            metric
+            for metric in self.collect()
+            if metric.name == name and all(metric.dimensions.get(key) == value for key, value in dimensions.items())
+        ]
+
+    def values(self, name: str, **dimensions) -> List[float]:
+        return [metric.value for metric in self.find(name, **dimensions)]
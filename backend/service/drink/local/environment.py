@@ -0,0 +1,134 @@
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from service.drink.clients import (
+    get_client,
+    get_dynamodb_resource,
+    register_client,
+    reset_clients,
+)
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.sendgrid import FakeSendGridClient
+
+# Recursos locais e variáveis de ambiente equivalentes às definidas no deploy das funções do fluxo.
+# Os handlers leem essas variáveis na importação, então configure_local_environment precisa ser chamada antes
+LOCAL_RECIPES_BUCKET = "local-drink-recipes"
+LOCAL_TABLES = {
+    "DRINK_RECIPES_TABLE": ("local-drink-recipes", "recipe_id"),
+    "RECIPE_CACHE_TABLE": ("local-drink-recipe-cache", "cache_key"),
+    "IMAGE_STORE_TABLE": ("local-drink-image-store", "image_hash"),
+    "BEDROCK_LIMITER_TABLE": ("local-drink-bedrock-limiter", "limiter_id"),
+    "IDEMPOTENCY_TABLE": ("local-drink-idempotency", "idempotency_key"),
+}
+LOCAL_SENDGRID_SECRET = "local-drink-sendgrid"
+# Máquina de estado registrada no moto apenas para receber o StartExecution do handler de criação (o moto não
+# executa os estados; o fluxo é executado pelo InProcessWorkflow com o input gravado na execução)
+LOCAL_ACCOUNT_ID = "123456789012"
+LOCAL_STATE_MACHINE = "local-drink-recipe"
+LOCAL_STATE_MACHINE_ARN = f"arn:aws:states:us-east-1:{LOCAL_ACCOUNT_ID}:stateMachine:{LOCAL_STATE_MACHINE}"
+LOCAL_ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "RECIPES_BUCKET": LOCAL_RECIPES_BUCKET,
+    **{variable: table_name for variable, (table_name, _) in LOCAL_TABLES.items()},
+    "SENDGRID_SECRET_NAME": LOCAL_SENDGRID_SECRET,
+    "DRINK_RECIPE_STEP_FUNCTION_ARN": LOCAL_STATE_MACHINE_ARN,
+    "RECIPE_TEXT_STREAMING": "true",
+    "RECIPE_TEXT_CHECKPOINT_SECONDS": "1.0",
+    "IMAGE_TWO_PHASE": "true",
+    "POWERTOOLS_METRICS_NAMESPACE": "awsome-generative-drink-app-local",
+    "POWERTOOLS_TRACE_DISABLED": "true",
+    "POWERTOOLS_LOG_LEVEL": "WARNING",
+}
+
+
+@dataclass
+class LocalServices:
+    """
+    Substitutos locais ativos: o cliente fictício do Bedrock, o do SendGrid e os nomes dos recursos criados no moto.
+    """
+
+    bedrock: FakeBedrockRuntime
+    sendgrid: FakeSendGridClient
+    bucket: str = LOCAL_RECIPES_BUCKET
+
+    @property
+    def recipes_table(self):
+        return get_dynamodb_resource().Table(LOCAL_TABLES["DRINK_RECIPES_TABLE"][0])
+
+    def execution_input(self, recipe_id: str) -> dict:
+        """
+        Retorna o input da execução iniciada pelo handler de criação para a receita.
+        """
+        execution_arn = f"arn:aws:states:us-east-1:{LOCAL_ACCOUNT_ID}:execution:{LOCAL_STATE_MACHINE}:DrinkRecipe-{recipe_id}"
+        return json.loads(get_client("stepfunctions").describe_execution(executionArn=execution_arn)["input"])
+
+
+def configure_local_environment(overrides: Optional[dict] = None) -> dict:
+    """
+    Define as variáveis de ambiente do fluxo local (sem sobrescrever as já definidas).
+
+    Args:
+        overrides: Variáveis que substituem os valores locais padrão
+
+    Returns:
+        dict: Variáveis aplicadas
+    """
+    environment = {**LOCAL_ENVIRONMENT, **(overrides or {})}
+    for name, value in environment.items():
+        os.environ.setdefault(name, value)
+    return environment
+
+
+@contextmanager
+def local_aws_services(bedrock: Optional[FakeBedrockRuntime] = None, sendgrid: Optional[FakeSendGridClient] = None):
+    """
+    Cria o bucket, as tabelas, o secret e a máquina de estado do fluxo no moto e registra os substitutos do Bedrock e do SendGrid.
+
+    O moto é uma dependência de desenvolvimento, importada apenas aqui. Os clientes registrados são descartados
+    na saída do contexto.
+
+    Args:
+        bedrock: Cliente fictício do Bedrock (por padrão, sem latência)
+        sendgrid: Cliente fictício do SendGrid (por padrão, sem latência)
+
+    Yields:
+        LocalServices: Substitutos ativos
+    """
+    from moto import mock_aws
+    from service.drink.config import reset_config_cache
+
+    configure_local_environment()
+    with mock_aws():
+        reset_clients()
+        reset_config_cache()
+        services = LocalServices(bedrock=bedrock or FakeBedrockRuntime(), sendgrid=sendgrid or FakeSendGridClient())
+
+        get_client("s3").create_bucket(Bucket=LOCAL_RECIPES_BUCKET)
+        for table_name, key_name in LOCAL_TABLES.values():
+            get_client("dynamodb").create_table(
+                TableName=table_name,
+                KeySchema=[{"AttributeName": key_name, "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": key_name, "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        get_client("secretsmanager").create_secret(
+            Name=LOCAL_SENDGRID_SECRET, SecretString=json.dumps({"api_key": "local-api-key", "sender_email": "drinks@example.com"})
+        )
+        get_client("stepfunctions").create_state_machine(
+            name=LOCAL_STATE_MACHINE,
+            definition=json.dumps({"StartAt": "Local", "States": {"Local": {"Type": "Pass", "End": True}}}),
+            roleArn=f"arn:aws:iam::{LOCAL_ACCOUNT_ID}:role/{LOCAL_STATE_MACHINE}",
+        )
+
+        register_client("bedrock-runtime", services.bedrock)
+        register_client("sendgrid", services.sendgrid)
+        try:
+            yield services
+        finally:
+            reset_clients()
+            reset_config_cache()
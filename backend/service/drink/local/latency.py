@@ -0,0 +1,43 @@
+import math
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    Distribuição de latência dos substitutos locais (Bedrock, SendGrid): log-normal a partir da mediana e do p99.
+
+    A latência de serviços remotos tem cauda longa, e a log-normal reproduz isso com dois parâmetros fáceis de
+    tirar de um dashboard. Sem p99 (ou com p99 igual à mediana), a latência é fixa. As instâncias podem ser
+    passadas diretamente como latency_seconds dos substitutos (os argumentos da chamada são ignorados).
+    """
+
+    median_seconds: float = 0.0
+    p99_seconds: Optional[float] = None
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    # Quantil 0,99 da normal padrão: p99 = mediana * exp(2,326 * sigma)
+    Z_99 = 2.3263
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def sigma(self) -> float:
+        if self.median_seconds <= 0 or not self.p99_seconds or self.p99_seconds <= self.median_seconds:
+            return 0.0
+        return math.log(self.p99_seconds / self.median_seconds) / self.Z_99
+
+    def sample(self) -> float:
+        if self.median_seconds <= 0:
+            return 0.0
+        with self._lock:
+            return self._rng.lognormvariate(math.log(self.median_seconds), self.sigma)
+
+    def __call__(self, *args) -> float:
+        return self.sample()
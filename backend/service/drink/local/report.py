@@ -0,0 +1,55 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Percentil pelo método do posto mais próximo (sem interpolação, como nos dashboards do CloudWatch).
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """
+    Resume uma série de latências em segundos (contagem, média, p50, p95, p99 e máximo).
+    """
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 0.50), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "p99": round(percentile(values, 0.99), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
+
+
+def summarize_executions(results: Iterable, elapsed_seconds: float, concurrency: int) -> dict:
+    """
+    Resume as execuções do InProcessWorkflow: vazão, latência ponta a ponta e latência e repetições por etapa.
+
+    Args:
+        results: ExecutionResult das execuções
+        elapsed_seconds: Tempo total de parede da rodada
+        concurrency: Execuções simultâneas da rodada
+
+    Returns:
+        dict: Resumo serializável em JSON
+    """
+    results = list(results)
+    stage_seconds, stage_retries = defaultdict(list), defaultdict(int)
+    for result in results:
+        for stage, seconds in result.stage_seconds.items():
+            stage_seconds[stage].append(seconds)
+        for stage, retries in result.retries.items():
+            stage_retries[stage] += retries
+
+    return {
+        "executions": len(results),
+        "succeeded": sum(1 for result in results if result.status == "SUCCEEDED"),
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "executions_per_second": round(len(results) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+        "end_to_end_seconds": latency_summary([result.duration_seconds for result in results]),
+        "stages": {stage: {**latency_summary(values), "retries": stage_retries[stage]} for stage, values in stage_seconds.items()},
+    }
@@ -0,0 +1,119 @@
+"""
+Executa o fluxo de receitas localmente, com o runner em processo, moto e os substitutos do Bedrock e do SendGrid.
+
+Uso: python -m service.drink.local.run_workflow --executions 1000 --concurrency 64 --text-latency 2.0 --image-latency 1.0 \
+    --throttle-rate 0.05 --output results.json
+
+As latências informadas são medianas de distribuições log-normais (o p99 fica em --tail-factor vezes a mediana).
+
+Por padrão, o rate limiter do Bedrock fica desligado; com --bedrock-quotas, as cotas padrão da configuração
+(por exemplo, 60 imagens por minuto) limitam a execução como na conta real.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import resource
+import time
+import uuid
+from datetime import datetime
+
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.environment import (
+    configure_local_environment,
+    local_aws_services,
+)
+from service.drink.local.latency import LatencyDistribution
+from service.drink.local.report import summarize_executions
+from service.drink.local.sendgrid import FakeSendGridClient
+
+MOODS = ["happy", "sad", "excited", "calm"]
+FLAVORS = ["fruity", "citric", "sweet", "bitter", "complex"]
+FRUIT = ["mango", "pineapple", "strawberry", "lime", "passion fruit", "watermelon"]
+LIQUIDS = ["soda", "coconut water", "tonic water", "orange juice"]
+
+
+def generate_drink_requests(count: int, rng: random.Random) -> list:
+    """
+    Gera solicitações distintas (sem repetir humor, sabor, fruta e líquido), para que cada uma tenha o próprio
+    prompt, como em um tráfego real; solicitações iguais seriam atendidas pelos caches de receita e de imagem.
+    """
+    combinations = list(itertools.product(MOODS, FLAVORS, FRUIT, LIQUIDS))
+    rng.shuffle(combinations)
+    return [
+        {
+            "customer_name": "Local",
+            "email": "local@example.com",
+            "mood": mood,
+            "flavor": flavor,
+            "fruit": [fruit],
+            "liquids": [liquid],
+            "syrups": [],
+            "leaves": [],
+        }
+        for mood, flavor, fruit, liquid in (combinations * (count // len(combinations) + 1))[:count]
+    ]
+
+
+def generate_execution_input(request: dict) -> dict:
+    """
+    Monta um input de execução no formato do StartExecution.
+    """
+    return {"recipe_id": str(uuid.uuid4()), "timestamp": datetime.utcnow().isoformat(), "request": request}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the drink recipe workflow in process against local AWS stand-ins")
+    parser.add_argument("--executions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--text-latency", type=float, default=0.0, help="median text model latency in seconds")
+    parser.add_argument("--image-latency", type=float, default=0.0, help="median image model latency in seconds")
+    parser.add_argument("--email-latency", type=float, default=0.0, help="median SendGrid latency in seconds")
+    parser.add_argument("--tail-factor", type=float, default=3.0, help="p99 latency as a multiple of the median")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of Bedrock and SendGrid calls throttled")
+    parser.add_argument("--bedrock-quotas", action="store_true", help="enforce the default Bedrock quotas with the shared rate limiter")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    # As variáveis de ambiente precisam estar definidas antes da importação do runner e dos handlers
+    configure_local_environment(None if args.bedrock_quotas else {"BEDROCK_LIMITER_TABLE": ""})
+    from service.drink.workflow.runner import InProcessWorkflow, RetryPolicy
+
+    rng = random.Random(args.seed)
+
+    text_latency = LatencyDistribution(args.text_latency, args.text_latency * args.tail_factor, seed=args.seed)
+    image_latency = LatencyDistribution(args.image_latency, args.image_latency * args.tail_factor, seed=args.seed + 1)
+
+    def model_latency(model_id: str) -> float:
+        return image_latency.sample() if model_id.startswith("stability.") else text_latency.sample()
+
+    bedrock = FakeBedrockRuntime(latency_seconds=model_latency, throttle_rate=args.throttle_rate, seed=args.seed)
+    sendgrid = FakeSendGridClient(
+        latency_seconds=LatencyDistribution(args.email_latency, args.email_latency * args.tail_factor, seed=args.seed + 2),
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    with local_aws_services(bedrock=bedrock, sendgrid=sendgrid):
+        workflow = InProcessWorkflow(retry_policy=RetryPolicy(interval_seconds=0.05), max_workers=max(args.concurrency * 2, 4))
+        inputs = [generate_execution_input(request) for request in generate_drink_requests(args.executions, rng)]
+
+        started = time.perf_counter()
+        results = asyncio.run(workflow.run_many(inputs, concurrency=args.concurrency))
+        elapsed = time.perf_counter() - started
+        workflow.close()
+
+    summary = summarize_executions(results, elapsed, args.concurrency)
+    # ru_maxrss é informado em KiB no Linux
+    summary["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    summary["throttled"] = {"bedrock": bedrock.throttled, "sendgrid": sendgrid.throttled}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(summary, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from python_http_client.exceptions import TooManyRequestsError
+
+
+@dataclass(frozen=True)
+class FakeSendGridResponse:
+    status_code: int
+    body: str = ""
+
+
+class FakeSendGridClient:
+    """
+    Substituto local do SendGridAPIClient para executar a notificação sem enviar emails.
+
+    Registrado com register_client("sendgrid", ...), é usado pelo handler de notificação no lugar da API real.
+    Guarda as mensagens recebidas e responde 202 depois de uma latência fixa ou sorteada por uma função; uma
+    fração dos envios pode ser recusada com 429, como no limite de requisições da API.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: Union[float, Callable[[], float]] = 0.0,
+        status_code: int = 202,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_seconds = latency_seconds
+        self.status_code = status_code
+        self.throttle_rate = throttle_rate
+        self.throttled = 0
+        self.messages = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, message) -> FakeSendGridResponse:
+        if self.throttle_rate > 0:
+            with self._lock:
+                throttled = self._rng.random() < self.throttle_rate
+                self.throttled += throttled
+            if throttled:
+                raise TooManyRequestsError(429, "Too Many Requests", b'{"errors":[{"message":"too many requests"}]}', {})
+        latency = self.latency_seconds() if callable(self.latency_seconds) else self.latency_seconds
+        if latency > 0:
+            time.sleep(latency)
+        with self._lock:
+            self.messages.append(message)
+        return FakeSendGridResponse(status_code=self.status_code)
@@ -0,0 +1,87 @@
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+
+class LocalQueue:
+    """
+    Substituto local do cliente do SQS (boto3) para testes e execução offline das filas de admissão.
+
+    Suporta send_message, receive_message, delete_message, get_queue_attributes e change_message_visibility_batch
+    com a mesma assinatura do boto3, para qualquer número de filas (identificadas pelo QueueUrl). Mensagens
+    recebidas ficam invisíveis até o fim do visibility timeout, ou até delete/change_message_visibility_batch,
+    como no SQS.
+    """
+
+    def __init__(self, visibility_timeout_seconds: float = 30.0, clock: Callable[[], float] = time.time):
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.clock = clock
+        self.messages = {}
+        self._lock = threading.Lock()
+
+    def queue_messages(self, queue_url: str) -> List[dict]:
+        """
+        Mensagens da fila informada (recebidas ou não), da mais antiga para a mais nova.
+        """
+        with self._lock:
+            return sorted(
+                (message for message in self.messages.values() if message["queue_url"] == queue_url), key=lambda message: message["sent_at"]
+            )
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs) -> dict:
+        message_id = str(uuid.uuid4())
+        with self._lock:
+            now = self.clock()
+            self.messages[message_id] = {"queue_url": QueueUrl, "body": MessageBody, "sent_at": now, "visible_at": now, "receive_count": 0}
+        return {"MessageId": message_id}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, VisibilityTimeout: Optional[int] = None, **kwargs) -> dict:
+        with self._lock:
+            now = self.clock()
+            visible = sorted(
+                (item for item in self.messages.items() if item[1]["queue_url"] == QueueUrl and item[1]["visible_at"] <= now),
+                key=lambda item: item[1]["sent_at"],
+            )
+            received = []
+            for message_id, message in visible[:MaxNumberOfMessages]:
+                message["visible_at"] = now + (self.visibility_timeout_seconds if VisibilityTimeout is None else VisibilityTimeout)
+                message["receive_count"] += 1
+                received.append(
+                    {
+                        "MessageId": message_id,
+                        "ReceiptHandle": message_id,
+                        "Body": message["body"],
+                        "Attributes": {
+                            "SentTimestamp": str(int(message["sent_at"] * 1000)),
+                            "ApproximateReceiveCount": str(message["receive_count"]),
+                        },
+                    }
+                )
+        # Como no boto3, a chave Messages fica de fora quando não há mensagens
+        return {"Messages": received} if received else {}
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs) -> dict:
+        with self._lock:
+            self.messages.pop(ReceiptHandle, None)
+        return {}
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: List[str], **kwargs) -> dict:
+        with self._lock:
+            now = self.clock()
+            messages = [message for message in self.messages.values() if message["queue_url"] == QueueUrl]
+            visible = sum(1 for message in messages if message["visible_at"] <= now)
+            attributes = {
+                "ApproximateNumberOfMessages": str(visible),
+                "ApproximateNumberOfMessagesNotVisible": str(len(messages) - visible),
+                "ApproximateNumberOfMessagesDelayed": "0",
+            }
+        return {"Attributes": {name: value for name, value in attributes.items() if name in AttributeNames}}
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        with self._lock:
+            for entry in Entries:
+                message = self.messages.get(entry["ReceiptHandle"])
+                if message is not None:
+                    message["visible_at"] = self.clock() + entry["VisibilityTimeout"]
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
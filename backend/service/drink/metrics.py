@@ -0,0 +1,191 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+logger = Logger(child=True)
+
+# Namespace das métricas (será definido via variável de ambiente); o padrão evita que a falta da variável derrube o handler
+METRICS_NAMESPACE = os.environ.get("POWERTOOLS_METRICS_NAMESPACE", "awsome-generative-drink-app")
+
+# Campos da solicitação usados como dimensões (valores fechados no DrinkRequest, portanto de baixa cardinalidade)
+REQUEST_DIMENSIONS = {"mood": "Mood", "flavor": "Flavor"}
+
+# Métricas da invocação em andamento. Cada invocação tem o próprio conjunto (EphemeralMetrics), e não o conjunto
+# global do Powertools, para que etapas executadas em threads do mesmo processo (modo de Lambda única, runner local)
+# não misturem métricas nem dimensões
+_invocation_metrics: ContextVar[Optional[EphemeralMetrics]] = ContextVar("invocation_metrics", default=None)
+
+# Etapas que já foram executadas neste processo (a primeira invocação de cada uma é um cold start)
+_warm_stages = set()
+_warm_stages_lock = threading.Lock()
+
+
+class InvocationMetrics:
+    """
+    Métricas usadas pelos handlers e módulos auxiliares: registra na invocação instrumentada em andamento.
+
+    Fora de uma invocação (por exemplo, em um teste que chama uma função auxiliar diretamente), as métricas são
+    descartadas. A interface é a mesma do Metrics do Powertools.
+    """
+
+    def add_metric(self, name: str, unit: MetricUnit, value: float) -> None:
+        current = _invocation_metrics.get()
+        if current is not None:
+            current.add_metric(name=name, unit=unit, value=value)
+
+    def add_dimension(self, name: str, value: str) -> None:
+        current = _invocation_metrics.get()
+        if current is not None:
+            current.add_dimension(name=name, value=value)
+
+    def add_metadata(self, key: str, value) -> None:
+        current = _invocation_metrics.get()
+        if current is not None:
+            current.add_metadata(key=key, value=value)
+
+
+metrics = InvocationMetrics()
+
+
+def add_request_dimensions(request_data) -> None:
+    """
+    Adiciona humor e sabor da solicitação como dimensões da invocação em andamento.
+
+    Args:
+        request_data: Dados da solicitação (ignorados quando não são um dicionário)
+    """
+    if not isinstance(request_data, dict):
+        return
+    for field_name, dimension in REQUEST_DIMENSIONS.items():
+        value = request_data.get(field_name)
+        if isinstance(value, str) and value:
+            metrics.add_dimension(name=dimension, value=value)
+
+
+def _elapsed_milliseconds(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def _payload_size(payload) -> int:
+    try:
+        return len(json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Registra a duração do bloco, em milissegundos, na métrica informada (também quando o bloco falha).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_metric(name=name, unit=MetricUnit.Milliseconds, value=_elapsed_milliseconds(started))
+
+
+def dimensioned_metrics(**dimensions: str) -> EphemeralMetrics:
+    """
+    Cria um conjunto de métricas com dimensões próprias, publicado em um registro EMF separado com flush_metrics.
+
+    Usado quando as dimensões da invocação em andamento não distinguem o que é medido (o modelo chamado ou a faixa
+    de prioridade de uma solicitação).
+
+    Args:
+        dimensions: Nome e valor de cada dimensão
+
+    Returns:
+        EphemeralMetrics: Conjunto de métricas a ser publicado pelo chamador
+    """
+    scoped_metrics = EphemeralMetrics(namespace=METRICS_NAMESPACE)
+    for name, value in dimensions.items():
+        scoped_metrics.add_dimension(name=name, value=value)
+    return scoped_metrics
+
+
+def record_model_invocation(model_id: str, latency_ms: float, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None) -> None:
+    """
+    Publica a latência e os tokens de uma chamada ao Bedrock com a dimensão ModelId.
+
+    As métricas do modelo vão em um registro EMF próprio, pois as dimensões da invocação (etapa, humor e sabor)
+    não distinguem o modelo que atendeu.
+
+    Args:
+        model_id: Modelo chamado
+        latency_ms: Duração da chamada, até o último token
+        input_tokens: Tokens de entrada informados pelo modelo
+        output_tokens: Tokens de saída informados pelo modelo
+    """
+    model_metrics = dimensioned_metrics(ModelId=model_id)
+    model_metrics.add_metric(name="BedrockLatency", unit=MetricUnit.Milliseconds, value=latency_ms)
+    if input_tokens is not None:
+        model_metrics.add_metric(name="BedrockInputTokens", unit=MetricUnit.Count, value=input_tokens)
+    if output_tokens is not None:
+        model_metrics.add_metric(name="BedrockOutputTokens", unit=MetricUnit.Count, value=output_tokens)
+    model_metrics.flush_metrics()
+
+
+def instrument_stage(stage: str) -> Callable:
+    """
+    Decorator dos handlers: publica em EMF, ao fim de cada invocação, as métricas registradas durante ela.
+
+    Toda invocação registra StageDuration, StageErrors (0 ou 1), ColdStart (0 ou 1, cuja média é a taxa de cold
+    start) e, quando bem-sucedida, StagePayloadSize (tamanho do evento ou resposta devolvido), com a dimensão Stage
+    e, se o evento trouxer a solicitação, as dimensões Mood e Flavor.
+
+    Args:
+        stage: Nome da etapa (dimensão Stage)
+
+    Returns:
+        Callable: Decorator do lambda_handler
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event, context, *args, **kwargs):
+            invocation_metrics = EphemeralMetrics(namespace=METRICS_NAMESPACE)
+            token = _invocation_metrics.set(invocation_metrics)
+            with _warm_stages_lock:
+                cold_start = stage not in _warm_stages
+                _warm_stages.add(stage)
+
+            metrics.add_dimension(name="Stage", value=stage)
+            add_request_dimensions(event.get("request") if isinstance(event, dict) else None)
+            metrics.add_metric(name="ColdStart", unit=MetricUnit.Count, value=int(cold_start))
+            started = time.perf_counter()
+            failed = True
+            try:
+                response = handler(event, context, *args, **kwargs)
+                failed = False
+                metrics.add_metric(name="StagePayloadSize", unit=MetricUnit.Bytes, value=_payload_size(response))
+                return response
+            finally:
+                metrics.add_metric(name="StageDuration", unit=MetricUnit.Milliseconds, value=_elapsed_milliseconds(started))
+                metrics.add_metric(name="StageErrors", unit=MetricUnit.Count, value=int(failed))
+                _invocation_metrics.reset(token)
+                try:
+                    invocation_metrics.flush_metrics()
+                except Exception:
+                    # Uma métrica inválida não deve mudar o resultado da invocação
+                    logger.exception(f"Error publishing metrics for stage {stage}")
+
+        return wrapper
+
+    return decorator
+
+
+def reset_cold_starts() -> None:
+    """
+    Volta a considerar todas as etapas como não executadas (usado em testes).
+    """
+    with _warm_stages_lock:
+        _warm_stages.clear()
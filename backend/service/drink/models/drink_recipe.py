@@ -0,0 +1,30 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class DrinkRecipe(BaseModel):
+    """
+    Model representing the structured recipe returned by the text model.
+
+    Example:
+        ```python
+        recipe = DrinkRecipe(
+            name="Sunny Mango Fizz",
+            description="A bright, bubbly mango and pineapple cooler.",
+            ingredients=["60 ml mango juice", "30 ml pineapple juice", "90 ml soda"],
+            steps=["Muddle the mint.", "Add juices and ice, then top with soda."],
+            garnish="Mint sprig",
+        )
+        ```
+    """
+
+    name: str = Field(..., description="Name of the drink", min_length=1)
+
+    description: str = Field(default="", description="One-sentence description of the drink")
+
+    ingredients: List[str] = Field(..., description="Ingredients with quantities", min_length=1)
+
+    steps: List[str] = Field(..., description="Preparation steps in order", min_length=1)
+
+    garnish: str = Field(default="", description="Garnish and serving suggestion")
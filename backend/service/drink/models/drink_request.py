@@ -1,12 +1,21 @@
-from typing import List, Literal, Optional
+from typing import List, Literal, Optional, get_args
 
 from pydantic import BaseModel, Field, field_validator
+from service.drink.catalog.ingredient_catalog import canonicalize_ingredients
+
+# Classes de prioridade da geração: cada uma tem a própria faixa (fila) no controle de admissão
+Priority = Literal["vip", "standard", "bulk"]
+PRIORITY_LANES = get_args(Priority)
+DEFAULT_PRIORITY = "standard"
 
 
 class DrinkRequest(BaseModel):
     """
     Model representing a drink request with specific mood, flavor, and ingredients.
 
+    Ingredients are normalized to the canonical IDs of the ingredient catalog, so aliases, translations
+    and small typos ("Mint", "mint leaves", "hortelã") all become the same ingredient ("mint").
+
     Example:
         ```python
         drink = DrinkRequest(
@@ -16,7 +25,8 @@ class DrinkRequest(BaseModel):
             fruit=["pineapple", "mango"],
             liquids=["coconut water", "soda"],
             syrups=["simple syrup"],
-            leaves=["mint"]
+            leaves=["mint"],
+            priority="vip"
         )
         ```
     """
@@ -35,9 +45,19 @@ class DrinkRequest(BaseModel):
 
     leaves: Optional[List[str]] = Field(default=[], description="Optional list of leaves to be used in the drink")
 
+    priority: Priority = Field(
+        default=DEFAULT_PRIORITY,
+        description="Priority class that decides the admission lane of the generation (at most the priority granted to the client by the API)",
+    )
+
     @field_validator("customer_name")
     @classmethod
     def customer_name_not_empty(cls, v):
         if v.strip() == "":
             raise ValueError("customer_name cannot be empty or contain only whitespace")
         return v
+
+    @field_validator("fruit", "liquids", "syrups", "leaves")
+    @classmethod
+    def canonical_ingredients(cls, v):
+        return canonicalize_ingredients(v)
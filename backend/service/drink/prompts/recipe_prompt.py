@@ -0,0 +1,222 @@
+import json
+import math
+from dataclasses import dataclass
+from string import Template
+from typing import Optional
+
+from aws_lambda_powertools import Logger
+from pydantic import ValidationError
+from pydantic_core import from_json
+from service.drink.models.drink_recipe import DrinkRecipe
+from service.drink.models.drink_request import DrinkRequest
+
+logger = Logger(child=True)
+
+# Aproximação usada para estimar tokens sem carregar um tokenizer (texto em inglês tem ~4 caracteres por token)
+CHARS_PER_TOKEN = 4
+
+# Orçamento de saída: uma base para nome, descrição e guarnição, mais um valor por ingrediente
+# (cada ingrediente gera uma linha na lista e, em média, um passo de preparo)
+RECIPE_BASE_OUTPUT_TOKENS = 120
+RECIPE_TOKENS_PER_INGREDIENT = 45
+RECIPE_MIN_OUTPUT_TOKENS = 256
+
+# Templates compilados uma única vez, no carregamento do módulo (reaproveitados entre invocações do container)
+RECIPE_SYSTEM_PROMPT = (
+    "You are a mixologist writing concise drink recipes. "
+    "Reply with a single minified JSON object and nothing else, using exactly these keys: "
+    + json.dumps(
+        {
+            "name": "drink name",
+            "description": "one short sentence",
+            "ingredients": ["quantity + ingredient"],
+            "steps": ["short imperative step"],
+            "garnish": "garnish and glass",
+        },
+        separators=(",", ":"),
+    )
+    + ". Use metric measures, at most 6 steps, no history or trivia."
+)
+
+RECIPE_USER_TEMPLATE = Template("Create a $flavor drink for a $mood mood.\nFruit: $fruit\nLiquids: $liquids\nSyrups: $syrups\nLeaves: $leaves")
+
+IMAGE_PROMPT_TEMPLATE = Template(
+    "A professional, high-quality photograph of a $flavor drink made with $ingredients. "
+    "The drink should be in an appropriate glass, garnished beautifully, with perfect lighting and composition. "
+    "The image should look like it belongs in a high-end recipe book or luxury bar menu. "
+    "Studio lighting, high resolution, photorealistic."
+)
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    Prompt pronto para a Messages API, com a estimativa de tokens de entrada e o limite de saída calculado.
+    """
+
+    system: str
+    user: str
+    estimated_input_tokens: int
+    max_tokens: int
+
+    @property
+    def estimated_total_tokens(self) -> int:
+        return self.estimated_input_tokens + self.max_tokens
+
+    def to_request_body(self) -> dict:
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": self.max_tokens,
+            "system": self.system,
+            "messages": [{"role": "user", "content": self.user}],
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima a quantidade de tokens de um texto.
+
+    Args:
+        text: Texto do prompt
+
+    Returns:
+        int: Número aproximado de tokens
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _join(values) -> str:
+    return ", ".join(value.strip() for value in values or [] if value.strip()) or "none"
+
+
+def compile_recipe_prompt(drink_request: DrinkRequest, max_tokens_limit: int) -> CompiledPrompt:
+    """
+    Monta o prompt da receita a partir dos campos da solicitação e dimensiona o limite de tokens de saída.
+
+    O nome do cliente não entra no prompt: a receita depende apenas dos mesmos campos usados na chave do cache.
+
+    Args:
+        drink_request: Solicitação validada
+        max_tokens_limit: Limite máximo de tokens de saída definido na configuração
+
+    Returns:
+        CompiledPrompt: Prompt compilado
+    """
+    user = RECIPE_USER_TEMPLATE.substitute(
+        flavor=drink_request.flavor,
+        mood=drink_request.mood,
+        fruit=_join(drink_request.fruit),
+        liquids=_join(drink_request.liquids),
+        syrups=_join(drink_request.syrups),
+        leaves=_join(drink_request.leaves),
+    )
+
+    ingredient_count = sum(len(values or []) for values in (drink_request.fruit, drink_request.liquids, drink_request.syrups, drink_request.leaves))
+    max_tokens = RECIPE_BASE_OUTPUT_TOKENS + RECIPE_TOKENS_PER_INGREDIENT * ingredient_count
+    max_tokens = min(max_tokens_limit, max(RECIPE_MIN_OUTPUT_TOKENS, max_tokens))
+
+    return CompiledPrompt(
+        system=RECIPE_SYSTEM_PROMPT,
+        user=user,
+        estimated_input_tokens=estimate_tokens(RECIPE_SYSTEM_PROMPT) + estimate_tokens(user),
+        max_tokens=max_tokens,
+    )
+
+
+def compile_image_prompt(drink_request: DrinkRequest) -> str:
+    """
+    Monta o prompt do modelo de imagem a partir dos campos da solicitação.
+
+    Args:
+        drink_request: Solicitação validada
+
+    Returns:
+        str: Prompt para geração de imagem
+    """
+    ingredients = [*drink_request.fruit, *drink_request.liquids, *(drink_request.leaves or [])]
+    return IMAGE_PROMPT_TEMPLATE.substitute(flavor=drink_request.flavor, ingredients=_join(ingredients))
+
+
+def parse_recipe_output(text: str) -> Optional[DrinkRecipe]:
+    """
+    Interpreta a resposta do modelo como receita estruturada.
+
+    Args:
+        text: Texto retornado pelo modelo
+
+    Returns:
+        DrinkRecipe | None: Receita validada, ou None quando a resposta não segue o formato pedido
+    """
+    start = text.find("{")
+    end = text.rfind("}") + 1
+    if start < 0 or end <= start:
+        return None
+
+    try:
+        return DrinkRecipe.model_validate_json(text[start:end])
+    except ValidationError:
+        logger.warning("Recipe output is not valid JSON for the expected structure")
+        return None
+
+
+def render_recipe_text(recipe: DrinkRecipe) -> str:
+    """
+    Converte a receita estruturada no texto usado no e-mail e salvo no S3.
+
+    Args:
+        recipe: Receita estruturada
+
+    Returns:
+        str: Receita em texto simples
+    """
+    return _render_recipe_fields(recipe.model_dump())
+
+
+def render_partial_recipe_text(text: str) -> str:
+    """
+    Converte a resposta parcial do modelo (JSON incompleto, durante o streaming) no texto da receita até onde ela chegou.
+
+    Os campos e itens de lista aparecem quando o modelo termina de escrevê-los; uma string ainda incompleta fica de
+    fora até o próximo checkpoint.
+
+    Args:
+        text: Texto acumulado da resposta do modelo
+
+    Returns:
+        str: Receita parcial em texto simples (a resposta como veio, quando ela não segue o formato pedido)
+    """
+    start = text.find("{")
+    if start < 0:
+        return text.strip()
+
+    try:
+        # Depois do objeto completo, o modelo pode fechar um bloco de código (```), que fica de fora
+        fields = from_json(text[start:], allow_partial=True)
+    except ValueError:
+        try:
+            end = text.rfind("}") + 1
+            fields = from_json(text[start:end])
+        except ValueError:
+            return text
+    if not isinstance(fields, dict):
+        return text
+    return _render_recipe_fields(fields)
+
+
+def _render_recipe_fields(fields: dict) -> str:
+    # Só entram as seções presentes (no texto parcial, as que o modelo ainda não gerou ficam de fora)
+    name, description, garnish = (fields.get(key) if isinstance(fields.get(key), str) else "" for key in ("name", "description", "garnish"))
+    ingredients, steps = (
+        [item for item in fields[key] if isinstance(item, str)] if isinstance(fields.get(key), list) else [] for key in ("ingredients", "steps")
+    )
+
+    sections = [[name]] if name else []
+    if description:
+        sections.append([description])
+    if ingredients:
+        sections.append(["Ingredients:"] + [f"- {ingredient}" for ingredient in ingredients])
+    if steps:
+        sections.append(["Preparation:"] + [f"{number}. {step}" for number, step in enumerate(steps, start=1)])
+    if garnish:
+        sections.append([f"Garnish: {garnish}"])
+    return "\n\n".join("\n".join(section) for section in sections)
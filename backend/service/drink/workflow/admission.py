@@ -0,0 +1,267 @@
+import json
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from aws_lambda_powertools import Logger
+from service.drink.bedrock.rate_limiter import BucketLimit, TokenBucketLimiter
+from service.drink.clients import get_client
+from service.drink.config import DrinkSettings
+from service.drink.models.drink_request import DEFAULT_PRIORITY
+
+logger = Logger(child=True)
+
+# Bucket do limitador compartilhado usado para o ritmo de início das execuções (na mesma tabela dos buckets do Bedrock)
+ADMISSION_BUCKET = "admission"
+
+# Rajada máxima do ritmo de admissão, em segundos de reposição (evita iniciar um minuto inteiro de execuções de uma vez)
+ADMISSION_BURST_SECONDS = 10
+
+# Atributos da fila somados no backlog: mensagens à espera, em processamento pelo consumidor e com atraso de entrega
+BACKLOG_ATTRIBUTES = ["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible", "ApproximateNumberOfMessagesDelayed"]
+
+# Prefixo do nome das execuções iniciadas pelo consumidor da fila; o nome traz a faixa para a contagem por faixa
+EXECUTION_NAME_PREFIX = "DrinkRecipe"
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Fila de admissão acima do limite: a solicitação deve ser repetida depois de retry_after_seconds.
+    """
+
+    def __init__(self, backlog: int, retry_after_seconds: int):
+        super().__init__(f"Admission backlog of {backlog} requests is over the limit, retry after {retry_after_seconds}s")
+        self.backlog = backlog
+        self.retry_after_seconds = retry_after_seconds
+
+
+def admission_rate_per_minute(settings: DrinkSettings) -> float:
+    """
+    Calcula quantas execuções podem ser iniciadas por minuto sem exceder as cotas do Bedrock.
+
+    Cada receita faz uma chamada ao modelo de texto e uma ou duas ao de imagem (prévia e versão final); o ritmo é o
+    do modelo mais restrito, com a margem de utilização configurada. Acertos de cache não chamam o Bedrock, então o
+    valor é conservador.
+
+    Args:
+        settings: Configurações tipadas dos handlers
+
+    Returns:
+        float: Execuções por minuto
+    """
+    admission = settings.admission
+    if admission.executions_per_minute:
+        return admission.executions_per_minute
+
+    bedrock = settings.bedrock
+    calls_per_recipe = {bedrock.text_model_id: 1, bedrock.image_model_id: 2 if settings.features.image_two_phase else 1}
+    rates = [bedrock.quotas[model_id].requests_per_minute / calls for model_id, calls in calls_per_recipe.items() if model_id in bedrock.quotas]
+    return max(1.0, min(rates, default=60.0) * admission.quota_utilization)
+
+
+class AdmissionQueue:
+    """
+    Fila (SQS) de uma faixa de prioridade com as solicitações aceitas pela API, consumida no ritmo que o Bedrock suporta.
+
+    O tamanho da fila é consultado no máximo uma vez por intervalo de cache no container, já que ele é apenas
+    aproximado no SQS; as mensagens enviadas desde a última consulta são somadas ao valor em cache.
+    """
+
+    def __init__(self, queue_url: Optional[str], sqs_client=None, backlog_cache_seconds: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.queue_url = queue_url
+        self._client = sqs_client
+        self.backlog_cache_seconds = backlog_cache_seconds
+        self.clock = clock
+        self._backlog = None
+        self._backlog_read_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # O cliente é resolvido apenas no primeiro uso
+        if self._client is None:
+            self._client = get_client("sqs")
+        return self._client
+
+    def backlog(self) -> int:
+        """
+        Retorna o número aproximado de solicitações na fila.
+        """
+        with self._lock:
+            if self._backlog is None or self.clock() - self._backlog_read_at >= self.backlog_cache_seconds:
+                attributes = self.client.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=BACKLOG_ATTRIBUTES)["Attributes"]
+                self._backlog = sum(int(attributes.get(name, 0)) for name in BACKLOG_ATTRIBUTES)
+                self._backlog_read_at = self.clock()
+            return self._backlog
+
+    def ensure_capacity(self, max_backlog: int, rate_per_minute: float, count: int = 1) -> int:
+        """
+        Verifica se a fila comporta mais solicitações.
+
+        Args:
+            max_backlog: Tamanho máximo da fila
+            rate_per_minute: Ritmo de consumo da fila (para estimar o Retry-After)
+            count: Quantidade de solicitações que serão enviadas
+
+        Returns:
+            int: Tamanho atual da fila
+
+        Raises:
+            AdmissionRejectedError: Quando a fila passaria do limite
+        """
+        backlog = self.backlog()
+        excess = backlog + count - max_backlog
+        if excess > 0:
+            # Tempo para o consumidor abrir espaço para as solicitações, limitado a um minuto
+            raise AdmissionRejectedError(backlog, min(60, max(1, math.ceil(excess * 60 / rate_per_minute))))
+        return backlog
+
+    def enqueue(self, recipe_id: str, execution_input: str) -> None:
+        """
+        Envia o input da execução para a fila.
+
+        Args:
+            recipe_id: ID da receita
+            execution_input: JSON do input da execução
+        """
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=execution_input)
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog += 1
+        logger.info(f"Drink recipe {recipe_id} queued for admission")
+
+
+def lane_rate_per_minute(settings: DrinkSettings, lane: str) -> float:
+    """
+    Ritmo garantido de uma faixa quando todas as faixas têm solicitações à espera (parte do ritmo total pelo peso).
+
+    Args:
+        settings: Configurações tipadas dos handlers
+        lane: Faixa de prioridade
+
+    Returns:
+        float: Execuções por minuto
+    """
+    lanes = settings.admission.lanes
+    return admission_rate_per_minute(settings) * lanes[lane].weight / sum(lane_settings.weight for lane_settings in lanes.values())
+
+
+def execution_name(recipe_id: str, lane: str) -> str:
+    """
+    Nome da execução de uma solicitação da fila (determinístico, para que uma mensagem repetida não inicie outra execução).
+    """
+    return f"{EXECUTION_NAME_PREFIX}-{lane}-{recipe_id}"
+
+
+def execution_lane(name: str, lanes: Iterable[str]) -> str:
+    """
+    Faixa de uma execução pelo nome; execuções iniciadas diretamente pela API (sem a fila) contam na faixa padrão.
+    """
+    parts = name.split("-", 2)
+    return parts[1] if len(parts) == 3 and parts[0] == EXECUTION_NAME_PREFIX and parts[1] in lanes else DEFAULT_PRIORITY
+
+
+def count_running_executions(sfn_client, state_machine_arn: str, lanes: Iterable[str], limit: int) -> Dict[str, int]:
+    """
+    Conta as execuções em andamento da máquina de estado por faixa, parando ao atingir o limite global.
+
+    Args:
+        sfn_client: Cliente do Step Functions
+        state_machine_arn: ARN da máquina de estado padrão
+        lanes: Faixas de prioridade
+        limit: Contagem total a partir da qual não é preciso continuar paginando
+
+    Returns:
+        Dict[str, int]: Execuções em andamento por faixa
+    """
+    lanes = list(lanes)
+    running = dict.fromkeys(lanes, 0)
+    kwargs = {"stateMachineArn": state_machine_arn, "statusFilter": "RUNNING", "maxResults": 1000}
+    while True:
+        page = sfn_client.list_executions(**kwargs)
+        for execution in page.get("executions", []):
+            lane = execution_lane(execution["name"], lanes)
+            running[lane] = running.get(lane, 0) + 1
+        if sum(running.values()) >= limit or not page.get("nextToken"):
+            return running
+        kwargs["nextToken"] = page["nextToken"]
+
+
+class ExecutionAdmitter:
+    """
+    Decide quando o consumidor da fila pode iniciar a próxima execução.
+
+    O ritmo vem de um token bucket compartilhado (TokenBucketLimiter), para que o limite valha também entre
+    invocações do consumidor; a vaga de cada faixa (peso e execuções em andamento) é decidida pelo escalonador.
+    """
+
+    def __init__(self, limiter: Optional[TokenBucketLimiter], clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        self.limiter = limiter
+        self.clock = clock
+        self.sleep = sleep
+
+    @classmethod
+    def for_rate(cls, table, rate_per_minute: float, **kwargs) -> "ExecutionAdmitter":
+        """
+        Cria o controle com o token bucket de admissão na tabela do limitador (sem ritmo quando não há tabela).
+        """
+        limiter = None
+        if table is not None:
+            limit = BucketLimit(capacity=max(1.0, rate_per_minute * ADMISSION_BURST_SECONDS / 60), refill_per_second=rate_per_minute / 60)
+            limiter = TokenBucketLimiter(table, {ADMISSION_BUCKET: {"executions": limit}}, clock=kwargs.get("clock", time.time))
+        return cls(limiter, **kwargs)
+
+    def wait_for_capacity(self, deadline: float) -> Optional[float]:
+        """
+        Aguarda até que uma execução possa ser iniciada e reserva a vaga.
+
+        Args:
+            deadline: Instante (no relógio do controle) a partir do qual não se deve mais aguardar
+
+        Returns:
+            float | None: None quando a vaga foi reservada; caso contrário, a espera estimada que passaria do prazo
+        """
+        while self.limiter is not None:
+            wait = self.limiter.try_acquire(ADMISSION_BUCKET, {"executions": 1})
+            if wait <= 0:
+                return None
+            if self.clock() + wait > deadline:
+                return wait
+            self.sleep(wait)
+        return None
+
+    def release(self) -> None:
+        """
+        Devolve a vaga reservada por wait_for_capacity para uma execução que não pôde ser iniciada.
+        """
+        if self.limiter is not None:
+            self.limiter.release(ADMISSION_BUCKET, {"executions": 1})
+
+
+def parse_queued_execution(body: str) -> dict:
+    """
+    Lê o input da execução de uma mensagem da fila de admissão.
+    """
+    execution_input = json.loads(body)
+    if not isinstance(execution_input, dict) or "recipe_id" not in execution_input:
+        raise ValueError("Queued message is not a drink recipe execution input")
+    return execution_input
+
+
+def release_messages(sqs_client, queue_url: str, receipt_handles: List[str], delay_seconds: float = 0) -> None:
+    """
+    Devolve à fila as mensagens recebidas e não iniciadas, visíveis de novo após delay_seconds (em vez do visibility timeout).
+
+    Args:
+        sqs_client: Cliente do SQS
+        queue_url: URL da fila da faixa
+        receipt_handles: Recibos das mensagens devolvidas à fila
+        delay_seconds: Espera até que as mensagens possam ser recebidas de novo
+    """
+    visibility = min(43200, max(0, math.ceil(delay_seconds)))
+    for start in range(0, len(receipt_handles), 10):
+        end = start + 10
+        batch = receipt_handles[start:end]
+        entries = [{"Id": str(index), "ReceiptHandle": receipt_handle, "VisibilityTimeout": visibility} for index, receipt_handle in enumerate(batch)]
+        sqs_client.change_message_visibility_batch(QueueUrl=queue_url, Entries=entries)
@@ -0,0 +1,126 @@
+import json
+import os
+from typing import Optional
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import MetricUnit
+from aws_lambda_powertools.middleware_factory import lambda_handler_decorator
+from service.drink.clients import get_client
+from service.drink.metrics import metrics, timed
+
+logger = Logger(child=True)
+
+# Bucket dos payloads retirados do evento e tamanho (JSON, em bytes) a partir do qual um campo é retirado.
+# O Step Functions limita o estado a 256 KB; o limite por campo deixa folga para o restante do evento
+CLAIM_CHECK_BUCKET = os.environ.get("RECIPES_BUCKET")
+PAYLOAD_OFFLOAD_THRESHOLD_BYTES = int(os.environ.get("PAYLOAD_OFFLOAD_THRESHOLD_BYTES", "32768"))
+
+# Chave que identifica um campo substituído pela referência ao objeto no S3
+CLAIM_CHECK_KEY = "claim_check"
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def is_claim_check(value) -> bool:
+    """
+    Indica se o valor é uma referência a um campo retirado do evento.
+    """
+    return isinstance(value, dict) and value.keys() == {CLAIM_CHECK_KEY}
+
+
+def offload_large_fields(payload: dict, key_prefix: str, threshold_bytes: int = None, s3_client=None, bucket: Optional[str] = None) -> dict:
+    """
+    Substitui os campos grandes do evento por referências a objetos no S3 (padrão claim-check).
+
+    Dicionários são percorridos antes de serem retirados por inteiro, para que campos pequenos lidos pela
+    máquina de estado (como recipe.s3_key) continuem no evento; apenas o que ainda exceder o limite é gravado no S3.
+
+    Args:
+        payload: Evento (alterado no próprio objeto)
+        key_prefix: Prefixo das chaves no bucket (por exemplo, recipes/{recipe_id}/payloads)
+        threshold_bytes: Tamanho máximo de um campo no evento
+        s3_client: Cliente do S3
+        bucket: Bucket dos payloads
+
+    Returns:
+        dict: O mesmo evento, com os campos grandes substituídos
+    """
+    threshold_bytes = PAYLOAD_OFFLOAD_THRESHOLD_BYTES if threshold_bytes is None else threshold_bytes
+    for name, value in payload.items():
+        if is_claim_check(value) or _json_size(value) <= threshold_bytes:
+            continue
+        if isinstance(value, dict):
+            offload_large_fields(value, f"{key_prefix}/{name}", threshold_bytes, s3_client, bucket)
+            if _json_size(value) <= threshold_bytes:
+                continue
+
+        s3_key = f"{key_prefix}/{name}.json"
+        body = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        with timed("S3PutDuration"):
+            (s3_client or get_client("s3")).put_object(Bucket=bucket or CLAIM_CHECK_BUCKET, Key=s3_key, Body=body, ContentType="application/json")
+        metrics.add_metric(name="ClaimCheckOffloadSize", unit=MetricUnit.Bytes, value=len(body))
+        payload[name] = {CLAIM_CHECK_KEY: {"s3_key": s3_key, "size_bytes": len(body)}}
+        logger.info(f"Offloaded event field {name} ({len(body)} bytes) to S3: {s3_key}")
+    return payload
+
+
+def resolve_claim_checks(value, s3_client=None, bucket: Optional[str] = None):
+    """
+    Substitui as referências de claim-check pelos valores gravados no S3, em qualquer nível do valor.
+
+    Args:
+        value: Campo do evento (possivelmente uma referência ou um dicionário com referências)
+        s3_client: Cliente do S3
+        bucket: Bucket dos payloads
+
+    Returns:
+        Valor original
+    """
+    if is_claim_check(value):
+        response = (s3_client or get_client("s3")).get_object(Bucket=bucket or CLAIM_CHECK_BUCKET, Key=value[CLAIM_CHECK_KEY]["s3_key"])
+        return json.loads(response["Body"].read())
+    if isinstance(value, dict):
+        return {name: resolve_claim_checks(item, s3_client, bucket) for name, item in value.items()}
+    return value
+
+
+@lambda_handler_decorator
+def claim_check(handler, event: dict, context, resolve_fields=("request",)):
+    """
+    Middleware dos handlers da máquina de estado: resolve os campos de entrada indicados e, na saída,
+    retira do evento os campos acima do limite de tamanho.
+
+    Campos não listados em resolve_fields (como o texto da receita) continuam como referências e são
+    lidos pelo handler apenas quando necessários.
+    """
+    for field in resolve_fields:
+        if field in event:
+            event[field] = resolve_claim_checks(event[field])
+
+    result = handler(event, context)
+
+    if isinstance(result, dict) and result.get("recipe_id"):
+        offload_large_fields(result, f"recipes/{result['recipe_id']}/payloads")
+    return result
+
+
+def load_recipe_text(recipe: dict, s3_client=None, bucket: Optional[str] = None) -> str:
+    """
+    Lê o texto da receita do S3 a partir da chave no evento (o texto não trafega entre os estados).
+
+    Args:
+        recipe: Dados da receita no evento (s3_key e, em execuções antigas, o próprio texto)
+        s3_client: Cliente do S3
+        bucket: Bucket das receitas
+
+    Returns:
+        str: Texto da receita (vazio quando não há receita no evento)
+    """
+    if "text" in recipe:
+        return resolve_claim_checks(recipe["text"], s3_client, bucket)
+    if not recipe.get("s3_key"):
+        return ""
+    response = (s3_client or get_client("s3")).get_object(Bucket=bucket or CLAIM_CHECK_BUCKET, Key=recipe["s3_key"])
+    return response["Body"].read().decode("utf-8")
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+from service.drink.clients import get_table
+
+logger = Logger(child=True)
+
+# Tabela das receitas atualizada pelos estados MarkRecipeCompleted/MarkRecipeFailed (será definida via variável de ambiente)
+DRINK_RECIPES_TABLE = os.environ.get("DRINK_RECIPES_TABLE")
+
+# Atributos gravados no item da receita ao concluí-la (atributo do item -> campo da receita no evento); a mesma lista
+# monta o estado MarkRecipeCompleted da máquina de estado, para que os dois modos de implantação gravem o mesmo item
+COMPLETED_RECIPE_FIELDS = {"recipe_s3_key": "s3_key", "image_s3_key": "image_s3_key"}
+
+# Threads usadas para executar os handlers (as chamadas ao boto3 e ao Bedrock são bloqueantes)
+WORKFLOW_MAX_WORKERS = int(os.environ.get("WORKFLOW_MAX_WORKERS", "64"))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Repetição de um estado da máquina de estado (Retry): erros repetidos, intervalo inicial, backoff e jitter FULL.
+
+    Como no Step Functions, max_attempts conta apenas as repetições (a primeira tentativa não entra na conta) e
+    "States.ALL" repete qualquer erro.
+    """
+
+    errors: Tuple[str, ...] = ("BedrockOverloadedError",)
+    interval_seconds: float = 5.0
+    backoff_rate: float = 2.0
+    max_attempts: int = 6
+    jitter: bool = True
+
+    def matches(self, error: Exception) -> bool:
+        return "States.ALL" in self.errors or type(error).__name__ in self.errors
+
+    def delay(self, retry_number: int, rng: random.Random) -> float:
+        """
+        Espera antes da repetição de número retry_number (a partir de 1).
+        """
+        base = self.interval_seconds * self.backoff_rate ** (retry_number - 1)
+        return rng.uniform(0, base) if self.jitter else base
+
+
+@dataclass
+class LocalLambdaContext:
+    """
+    Contexto entregue aos handlers fora do Lambda (os campos lidos pelo Powertools).
+    """
+
+    function_name: str
+    memory_limit_in_mb: int = 1024
+    invoked_function_arn: str = "arn:aws:lambda:us-east-1:000000000000:function:local"
+    aws_request_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    timeout_seconds: float = 300.0
+
+    def __post_init__(self):
+        self._deadline = time.monotonic() + self.timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+@dataclass
+class ExecutionResult:
+    """
+    Resultado de uma execução: status, saída (ou erro no formato do Catch) e tempos por etapa.
+    """
+
+    recipe_id: Optional[str]
+    status: str = "RUNNING"
+    output: Optional[dict] = None
+    error: Optional[dict] = None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    retries: Dict[str, int] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+
+
+class StageFailedError(Exception):
+    """
+    Falha de uma etapa depois de esgotadas as repetições.
+    """
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage} failed: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+
+    def to_state_error(self) -> dict:
+        # Mesmo formato que o Catch da máquina de estado grava em $.error
+        return {"Error": type(self.error).__name__, "Cause": str(self.error)}
+
+
+def default_handlers() -> Dict[str, Callable]:
+    """
+    Retorna os handlers das etapas do fluxo, importados apenas quando usados (as variáveis de ambiente
+    lidas por eles na importação já precisam estar definidas).
+    """
+    from service.drink.handlers import (
+        handle_generate_recipe_image,
+        handle_generate_recipe_text,
+        handle_persist_initial_request,
+        handle_send_notification,
+    )
+
+    return {
+        "persist": handle_persist_initial_request.lambda_handler,
+        "text": handle_generate_recipe_text.lambda_handler,
+        "image": handle_generate_recipe_image.lambda_handler,
+        "notification": handle_send_notification.lambda_handler,
+    }
+
+
+class InProcessWorkflow:
+    """
+    Executa o fluxo da máquina de estado padrão no próprio processo, com asyncio, para testes de carga locais,
+    profiling e o modo de implantação em uma única Lambda.
+
+    Cada etapa recebe e devolve o mesmo evento JSON dos estados do Step Functions (o evento é serializado entre
+    as etapas, como no serviço), e a ordem dos estados é a mesma da definição:
+
+    PersistInitialRequest -> Parallel(GenerateRecipeText, GenerateRecipeImage draft) -> MarkRecipeCompleted
+    -> RenderFullQualityImage -> SendNotification
+
+    O ramo paralelo combina as saídas como o ResultSelector (JsonMerge raso das receitas) e, quando um ramo
+    falha, os demais deixam de ser aguardados, a receita é marcada como FAILED e a execução falha (Catch). As
+    etapas de geração seguem a política de repetição; uma falha na versão final da imagem mantém a prévia, que
+    segue para a notificação.
+    Os handlers rodam em um pool de threads, portanto o estado de módulo deles (caches, clientes) é compartilhado
+    entre as execuções, como em um único container que recebesse várias invocações ao mesmo tempo.
+    """
+
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, Callable]] = None,
+        recipes_table: Optional[str] = None,
+        retry_policy: RetryPolicy = RetryPolicy(),
+        send_notification: bool = True,
+        render_full_image: bool = True,
+        max_workers: int = WORKFLOW_MAX_WORKERS,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        self.handlers = handlers
+        self.recipes_table = recipes_table or DRINK_RECIPES_TABLE
+        self.retry_policy = retry_policy
+        self.send_notification = send_notification
+        self.render_full_image = render_full_image
+        self.max_workers = max_workers
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow")
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, execution_input) -> ExecutionResult:
+        """
+        Executa o fluxo para um input no formato do StartExecution.
+
+        Args:
+            execution_input: Input da execução (JSON ou dicionário com recipe_id, timestamp e request)
+
+        Returns:
+            ExecutionResult: SUCCEEDED com a saída final, ou FAILED com o erro
+        """
+        if self.handlers is None:
+            self.handlers = default_handlers()
+        state = json.loads(execution_input if isinstance(execution_input, str) else json.dumps(execution_input))
+        result = ExecutionResult(recipe_id=state.get("recipe_id"))
+        started = time.perf_counter()
+
+        try:
+            state = await self._invoke("persist", state, result, retry=False)
+
+            try:
+                draft_payload = {**self._image_payload(state), "image_profile": "draft"}
+                text_state, image_state = await self._parallel(result, [("text", state), ("image", draft_payload)])
+            except StageFailedError as failure:
+                result.error = failure.to_state_error()
+                await self._update_status(state["recipe_id"], "FAILED", result)
+                raise
+
+            state = {
+                "recipe_id": text_state["recipe_id"],
+                "timestamp": text_state["timestamp"],
+                "request": text_state["request"],
+                "recipe": {**text_state["recipe"], **image_state["recipe"]},
+            }
+
+            await self._update_status(state["recipe_id"], "COMPLETED", result, state["recipe"])
+
+            if self.render_full_image:
+                try:
+                    full_payload = {**self._image_payload(state), "recipe": state["recipe"], "image_profile": "full"}
+                    state = await self._invoke("full_image", full_payload, result, handler=self.handlers["image"])
+                except StageFailedError as failure:
+                    # A notificação segue com a prévia (Catch com ResultPath $.error)
+                    logger.exception(f"Full quality image failed for recipe {state['recipe_id']}, keeping draft image")
+                    state = {**state, "error": failure.to_state_error()}
+
+            if self.send_notification:
+                state = await self._invoke("notification", state, result, retry=False)
+
+            result.status = "SUCCEEDED"
+            result.output = state
+        except StageFailedError as failure:
+            result.status = "FAILED"
+            result.error = result.error or failure.to_state_error()
+        finally:
+            result.duration_seconds = time.perf_counter() - started
+        return result
+
+    async def run_many(self, execution_inputs: Iterable, concurrency: int = 64) -> List[ExecutionResult]:
+        """
+        Executa vários fluxos com no máximo `concurrency` execuções simultâneas.
+
+        Args:
+            execution_inputs: Inputs das execuções
+            concurrency: Execuções em andamento ao mesmo tempo
+
+        Returns:
+            list: Resultados, na ordem dos inputs
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(execution_input):
+            async with semaphore:
+                return await self.run(execution_input)
+
+        return await asyncio.gather(*(run_one(execution_input) for execution_input in execution_inputs))
+
+    def execute(self, execution_input) -> ExecutionResult:
+        """
+        Versão síncrona de run (por exemplo, para o handler da Lambda única).
+        """
+        return asyncio.run(self.run(execution_input))
+
+    @staticmethod
+    def _image_payload(state: dict) -> dict:
+        return {"recipe_id": state["recipe_id"], "timestamp": state["timestamp"], "request": state["request"]}
+
+    async def _invoke(self, stage: str, payload: dict, result: ExecutionResult, handler: Optional[Callable] = None, retry: bool = True) -> dict:
+        handler = handler or self.handlers[stage]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        retries = 0
+
+        try:
+            while True:
+                # O evento passa por JSON a cada etapa, como no Step Functions (o handler não recebe objetos compartilhados)
+                event = json.loads(json.dumps(payload))
+                context = LocalLambdaContext(function_name=f"local-{stage}")
+                try:
+                    output = await loop.run_in_executor(self._get_executor(), handler, event, context)
+                    return json.loads(json.dumps(output))
+                except Exception as error:
+                    if not retry or not self.retry_policy.matches(error) or retries >= self.retry_policy.max_attempts:
+                        raise StageFailedError(stage, error) from error
+                    retries += 1
+                    await self.sleep(self.retry_policy.delay(retries, self.rng))
+        finally:
+            result.stage_seconds[stage] = time.perf_counter() - started
+            result.retries[stage] = retries
+
+    async def _parallel(self, result: ExecutionResult, branches: List[Tuple[str, dict]]) -> List[dict]:
+        tasks = [asyncio.ensure_future(self._invoke(stage, payload, result)) for stage, payload in branches]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+
+        # Como no estado Parallel, a falha de um ramo encerra os demais (a thread em andamento termina sozinha)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in tasks:
+            if task in done and task.exception():
+                raise task.exception()
+        return [task.result() for task in tasks]
+
+    async def _update_status(self, recipe_id: str, status: str, result: ExecutionResult, recipe: Optional[dict] = None) -> None:
+        if not self.recipes_table:
+            return
+
+        update_expression, values = "SET #status = :status", {":status": status}
+        if recipe is not None:
+            update_expression += "".join(f", {attribute} = :{attribute}" for attribute in COMPLETED_RECIPE_FIELDS)
+            values.update({f":{attribute}": recipe[field] for attribute, field in COMPLETED_RECIPE_FIELDS.items()})
+
+        def update(event, context):
+            get_table(self.recipes_table).update_item(
+                Key={"recipe_id": recipe_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues=values,
+            )
+
+        # Como nos estados DynamoUpdateItem, uma falha aqui falha a execução (sem repetição)
+        await self._invoke("mark_completed" if status == "COMPLETED" else "mark_failed", {}, result, handler=update, retry=False)
@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from service.drink.config import LaneSettings
+
+
+@dataclass(order=True)
+class PendingRequest:
+    """
+    Solicitação à espera em uma faixa do escalonador.
+    """
+
+    enqueued_at: float
+    sequence: int
+    lane: str = field(compare=False)
+    item: Any = field(compare=False)
+
+    def wait_seconds(self, now: float) -> float:
+        return max(0.0, now - self.enqueued_at)
+
+
+class WeightedFairScheduler:
+    """
+    Escolhe a próxima solicitação a ser iniciada entre as faixas de prioridade (start-time fair queueing).
+
+    Cada faixa tem um tempo virtual que avança 1/peso a cada solicitação iniciada; a faixa elegível com o menor tempo
+    virtual é a próxima, então, com todas as faixas ocupadas, o ritmo é dividido na proporção dos pesos, e a parte de
+    uma faixa sem demanda fica com as demais. Uma faixa que volta a ter solicitações (ou que estava no limite de
+    execuções em andamento) começa no tempo virtual do sistema, sem acumular crédito pelo tempo parada.
+
+    Uma faixa é elegível quando tem solicitações e está abaixo dos limites de execuções em andamento (da faixa e
+    global). A proteção contra inanição atende primeiro a faixa cuja solicitação mais antiga passou de
+    max_wait_seconds (a mais atrasada em proporção ao prazo, quando há várias).
+    """
+
+    def __init__(self, lanes: Dict[str, LaneSettings], max_in_flight: Optional[int] = None, clock: Callable[[], float] = time.time):
+        self.lanes = lanes
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self._pending: Dict[str, List[PendingRequest]] = {lane: [] for lane in lanes}
+        self._virtual_start = {lane: 0.0 for lane in lanes}
+        self._system_virtual_time = 0.0
+        self._sequence = itertools.count()
+
+    def add(self, lane: str, item: Any, enqueued_at: float) -> None:
+        """
+        Adiciona uma solicitação à faixa; dentro da faixa, as solicitações são atendidas da mais antiga para a mais nova.
+
+        Args:
+            lane: Faixa de prioridade
+            item: Solicitação (por exemplo, a mensagem da fila)
+            enqueued_at: Instante em que a solicitação entrou na fila
+        """
+        if not self._pending[lane]:
+            self._virtual_start[lane] = max(self._virtual_start[lane], self._system_virtual_time)
+        heapq.heappush(self._pending[lane], PendingRequest(enqueued_at, next(self._sequence), lane, item))
+
+    def depth(self, lane: str) -> int:
+        return len(self._pending[lane])
+
+    def oldest_wait(self, lane: str) -> Optional[float]:
+        """
+        Espera, em segundos, da solicitação mais antiga da faixa (None quando a faixa está vazia).
+        """
+        pending = self._pending[lane]
+        return pending[0].wait_seconds(self.clock()) if pending else None
+
+    def _eligible(self, in_flight: Optional[Dict[str, int]]) -> List[str]:
+        lanes = [lane for lane, pending in self._pending.items() if pending]
+        if in_flight is None:
+            return lanes
+        if self.max_in_flight and sum(in_flight.values()) >= self.max_in_flight:
+            return []
+        return [lane for lane in lanes if in_flight.get(lane, 0) < self.lanes[lane].max_in_flight]
+
+    def ready(self, in_flight: Optional[Dict[str, int]] = None) -> bool:
+        """
+        Indica se alguma solicitação pode ser iniciada com as execuções em andamento informadas.
+        """
+        return bool(self._eligible(in_flight))
+
+    def next(self, in_flight: Optional[Dict[str, int]] = None) -> Optional[PendingRequest]:
+        """
+        Retira a próxima solicitação a ser iniciada.
+
+        Args:
+            in_flight: Execuções em andamento por faixa (None quando não há como contá-las; os limites são ignorados)
+
+        Returns:
+            PendingRequest | None: Solicitação escolhida, ou None quando nenhuma faixa é elegível
+        """
+        eligible = self._eligible(in_flight)
+        if not eligible:
+            return None
+
+        now = self.clock()
+        overdue = [lane for lane in eligible if self._pending[lane][0].wait_seconds(now) >= self.lanes[lane].max_wait_seconds]
+        if overdue:
+            lane = max(overdue, key=lambda name: self._pending[name][0].wait_seconds(now) / self.lanes[name].max_wait_seconds)
+        else:
+            lane = min(eligible, key=lambda name: (self._virtual_start[name], -self.lanes[name].weight))
+
+        self._system_virtual_time = max(self._system_virtual_time, self._virtual_start[lane])
+        self._virtual_start[lane] += 1 / self.lanes[lane].weight
+        # Faixas bloqueadas pelo limite de execuções não acumulam crédito enquanto esperam
+        for name, pending in self._pending.items():
+            if pending and name not in eligible:
+                self._virtual_start[name] = max(self._virtual_start[name], self._system_virtual_time)
+        return heapq.heappop(self._pending[lane])
+
+    def drain(self) -> List[PendingRequest]:
+        """
+        Retira todas as solicitações à espera (para devolvê-las à fila).
+        """
+        pending = [request for requests in self._pending.values() for request in requests]
+        for lane in self._pending:
+            self._pending[lane] = []
+        return pending
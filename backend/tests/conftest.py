@@ -2,6 +2,17 @@
 Configuração global para testes pytest.
 """
 
+import pytest
+
+
+def pytest_addoption(parser):
+    """
+    Adiciona as opções dos benchmarks (lentos e dependentes da máquina, fora da execução padrão) e do diretório
+    onde os resultados são gravados.
+    """
+    parser.addoption("--run-benchmarks", action="store_true", default=False, help="executa os testes marcados como benchmark")
+    parser.addoption("--benchmark-output", default=".benchmarks", help="diretório dos resultados JSON dos benchmarks (um subdiretório por commit)")
+
 
 def pytest_configure(config):
     """
@@ -10,3 +21,16 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "unit: marca testes de unidade")
     config.addinivalue_line("markers", "integration: marca testes de integração")
     config.addinivalue_line("markers", "e2e: marca testes end-to-end")
+    config.addinivalue_line("markers", "benchmark: marca benchmarks de desempenho (executados apenas com --run-benchmarks)")
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Ignora os benchmarks, a menos que a opção --run-benchmarks seja informada.
+    """
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmark: use --run-benchmarks para executar")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
@@ -0,0 +1,69 @@
+import json
+import os
+import platform
+import subprocess
+import timeit
+from datetime import datetime
+
+import pytest
+from service.drink.local.environment import configure_local_environment
+
+
+def pytest_configure(config):
+    """
+    Define o ambiente local do fluxo antes da coleta, pois os handlers leem as variáveis de ambiente na importação.
+
+    O rate limiter do Bedrock fica desligado para que as cotas da conta real não limitem a vazão medida.
+    Execute os benchmarks separados dos testes de unidade, que esperam essas variáveis indefinidas.
+    """
+    if config.getoption("--run-benchmarks"):
+        configure_local_environment({"BEDROCK_LIMITER_TABLE": ""})
+
+
+@pytest.fixture
+def measure_throughput():
+    """
+    Mede operações por segundo de uma função (melhor de várias repetições, para reduzir o ruído da máquina).
+    """
+
+    def measure(label: str, operation, number: int, repeat: int = 5, operations_per_call: int = 1) -> float:
+        best = min(timeit.repeat(operation, number=number, repeat=repeat))
+        ops_per_second = number * operations_per_call / best
+        print(f"\n{label:<55} {ops_per_second:>12,.0f} ops/s")
+        return ops_per_second
+
+    return measure
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout
+        return f"{commit}-dirty" if dirty.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@pytest.fixture(scope="session")
+def save_benchmark_results(request):
+    """
+    Grava o resumo de um benchmark em JSON, em <--benchmark-output>/<commit>/<nome>.json, para comparar commits.
+    """
+    directory = os.path.join(request.config.getoption("--benchmark-output"), current_commit())
+
+    def save(name: str, summary: dict) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.json")
+        metadata = {
+            "benchmark": name,
+            "commit": os.path.basename(directory),
+            "recorded_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        }
+        with open(path, "w") as output:
+            json.dump({**metadata, **summary}, output, indent=2)
+        print(f"\n{name}: {json.dumps(summary.get('executions_per_second'))} executions/s -> {path}")
+        return path
+
+    return save
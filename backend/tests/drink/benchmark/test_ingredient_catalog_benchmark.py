@@ -0,0 +1,126 @@
+"""
+Ingredient catalog benchmark: canonicalization and DrinkRequest validation throughput over a large catalog,
+and the duplicate-request detection gained by canonical ingredient IDs.
+
+Run with: pytest tests/drink/benchmark -m benchmark --run-benchmarks -s
+"""
+
+import random
+import string
+import time
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+from service.drink.cache.recipe_cache import build_cache_key
+from service.drink.catalog import ingredient_catalog
+from service.drink.catalog.ingredient_catalog import IngredientCatalog, IngredientEntry
+from service.drink.models.drink_request import DrinkRequest
+
+SYNTHETIC_INGREDIENTS = 50_000
+OPERATIONS = 20_000
+
+# Grafias equivalentes usadas para gerar solicitações repetidas escritas de formas diferentes
+VARIANTS = {
+    "mango": ["mango", "Mango", "manga", "mangoo"],
+    "pineapple": ["pineapple", "abacaxi", "Pineapple ", "pineaple"],
+    "strawberry": ["strawberry", "morango", "strawberries"],
+    "lime": ["lime", "limão", "Limes"],
+    "soda": ["soda", "sparkling water", "club soda", "água com gás"],
+    "coconut water": ["coconut water", "água de coco", "Coconut-Water"],
+    "tonic water": ["tonic water", "tonic", "água tônica"],
+    "simple syrup": ["simple syrup", "sugar syrup", "xarope simples"],
+    "honey": ["honey", "mel", "honey syrup"],
+    "mint": ["mint", "mint leaves", "hortelã", "Hortela", "menta"],
+    "basil": ["basil", "manjericão", "basil leaves"],
+}
+FRUIT, LIQUIDS, SYRUPS, LEAVES = (
+    ["mango", "pineapple", "strawberry", "lime"],
+    ["soda", "coconut water", "tonic water"],
+    ["simple syrup", "honey"],
+    ["mint", "basil"],
+)
+
+
+@pytest.fixture
+def large_catalog(monkeypatch):
+    # Catálogo real mais ingredientes sintéticos, para medir a trie com dezenas de milhares de nomes
+    rng = random.Random(7)
+    bundled = IngredientCatalog.from_file()
+    synthetic = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 14))) for _ in range(SYNTHETIC_INGREDIENTS)}
+    synthetic -= {name for name in synthetic if bundled.lookup(name)}
+    catalog = IngredientCatalog([*bundled.entries.values(), *(IngredientEntry(id=name, category="fruit") for name in sorted(synthetic))])
+    ingredient_catalog.reset_ingredient_catalog()
+    monkeypatch.setattr(ingredient_catalog, "get_ingredient_catalog", lambda: catalog)
+    yield catalog
+    ingredient_catalog._canonicalize_cached.cache_clear()
+
+
+def report(label: str, operations: int, seconds: float) -> None:
+    print(f"\n{label:<45} {operations / seconds:>12,.0f} ops/s")
+
+
+def test_canonicalization_throughput(large_catalog):
+    """Report uncached canonicalization throughput for exact, alias, typo and unknown names."""
+    print(f"\ncatalog names: {len(large_catalog):,}")
+    cases = {"exact id": "pineapple", "alias/translation": "hortelã", "typo (fuzzy)": "pineaple", "unknown (fuzzy miss)": "dragonfruitx"}
+    for label, name in cases.items():
+        count = OPERATIONS if label in ("exact id", "alias/translation") else OPERATIONS // 100
+        started = time.perf_counter()
+        for _ in range(count):
+            large_catalog.canonicalize(name)
+        report(f"canonicalize {label}", count, time.perf_counter() - started)
+
+
+def test_validation_throughput(large_catalog):
+    """Report DrinkRequest validation throughput with canonicalization (cold and warm name cache)."""
+    rng = random.Random(11)
+    payloads = [generate_request(rng) for _ in range(OPERATIONS)]
+
+    ingredient_catalog._canonicalize_cached.cache_clear()
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        for payload in payloads:
+            DrinkRequest.model_validate(payload)
+        report(f"DrinkRequest.model_validate ({label} name cache)", len(payloads), time.perf_counter() - started)
+
+
+def test_duplicate_request_detection(large_catalog):
+    """Report how many repeated requests share a cache key before and after canonicalization."""
+    rng = random.Random(3)
+    base_requests = {}
+    while len(base_requests) < 300:
+        request = generate_request(rng, canonical=True)
+        base_requests[build_cache_key(request)] = request
+
+    stream = [respell(rng.choice(list(base_requests.values())), rng) for _ in range(5000)]
+    raw_keys = {build_cache_key(request) for request in stream}
+    canonical_keys = {build_cache_key(DrinkRequest.model_validate(request).model_dump()) for request in stream}
+    expected_keys = {build_cache_key(DrinkRequest.model_validate(request).model_dump()) for request in base_requests.values()}
+
+    print(f"\nrequests: {len(stream):,}, distinct drinks: {len(base_requests)}")
+    print(f"duplicates detected without catalog: {1 - len(raw_keys) / len(stream):.1%} ({len(raw_keys):,} distinct keys)")
+    print(f"duplicates detected with catalog:    {1 - len(canonical_keys) / len(stream):.1%} ({len(canonical_keys):,} distinct keys)")
+    assert canonical_keys <= expected_keys
+    assert len(canonical_keys) < len(raw_keys)
+
+
+def generate_request(rng: random.Random, canonical: bool = False) -> dict:
+    request = {
+        "customer_name": "Benchmark",
+        "mood": rng.choice(["happy", "sad", "excited", "calm"]),
+        "flavor": rng.choice(["fruity", "citric", "sweet", "bitter", "complex"]),
+        "fruit": rng.sample(FRUIT, rng.randint(1, 2)),
+        "liquids": rng.sample(LIQUIDS, 1),
+        "syrups": rng.sample(SYRUPS, rng.randint(0, 1)),
+        "leaves": rng.sample(LEAVES, rng.randint(0, 1)),
+    }
+    return request if canonical else respell(request, rng)
+
+
+def respell(request: dict, rng: random.Random) -> dict:
+    respelled = dict(request)
+    for field in ("fruit", "liquids", "syrups", "leaves"):
+        respelled[field] = [rng.choice(VARIANTS[name]) for name in rng.sample(request[field], len(request[field]))]
+    return respelled
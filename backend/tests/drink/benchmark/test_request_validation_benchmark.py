@@ -0,0 +1,74 @@
+"""
+DrinkRequest validation and Step Functions input serialization throughput, single and batched.
+
+The legacy path (json.loads, Powertools parse, model_dump and json.dumps) is kept here as the baseline;
+the fast path used by handle_create_drink must stay ahead of it.
+
+Run with: pytest tests/drink/benchmark -m benchmark --run-benchmarks -s
+"""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+from aws_lambda_powertools.utilities.parser import parse
+from service.drink.handlers.handle_create_drink import (
+    DRINK_REQUESTS,
+    build_execution_input,
+)
+from service.drink.models.drink_request import DrinkRequest
+
+NUMBER = 2000
+BATCH_SIZE = 100
+
+REQUEST = {
+    "customer_name": "Maria Silva",
+    "mood": "happy",
+    "flavor": "fruity",
+    "fruit": ["pineapple", "mango"],
+    "liquids": ["coconut water", "soda"],
+    "syrups": ["simple syrup"],
+    "leaves": ["mint"],
+}
+BODY = json.dumps(REQUEST)
+BATCH_BODY = json.dumps([REQUEST] * BATCH_SIZE)
+
+
+def legacy_single():
+    drink_request = parse(event=json.loads(BODY), model=DrinkRequest)
+    return json.dumps({"recipe_id": "recipe-1", "timestamp": "2024-01-01T00:00:00", "request": drink_request.model_dump()})
+
+
+def fast_single():
+    return build_execution_input("recipe-1", "2024-01-01T00:00:00", DrinkRequest.model_validate_json(BODY))
+
+
+def test_single_request_fast_path_beats_legacy_path(measure_throughput):
+    """Report single request validate + serialize throughput for both paths."""
+    assert json.loads(fast_single()) == json.loads(legacy_single())
+
+    legacy = measure_throughput("single: json.loads + parse + model_dump + json.dumps", legacy_single, NUMBER)
+    fast = measure_throughput("single: model_validate_json + model_dump_json", fast_single, NUMBER)
+
+    assert fast > legacy
+
+
+def test_validation_only_throughput(measure_throughput):
+    """Report validation throughput from a dict and from raw JSON."""
+    measure_throughput("validate: model_validate(dict)", lambda: DrinkRequest.model_validate(REQUEST), NUMBER)
+    measure_throughput("validate: model_validate_json(str)", lambda: DrinkRequest.model_validate_json(BODY), NUMBER)
+
+
+def test_batch_throughput(measure_throughput):
+    """Report per-request throughput when validating and serializing a batch body."""
+
+    def per_item():
+        return [build_execution_input("recipe-1", "t", DrinkRequest.model_validate(item)) for item in json.loads(BATCH_BODY)]
+
+    def whole_batch():
+        return [build_execution_input("recipe-1", "t", drink_request) for drink_request in DRINK_REQUESTS.validate_json(BATCH_BODY)]
+
+    measure_throughput(f"batch of {BATCH_SIZE}: json.loads + model_validate per item", per_item, NUMBER // BATCH_SIZE, operations_per_call=BATCH_SIZE)
+    measure_throughput(f"batch of {BATCH_SIZE}: TypeAdapter.validate_json", whole_batch, NUMBER // BATCH_SIZE, operations_per_call=BATCH_SIZE)
@@ -0,0 +1,62 @@
+"""
+Query latency benchmark for the similarity index at 10k, 100k and 1M memory-mapped vectors.
+
+Run with: pytest tests/drink/benchmark -m benchmark --run-benchmarks -s
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+from service.drink.cache.similarity_index import (
+    SIMILARITY_INDEX_DIMENSIONS,
+    SIMILARITY_INDEX_ENTRIES_FILE,
+    SIMILARITY_INDEX_VECTORS_FILE,
+    SimilarityIndex,
+    vectorize_request,
+)
+
+QUERY_COUNT = 200
+CHUNK_SIZE = 100_000
+
+
+def write_random_index(directory, size: int) -> None:
+    # Os vetores são gravados em blocos direto no arquivo .npy, sem manter a matriz inteira em memória
+    rng = np.random.default_rng(42)
+    vectors = np.lib.format.open_memmap(
+        str(directory / SIMILARITY_INDEX_VECTORS_FILE), mode="w+", dtype=np.float32, shape=(size, SIMILARITY_INDEX_DIMENSIONS)
+    )
+    for start in range(0, size, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, size)
+        chunk = rng.standard_normal((end - start, SIMILARITY_INDEX_DIMENSIONS), dtype=np.float32)
+        vectors[start:end] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    vectors.flush()
+    del vectors
+    entries = ",".join(f'{{"recipe_id":"r{position}","s3_key":"recipes/r{position}/recipe.txt"}}' for position in range(size))
+    (directory / SIMILARITY_INDEX_ENTRIES_FILE).write_text(f"[{entries}]")
+
+
+@pytest.mark.parametrize("size", [10_000, 100_000, 1_000_000])
+def test_query_latency(tmp_path, size):
+    """Report p50/p99 top-5 query latency over a memory-mapped index."""
+    write_random_index(tmp_path, size)
+    index = SimilarityIndex.load(str(tmp_path), mmap=True)
+    queries = [
+        vectorize_request({"mood": "happy", "flavor": "fruity", "fruit": [f"fruit-{position}"], "liquids": ["soda"]})
+        for position in range(QUERY_COUNT)
+    ]
+
+    index.query(queries[0], top_k=5)  # Primeira consulta carrega as páginas do arquivo (como no cold start)
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        matches = index.query(query, top_k=5)
+        latencies.append(time.perf_counter() - started)
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"\nsimilarity index size={size:>9,} p50={p50:8.2f} ms p99={p99:8.2f} ms qps={QUERY_COUNT / sum(latencies):8.1f}")
+    assert len(matches) == 5
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
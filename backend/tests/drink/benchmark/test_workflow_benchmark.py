@@ -0,0 +1,149 @@
+"""
+End-to-end pipeline benchmark, fully offline: all five handlers (create, persist, text, image and notification) run
+against moto S3/DynamoDB/Secrets Manager/Step Functions, a fake Bedrock and a fake SendGrid with log-normal latencies
+and configurable throttling, driven by the in-process workflow runner.
+
+Each scenario reports p50/p95/p99 per stage and end to end, throughput at N concurrent executions and peak memory,
+and is saved as JSON under --benchmark-output/<commit>/ so runs can be diffed across commits.
+
+Run on its own (the handlers read the local environment at import):
+    pytest tests/drink/benchmark/test_workflow_benchmark.py -m benchmark --run-benchmarks -s
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import resource
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.environment import local_aws_services
+from service.drink.local.latency import LatencyDistribution
+from service.drink.local.report import summarize_executions
+from service.drink.local.run_workflow import generate_drink_requests
+from service.drink.local.sendgrid import FakeSendGridClient
+from service.drink.workflow.runner import (
+    InProcessWorkflow,
+    LocalLambdaContext,
+    RetryPolicy,
+)
+
+EXECUTIONS = 48
+
+# Latências dos serviços externos em segundos (mediana e p99), reduzidas em relação às reais para a rodada
+# caber em poucos segundos sem deixar de sobrepor as etapas
+TEXT_LATENCY = (0.20, 0.80)
+IMAGE_LATENCY = (0.15, 0.60)
+EMAIL_LATENCY = (0.02, 0.10)
+
+# Solicitações distintas entre todos os cenários: os handlers mantêm caches de módulo (como um container aquecido),
+# e uma receita em cache de um cenário anterior apontaria para um objeto do moto que já não existe
+DRINK_REQUESTS = iter(generate_drink_requests(480, random.Random(1)))
+
+
+def create_fakes(throttle_rate: float = 0.0, seed: int = 1):
+    text_latency, image_latency = LatencyDistribution(*TEXT_LATENCY, seed=seed), LatencyDistribution(*IMAGE_LATENCY, seed=seed + 1)
+
+    def model_latency(model_id):
+        return image_latency.sample() if model_id.startswith("stability.") else text_latency.sample()
+
+    bedrock = FakeBedrockRuntime(latency_seconds=model_latency, throttle_rate=throttle_rate, seed=seed)
+    sendgrid = FakeSendGridClient(latency_seconds=LatencyDistribution(*EMAIL_LATENCY, seed=seed + 2), throttle_rate=throttle_rate, seed=seed)
+    return bedrock, sendgrid
+
+
+def run_pipeline(services, executions: int, concurrency: int) -> dict:
+    """
+    Envia solicitações distintas pelo handler de criação (API Gateway) e executa o fluxo com o input gravado na execução.
+    """
+    from service.drink.handlers import handle_create_drink
+
+    workflow = InProcessWorkflow(retry_policy=RetryPolicy(interval_seconds=0.05), max_workers=max(concurrency * 2, 4))
+    # O resolver do Powertools guarda o evento atual na instância; como um container Lambda, atende uma requisição por vez
+    create_lock = threading.Lock()
+
+    def create(request):
+        event = {
+            "httpMethod": "POST",
+            "path": "/drink",
+            "headers": {},
+            "requestContext": {},
+            "queryStringParameters": None,
+            "body": json.dumps(request),
+        }
+        with create_lock:
+            response = handle_create_drink.lambda_handler(event, LocalLambdaContext(function_name="local-create"))
+        return json.loads(response["body"])["body"]["recipe_id"]
+
+    async def run_one(semaphore, request):
+        async with semaphore:
+            started = time.perf_counter()
+            recipe_id = await asyncio.get_running_loop().run_in_executor(workflow._get_executor(), create, request)
+            create_seconds = time.perf_counter() - started
+            result = await workflow.run(services.execution_input(recipe_id))
+            result.stage_seconds = {"create": create_seconds, **result.stage_seconds}
+            result.duration_seconds += create_seconds
+            return result
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(run_one(semaphore, request) for request in itertools.islice(DRINK_REQUESTS, executions)))
+
+    started = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - started
+    workflow.close()
+
+    summary = summarize_executions(results, elapsed, concurrency)
+    summary["notifications_failed"] = sum(1 for result in results if (result.output or {}).get("notification", {}).get("status") == "FAILED")
+    summary["throttled"] = {"bedrock": services.bedrock.throttled, "sendgrid": services.sendgrid.throttled}
+    # ru_maxrss (KiB no Linux) é o pico do processo inteiro, acumulado entre os cenários
+    summary["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    summary["failures"] = [result.error for result in results if result.status != "SUCCEEDED"][:5]
+    return summary
+
+
+@pytest.mark.parametrize("concurrency", [1, 8, 32])
+def test_pipeline_throughput_by_concurrency(concurrency, save_benchmark_results):
+    """Report per-stage latency percentiles and throughput at increasing concurrency."""
+    bedrock, sendgrid = create_fakes()
+    with local_aws_services(bedrock=bedrock, sendgrid=sendgrid) as services:
+        summary = run_pipeline(services, EXECUTIONS, concurrency)
+
+    save_benchmark_results(f"pipeline-concurrency-{concurrency}", summary)
+    assert summary["succeeded"] == EXECUTIONS, summary["failures"]
+    assert {"create", "persist", "text", "image", "notification", "full_image"} <= set(summary["stages"])
+
+
+def test_pipeline_under_throttling(save_benchmark_results):
+    """Report how Bedrock and SendGrid throttling stretch the tail: Bedrock retries, email failures are tolerated."""
+    bedrock, sendgrid = create_fakes(throttle_rate=0.2)
+    with local_aws_services(bedrock=bedrock, sendgrid=sendgrid) as services:
+        summary = run_pipeline(services, EXECUTIONS, 16)
+
+    save_benchmark_results("pipeline-throttled", summary)
+    assert summary["succeeded"] == EXECUTIONS, summary["failures"]
+    assert summary["throttled"]["bedrock"] > 0
+
+
+def test_pipeline_peak_memory(save_benchmark_results):
+    """Report peak traced Python memory for a concurrent run (tracemalloc slows the run, so throughput is not comparable)."""
+    bedrock, sendgrid = create_fakes()
+    with local_aws_services(bedrock=bedrock, sendgrid=sendgrid) as services:
+        tracemalloc.start()
+        try:
+            summary = run_pipeline(services, EXECUTIONS // 2, 16)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    summary["peak_traced_mb"] = round(peak / 1024 / 1024, 1)
+    save_benchmark_results("pipeline-memory", summary)
+    assert summary["succeeded"] == EXECUTIONS // 2, summary["failures"]
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+# Região e credenciais fictícias permitem criar clientes boto3 nos testes sem acesso à AWS
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "awsome-generative-drink-app-test")
+
+from service.drink.clients import reset_clients  # noqa: E402
+from service.drink.local.emf import EmfCapture  # noqa: E402
+from service.drink.metrics import reset_cold_starts  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_aws_clients():
+    """Garante que clientes registrados por um teste não vazem para os demais."""
+    reset_clients()
+    yield
+    reset_clients()
+
+
+@pytest.fixture
+def emf_metrics(capsys):
+    """
+    Captura as métricas EMF impressas no stdout durante o teste (cada etapa volta a contar como cold start).
+    """
+    reset_cold_starts()
+    capsys.readouterr()
+    return EmfCapture(lambda: capsys.readouterr().out)
@@ -0,0 +1,260 @@
+"""
+Tests for the queue-buffered admission control and its priority lanes in front of the state machine.
+"""
+
+import json
+import math
+import random
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from botocore.exceptions import ClientError
+from service.drink.clients import register_client
+from service.drink.config import DrinkSettings
+from service.drink.handlers import handle_start_queued_executions
+from service.drink.local.dynamodb import InMemoryTable
+from service.drink.local.report import percentile
+from service.drink.local.sqs import LocalQueue
+from service.drink.workflow.admission import (
+    AdmissionQueue,
+    AdmissionRejectedError,
+    admission_rate_per_minute,
+)
+
+QUEUE_URLS = {lane: f"https://sqs.us-east-1.amazonaws.com/123456789012/drink-admission-{lane}" for lane in ("vip", "standard", "bulk")}
+STATE_MACHINE_ARN = "arn:aws:states:us-east-1:123456789012:stateMachine:drinks"
+
+
+class FakeTime:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.arrivals = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Arrivals due while sleeping are sent at their own moment, so their SentTimestamp is exact; a sleep shorter than
+        # the float resolution still moves the clock, like a real sleep would
+        target = max(self.now + seconds, math.nextafter(self.now, math.inf)) if seconds > 0 else self.now
+        while self.arrivals and self.arrivals[0][0] <= target:
+            moment, send = self.arrivals.pop(0)
+            self.now = max(self.now, moment)
+            send()
+        self.now = target
+
+    def at(self, moment, send):
+        self.arrivals.append((moment, send))
+        self.arrivals.sort(key=lambda arrival: arrival[0])
+
+
+class LambdaContext:
+    function_name = "StartQueuedExecutionsFunction"
+    memory_limit_in_mb = 256
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:StartQueuedExecutionsFunction"
+    aws_request_id = "request-id"
+
+    def get_remaining_time_in_millis(self):
+        return 60_000
+
+
+class StubStepFunctionsClient:
+    def __init__(self, clock, duration=40.0):
+        self.clock = clock
+        self.duration = duration
+        self.started = {}
+        self.failures = {}
+
+    def start_execution(self, stateMachineArn, name, input):
+        if self.failures.get(name):
+            self.failures[name] -= 1
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": name}}, "StartExecution")
+        if name in self.started:
+            raise ClientError({"Error": {"Code": "ExecutionAlreadyExists", "Message": name}}, "StartExecution")
+        self.started[name] = self.clock()
+        return {"executionArn": f"{stateMachineArn}:{name}"}
+
+    def list_executions(self, stateMachineArn, statusFilter, maxResults, **kwargs):
+        running = [name for name, started_at in self.started.items() if started_at + self.duration > self.clock()]
+        return {"executions": [{"name": name} for name in running]}
+
+
+class StubDynamoDBResource:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def Table(self, name):
+        return self.tables[name]
+
+
+@pytest.fixture
+def consumer(monkeypatch):
+    fake_time = FakeTime()
+    queue = LocalQueue(clock=fake_time.time)
+    sfn = StubStepFunctionsClient(fake_time.time)
+    register_client("sqs", queue)
+    register_client("stepfunctions", sfn)
+    register_client("dynamodb-resource", StubDynamoDBResource({"limiter-table": InMemoryTable("limiter_id")}))
+    monkeypatch.setattr(handle_start_queued_executions, "time", fake_time)
+    monkeypatch.setattr(handle_start_queued_executions, "ADMISSION_QUEUE_URLS", QUEUE_URLS)
+    monkeypatch.setattr(handle_start_queued_executions, "STEP_FUNCTION_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setattr(handle_start_queued_executions, "PIPELINE_FUNCTION_NAME", None)
+    monkeypatch.setattr(handle_start_queued_executions, "BEDROCK_LIMITER_TABLE", "limiter-table")
+    return fake_time, queue, sfn
+
+
+def send(queue, lane, recipe_id):
+    queue.send_message(QueueUrl=QUEUE_URLS[lane], MessageBody=json.dumps({"recipe_id": recipe_id, "request": {"priority": lane}}))
+
+
+def run_schedule(fake_time, queue, until):
+    # Plays the EventBridge schedule: one consumer invocation per minute until the deadline, or until nothing is left
+    while fake_time.now < until and (queue.messages or fake_time.arrivals):
+        invoked_at = fake_time.now
+        handle_start_queued_executions.lambda_handler({}, LambdaContext())
+        fake_time.sleep(max(0.0, invoked_at + 60 - fake_time.now))
+
+
+def test_rate_is_derived_from_the_most_constrained_bedrock_quota():
+    """Test that the admission rate follows the image model quota, which is called twice per recipe with two-phase images."""
+    settings = DrinkSettings()
+
+    assert admission_rate_per_minute(settings) == pytest.approx(60 / 2 * 0.9)
+    settings.features.image_two_phase = False
+    assert admission_rate_per_minute(settings) == pytest.approx(60 * 0.9)
+    settings.admission.executions_per_minute = 12
+    assert admission_rate_per_minute(settings) == 12
+
+
+def test_backlog_over_the_limit_is_rejected_with_retry_after():
+    """Test that the cached backlog counts requests enqueued since the last read and rejects once over the bound."""
+    fake_time = FakeTime()
+    queue = AdmissionQueue(QUEUE_URLS["standard"], sqs_client=LocalQueue(clock=fake_time.time), backlog_cache_seconds=60, clock=fake_time.time)
+
+    for index in range(3):
+        queue.ensure_capacity(max_backlog=3, rate_per_minute=30)
+        queue.enqueue(f"recipe-{index}", "{}")
+
+    with pytest.raises(AdmissionRejectedError) as error:
+        queue.ensure_capacity(max_backlog=3, rate_per_minute=30, count=2)
+    assert error.value.backlog == 3
+    assert error.value.retry_after_seconds == 4
+
+
+def test_burst_is_admitted_at_the_quota_ceiling(consumer):
+    """Test that a burst drains at the configured rate: no minute exceeds the rate plus the burst allowance, and none idles."""
+    fake_time, queue, sfn = consumer
+    sfn.duration = 1.0
+    start = fake_time.now
+    for index in range(120):
+        send(queue, "standard", f"recipe-{index}")
+
+    run_schedule(fake_time, queue, start + 3600)
+
+    rate = admission_rate_per_minute(DrinkSettings())
+    starts = sorted(sfn.started.values())
+    assert len(starts) == 120
+    for window_start in range(0, int(starts[-1] - start), 10):
+        in_window = [moment for moment in starts if start + window_start <= moment < start + window_start + 60]
+        assert len(in_window) <= rate + rate * 10 / 60 + 1
+    assert (starts[-1] - start) / 60 == pytest.approx((120 - rate * 10 / 60) / rate, rel=0.1)
+
+
+def test_lane_at_its_in_flight_cap_yields_to_other_lanes(consumer, emf_metrics):
+    """Test that a lane at its in-flight cap is skipped, its messages go back to the queue, and lane metrics are published."""
+    fake_time, queue, sfn = consumer
+    vip_cap = DrinkSettings().admission.lanes["vip"].max_in_flight
+    sfn.duration = 3600
+    sfn.started = {f"DrinkRecipe-vip-running-{index}": fake_time.now for index in range(vip_cap)}
+    for index in range(3):
+        send(queue, "vip", f"vip-{index}")
+        send(queue, "standard", f"standard-{index}")
+
+    response = handle_start_queued_executions.lambda_handler({}, LambdaContext())
+
+    assert sorted(name for name in sfn.started if "running" not in name) == [f"DrinkRecipe-standard-standard-{index}" for index in range(3)]
+    assert response == {"started": 3, "released": 3}
+    assert all(message["visible_at"] <= fake_time.now for message in queue.queue_messages(QUEUE_URLS["vip"]))
+    assert emf_metrics.values("LaneQueueDepth", Lane="vip") == [3]
+    assert emf_metrics.values("LaneStarted", Lane="standard") == [1, 1, 1]
+    assert len(emf_metrics.values("LaneWaitTime", Lane="standard")) == 3
+
+
+def test_redelivered_message_does_not_start_a_second_execution(consumer):
+    """Test that a message delivered twice by SQS is acknowledged without a duplicate execution."""
+    fake_time, queue, sfn = consumer
+    send(queue, "vip", "recipe-0")
+    handle_start_queued_executions.lambda_handler({}, LambdaContext())
+
+    send(queue, "vip", "recipe-0")
+    handle_start_queued_executions.lambda_handler({}, LambdaContext())
+
+    assert list(sfn.started) == ["DrinkRecipe-vip-recipe-0"]
+    assert queue.messages == {}
+
+
+def test_failed_start_returns_its_admission_slot_and_is_retried_in_the_same_invocation(consumer):
+    """Test that a start that fails gives back its rate token and makes its message visible again right away."""
+    fake_time, queue, sfn = consumer
+    sfn.failures["DrinkRecipe-vip-recipe-0"] = 1
+    send(queue, "vip", "recipe-0")
+    handle_start_queued_executions.lambda_handler({}, LambdaContext())
+
+    bucket = handle_start_queued_executions.get_table("limiter-table").items["bucket#admission"]
+    burst = admission_rate_per_minute(DrinkSettings()) * 10 / 60
+    assert list(sfn.started) == ["DrinkRecipe-vip-recipe-0"]
+    assert queue.messages == {}
+    assert float(bucket["executions"]) == pytest.approx(burst - 1)
+
+
+def test_mixed_load_wait_per_lane(consumer):
+    """
+    Simulate 10 minutes of mixed load above the admission rate: a 400-item bulk batch plus steady vip and standard traffic.
+
+    The vip lane keeps a low p99 wait, standard stays within its starvation bound, and bulk keeps draining at least at
+    its weighted share while absorbing the excess.
+    """
+    fake_time, queue, sfn = consumer
+    rng = random.Random(7)
+    start = fake_time.now
+    duration = 600
+    sent_at = {}
+
+    def arrival(lane, recipe_id):
+        def deliver():
+            sent_at[recipe_id] = (lane, fake_time.now)
+            send(queue, lane, recipe_id)
+
+        return deliver
+
+    for index in range(400):
+        fake_time.at(start, arrival("bulk", f"bulk-{index}"))
+    for lane, per_minute in (("vip", 4), ("standard", 12)):
+        moment = start
+        for index in range(10_000):
+            moment += rng.expovariate(per_minute / 60)
+            if moment >= start + duration:
+                break
+            fake_time.at(moment, arrival(lane, f"{lane}-{index}"))
+    fake_time.sleep(0)
+
+    run_schedule(fake_time, queue, start + duration)
+
+    waits = {lane: [] for lane in QUEUE_URLS}
+    for name, started_at in sfn.started.items():
+        recipe_id = name.split("-", 2)[2]
+        lane, queued_at = sent_at[recipe_id]
+        waits[lane].append(started_at - queued_at)
+    p99 = {lane: percentile(values, 0.99) for lane, values in waits.items()}
+    print({lane: {"started": len(waits[lane]), "p50": round(percentile(waits[lane], 0.5), 1), "p99": round(p99[lane], 1)} for lane in waits})
+
+    settings = DrinkSettings()
+    rate = admission_rate_per_minute(settings)
+    bulk_share = settings.admission.lanes["bulk"].weight / sum(lane.weight for lane in settings.admission.lanes.values())
+    assert p99["vip"] < 10
+    assert p99["vip"] < p99["standard"] < settings.admission.lanes["standard"].max_wait_seconds
+    assert p99["standard"] < p99["bulk"]
+    assert len(waits["bulk"]) >= rate * bulk_share * duration / 60
+    assert len(sfn.started) == pytest.approx(rate * duration / 60 + rate * 10 / 60, abs=5)
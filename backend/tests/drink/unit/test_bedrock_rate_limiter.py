@@ -0,0 +1,262 @@
+"""
+Tests for the distributed Bedrock token bucket, circuit breaker and invocation layer.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+import threading
+
+from botocore.exceptions import ClientError, EventStreamError
+from service.drink.bedrock.invoker import BedrockInvoker
+from service.drink.bedrock.rate_limiter import (
+    BedrockOverloadedError,
+    BucketLimit,
+    CircuitBreaker,
+    TokenBucketLimiter,
+)
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.dynamodb import InMemoryTable
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class RecordingBedrockRuntime:
+    def __init__(self):
+        self.calls = []
+
+    def invoke_model(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"body": None}
+
+
+class ThrottlingBedrockRuntime:
+    def __init__(self, code: str = "ThrottlingException"):
+        self.code = code
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        raise ClientError({"Error": {"Code": self.code, "Message": "Too many requests"}}, "InvokeModel")
+
+
+class MidStreamErrorBedrockRuntime:
+    def __init__(self, code: str = "throttlingException"):
+        self.code = code
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        def events():
+            yield {"chunk": {"bytes": b"{}"}}
+            raise EventStreamError({"Error": {"Code": self.code, "Message": "Too many requests"}}, "InvokeModelWithResponseStream")
+
+        return {"body": events()}
+
+
+def test_concurrent_containers_never_exceed_shared_capacity():
+    """Test that limiters in different 'containers' sharing one table grant at most the bucket capacity."""
+    table = InMemoryTable("limiter_id", latency_seconds=0.0005)
+    clock = FakeClock()
+    limits = {MODEL_ID: {"requests": BucketLimit(capacity=20, refill_per_second=0.001)}}
+    containers = [TokenBucketLimiter(table, limits, clock=clock) for _ in range(8)]
+    granted = []
+    lock = threading.Lock()
+
+    def worker(limiter):
+        for _ in range(10):
+            try:
+                wait = limiter.try_acquire(MODEL_ID, {"requests": 1})
+            except BedrockOverloadedError:
+                continue
+            if wait == 0:
+                with lock:
+                    granted.append(1)
+
+    threads = [threading.Thread(target=worker, args=(limiter,)) for limiter in containers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 20
+    assert table.operation_counts["conditional_check_failed"] > 0
+
+
+def test_bucket_refills_and_reports_wait_time():
+    """Test that an empty bucket reports the wait until refill and grants again afterwards."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), {MODEL_ID: {"requests": BucketLimit.per_minute(60)}}, clock=clock)
+
+    for _ in range(60):
+        assert limiter.try_acquire(MODEL_ID, {"requests": 1}) == 0
+
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1}) == pytest.approx(1.0)
+
+    clock.advance(1.0)
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1}) == 0
+
+
+def test_released_capacity_is_granted_again_without_exceeding_the_bucket():
+    """Test that capacity returned for an unused grant is available at once, and a refund never overfills the bucket."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), {MODEL_ID: {"requests": BucketLimit.per_minute(60)}}, clock=clock)
+    for _ in range(60):
+        limiter.try_acquire(MODEL_ID, {"requests": 1})
+
+    limiter.release(MODEL_ID, {"requests": 1})
+
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1}) == 0
+    clock.advance(120)
+    limiter.release(MODEL_ID, {"requests": 1})
+    for _ in range(60):
+        assert limiter.try_acquire(MODEL_ID, {"requests": 1}) == 0
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1}) > 0
+
+
+def test_token_dimension_limits_large_prompts():
+    """Test that the tokens-per-minute dimension is enforced independently of request count."""
+    clock = FakeClock()
+    limits = {MODEL_ID: {"requests": BucketLimit.per_minute(100), "tokens": BucketLimit.per_minute(6_000)}}
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), limits, clock=clock)
+
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1, "tokens": 5_000}) == 0
+    assert limiter.try_acquire(MODEL_ID, {"requests": 1, "tokens": 5_000}) == pytest.approx(40.0)
+
+
+def test_unknown_model_is_not_limited():
+    """Test that models without a configured quota are never delayed."""
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), {})
+
+    assert limiter.try_acquire("other-model", {"requests": 1}) == 0
+
+
+def test_breaker_opens_after_threshold_and_closes_after_cooldown():
+    """Test that consecutive throttles open the shared breaker for the cooldown period."""
+    clock = FakeClock()
+    table = InMemoryTable("limiter_id")
+    breaker = CircuitBreaker(table, failure_threshold=3, cooldown_seconds=15, clock=clock)
+    other_container = CircuitBreaker(table, failure_threshold=3, cooldown_seconds=15, clock=clock)
+
+    breaker.record_throttle(MODEL_ID)
+    other_container.record_throttle(MODEL_ID)
+    assert breaker.remaining_open_seconds(MODEL_ID) == 0
+
+    breaker.record_throttle(MODEL_ID)
+    assert other_container.remaining_open_seconds(MODEL_ID) == pytest.approx(15)
+
+    clock.advance(15)
+    assert other_container.remaining_open_seconds(MODEL_ID) == 0
+
+
+def test_success_resets_consecutive_failures():
+    """Test that a successful call clears the failure count so the breaker does not open."""
+    table = InMemoryTable("limiter_id")
+    breaker = CircuitBreaker(table, failure_threshold=2, clock=FakeClock())
+
+    breaker.record_throttle(MODEL_ID)
+    breaker.record_success(MODEL_ID)
+    breaker.record_throttle(MODEL_ID)
+
+    assert breaker.remaining_open_seconds(MODEL_ID) == 0
+
+
+def test_invoker_passes_through_when_capacity_available():
+    """Test that the invoker forwards the call without the estimated_tokens argument."""
+    bedrock = RecordingBedrockRuntime()
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), {MODEL_ID: {"requests": BucketLimit.per_minute(10)}})
+    invoker = BedrockInvoker(bedrock, limiter=limiter)
+
+    invoker.invoke_model(modelId=MODEL_ID, body="{}", estimated_tokens=1_000)
+
+    assert bedrock.calls == [{"modelId": MODEL_ID, "body": "{}"}]
+
+
+def test_invoker_delays_when_wait_fits_deadline():
+    """Test that the invoker sleeps until capacity refills when the wait is within the deadline."""
+    clock = FakeClock()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.advance(seconds)
+
+    limiter = TokenBucketLimiter(InMemoryTable("limiter_id"), {MODEL_ID: {"requests": BucketLimit.per_minute(60)}}, clock=clock)
+    invoker = BedrockInvoker(FakeBedrockRuntime(text="ok"), limiter=limiter, max_wait_seconds=5, sleep=sleep, clock=clock)
+
+    for _ in range(61):
+        invoker.invoke_model(modelId=MODEL_ID, body="{}")
+
+    assert len(sleeps) == 1
+
+
+def test_invoker_sheds_load_when_breaker_is_open():
+    """Test that calls are rejected with BedrockOverloadedError while the breaker is open."""
+    clock = FakeClock()
+    table = InMemoryTable("limiter_id")
+    breaker = CircuitBreaker(table, failure_threshold=1, cooldown_seconds=60, clock=clock)
+    breaker.record_throttle(MODEL_ID)
+    bedrock = FakeBedrockRuntime(text="ok")
+    invoker = BedrockInvoker(bedrock, breaker=breaker, max_wait_seconds=5, sleep=lambda seconds: None, clock=clock)
+
+    with pytest.raises(BedrockOverloadedError):
+        invoker.invoke_model(modelId=MODEL_ID, body="{}")
+
+    assert bedrock.calls == []
+
+
+def test_throttling_error_is_mapped_and_recorded():
+    """Test that a Bedrock throttling error becomes BedrockOverloadedError and counts towards the breaker."""
+    table = InMemoryTable("limiter_id")
+    clock = FakeClock()
+    breaker = CircuitBreaker(table, failure_threshold=2, cooldown_seconds=30, clock=clock)
+    invoker = BedrockInvoker(ThrottlingBedrockRuntime(), breaker=breaker, clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(BedrockOverloadedError):
+            invoker.invoke_model(modelId=MODEL_ID, body="{}")
+
+    assert breaker.remaining_open_seconds(MODEL_ID) == pytest.approx(30)
+
+
+def test_other_client_errors_are_not_retried_as_overload():
+    """Test that validation errors from Bedrock propagate unchanged."""
+    invoker = BedrockInvoker(ThrottlingBedrockRuntime(code="ValidationException"))
+
+    with pytest.raises(ClientError):
+        invoker.invoke_model(modelId=MODEL_ID, body="{}")
+
+
+@pytest.mark.parametrize("code", ["throttlingException", "modelStreamErrorException"])
+def test_mid_stream_throttling_is_mapped_and_recorded(code):
+    """Test that a throttle reported inside the response stream counts towards the breaker instead of as a success."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(InMemoryTable("limiter_id"), failure_threshold=1, cooldown_seconds=30, clock=clock)
+    invoker = BedrockInvoker(MidStreamErrorBedrockRuntime(code), breaker=breaker, clock=clock)
+
+    response = invoker.invoke_model_with_response_stream(modelId=MODEL_ID, body="{}")
+    assert breaker.remaining_open_seconds(MODEL_ID) == 0
+
+    with pytest.raises(BedrockOverloadedError):
+        list(response["body"])
+    assert breaker.remaining_open_seconds(MODEL_ID) == pytest.approx(30)
+
+
+def test_other_mid_stream_errors_propagate_unchanged():
+    """Test that a non-capacity error inside the stream is neither mapped nor counted."""
+    breaker = CircuitBreaker(InMemoryTable("limiter_id"), failure_threshold=1, cooldown_seconds=30, clock=FakeClock())
+    invoker = BedrockInvoker(MidStreamErrorBedrockRuntime("validationException"), breaker=breaker)
+
+    with pytest.raises(EventStreamError):
+        list(invoker.invoke_model_with_response_stream(modelId=MODEL_ID, body="{}")["body"])
+    assert breaker.remaining_open_seconds(MODEL_ID) == 0
@@ -0,0 +1,92 @@
+"""
+Tests for claim-check payloads between workflow states.
+"""
+
+import io
+import json
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.clients import register_client
+from service.drink.workflow.claim_check import (
+    claim_check,
+    is_claim_check,
+    load_recipe_text,
+    offload_large_fields,
+    resolve_claim_checks,
+)
+
+
+class InMemoryS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.encode("utf-8")
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+@pytest.fixture
+def s3():
+    client = InMemoryS3Client()
+    register_client("s3", client)
+    return client
+
+
+def make_event(notes_size: int) -> dict:
+    return {
+        "recipe_id": "recipe-1",
+        "request": {"customer_name": "Ana", "mood": "happy", "notes": "x" * notes_size},
+        "recipe": {"s3_key": "recipes/recipe-1/recipe.txt", "image_s3_key": "recipes/recipe-1/image.jpg"},
+    }
+
+
+def test_small_events_are_left_untouched(s3):
+    """Test that nothing is written to S3 while every field is below the threshold."""
+    event = make_event(10)
+
+    assert offload_large_fields(json.loads(json.dumps(event)), "recipes/recipe-1/payloads", threshold_bytes=1024) == event
+    assert s3.objects == {}
+
+
+def test_only_the_large_nested_field_is_offloaded(s3):
+    """Test that small sibling fields read by the state machine stay inline."""
+    event = offload_large_fields(make_event(5000), "recipes/recipe-1/payloads", threshold_bytes=1024)
+
+    assert is_claim_check(event["request"]["notes"])
+    assert event["request"]["customer_name"] == "Ana"
+    assert event["recipe"]["s3_key"] == "recipes/recipe-1/recipe.txt"
+    assert list(s3.objects) == ["recipes/recipe-1/payloads/request/notes.json"]
+    assert resolve_claim_checks(event["request"]) == make_event(5000)["request"]
+
+
+def test_middleware_resolves_inputs_and_offloads_outputs(s3, monkeypatch):
+    """Test that handlers see resolved requests and return size-guarded events."""
+    monkeypatch.setattr("service.drink.workflow.claim_check.PAYLOAD_OFFLOAD_THRESHOLD_BYTES", 1024)
+    seen = {}
+
+    @claim_check
+    def handler(event, context):
+        seen["notes"] = event["request"]["notes"]
+        event["recipe"]["variants"] = ["y" * 2000]
+        return event
+
+    event = handler(offload_large_fields(make_event(5000), "recipes/recipe-1/payloads", threshold_bytes=1024), None)
+
+    assert seen["notes"] == "x" * 5000
+    assert is_claim_check(event["request"]["notes"])
+    assert is_claim_check(event["recipe"]["variants"])
+    assert len(json.dumps(event)) < 1024
+
+
+def test_recipe_text_is_loaded_from_s3_only_when_needed(s3):
+    """Test that the recipe text comes from the S3 key, with inline text kept for older executions."""
+    s3.objects["recipes/recipe-1/recipe.txt"] = "Mango Fizz".encode("utf-8")
+
+    assert load_recipe_text({"s3_key": "recipes/recipe-1/recipe.txt"}) == "Mango Fizz"
+    assert load_recipe_text({"text": "Inline", "s3_key": "recipes/recipe-1/recipe.txt"}) == "Inline"
+    assert load_recipe_text({}) == ""
@@ -0,0 +1,43 @@
+"""
+Tests for the shared, lazily-initialized AWS client registry.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink import clients
+
+
+def test_clients_are_created_lazily_and_cached():
+    """Test that a client is built on first use and reused afterwards."""
+    assert "s3" not in clients._clients
+
+    s3_client = clients.get_client("s3")
+
+    assert clients.get_client("s3") is s3_client
+    assert "bedrock-runtime" not in clients._clients
+
+
+def test_bedrock_client_uses_long_read_timeout():
+    """Test that Bedrock gets its own timeouts on top of the shared pooling, and leaves throttling retries to the invoker."""
+    config = clients.get_client("bedrock-runtime").meta.config
+
+    assert config.read_timeout == 120
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == clients.MAX_POOL_CONNECTIONS
+    assert config.retries == {"total_max_attempts": 1, "mode": "standard"}
+
+
+def test_tables_are_cached_per_name():
+    """Test that table references are reused between invocations."""
+    assert clients.get_table("recipes") is clients.get_table("recipes")
+    assert clients.get_table("recipes") is not clients.get_table("cache")
+
+
+def test_registered_client_overrides_default():
+    """Test that stand-ins can replace real clients."""
+    stub = object()
+    clients.register_client("stepfunctions", stub)
+
+    assert clients.get_client("stepfunctions") is stub
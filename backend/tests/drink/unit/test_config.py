@@ -0,0 +1,101 @@
+"""
+Tests for the TTL-cached configuration and secrets provider.
+"""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink import config
+from service.drink.clients import register_client
+
+
+class StubSSMClient:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def get_parameter(self, Name, **kwargs):
+        self.calls += 1
+        if isinstance(self.value, Exception):
+            raise self.value
+        return {"Parameter": {"Name": Name, "Value": json.dumps(self.value)}}
+
+
+class StubSecretsClient:
+    def __init__(self, secret):
+        self.secret = secret
+        self.calls = 0
+
+    def get_secret_value(self, SecretId, **kwargs):
+        self.calls += 1
+        return {"SecretString": json.dumps(self.secret)}
+
+
+@pytest.fixture(autouse=True)
+def fresh_providers(monkeypatch):
+    monkeypatch.setattr(config, "DRINK_SETTINGS_PARAMETER", "/drink/settings")
+    monkeypatch.setattr(config, "SENDGRID_SECRET_NAME", "sendgrid")
+    config.reset_config_cache()
+    yield
+    config.reset_config_cache()
+
+
+def test_parameter_overrides_defaults_field_by_field(monkeypatch):
+    """Test that the SSM parameter only overrides the fields it contains."""
+    monkeypatch.setenv("BEDROCK_IMAGE_MODEL_ID", "image-model-from-env")
+    register_client(
+        "ssm", StubSSMClient({"bedrock": {"text_model_id": "haiku", "text_max_tokens": 400}, "features": {"recipe_cache_enabled": False}})
+    )
+
+    settings = config.get_settings()
+
+    assert settings.bedrock.text_model_id == "haiku"
+    assert settings.bedrock.text_max_tokens == 400
+    assert settings.bedrock.image_model_id == "image-model-from-env"
+    assert settings.features.recipe_cache_enabled is False
+    assert settings.features.notification_delivery_mode == "link"
+
+
+def test_settings_are_cached_until_forced():
+    """Test that repeated reads within the TTL hit SSM only once."""
+    ssm = StubSSMClient({"batch_max_items": 10})
+    register_client("ssm", ssm)
+
+    for _ in range(100):
+        assert config.get_settings().batch_max_items == 10
+    assert ssm.calls == 1
+
+    ssm.value = {"batch_max_items": 20}
+    assert config.get_settings(force_fetch=True).batch_max_items == 20
+    assert ssm.calls == 2
+
+
+def test_unavailable_parameter_falls_back_to_deployment_defaults():
+    """Test that an SSM failure does not break the handlers."""
+    register_client("ssm", StubSSMClient(RuntimeError("throttled")))
+
+    assert config.get_settings().bedrock.text_max_tokens == 1000
+
+
+def test_invalid_settings_fall_back_to_deployment_defaults():
+    """Test that typed settings reject bad values instead of passing them to Bedrock."""
+    register_client("ssm", StubSSMClient({"bedrock": {"image_steps": 5}}))
+
+    assert config.get_settings().bedrock.image_steps == 50
+
+
+def test_sendgrid_secret_is_cached_and_refreshable():
+    """Test that the secret is fetched once per TTL and again after a rotation error."""
+    secrets = StubSecretsClient({"api_key": "old", "sender_email": "noreply@example.com"})
+    register_client("secretsmanager", secrets)
+
+    assert config.get_sendgrid_settings().api_key == "old"
+    assert config.get_sendgrid_settings().api_key == "old"
+    assert secrets.calls == 1
+
+    secrets.secret = {"api_key": "rotated", "sender_email": "noreply@example.com"}
+    assert config.get_sendgrid_settings(force_fetch=True).api_key == "rotated"
+    assert secrets.calls == 2
@@ -0,0 +1,342 @@
+"""
+Tests for the single drink submission endpoint, its synchronous mode and its Step Functions input serialization.
+"""
+
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.clients import register_client
+from service.drink.config import DrinkSettings
+from service.drink.handlers import handle_create_drink
+from service.drink.local.dynamodb import InMemoryTable
+from service.drink.local.sqs import LocalQueue
+from service.drink.models.drink_request import DrinkRequest
+from service.drink.workflow.admission import AdmissionQueue
+
+
+class StubStepFunctionsClient:
+    def __init__(self, sync_status="SUCCEEDED"):
+        self.inputs = []
+        self.sync_inputs = []
+        self.sync_status = sync_status
+
+    def start_execution(self, stateMachineArn, name, input):
+        self.inputs.append(input)
+        return {"executionArn": f"arn:aws:states:us-east-1:123456789012:execution:drinks:{name}"}
+
+    def start_sync_execution(self, stateMachineArn, name, input):
+        self.sync_inputs.append(input)
+        execution = json.loads(input)
+        recipe = {"s3_key": f"recipes/{execution['recipe_id']}/recipe.txt", "model_id": "text-model", "image_s3_key": "images/ab/cd.png"}
+        return {
+            "executionArn": f"arn:aws:states:us-east-1:123456789012:express:drinks-express:{name}",
+            "status": self.sync_status,
+            "output": json.dumps({**execution, "recipe": {**recipe, "image_quality": "draft"}}),
+        }
+
+
+class StubS3Client:
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(b"Mango Sunrise")}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://bucket.s3.amazonaws.com/{Params['Key']}?signature"
+
+
+class StubDynamoDBResource:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def Table(self, name):
+        return self.tables[name]
+
+
+@pytest.fixture
+def idempotency_table(monkeypatch):
+    table = InMemoryTable("idempotency_key")
+    register_client("dynamodb-resource", StubDynamoDBResource({"idempotency-table": table}))
+    monkeypatch.setattr(handle_create_drink, "IDEMPOTENCY_TABLE", "idempotency-table")
+    return table
+
+
+@pytest.fixture
+def sfn_client():
+    client = StubStepFunctionsClient()
+    register_client("stepfunctions", client)
+    return client
+
+
+def post_batch(body, authorizer: dict = None):
+    event = {
+        "httpMethod": "POST",
+        "path": "/drinks/batch",
+        "headers": {},
+        "requestContext": {"authorizer": authorizer} if authorizer else {},
+        "queryStringParameters": None,
+        "body": json.dumps(body),
+    }
+    response = handle_create_drink.app.resolve(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def post_drink(body: str, query: dict = None, headers: dict = None, authorizer: dict = None):
+    request_context = {"authorizer": authorizer} if authorizer else {}
+    event = {
+        "httpMethod": "POST",
+        "path": "/drink",
+        "headers": headers or {},
+        "requestContext": request_context,
+        "queryStringParameters": query,
+        "body": body,
+    }
+    response = handle_create_drink.app.resolve(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_valid_request_starts_execution_with_canonical_request(sfn_client):
+    """Test that the raw body is validated once and forwarded as the execution input."""
+    body = json.dumps({"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["Manga"], "liquids": ["soda"]})
+
+    _, response = post_drink(body)
+
+    execution_input = json.loads(sfn_client.inputs[0])
+    assert response["body"]["recipe_id"] == execution_input["recipe_id"]
+    assert execution_input["request"] == {
+        "customer_name": "Ana",
+        "mood": "happy",
+        "flavor": "fruity",
+        "fruit": ["mango"],
+        "liquids": ["soda"],
+        "syrups": [],
+        "leaves": [],
+        "priority": "standard",
+    }
+
+
+VALID_BODY = json.dumps({"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["mango"], "liquids": ["soda"]})
+
+
+def test_wait_returns_recipe_inline_from_express_execution(monkeypatch):
+    """Test that ?wait=true runs the Express workflow and returns the text and image link without a Standard execution."""
+    client = StubStepFunctionsClient()
+    register_client("stepfunctions-sync", client)
+    register_client("stepfunctions", client)
+    register_client("s3", StubS3Client())
+    monkeypatch.setattr(handle_create_drink, "EXPRESS_STEP_FUNCTION_ARN", "arn:aws:states:us-east-1:123456789012:stateMachine:drinks-express")
+
+    status_code, response = post_drink(VALID_BODY, {"wait": "true"})
+
+    assert status_code == 200
+    assert response["recipe_id"] == json.loads(client.sync_inputs[0])["recipe_id"]
+    assert response["status"] == "COMPLETED"
+    assert response["recipe"]["text"] == "Mango Sunrise"
+    assert response["image"]["url"].startswith("https://bucket.s3.amazonaws.com/images/ab/cd.png")
+    assert client.inputs == []
+
+
+@pytest.mark.parametrize("sync_status", ["TIMED_OUT", "FAILED"])
+def test_wait_falls_back_to_standard_execution(monkeypatch, sync_status):
+    """Test that an Express run that does not succeed in time continues as a Standard execution that reuses its outputs."""
+    client = StubStepFunctionsClient(sync_status)
+    register_client("stepfunctions-sync", client)
+    register_client("stepfunctions", client)
+    monkeypatch.setattr(handle_create_drink, "EXPRESS_STEP_FUNCTION_ARN", "arn:aws:states:us-east-1:123456789012:stateMachine:drinks-express")
+
+    _, response = post_drink(VALID_BODY, {"wait": "true"})
+
+    assert response["statusCode"] == 202
+    assert json.loads(client.inputs[0]) == {**json.loads(client.sync_inputs[0]), "resume": True}
+    assert response["body"]["recipe_id"] == json.loads(client.inputs[0])["recipe_id"]
+
+
+@pytest.mark.parametrize("body", ['{"customer_name": "Ana", "mood": "angry"}', "{not json", ""])
+def test_invalid_request_is_rejected_without_execution(sfn_client, body):
+    """Test that invalid payloads and malformed JSON return 400 with the validation errors."""
+    status_code, response = post_drink(body)
+
+    assert status_code == 400
+    assert response["errors"]
+    assert sfn_client.inputs == []
+
+
+def test_execution_input_matches_dict_serialization():
+    """Test that the templated serializer produces the same document as json.dumps of the dict."""
+    drink_request = DrinkRequest(customer_name='Jo "Quote" ão', mood="calm", flavor="sweet", fruit=["strawberry"], liquids=["milk"])
+
+    serialized = handle_create_drink.build_execution_input("recipe-1", "2024-01-01T00:00:00", drink_request)
+
+    assert json.loads(serialized) == {"recipe_id": "recipe-1", "timestamp": "2024-01-01T00:00:00", "request": drink_request.model_dump()}
+
+
+def test_pipeline_mode_invokes_single_lambda_asynchronously(monkeypatch, sfn_client):
+    """Test that, with the single-Lambda pipeline configured, the execution input goes to that function instead of Step Functions."""
+    invocations = []
+
+    class StubLambdaClient:
+        def invoke(self, FunctionName, InvocationType, Payload):
+            invocations.append({"function": FunctionName, "type": InvocationType, "input": json.loads(Payload)})
+
+    register_client("lambda", StubLambdaClient())
+    monkeypatch.setattr(handle_create_drink, "PIPELINE_FUNCTION_NAME", "RunWorkflowFunction")
+
+    _, response = post_drink(VALID_BODY)
+
+    assert sfn_client.inputs == []
+    assert invocations[0]["function"] == "RunWorkflowFunction" and invocations[0]["type"] == "Event"
+    assert invocations[0]["input"]["recipe_id"] == response["body"]["recipe_id"]
+
+
+def test_retry_with_idempotency_key_returns_original_recipe(sfn_client, idempotency_table):
+    """Test that a repeated POST with the same Idempotency-Key returns the first recipe ID without a second execution."""
+    headers = {"Idempotency-Key": "retry-1"}
+
+    _, first = post_drink(VALID_BODY, headers=headers)
+    _, second = post_drink(VALID_BODY, headers=headers)
+
+    assert len(sfn_client.inputs) == 1
+    assert second == first
+    assert second["statusCode"] == 202
+
+
+def test_same_body_from_same_client_is_deduplicated_without_key(sfn_client, idempotency_table):
+    """Test that without a key the request body plus X-Client-Id identifies a retry, but other clients still get their own recipe."""
+    _, first = post_drink(VALID_BODY, headers={"X-Client-Id": "phone-1"})
+    _, retry = post_drink(VALID_BODY, headers={"x-client-id": "phone-1"})
+    _, other_client = post_drink(VALID_BODY, headers={"X-Client-Id": "phone-2"})
+    post_drink(VALID_BODY)
+
+    assert retry["body"]["recipe_id"] == first["body"]["recipe_id"]
+    assert other_client["body"]["recipe_id"] != first["body"]["recipe_id"]
+    assert len(sfn_client.inputs) == 3
+
+
+def test_idempotency_key_reused_with_different_body_is_rejected(sfn_client, idempotency_table):
+    """Test that reusing a key for a different drink request returns 422 instead of the other recipe."""
+    post_drink(VALID_BODY, headers={"Idempotency-Key": "retry-1"})
+    other_body = json.dumps({**json.loads(VALID_BODY), "mood": "calm"})
+
+    status_code, response = post_drink(other_body, headers={"Idempotency-Key": "retry-1"})
+
+    assert status_code == 422
+    assert len(sfn_client.inputs) == 1
+
+
+def test_failed_start_releases_idempotency_key(sfn_client, idempotency_table):
+    """Test that a request whose execution fails to start frees the key so the retry can start the recipe."""
+    headers = {"Idempotency-Key": "retry-1"}
+    start_execution = sfn_client.start_execution
+    sfn_client.start_execution = lambda **kwargs: (_ for _ in ()).throw(RuntimeError("throttled"))
+
+    _, failed = post_drink(VALID_BODY, headers=headers)
+    sfn_client.start_execution = start_execution
+    _, retry = post_drink(VALID_BODY, headers=headers)
+
+    assert failed["statusCode"] == 500
+    assert retry["statusCode"] == 202
+    assert json.loads(sfn_client.inputs[0])["recipe_id"] == retry["body"]["recipe_id"]
+
+
+def test_concurrent_duplicates_start_a_single_execution(sfn_client, idempotency_table):
+    """Test that simultaneous duplicates race on the conditional write: one starts the recipe, the others get 409 or the same ID."""
+    idempotency_table.latency_seconds = 0.01
+    headers = {"Idempotency-Key": "retry-1"}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda _: post_drink(VALID_BODY, headers=headers), range(8)))
+
+    assert len(sfn_client.inputs) == 1
+    recipe_id = json.loads(sfn_client.inputs[0])["recipe_id"]
+    for status_code, response in responses:
+        assert status_code == 409 or response["body"]["recipe_id"] == recipe_id
+
+
+ADMISSION_QUEUE_URLS = {lane: f"https://sqs.us-east-1.amazonaws.com/123456789012/drink-admission-{lane}" for lane in ("vip", "standard", "bulk")}
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    queue, recipes_table = LocalQueue(), InMemoryTable("recipe_id")
+    settings = DrinkSettings()
+    settings.admission.lanes["standard"].max_backlog = 2
+    settings.admission.lanes["bulk"].max_backlog = 3
+    register_client("dynamodb-resource", StubDynamoDBResource({"recipes-table": recipes_table}))
+    monkeypatch.setattr(handle_create_drink, "get_settings", lambda: settings)
+    monkeypatch.setattr(handle_create_drink, "DRINK_RECIPES_TABLE", "recipes-table")
+    monkeypatch.setattr(
+        handle_create_drink,
+        "admission_queues",
+        {lane: AdmissionQueue(queue_url, sqs_client=queue, backlog_cache_seconds=0) for lane, queue_url in ADMISSION_QUEUE_URLS.items()},
+    )
+    return queue, recipes_table
+
+
+def queued_recipe_ids(queue, lane):
+    return [json.loads(message["body"])["recipe_id"] for message in queue.queue_messages(ADMISSION_QUEUE_URLS[lane])]
+
+
+def test_admission_queue_buffers_requests_instead_of_starting_executions(sfn_client, admission):
+    """Test that with the admission queues the request is enqueued in its lane and recorded as QUEUED, leaving the start to the consumer."""
+    queue, recipes_table = admission
+
+    _, response = post_drink(VALID_BODY)
+    _, vip_response = post_drink(VALID_BODY, authorizer={"priority": "vip"})
+
+    recipe_id = response["body"]["recipe_id"]
+    assert sfn_client.inputs == []
+    assert queued_recipe_ids(queue, "standard") == [recipe_id]
+    assert queued_recipe_ids(queue, "vip") == [vip_response["body"]["recipe_id"]]
+    assert recipes_table.items[recipe_id]["status"] == "QUEUED"
+
+
+def test_full_admission_queue_returns_429_with_retry_after(sfn_client, admission):
+    """Test that once a lane backlog reaches its bound new requests and batches for that lane are rejected with Retry-After."""
+    post_drink(VALID_BODY)
+    post_drink(VALID_BODY)
+    event = {"httpMethod": "POST", "path": "/drink", "headers": {}, "requestContext": {}, "queryStringParameters": None, "body": VALID_BODY}
+
+    response = handle_create_drink.app.resolve(event, None)
+    batch_status, _ = post_batch({"requests": [{**json.loads(VALID_BODY), "priority": "standard"}]})
+
+    assert response["statusCode"] == 429
+    assert int(response["multiValueHeaders"]["Retry-After"][0]) >= 1
+    assert json.loads(response["body"])["retry_after"] >= 1
+    assert batch_status == 429
+    assert len(queued_recipe_ids(admission[0], "standard")) == 2
+
+
+def test_full_bulk_lane_does_not_reject_other_lanes(sfn_client, admission):
+    """Test that batch items default to the bulk lane, and that a full bulk lane leaves the vip lane open."""
+    queue, _ = admission
+    batch_status, _ = post_batch({"requests": [json.loads(VALID_BODY)] * 3})
+
+    over_status, _ = post_batch({"requests": [json.loads(VALID_BODY)]}, authorizer={"priority": "vip"})
+    _, vip_response = post_drink(json.dumps({**json.loads(VALID_BODY), "priority": "vip"}), authorizer={"claims": {"custom:priority": "vip"}})
+
+    assert batch_status == 202
+    assert len(queued_recipe_ids(queue, "bulk")) == 3
+    assert over_status == 429
+    assert queued_recipe_ids(queue, "vip") == [vip_response["body"]["recipe_id"]]
+
+
+def test_priority_above_the_client_grant_is_rejected(sfn_client, admission):
+    """Test that an anonymous client cannot pick the vip lane, while lower lanes stay open to it."""
+    queue, _ = admission
+    vip_body = json.dumps({**json.loads(VALID_BODY), "priority": "vip"})
+
+    status_code, response = post_drink(vip_body)
+    spoofed_status, _ = post_drink(vip_body, authorizer={"priority": "platinum"})
+    _, bulk_response = post_drink(json.dumps({**json.loads(VALID_BODY), "priority": "bulk"}))
+    batch_status, batch_response = post_batch({"requests": [json.loads(vip_body), json.loads(VALID_BODY)]})
+
+    assert status_code == 403 and spoofed_status == 403
+    assert response["errors"][0]["type"] == "priority_not_allowed"
+    assert queued_recipe_ids(queue, "vip") == []
+    assert queued_recipe_ids(queue, "bulk") == [bulk_response["body"]["recipe_id"], batch_response["results"][1]["recipe_id"]]
+    assert batch_status == 207
+    assert batch_response["results"][0]["status"] == "INVALID"
+    assert batch_response["results"][0]["errors"][0]["type"] == "priority_not_allowed"
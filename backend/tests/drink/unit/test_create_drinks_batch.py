@@ -0,0 +1,100 @@
+"""
+Tests for the batch drink submission endpoint.
+"""
+
+import json
+import threading
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.clients import register_client
+from service.drink.handlers import handle_create_drink
+
+
+class StubStepFunctionsClient:
+    """Thread-safe stand-in for the Step Functions client."""
+
+    def __init__(self, fail_for_customer=None):
+        self.fail_for_customer = fail_for_customer
+        self.started = []
+        self._lock = threading.Lock()
+
+    def start_execution(self, stateMachineArn, name, input):
+        payload = json.loads(input)
+        if payload["request"]["customer_name"] == self.fail_for_customer:
+            raise RuntimeError("ExecutionLimitExceeded")
+        with self._lock:
+            self.started.append(payload)
+        return {"executionArn": f"arn:aws:states:us-east-1:123456789012:execution:drinks:{name}"}
+
+
+@pytest.fixture
+def sfn_client():
+    client = StubStepFunctionsClient(fail_for_customer="Broken Kiosk")
+    register_client("stepfunctions", client)
+    return client
+
+
+def make_request(customer_name="John Doe"):
+    return {"customer_name": customer_name, "mood": "happy", "flavor": "fruity", "fruit": ["mango"], "liquids": ["soda"]}
+
+
+def post_batch(body):
+    event = {"httpMethod": "POST", "path": "/drinks/batch", "headers": {}, "requestContext": {}, "body": json.dumps(body)}
+    response = handle_create_drink.app.resolve(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_all_items_accepted(sfn_client):
+    """Test that a valid batch starts one execution per item."""
+    status_code, body = post_batch({"requests": [make_request(f"Customer {i}") for i in range(20)]})
+
+    assert status_code == 202
+    assert body["accepted"] == 20
+    assert len(sfn_client.started) == 20
+    assert [result["index"] for result in body["results"]] == list(range(20))
+    assert {result["recipe_id"] for result in body["results"]} == {payload["recipe_id"] for payload in sfn_client.started}
+
+
+def test_valid_list_batch_is_validated_straight_from_the_body(sfn_client, monkeypatch):
+    """Test that a valid batch sent as a list skips the per-item fallback validation."""
+
+    def fallback(items):
+        raise AssertionError("fallback validation used")
+
+    monkeypatch.setattr(handle_create_drink, "validate_batch_items", fallback)
+
+    status_code, body = post_batch([make_request(f"Customer {i}") for i in range(3)])
+
+    assert status_code == 202
+    assert sorted(payload["request"]["customer_name"] for payload in sfn_client.started) == ["Customer 0", "Customer 1", "Customer 2"]
+
+
+def test_partial_success(sfn_client):
+    """Test that invalid items and start failures are reported per item without affecting the rest."""
+    invalid = {**make_request(), "mood": "angry"}
+    status_code, body = post_batch([make_request(), invalid, make_request("Broken Kiosk")])
+
+    assert status_code == 207
+    assert body["accepted"] == 1
+    assert body["rejected"] == 2
+    assert [result["status"] for result in body["results"]] == ["ACCEPTED", "INVALID", "FAILED"]
+    assert body["results"][1]["errors"][0]["loc"] == ["mood"]
+    assert len(sfn_client.started) == 1
+
+
+@pytest.mark.parametrize("body", [[], {"requests": "not a list"}])
+def test_rejects_malformed_batches(sfn_client, body):
+    """Test that empty or malformed batches are rejected."""
+    status_code, _ = post_batch(body)
+    assert status_code == 400
+    assert sfn_client.started == []
+
+
+def test_rejects_oversized_batches(sfn_client, monkeypatch):
+    """Test that batches above the configured limit are rejected."""
+    monkeypatch.setenv("DRINK_BATCH_MAX_ITEMS", "2")
+    status_code, _ = post_batch([make_request()] * 3)
+    assert status_code == 400
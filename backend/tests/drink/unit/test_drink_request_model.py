@@ -27,6 +27,7 @@ def valid_drink_request_data():
         "liquids": ["water", "juice"],
         "syrups": ["honey"],
         "leaves": ["mint"],
+        "priority": "vip",
     }
 
 
@@ -88,6 +89,7 @@ def test_create_with_minimal_fields(minimal_drink_request_data):
     expected_data = minimal_drink_request_data.copy()
     expected_data["syrups"] = []  # Default empty list
     expected_data["leaves"] = []  # Default empty list
+    expected_data["priority"] = "standard"  # Default priority lane
 
     assert drink_request.model_dump() == expected_data
 
@@ -278,6 +280,31 @@ def test_missing_optional_fields(minimal_drink_request_data):
     drink_request = DrinkRequest(**minimal_drink_request_data)
     assert drink_request.syrups == []
     assert drink_request.leaves == []
+    assert drink_request.priority == "standard"
+
+
+# Tests for priority field
+
+
+@pytest.mark.parametrize("priority_value", ["vip", "standard", "bulk"])
+def test_valid_priority_values(minimal_drink_request_data, priority_value):
+    """Test that every priority lane is accepted."""
+    data = minimal_drink_request_data.copy()
+    data["priority"] = priority_value
+
+    drink_request = DrinkRequest(**data)
+    assert drink_request.priority == priority_value
+
+
+def test_invalid_priority_value(minimal_drink_request_data):
+    """Test that an unknown priority raises a validation error."""
+    data = minimal_drink_request_data.copy()
+    data["priority"] = "urgent"
+
+    with pytest.raises(ValidationError) as exc_info:
+        DrinkRequest(**data)
+
+    assert_validation_error(exc_info, "priority", "literal_error")
 
 
 # Tests for serialization and deserialization
@@ -0,0 +1,183 @@
+"""
+Tests for two-phase (draft preview, then full quality) recipe image generation.
+"""
+
+import base64
+import io
+import json
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from PIL import Image
+from service.drink.clients import register_client
+from service.drink.handlers import handle_generate_recipe_image
+from service.drink.local.dynamodb import InMemoryTable
+
+REQUEST = {"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["mango"], "liquids": ["soda"]}
+
+
+class LambdaContext:
+    function_name = "GenerateRecipeImageFunction"
+    memory_limit_in_mb = 1024
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:GenerateRecipeImageFunction"
+    aws_request_id = "request-id"
+
+
+class StubImageBedrockRuntime:
+    def __init__(self):
+        self.bodies = []
+        image = Image.new("RGB", (64, 64), (200, 120, 40))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        self.artifact = base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self.bodies.append(json.loads(body))
+        return {"body": io.BytesIO(json.dumps({"artifacts": [{"base64": self.artifact}]}).encode("utf-8"))}
+
+
+class RecordingS3Client:
+    def __init__(self):
+        self.keys = []
+
+    def put_object(self, **kwargs):
+        self.keys.append(kwargs["Key"])
+
+
+class RecordingTable:
+    def __init__(self):
+        self.updates = []
+        self.fail = False
+
+    def update_item(self, **kwargs):
+        if self.fail:
+            raise RuntimeError("DynamoDB unavailable")
+        self.updates.append(kwargs)
+
+
+class StubDynamoDBResource:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def Table(self, name):
+        return self.tables[name]
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    bedrock, s3, table = StubImageBedrockRuntime(), RecordingS3Client(), RecordingTable()
+    image_store_table = InMemoryTable("image_hash")
+    register_client("bedrock-runtime", bedrock)
+    register_client("s3", s3)
+    register_client("dynamodb-resource", StubDynamoDBResource({"recipes-table": table, "image-store-table": image_store_table}))
+    monkeypatch.setattr(handle_generate_recipe_image, "RECIPES_BUCKET", "recipes-bucket")
+    monkeypatch.setattr(handle_generate_recipe_image, "DRINK_RECIPES_TABLE", "recipes-table")
+    return bedrock, s3, table
+
+
+def generate(image_profile, recipe=None, recipe_id="abc"):
+    event = {"recipe_id": recipe_id, "timestamp": "2024-01-01T00:00:00", "request": REQUEST, "image_profile": image_profile}
+    if recipe is not None:
+        event["recipe"] = recipe
+    return handle_generate_recipe_image.lambda_handler(event, LambdaContext())
+
+
+def test_draft_profile_renders_quick_preview_under_draft_prefix(clients):
+    """Test that the draft phase uses fewer steps and stores renditions under a separate prefix."""
+    bedrock, s3, table = clients
+
+    event = generate("draft")
+
+    assert bedrock.bodies[0]["steps"] == 15
+    assert all(key.startswith("recipes/abc/draft/") for key in s3.keys)
+    assert event["recipe"]["image_s3_key"] == "recipes/abc/draft/image.jpg"
+    assert event["recipe"]["image_quality"] == "draft"
+    assert table.updates[0]["ExpressionAttributeNames"] == {"#profile_key": "draft_image_s3_key"}
+    assert table.updates[0]["ExpressionAttributeValues"] == {":key": "recipes/abc/draft/image.jpg", ":quality": "draft"}
+
+
+def test_full_profile_replaces_preview_with_same_seed(clients):
+    """Test that the full phase renders at full quality with the same seed and updates the recipe record."""
+    bedrock, s3, table = clients
+
+    generate("draft")
+    event = generate("full", recipe={"image_quality": "draft", "image_s3_key": "recipes/abc/draft/image.jpg"})
+
+    assert [body["steps"] for body in bedrock.bodies] == [15, 50]
+    assert bedrock.bodies[0]["seed"] == bedrock.bodies[1]["seed"]
+    assert event["recipe"]["image_s3_key"] == "recipes/abc/image.jpg"
+    assert table.updates[-1]["ExpressionAttributeValues"] == {":key": "recipes/abc/image.jpg", ":quality": "full"}
+
+
+def test_single_phase_renders_full_quality_once(clients, monkeypatch):
+    """Test that with two-phase disabled the first call renders full quality and the second is skipped."""
+    bedrock, s3, table = clients
+    monkeypatch.setenv("IMAGE_TWO_PHASE", "false")
+
+    first = generate("draft")
+    generate("full", recipe=first["recipe"])
+
+    assert [body["steps"] for body in bedrock.bodies] == [50]
+    assert first["recipe"]["image_quality"] == "full"
+    assert first["recipe"]["image_s3_key"] == "recipes/abc/image.jpg"
+
+
+def test_identical_requests_share_one_stored_image(clients, monkeypatch):
+    """Test that the content-addressed store reuses an image instead of invoking Bedrock again."""
+    bedrock, s3, table = clients
+    monkeypatch.setattr(handle_generate_recipe_image, "IMAGE_STORE_TABLE", "image-store-table")
+    image_store_table = handle_generate_recipe_image.get_table("image-store-table")
+
+    first = generate("draft", recipe_id="recipe-1")
+    second = generate("draft", recipe_id="recipe-2")
+
+    image_hash = first["recipe"]["image_hash"]
+    assert len(bedrock.bodies) == 1
+    assert second["recipe"]["image_reused"] is True
+    assert second["recipe"]["image_s3_key"] == first["recipe"]["image_s3_key"] == f"images/{image_hash}/image.jpg"
+    assert image_store_table.items[image_hash]["refs"] == {"recipe-1", "recipe-2"}
+
+
+def test_full_render_releases_the_draft_reference(clients, monkeypatch):
+    """Test that the recipe stops referencing its draft once the full-quality image is stored."""
+    bedrock, s3, table = clients
+    monkeypatch.setattr(handle_generate_recipe_image, "IMAGE_STORE_TABLE", "image-store-table")
+    image_store_table = handle_generate_recipe_image.get_table("image-store-table")
+
+    draft_hash = generate("draft", recipe_id="recipe-1")["recipe"]["image_hash"]
+    full = generate("full", recipe={"image_quality": "draft", "image_hash": draft_hash}, recipe_id="recipe-1")
+
+    assert full["recipe"]["image_hash"] != draft_hash
+    assert "refs" not in image_store_table.items[draft_hash]
+    assert image_store_table.items[full["recipe"]["image_hash"]]["refs"] == {"recipe-1"}
+    assert table.updates[-1]["UpdateExpression"].endswith(" REMOVE #cleared_key")
+    assert table.updates[-1]["ExpressionAttributeNames"]["#cleared_key"] == "draft_image_s3_key"
+
+
+def test_draft_reference_is_kept_while_the_recipe_item_still_names_it(clients, monkeypatch):
+    """Test that the draft is not released for garbage collection when its key could not be cleared from the recipe."""
+    bedrock, s3, table = clients
+    monkeypatch.setattr(handle_generate_recipe_image, "IMAGE_STORE_TABLE", "image-store-table")
+    image_store_table = handle_generate_recipe_image.get_table("image-store-table")
+
+    draft_hash = generate("draft", recipe_id="recipe-1")["recipe"]["image_hash"]
+    table.fail = True
+    generate("full", recipe={"image_quality": "draft", "image_hash": draft_hash}, recipe_id="recipe-1")
+
+    assert image_store_table.items[draft_hash]["refs"] == {"recipe-1"}
+
+
+def test_image_generation_publishes_stage_and_model_metrics(clients, monkeypatch, emf_metrics):
+    """Test that a store miss then hit are counted and Bedrock latency is published per model."""
+    monkeypatch.setattr(handle_generate_recipe_image, "IMAGE_STORE_TABLE", "image-store-table")
+
+    generate("draft", recipe_id="recipe-1")
+    generate("draft", recipe_id="recipe-2")
+
+    assert emf_metrics.values("ImageStoreMiss", Stage="GenerateRecipeImage") == [1]
+    assert emf_metrics.values("ImageStoreHit", Stage="GenerateRecipeImage") == [1]
+    assert emf_metrics.values("ColdStart", Stage="GenerateRecipeImage") == [1, 0]
+    assert len(emf_metrics.find("BedrockLatency")) == 1
+    assert len(emf_metrics.values("GeneratedImageSize", Stage="GenerateRecipeImage")) == 1
@@ -0,0 +1,83 @@
+"""
+Tests for the recipe text handler when it continues a synchronous execution that did not answer in time.
+"""
+
+import io
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from botocore.exceptions import ClientError
+from service.drink.cache.recipe_cache import RecipeCache
+from service.drink.clients import register_client
+from service.drink.handlers import handle_generate_recipe_text
+from service.drink.local.bedrock import FakeBedrockRuntime
+
+REQUEST = {"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["mango"], "liquids": ["soda"]}
+
+
+class LambdaContext:
+    function_name = "GenerateRecipeTextFunction"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:GenerateRecipeTextFunction"
+    aws_request_id = "request-id"
+
+
+class InMemoryS3Client:
+    def __init__(self, objects=None, metadata=None):
+        self.objects = dict(objects or {})
+        self.metadata = dict(metadata or {})
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+        self.objects[Key] = Body
+        self.metadata[Key] = Metadata or {}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key]), "Metadata": self.metadata.get(Key, {})}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+@pytest.fixture
+def bedrock(monkeypatch):
+    client = FakeBedrockRuntime()
+    register_client("bedrock-runtime", client)
+    monkeypatch.setattr(handle_generate_recipe_text, "RECIPES_BUCKET", "recipes-bucket")
+    monkeypatch.setattr(handle_generate_recipe_text, "DRINK_RECIPES_TABLE", None)
+    monkeypatch.setattr(handle_generate_recipe_text, "recipe_cache", RecipeCache(table_name=None))
+    return client
+
+
+def generate(resume):
+    event = {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "request": REQUEST, **({"resume": True} if resume else {})}
+    return handle_generate_recipe_text.lambda_handler(event, LambdaContext())
+
+
+def test_resumed_execution_reuses_text_written_by_the_sync_execution(bedrock):
+    """Test that the Standard fallback does not call the model again when the Express run already stored the text."""
+    s3 = InMemoryS3Client({"recipes/abc/recipe.txt": b"Mango Sunrise"}, {"recipes/abc/recipe.txt": {"model-id": "anthropic.claude-3-haiku"}})
+    register_client("s3", s3)
+
+    event = generate(resume=True)
+
+    assert event["recipe"] == {"s3_key": "recipes/abc/recipe.txt", "cache_hit": False, "resumed": True, "model_id": "anthropic.claude-3-haiku"}
+    assert bedrock.calls == []
+    assert s3.objects["recipes/abc/recipe.txt"] == b"Mango Sunrise"
+
+
+@pytest.mark.parametrize("resume", [True, False])
+def test_text_is_generated_when_not_stored_yet(bedrock, resume):
+    """Test that a resumed execution without stored text, and any new execution, generates the recipe."""
+    s3 = InMemoryS3Client()
+    register_client("s3", s3)
+
+    event = generate(resume)
+
+    assert len(bedrock.calls) == 1
+    assert event["recipe"]["cache_hit"] is False
+    assert s3.objects["recipes/abc/recipe.txt"].startswith(b"Tropical Sunrise")
+    assert s3.metadata["recipes/abc/recipe.txt"] == {"model-id": event["recipe"]["model_id"]}
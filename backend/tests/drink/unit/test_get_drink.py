@@ -0,0 +1,118 @@
+"""
+Tests for the recipe status and result read API.
+"""
+
+import io
+import json
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.clients import register_client
+from service.drink.handlers import handle_get_drink
+
+
+class StubTable:
+    def __init__(self, items):
+        self.items = items
+        self.requests = []
+
+    def get_item(self, **kwargs):
+        self.requests.append(kwargs)
+        item = self.items.get(kwargs["Key"]["recipe_id"])
+        return {"Item": item} if item else {}
+
+
+class StubDynamoDBResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+@pytest.fixture
+def recipes_table(monkeypatch):
+    table = StubTable(
+        {
+            "abc": {
+                "recipe_id": "abc",
+                "status": "COMPLETED",
+                "timestamp": "2024-01-01T00:00:00",
+                "partial_text": "Shake and serve.",
+                "recipe_s3_key": "recipes/abc/recipe.txt",
+                "image_s3_key": "recipes/abc/image.jpg",
+                "text_model_id": "anthropic.claude-3-haiku-20240307-v1:0",
+            }
+        }
+    )
+    register_client("dynamodb-resource", StubDynamoDBResource(table))
+    monkeypatch.setattr(handle_get_drink, "RECIPES_BUCKET", "recipes-bucket")
+    return table
+
+
+class StubS3Client:
+    def __init__(self, objects):
+        self.objects = objects
+        self.reads = []
+
+    def get_object(self, Bucket, Key):
+        self.reads.append((Bucket, Key))
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+def get_drink(recipe_id, headers=None):
+    event = {"httpMethod": "GET", "path": f"/drink/{recipe_id}", "headers": headers or {}, "requestContext": {}, "body": None}
+    return handle_get_drink.app.resolve(event, None)
+
+
+def test_returns_recipe_with_presigned_image(recipes_table):
+    """Test that a completed recipe is returned with a presigned image URL."""
+    response = get_drink("abc")
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert body["status"] == "COMPLETED"
+    assert body["recipe"] == {"text": "Shake and serve.", "s3_key": "recipes/abc/recipe.txt", "model_id": "anthropic.claude-3-haiku-20240307-v1:0"}
+    assert "recipes/abc/image.jpg" in body["image"]["url"]
+    assert "X-Amz-Signature" in body["image"]["url"]
+    assert recipes_table.requests[0]["ProjectionExpression"] == handle_get_drink.RECIPE_PROJECTION
+
+
+def test_conditional_get_returns_not_modified(recipes_table):
+    """Test that polling with the current ETag returns an empty 304."""
+    etag = get_drink("abc")["multiValueHeaders"]["ETag"][0]
+
+    response = get_drink("abc", headers={"if-none-match": etag})
+
+    assert response["statusCode"] == 304
+    assert not response["body"]
+
+
+def test_etag_changes_with_item(recipes_table):
+    """Test that any change to the item invalidates the ETag."""
+    etag = get_drink("abc")["multiValueHeaders"]["ETag"][0]
+    recipes_table.items["abc"]["status"] = "PROCESSING"
+
+    response = get_drink("abc", headers={"If-None-Match": etag})
+
+    assert response["statusCode"] == 200
+
+
+def test_unknown_recipe_returns_not_found(recipes_table):
+    """Test that unknown recipe IDs return 404."""
+    assert get_drink("missing")["statusCode"] == 404
+
+
+@pytest.mark.parametrize("status, text", [("COMPLETED", "Mango Sunrise"), ("PROCESSING", None)])
+def test_completed_recipe_without_partial_text_reads_the_text_from_s3(recipes_table, status, text):
+    """Test that with streaming off a completed recipe still returns its text, read from S3 only once it is final."""
+    recipes_table.items["def"] = {"recipe_id": "def", "status": status, "recipe_s3_key": "recipes/def/recipe.txt"}
+    s3 = StubS3Client({"recipes/def/recipe.txt": b"Mango Sunrise"})
+    register_client("s3", s3)
+
+    body = json.loads(get_drink("def")["body"])
+
+    assert body["recipe"]["text"] == text
+    assert s3.reads == ([("recipes-bucket", "recipes/def/recipe.txt")] if text else [])
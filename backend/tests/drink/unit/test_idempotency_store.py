@@ -0,0 +1,73 @@
+"""
+Tests for the DynamoDB-backed idempotency records of drink creation.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.idempotency.idempotency_store import (
+    IdempotencyStore,
+    build_idempotency_key,
+)
+from service.drink.local.dynamodb import InMemoryTable
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(InMemoryTable("idempotency_key"), ttl_seconds=3600, in_progress_seconds=30, clock=Clock())
+
+
+def test_first_claim_wins_and_repeats_see_its_recipe(store):
+    """Test that only the first claim of a key is granted and later claims return the original recipe."""
+    first = store.claim("key", "hash", "recipe-1", "2024-01-01T00:00:00")
+    store.accept("key", "recipe-1")
+    repeat = store.claim("key", "hash", "recipe-2", "2024-01-01T00:00:05")
+
+    assert first.claimed and not repeat.claimed
+    assert repeat.recipe_id == "recipe-1"
+    assert repeat.timestamp == "2024-01-01T00:00:00"
+    assert repeat.accepted
+
+
+def test_expired_record_is_claimed_again(store):
+    """Test that a record past its TTL counts as absent even before DynamoDB removes it."""
+    store.claim("key", "hash", "recipe-1", "2024-01-01T00:00:00")
+    store.accept("key", "recipe-1")
+    store.clock.now += 3601
+
+    record = store.claim("key", "hash", "recipe-2", "2024-01-01T01:00:01")
+
+    assert record.claimed
+    assert store.table.items["key"]["recipe_id"] == "recipe-2"
+
+
+def test_stale_in_progress_record_is_taken_over(store):
+    """Test that a claim abandoned mid-request can be taken over after the in-progress window, but not before."""
+    store.claim("key", "hash", "recipe-1", "2024-01-01T00:00:00")
+
+    assert not store.claim("key", "hash", "recipe-2", "2024-01-01T00:00:10").claimed
+    store.clock.now += 31
+    assert store.claim("key", "hash", "recipe-2", "2024-01-01T00:00:31").claimed
+
+    # The original request, if still alive, must neither overwrite nor delete the new owner's record
+    store.accept("key", "recipe-1")
+    store.release("key", "recipe-1")
+    assert store.table.items["key"]["recipe_id"] == "recipe-2"
+    assert store.table.items["key"]["record_status"] == "IN_PROGRESS"
+
+
+def test_idempotency_key_scope():
+    """Test that header keys are scoped per client and body hashes are only used when the client is known."""
+    assert build_idempotency_key("abc", "phone-1", "hash") != build_idempotency_key("abc", "phone-2", "hash")
+    assert build_idempotency_key("abc", None, "hash-1") == build_idempotency_key("abc", None, "hash-2")
+    assert build_idempotency_key(None, "phone-1", "hash-1") != build_idempotency_key(None, "phone-1", "hash-2")
+    assert build_idempotency_key(None, None, "hash") is None
@@ -0,0 +1,58 @@
+"""
+Tests for the generated image post-processing stage.
+"""
+
+import io
+import random
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from PIL import Image
+from service.drink.images.renditions import IMAGE_RENDITIONS, render_image_renditions
+
+
+@pytest.fixture
+def generated_png():
+    """A 1024x1024 RGBA PNG with photo-like noise, like the artifact returned by SDXL."""
+    image = Image.frombytes("RGB", (1024, 1024), random.Random(0).randbytes(1024 * 1024 * 3)).convert("RGBA")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_produces_every_rendition(generated_png):
+    """Test that one call produces all configured renditions in order."""
+    rendered = render_image_renditions(generated_png)
+
+    assert [item.rendition.name for item in rendered] == [rendition.name for rendition in IMAGE_RENDITIONS]
+
+
+def test_renditions_have_expected_sizes_and_formats(generated_png):
+    """Test that each rendition is correctly sized and actually encoded in its declared format."""
+    rendered = {item.rendition.name: item for item in render_image_renditions(generated_png)}
+
+    expected = {"full": (1024, "JPEG"), "full_webp": (1024, "WEBP"), "email": (512, "JPEG"), "thumbnail": (128, "JPEG")}
+    for name, (size, image_format) in expected.items():
+        with Image.open(io.BytesIO(rendered[name].data)) as image:
+            assert image.size == (size, size)
+            assert image.format == image_format
+        assert (rendered[name].width, rendered[name].height) == (size, size)
+
+
+def test_renditions_are_smaller_than_generated_png(generated_png):
+    """Test that the stored renditions are smaller than the raw artifact."""
+    rendered = render_image_renditions(generated_png)
+
+    assert all(len(item.data) < len(generated_png) for item in rendered)
+
+
+def test_small_images_are_not_upscaled():
+    """Test that images smaller than a rendition keep their original size."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (100, 60), "orange").save(buffer, format="PNG")
+
+    rendered = {item.rendition.name: item for item in render_image_renditions(buffer.getvalue())}
+
+    assert (rendered["email"].width, rendered["email"].height) == (100, 60)
@@ -0,0 +1,127 @@
+"""
+Tests for the content-addressed image store, reference tracking and garbage collection.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.images.image_store import DELETING, ImageStore, build_image_hash
+from service.drink.images.renditions import IMAGE_RENDITIONS
+from service.drink.local.dynamodb import InMemoryTable
+
+PARAMS = {"cfg_scale": 7, "steps": 50, "seed": 0, "width": 1024, "height": 1024}
+RENDITIONS = {"full": {"s3_key": "images/abc/image.jpg", "version_id": "v1"}, "email": {"s3_key": "images/abc/image-512.jpg", "version_id": None}}
+
+
+class RecordingS3Client:
+    def __init__(self):
+        self.deletes = []
+
+    def delete_objects(self, **kwargs):
+        self.deletes.append(kwargs)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def store():
+    return ImageStore(InMemoryTable("image_hash"), RecordingS3Client(), "recipes-bucket", clock=FakeClock())
+
+
+def test_hash_covers_every_generation_input():
+    """Test that the hash is stable and changes with the model, prompt, any parameter or the rendition set."""
+    base = build_image_hash("sdxl", "a fruity drink", PARAMS)
+
+    assert base == build_image_hash("sdxl", "a fruity drink", dict(reversed(list(PARAMS.items()))))
+    assert base != build_image_hash("other", "a fruity drink", PARAMS)
+    assert base != build_image_hash("sdxl", "a citric drink", PARAMS)
+    assert base != build_image_hash("sdxl", "a fruity drink", {**PARAMS, "steps": 15})
+    assert base != build_image_hash("sdxl", "a fruity drink", PARAMS, renditions=IMAGE_RENDITIONS[:1])
+
+
+def test_acquire_misses_without_creating_a_record(store):
+    """Test that acquiring an unknown image returns None and leaves the table untouched."""
+    assert store.acquire("abc", "recipe-1") is None
+    assert store.table.items == {}
+
+
+def test_published_image_is_shared_with_idempotent_references(store):
+    """Test that later recipes reuse the published renditions and repeated acquisitions count once."""
+    assert store.publish("abc", "recipe-1", RENDITIONS) is True
+
+    assert store.acquire("abc", "recipe-2") == RENDITIONS
+    assert store.acquire("abc", "recipe-2") == RENDITIONS
+    assert store.table.items["abc"]["refs"] == {"recipe-1", "recipe-2"}
+
+
+def test_release_removes_reference_and_ignores_unknown_images(store):
+    """Test that releasing is idempotent and never creates records."""
+    store.publish("abc", "recipe-1", RENDITIONS)
+
+    store.release("abc", "recipe-1")
+    store.release("abc", "recipe-1")
+    store.release("missing", "recipe-1")
+
+    assert "refs" not in store.table.items["abc"]
+    assert "missing" not in store.table.items
+
+
+def test_garbage_collection_waits_for_grace_period(store):
+    """Test that unreferenced images are kept during the grace period and then deleted by version."""
+    store.publish("abc", "recipe-1", RENDITIONS)
+    store.release("abc", "recipe-1")
+
+    assert store.collect_garbage(grace_seconds=3600) == 0
+
+    store.clock.now += 3601
+    assert store.collect_garbage(grace_seconds=3600) == 1
+
+    assert store.table.items == {}
+    deleted = store.s3_client.deletes[0]["Delete"]["Objects"]
+    assert {"Key": "images/abc/image.jpg", "VersionId": "v1"} in deleted
+    assert {"Key": "images/abc/image-512.jpg"} in deleted
+
+
+def test_garbage_collection_keeps_referenced_images(store):
+    """Test that images with at least one reference are never collected."""
+    store.publish("abc", "recipe-1", RENDITIONS)
+    store.clock.now += 10 * 24 * 3600
+
+    assert store.collect_garbage(grace_seconds=3600) == 0
+    assert "abc" in store.table.items
+
+
+def test_reference_acquired_after_scan_prevents_deletion(store):
+    """Test that an acquisition racing with the collector wins and the image survives."""
+    store.publish("abc", "recipe-1", RENDITIONS)
+    store.release("abc", "recipe-1")
+    store.clock.now += 7200
+    table = store.table
+    original_scan = table.scan
+
+    def scan_then_acquire(**kwargs):
+        page = original_scan(**kwargs)
+        store.acquire("abc", "recipe-2")
+        return page
+
+    table.scan = scan_then_acquire
+
+    assert store.collect_garbage(grace_seconds=3600) == 0
+    assert table.items["abc"]["refs"] == {"recipe-2"}
+    assert store.s3_client.deletes == []
+
+
+def test_image_being_deleted_cannot_be_acquired_or_republished(store):
+    """Test that a DELETING record blocks reuse and leaves newly generated objects untracked."""
+    store.publish("abc", "recipe-1", RENDITIONS)
+    store.table.items["abc"]["image_status"] = DELETING
+
+    assert store.acquire("abc", "recipe-2") is None
+    assert store.publish("abc", "recipe-2", RENDITIONS) is False
@@ -0,0 +1,95 @@
+"""
+Tests for the ingredient catalog and ingredient canonicalization in DrinkRequest.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.cache.recipe_cache import build_cache_key
+from service.drink.catalog.ingredient_catalog import (
+    IngredientCatalog,
+    IngredientEntry,
+    canonicalize_ingredients,
+    fold_name,
+    get_ingredient_catalog,
+)
+from service.drink.models.drink_request import DrinkRequest
+
+
+@pytest.fixture
+def catalog():
+    return IngredientCatalog(
+        [
+            IngredientEntry(id="mint", category="leaves", aliases=("mint leaves", "hortelã", "menta")),
+            IngredientEntry(id="mango", category="fruit", aliases=("manga",)),
+            IngredientEntry(id="melon", category="fruit"),
+            IngredientEntry(id="lemon", category="fruit"),
+            IngredientEntry(id="pineapple", category="fruit", aliases=("abacaxi",)),
+        ]
+    )
+
+
+def test_fold_name_ignores_case_accents_and_separators():
+    """Test that names are compared without case, accents, hyphens or repeated spaces."""
+    assert fold_name("  Hortelã ") == "hortela"
+    assert fold_name("Passion-Fruit") == fold_name("passion   fruit") == "passion fruit"
+
+
+def test_aliases_and_translations_map_to_canonical_id(catalog):
+    """Test that ids, aliases and translations resolve to the same ingredient."""
+    assert {catalog.canonicalize(name) for name in ["Mint", "mint leaves", "hortelã", "Hortela", "MENTA"]} == {"mint"}
+
+
+def test_typos_are_corrected_only_within_the_length_bound(catalog):
+    """Test that fuzzy matching fixes typos in longer names but leaves short or distant names alone."""
+    assert catalog.canonicalize("pineaple") == "pineapple"
+    assert catalog.canonicalize("pinaple") == "pinaple"
+    assert catalog.canonicalize("mangoo") == "mango"
+    assert catalog.canonicalize("mint") == "mint"
+    assert catalog.canonicalize("mnt") == "mnt"
+    assert catalog.canonicalize("Dragon Fruit") == "dragon fruit"
+
+
+def test_fuzzy_match_rejects_ties(catalog):
+    """Test that a name equally close to two ingredients is not guessed."""
+    assert catalog.fuzzy_match("lemon", max_distance=2) == "lemon"
+    assert catalog.fuzzy_match("manta", max_distance=1) is None
+
+
+def test_suggest_lists_ids_by_prefix(catalog):
+    """Test that prefix suggestions come from the trie and deduplicate ids."""
+    assert catalog.suggest("m") == ["mango", "melon", "mint"]
+    assert catalog.suggest("x") == []
+
+
+def test_conflicting_aliases_are_rejected():
+    """Test that one name cannot point to two ingredients."""
+    with pytest.raises(ValueError):
+        IngredientCatalog([IngredientEntry(id="lime", category="fruit", aliases=("lima",)), IngredientEntry(id="lima", category="fruit")])
+
+
+def test_bundled_catalog_loads():
+    """Test that the shipped catalog has no conflicting names and covers common translations."""
+    catalog = get_ingredient_catalog()
+
+    assert catalog.canonicalize("água com gás") == catalog.canonicalize("sparkling water") == "soda"
+    assert catalog.canonicalize("maracujá") == "passion fruit"
+
+
+def test_canonicalize_ingredients_removes_duplicates_keeping_order():
+    """Test that two spellings of one ingredient collapse into the first position."""
+    assert canonicalize_ingredients(["Hortelã", "basil", "mint leaves"]) == ["mint", "basil"]
+    assert canonicalize_ingredients(None) == []
+
+
+def test_drink_request_normalizes_ingredients_and_shares_cache_key():
+    """Test that requests written with aliases validate to the same ingredients and cache key."""
+    english = DrinkRequest(customer_name="Ana", mood="happy", flavor="fruity", fruit=["mango", "pineapple"], liquids=["soda"], leaves=["mint"])
+    portuguese = DrinkRequest(
+        customer_name="Ana", mood="happy", flavor="fruity", fruit=["Abacaxi", "manga"], liquids=["sparkling water"], leaves=["hortelã"]
+    )
+
+    assert portuguese.fruit == ["pineapple", "mango"]
+    assert portuguese.liquids == ["soda"] and portuguese.leaves == ["mint"]
+    assert build_cache_key(english.model_dump()) == build_cache_key(portuguese.model_dump())
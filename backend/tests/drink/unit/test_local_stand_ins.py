@@ -0,0 +1,73 @@
+"""
+Tests for the local stand-ins used by the offline benchmarks: latency distributions, throttling and the report.
+"""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from botocore.exceptions import ClientError
+from python_http_client.exceptions import TooManyRequestsError
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.latency import LatencyDistribution
+from service.drink.local.report import percentile, summarize_executions
+from service.drink.local.sendgrid import FakeSendGridClient
+from service.drink.workflow.runner import ExecutionResult
+
+
+def test_latency_distribution_matches_median_and_p99():
+    """Test that samples follow the configured median and p99."""
+    distribution = LatencyDistribution(median_seconds=0.2, p99_seconds=0.8, seed=7)
+
+    samples = [distribution.sample() for _ in range(20000)]
+
+    assert percentile(samples, 0.50) == pytest.approx(0.2, rel=0.05)
+    assert percentile(samples, 0.99) == pytest.approx(0.8, rel=0.10)
+
+
+def test_latency_distribution_without_tail_is_fixed():
+    """Test that a distribution without p99 always returns the median, and zero disables the delay."""
+    assert [LatencyDistribution(0.1)("model-id") for _ in range(10)] == pytest.approx([0.1] * 10)
+    assert LatencyDistribution().sample() == 0.0
+
+
+def test_fakes_throttle_the_configured_fraction_of_calls():
+    """Test that the fake Bedrock raises ThrottlingException and the fake SendGrid raises 429 at the configured rate."""
+    bedrock = FakeBedrockRuntime(throttle_rate=0.25, seed=3)
+    sendgrid = FakeSendGridClient(throttle_rate=0.25, seed=3)
+    bedrock_errors, sendgrid_errors = [], []
+
+    for _ in range(2000):
+        try:
+            bedrock.invoke_model(modelId="anthropic.claude", body=json.dumps({"messages": []}))
+        except ClientError as error:
+            bedrock_errors.append(error.response["Error"]["Code"])
+        try:
+            sendgrid.send({"to": "ana@example.com"})
+        except TooManyRequestsError as error:
+            sendgrid_errors.append(error.status_code)
+
+    assert set(bedrock_errors) == {"ThrottlingException"} and len(bedrock_errors) == bedrock.throttled
+    assert set(sendgrid_errors) == {429} and len(sendgrid.messages) == 2000 - sendgrid.throttled
+    assert 400 < bedrock.throttled < 600 and 400 < sendgrid.throttled < 600
+
+
+def test_summary_reports_stage_percentiles_and_throughput():
+    """Test that the summary aggregates per-stage latency, retries and throughput."""
+    results = [
+        ExecutionResult(
+            recipe_id=f"r{index}", status="SUCCEEDED", stage_seconds={"text": index / 100}, retries={"text": index % 2}, duration_seconds=1.0
+        )
+        for index in range(1, 101)
+    ]
+    results[0].status = "FAILED"
+
+    summary = summarize_executions(results, elapsed_seconds=4.0, concurrency=10)
+
+    assert summary["executions"] == 100 and summary["succeeded"] == 99
+    assert summary["executions_per_second"] == 25.0
+    assert summary["stages"]["text"]["p50"] == 0.51 and summary["stages"]["text"]["p99"] == 1.0
+    assert summary["stages"]["text"]["retries"] == 50
+    assert json.loads(json.dumps(summary)) == summary
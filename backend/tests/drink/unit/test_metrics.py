@@ -0,0 +1,71 @@
+"""
+Tests for the per-invocation EMF metrics published by the handlers.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from aws_lambda_powertools.metrics import MetricUnit
+from service.drink.bedrock.streaming import stream_recipe_text
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.metrics import instrument_stage, metrics, timed
+
+REQUEST = {"mood": "happy", "flavor": "sweet", "fruits": ["lime"]}
+
+
+@instrument_stage("TestStage")
+def handler(event, context):
+    with timed("S3PutDuration"):
+        metrics.add_metric(name="RecipeTextSize", unit=MetricUnit.Bytes, value=42)
+    if event.get("fail"):
+        raise RuntimeError("boom")
+    return event
+
+
+def test_stage_metrics_carry_stage_and_request_dimensions(emf_metrics):
+    """Test that every metric of an invocation is published with the Stage, Mood and Flavor dimensions."""
+    handler({"request": REQUEST}, None)
+
+    assert emf_metrics.values("RecipeTextSize", Stage="TestStage", Mood="happy", Flavor="sweet") == [42]
+    assert len(emf_metrics.values("S3PutDuration", Stage="TestStage")) == 1
+    assert len(emf_metrics.values("StageDuration", Stage="TestStage")) == 1
+    assert emf_metrics.values("StageErrors", Stage="TestStage") == [0]
+    assert emf_metrics.values("StagePayloadSize", Stage="TestStage")[0] > 0
+
+
+def test_cold_start_is_reported_only_on_the_first_invocation(emf_metrics):
+    """Test that ColdStart is 1 on the first invocation of a stage and 0 afterwards."""
+    handler({"request": REQUEST}, None)
+    handler({"request": REQUEST}, None)
+
+    assert emf_metrics.values("ColdStart", Stage="TestStage") == [1, 0]
+
+
+def test_failed_invocation_reports_error_and_still_flushes(emf_metrics):
+    """Test that a failing handler publishes StageErrors=1 and re-raises the original exception."""
+    with pytest.raises(RuntimeError):
+        handler({"request": REQUEST, "fail": True}, None)
+
+    assert emf_metrics.values("StageErrors", Stage="TestStage") == [1]
+    assert emf_metrics.values("StagePayloadSize", Stage="TestStage") == []
+    assert emf_metrics.values("RecipeTextSize", Stage="TestStage") == [42]
+
+
+def test_metrics_outside_an_invocation_are_dropped(emf_metrics):
+    """Test that helpers called outside an instrumented handler do not publish anything."""
+    with timed("S3PutDuration"):
+        metrics.add_metric(name="RecipeTextSize", unit=MetricUnit.Bytes, value=1)
+
+    assert emf_metrics.collect() == []
+
+
+def test_streamed_generation_reports_model_latency_and_tokens(emf_metrics):
+    """Test that the stream's token usage is published with the ModelId dimension."""
+    text = "Shake well and serve over ice." * 4
+
+    stream_recipe_text(FakeBedrockRuntime(text=text, chunk_size=8), "text-model", {"messages": []})
+
+    assert len(emf_metrics.values("BedrockLatency", ModelId="text-model")) == 1
+    assert emf_metrics.values("BedrockInputTokens", ModelId="text-model") == [120]
+    assert emf_metrics.values("BedrockOutputTokens", ModelId="text-model") == [len(text) // 4]
@@ -0,0 +1,151 @@
+"""
+Tests for complexity-, load- and latency-aware text model routing with failover.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+import json
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+from service.drink.bedrock.invoker import BedrockInvoker
+from service.drink.bedrock.rate_limiter import BedrockOverloadedError, CircuitBreaker
+from service.drink.bedrock.router import LatencyTracker, ModelRouter, score_complexity
+from service.drink.config import BedrockSettings
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.local.dynamodb import InMemoryTable
+from service.drink.models.drink_request import DrinkRequest
+
+HAIKU = "anthropic.claude-3-haiku-20240307-v1:0"
+SONNET = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+class RoutingBedrockRuntime:
+    """Bedrock stub that fails for selected models and answers with the fake recipe otherwise."""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.fake = FakeBedrockRuntime()
+        self.models = []
+
+    def invoke_model(self, modelId: str, **kwargs):
+        self.models.append(modelId)
+        if modelId in self.errors:
+            raise self.errors[modelId]
+        return self.fake.invoke_model(modelId=modelId, **kwargs)
+
+
+def throttling_error():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}}, "InvokeModel")
+
+
+def build_request(**overrides):
+    data = {"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["mango"], "liquids": ["soda"]}
+    return DrinkRequest(**{**data, **overrides})
+
+
+def call_with(invoker):
+    def call(model_id, max_wait_seconds):
+        response = invoker.invoke_model(modelId=model_id, body=json.dumps({"messages": []}), max_wait_seconds=max_wait_seconds)
+        return json.loads(response["body"].read())["content"][0]["text"]
+
+    return call
+
+
+def test_complexity_scores_ingredients_and_flavor():
+    """Test that complexity grows with ingredients and demanding flavors."""
+    simple = build_request()
+    complex_request = build_request(flavor="complex", fruit=["orange", "lemon"], syrups=["orgeat"], leaves=["basil"])
+
+    assert score_complexity(simple) == 2
+    assert score_complexity(complex_request) == 9
+
+
+def test_simple_requests_use_fast_tier_and_complex_requests_use_capable_tier():
+    """Test that the starting tier is chosen from request complexity."""
+    router = ModelRouter(BedrockSettings())
+
+    assert router.plan(2) == [HAIKU, SONNET]
+    assert router.plan(9) == [SONNET, HAIKU]
+
+
+def test_routing_disabled_uses_configured_model():
+    """Test that disabling routing keeps the single configured text model."""
+    settings = BedrockSettings.model_validate({"text_model_id": SONNET, "text_routing": {"enabled": False}})
+
+    assert ModelRouter(settings).plan(2) == [SONNET]
+
+
+def test_slow_capable_tier_is_downgraded_when_over_slo():
+    """Test that a capable model observed above the latency SLO is replaced by the faster tier."""
+    latencies = LatencyTracker()
+    latencies.observe(SONNET, 30.0)
+    router = ModelRouter(BedrockSettings(), latency_tracker=latencies)
+
+    assert router.plan(9) == [HAIKU, SONNET]
+
+
+def test_open_breaker_moves_model_to_end():
+    """Test that models with an open circuit breaker are tried last."""
+    breaker = CircuitBreaker(InMemoryTable("limiter_id"), failure_threshold=1)
+    breaker.record_throttle(HAIKU)
+    router = ModelRouter(BedrockSettings(), breaker=breaker)
+
+    assert router.plan(2) == [SONNET, HAIKU]
+
+
+def test_throttling_fails_over_and_records_serving_model():
+    """Test that a throttled model fails over to the next tier and the serving model is reported."""
+    bedrock = RoutingBedrockRuntime(errors={HAIKU: throttling_error()})
+    breaker = CircuitBreaker(InMemoryTable("limiter_id"), failure_threshold=3)
+    router = ModelRouter(BedrockSettings(), breaker=breaker)
+
+    result = router.invoke(2, call_with(BedrockInvoker(bedrock, breaker=breaker)))
+
+    assert bedrock.models == [HAIKU, SONNET]
+    assert result.model_id == SONNET
+    assert result.failed_models == [HAIKU]
+    assert "Tropical Sunrise" in result.output
+
+
+def test_timeout_fails_over_and_updates_latency():
+    """Test that a read timeout fails over and counts against the model's observed latency."""
+    bedrock = RoutingBedrockRuntime(errors={SONNET: ReadTimeoutError(endpoint_url="https://bedrock-runtime")})
+    latencies = LatencyTracker()
+    router = ModelRouter(BedrockSettings(), latency_tracker=latencies)
+
+    result = router.invoke(9, call_with(BedrockInvoker(bedrock)))
+
+    assert result.model_id == HAIKU
+    assert latencies.get(SONNET) is not None
+    assert latencies.get(HAIKU) is not None
+
+
+def test_only_last_candidate_waits_for_capacity():
+    """Test that earlier candidates shed immediately so the router can fail over quickly."""
+    waits = []
+
+    def call(model_id, max_wait_seconds):
+        waits.append((model_id, max_wait_seconds))
+        if model_id == HAIKU:
+            raise BedrockOverloadedError("no capacity")
+        return "ok"
+
+    settings = BedrockSettings.model_validate({"capacity_max_wait_seconds": 10})
+    ModelRouter(settings).invoke(2, call)
+
+    assert waits == [(HAIKU, 0.0), (SONNET, 10.0)]
+
+
+def test_last_failure_and_non_failover_errors_propagate():
+    """Test that the router re-raises when every tier is overloaded or the error is not retryable."""
+    overloaded = RoutingBedrockRuntime(errors={HAIKU: throttling_error(), SONNET: throttling_error()})
+    invalid = RoutingBedrockRuntime(errors={HAIKU: ClientError({"Error": {"Code": "ValidationException", "Message": "bad"}}, "InvokeModel")})
+
+    with pytest.raises(BedrockOverloadedError):
+        ModelRouter(BedrockSettings()).invoke(2, call_with(BedrockInvoker(overloaded)))
+    with pytest.raises(ClientError):
+        ModelRouter(BedrockSettings()).invoke(2, call_with(BedrockInvoker(invalid)))
+
+    assert invalid.models == [HAIKU]
@@ -0,0 +1,98 @@
+"""
+Tests for the notification image delivery modes.
+"""
+
+import base64
+import io
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from botocore.response import StreamingBody
+from service.drink.clients import register_client
+from service.drink.handlers import handle_send_notification
+
+IMAGE_RENDITIONS = {
+    "full": {"s3_key": "recipes/1/image.jpg", "content_type": "image/jpeg"},
+    "email": {"s3_key": "recipes/1/image-512.jpg", "content_type": "image/jpeg"},
+}
+
+
+class StubS3Client:
+    def __init__(self, objects):
+        self.objects = objects
+        self.fetched = []
+
+    def get_object(self, Bucket, Key):
+        self.fetched.append(Key)
+        data = self.objects[Key]
+        return {"Body": StreamingBody(io.BytesIO(data), len(data)), "ContentLength": len(data)}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    client = StubS3Client({"recipes/1/image.jpg": b"full-size-image" * 1000, "recipes/1/image-512.jpg": b"small"})
+    register_client("s3", client)
+    monkeypatch.setattr(handle_send_notification, "RECIPES_BUCKET", "recipes-bucket")
+    return client
+
+
+def test_link_mode_has_no_attachment_and_does_not_download(s3_client):
+    """Test that the default mode embeds presigned links without reading the image."""
+    image_html, attachment = handle_send_notification.build_image_delivery("link", "Sunrise", "recipes/1/image.jpg", IMAGE_RENDITIONS)
+
+    assert attachment is None
+    assert s3_client.fetched == []
+    assert "recipes/1/image-512.jpg" in image_html
+    assert "recipes/1/image.jpg" in image_html
+
+
+def test_inline_mode_embeds_small_rendition(s3_client):
+    """Test that inline mode attaches only the email-size rendition referenced by CID."""
+    image_html, attachment = handle_send_notification.build_image_delivery("inline", "Sunrise", "recipes/1/image.jpg", IMAGE_RENDITIONS)
+
+    assert s3_client.fetched == ["recipes/1/image-512.jpg"]
+    assert 'src="cid:drink-image"' in image_html
+    assert attachment.disposition.get() == "inline"
+    assert base64.b64decode(attachment.file_content.get()) == b"small"
+
+
+def test_attachment_mode_attaches_full_image(s3_client):
+    """Test that the opt-in fallback still attaches the full-size image."""
+    _, attachment = handle_send_notification.build_image_delivery("attachment", "Sunrise", "recipes/1/image.jpg", IMAGE_RENDITIONS)
+
+    assert attachment.disposition.get() == "attachment"
+    assert base64.b64decode(attachment.file_content.get()) == b"full-size-image" * 1000
+
+
+@pytest.mark.parametrize("mode", ["attachment", "inline"])
+def test_image_above_the_attachment_limit_is_delivered_by_link(s3_client, monkeypatch, mode):
+    """Test that an image too large to attach is not encoded and the email links to it instead."""
+    monkeypatch.setattr(handle_send_notification, "MAX_ATTACHMENT_BYTES", 4)
+
+    image_html, attachment = handle_send_notification.build_image_delivery(mode, "Sunrise", "recipes/1/image.jpg", IMAGE_RENDITIONS)
+
+    assert attachment is None
+    assert "recipes/1/image.jpg?X-Amz-Expires=" in image_html
+
+
+def test_inline_mode_falls_back_to_full_image_without_renditions(s3_client):
+    """Test that events without renditions still deliver an image."""
+    handle_send_notification.build_image_delivery("inline", "Sunrise", "recipes/1/image.jpg", {})
+
+    assert s3_client.fetched == ["recipes/1/image.jpg"]
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 10, 1000])
+def test_streamed_base64_matches_single_shot_encoding(s3_client, monkeypatch, size):
+    """Test that chunked encoding is identical to encoding the whole object at once."""
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    s3_client.objects["object"] = data
+    monkeypatch.setattr(handle_send_notification, "ATTACHMENT_CHUNK_SIZE", 7)
+
+    assert handle_send_notification.encode_s3_object_base64("recipes-bucket", "object") == base64.b64encode(data).decode()
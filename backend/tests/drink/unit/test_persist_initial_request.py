@@ -0,0 +1,72 @@
+"""
+Tests for persisting the initial drink request, including executions that continue a timed-out synchronous run.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.clients import register_client
+from service.drink.handlers import handle_persist_initial_request
+from service.drink.local.dynamodb import InMemoryTable
+
+REQUEST = {"customer_name": "Ana", "mood": "happy", "flavor": "fruity"}
+
+
+class LambdaContext:
+    function_name = "PersistInitialRequestFunction"
+    memory_limit_in_mb = 256
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:PersistInitialRequestFunction"
+    aws_request_id = "request-id"
+
+
+class StubDynamoDBResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+@pytest.fixture
+def recipes_table(monkeypatch):
+    table = InMemoryTable("recipe_id")
+    register_client("dynamodb-resource", StubDynamoDBResource(table))
+    monkeypatch.setattr(handle_persist_initial_request, "DRINK_RECIPES_TABLE", "recipes")
+    return table
+
+
+def persist(resume=False):
+    event = {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "request": REQUEST, **({"resume": True} if resume else {})}
+    return handle_persist_initial_request.lambda_handler(event, LambdaContext())
+
+
+def test_resumed_execution_keeps_the_progress_of_the_synchronous_execution(recipes_table):
+    """Test that the Standard fallback does not overwrite the status and outputs the Express run already wrote."""
+    progress = {"status": "PROCESSING", "partial_text": "Mango Sunrise", "draft_image_s3_key": "images/draft.png", "text_model_id": "haiku"}
+    recipes_table.items["abc"] = {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "request": REQUEST, **progress}
+
+    persist(resume=True)
+
+    assert recipes_table.items["abc"] == {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "request": REQUEST, **progress}
+
+
+@pytest.mark.parametrize("existing", [None, {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "status": "QUEUED"}])
+def test_resumed_execution_records_a_recipe_the_synchronous_execution_did_not_persist(recipes_table, existing):
+    """Test that a missing or still queued recipe is recorded as PROCESSING on resume."""
+    if existing:
+        recipes_table.items["abc"] = existing
+
+    persist(resume=True)
+
+    assert recipes_table.items["abc"] == {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "request": REQUEST, "status": "PROCESSING"}
+
+
+def test_new_execution_replaces_the_queued_record(recipes_table):
+    """Test that a regular execution writes the full item over the QUEUED record."""
+    recipes_table.items["abc"] = {"recipe_id": "abc", "timestamp": "2024-01-01T00:00:00", "status": "QUEUED"}
+
+    persist()
+
+    assert recipes_table.items["abc"]["status"] == "PROCESSING"
+    assert recipes_table.items["abc"]["request"] == REQUEST
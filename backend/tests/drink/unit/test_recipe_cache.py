@@ -0,0 +1,107 @@
+"""
+Tests for the content-addressed recipe cache.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.cache.recipe_cache import RecipeCache, build_cache_key
+
+
+class FakeTable:
+    """Minimal stand-in for a DynamoDB Table resource."""
+
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key):
+        item = self.items.get(Key["cache_key"])
+        return {"Item": item} if item else {}
+
+    def put_item(self, Item):
+        self.items[Item["cache_key"]] = Item
+
+
+@pytest.fixture
+def request_data():
+    return {
+        "customer_name": "John Doe",
+        "mood": "happy",
+        "flavor": "fruity",
+        "fruit": ["pineapple", "mango"],
+        "liquids": ["coconut water", "soda"],
+        "syrups": ["simple syrup"],
+        "leaves": ["mint"],
+    }
+
+
+def test_cache_key_ignores_customer_name(request_data):
+    """Test that requests differing only by customer share a key."""
+    other = {**request_data, "customer_name": "Maria Silva"}
+    assert build_cache_key(request_data) == build_cache_key(other)
+
+
+def test_cache_key_is_order_and_case_insensitive(request_data):
+    """Test that ingredient order, casing and surrounding whitespace do not change the key."""
+    other = {**request_data, "fruit": [" Mango", "PINEAPPLE"], "liquids": ["Soda", "coconut water"], "mood": "HAPPY"}
+    assert build_cache_key(request_data) == build_cache_key(other)
+
+
+def test_cache_key_treats_missing_optional_lists_as_empty(request_data):
+    """Test that omitted optional lists match empty ones."""
+    with_empty = {**request_data, "syrups": [], "leaves": []}
+    without = {key: value for key, value in request_data.items() if key not in ("syrups", "leaves")}
+    assert build_cache_key(with_empty) == build_cache_key(without)
+
+
+def test_cache_key_changes_with_ingredients(request_data):
+    """Test that different ingredients produce different keys."""
+    other = {**request_data, "leaves": ["basil"]}
+    assert build_cache_key(request_data) != build_cache_key(other)
+
+
+def test_miss_then_local_hit():
+    """Test that a stored recipe is served from the local tier."""
+    cache = RecipeCache()
+    assert cache.get("key") is None
+
+    cache.put("key", "recipe text", "recipes/1/recipe.txt")
+    entry = cache.get("key")
+
+    assert entry["text"] == "recipe text"
+    assert entry["s3_key"] == "recipes/1/recipe.txt"
+
+
+def test_shared_tier_hit_populates_local_tier():
+    """Test that a shared-tier hit is served by a fresh container and then cached locally."""
+    table = FakeTable()
+    RecipeCache(table=table).put("key", "recipe text", "recipes/1/recipe.txt")
+
+    cold_cache = RecipeCache(table=table)
+    assert cold_cache.get("key")["s3_key"] == "recipes/1/recipe.txt"
+
+    table.items.clear()
+    assert cold_cache.get("key")["s3_key"] == "recipes/1/recipe.txt"
+
+
+def test_expired_entries_are_misses():
+    """Test that entries past their TTL are ignored in both tiers."""
+    table = FakeTable()
+    cache = RecipeCache(table=table, ttl_seconds=-1)
+    cache.put("key", "recipe text", "recipes/1/recipe.txt")
+
+    assert cache.get("key") is None
+
+
+def test_local_tier_evicts_least_recently_used():
+    """Test that the local tier is bounded."""
+    cache = RecipeCache(max_local_entries=2)
+    cache.put("a", "A", "recipes/a/recipe.txt")
+    cache.put("b", "B", "recipes/b/recipe.txt")
+    cache.get("a")
+    cache.put("c", "C", "recipes/c/recipe.txt")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
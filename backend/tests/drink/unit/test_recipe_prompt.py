@@ -0,0 +1,137 @@
+"""
+Tests for the recipe prompt compiler, token budgeting and structured output parsing.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+import json
+
+from service.drink.local.bedrock import DEFAULT_RECIPE_TEXT
+from service.drink.models.drink_request import DrinkRequest
+from service.drink.prompts.recipe_prompt import (
+    RECIPE_MIN_OUTPUT_TOKENS,
+    compile_image_prompt,
+    compile_recipe_prompt,
+    estimate_tokens,
+    parse_recipe_output,
+    render_partial_recipe_text,
+    render_recipe_text,
+)
+
+
+@pytest.fixture
+def drink_request():
+    return DrinkRequest(
+        customer_name="Maria Silva",
+        mood="happy",
+        flavor="fruity",
+        fruit=["pineapple", "mango"],
+        liquids=["coconut water", "soda"],
+        syrups=["simple syrup"],
+        leaves=["mint"],
+    )
+
+
+def test_prompt_uses_request_fields(drink_request):
+    """Test that the user prompt is built from the real DrinkRequest fields."""
+    compiled = compile_recipe_prompt(drink_request, max_tokens_limit=1000)
+
+    assert "fruity drink for a happy mood" in compiled.user
+    assert "pineapple, mango" in compiled.user
+    assert "coconut water, soda" in compiled.user
+    assert "simple syrup" in compiled.user
+    assert "mint" in compiled.user
+
+
+def test_prompt_excludes_customer_name(drink_request):
+    """Test that the prompt depends only on the fields used by the recipe cache key."""
+    compiled = compile_recipe_prompt(drink_request, max_tokens_limit=1000)
+
+    assert "Maria" not in compiled.system + compiled.user
+
+
+def test_missing_optional_lists_are_rendered_as_none(drink_request):
+    """Test that empty syrups and leaves still produce a well-formed prompt."""
+    drink_request = drink_request.model_copy(update={"syrups": [], "leaves": []})
+
+    compiled = compile_recipe_prompt(drink_request, max_tokens_limit=1000)
+
+    assert "Syrups: none" in compiled.user
+    assert "Leaves: none" in compiled.user
+
+
+def test_max_tokens_scales_with_ingredients_and_respects_limits(drink_request):
+    """Test that the output budget grows with the ingredient count and stays within the configured bounds."""
+    small = compile_recipe_prompt(drink_request.model_copy(update={"fruit": ["lime"], "liquids": ["soda"], "syrups": [], "leaves": []}), 1000)
+    large = compile_recipe_prompt(drink_request.model_copy(update={"fruit": [f"fruit {index}" for index in range(20)]}), 1000)
+    capped = compile_recipe_prompt(drink_request, max_tokens_limit=150)
+
+    assert small.max_tokens == RECIPE_MIN_OUTPUT_TOKENS
+    assert large.max_tokens == 1000
+    assert capped.max_tokens == 150
+    assert small.max_tokens < compile_recipe_prompt(drink_request, 1000).max_tokens < large.max_tokens
+
+
+def test_request_body_carries_system_prompt_and_budget(drink_request):
+    """Test that the Messages API body uses the compiled system prompt and max_tokens."""
+    compiled = compile_recipe_prompt(drink_request, max_tokens_limit=1000)
+
+    body = compiled.to_request_body()
+
+    assert body["system"] == compiled.system
+    assert body["max_tokens"] == compiled.max_tokens
+    assert body["messages"] == [{"role": "user", "content": compiled.user}]
+    assert compiled.estimated_total_tokens == compiled.estimated_input_tokens + compiled.max_tokens
+    assert compiled.estimated_input_tokens == estimate_tokens(compiled.system) + estimate_tokens(compiled.user)
+
+
+def test_image_prompt_uses_request_fields(drink_request):
+    """Test that the image prompt describes the requested flavor and ingredients."""
+    prompt = compile_image_prompt(drink_request)
+
+    assert "fruity drink made with pineapple, mango, coconut water, soda, mint" in prompt
+
+
+def test_parse_and_render_structured_output():
+    """Test that the compact JSON recipe is parsed and rendered as plain text."""
+    recipe = parse_recipe_output(DEFAULT_RECIPE_TEXT)
+
+    text = render_recipe_text(recipe)
+
+    assert recipe.name == "Tropical Sunrise"
+    assert "- 60 ml pineapple juice" in text
+    assert "1. Muddle the mint." in text
+    assert text.endswith("Garnish: Mint sprig in a highball glass")
+
+
+def test_parse_tolerates_text_around_json():
+    """Test that surrounding prose or code fences do not prevent parsing."""
+    payload = json.dumps({"name": "Fizz", "ingredients": ["soda"], "steps": ["Pour."]})
+
+    recipe = parse_recipe_output(f"Here is your recipe:\n```json\n{payload}\n```")
+
+    assert recipe.name == "Fizz"
+
+
+@pytest.mark.parametrize("output", ["Just some prose.", '{"name": "Truncated", "ingredients": ["soda"'])
+def test_parse_returns_none_for_unstructured_output(output):
+    """Test that prose or truncated JSON falls back to the raw text."""
+    assert parse_recipe_output(output) is None
+
+
+def test_partial_output_is_rendered_as_far_as_it_goes():
+    """Test that streamed JSON prefixes render as plain text, growing toward the final recipe without raw JSON."""
+    prefixes = [DEFAULT_RECIPE_TEXT[:length] for length in range(len(DEFAULT_RECIPE_TEXT) + 1)]
+
+    texts = [render_partial_recipe_text(prefix) for prefix in prefixes]
+
+    assert texts[0] == "" and render_partial_recipe_text('{"name":"Tropical Sun') == ""
+    assert render_partial_recipe_text('{"name":"Tropical Sunrise","ingredients":["60 ml pineapple juice",') == (
+        "Tropical Sunrise\n\nIngredients:\n- 60 ml pineapple juice"
+    )
+    assert not any("{" in text or '"' in text for text in texts)
+    assert all(later.startswith(earlier.rsplit("\n", 1)[0]) for earlier, later in zip(texts, texts[1:]))
+    assert texts[-1] == render_recipe_text(parse_recipe_output(DEFAULT_RECIPE_TEXT))
+    assert render_partial_recipe_text(f"```json\n{DEFAULT_RECIPE_TEXT}\n```") == texts[-1]
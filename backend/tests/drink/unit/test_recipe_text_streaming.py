@@ -0,0 +1,67 @@
+"""
+Tests for streaming recipe text generation using the local Bedrock stub.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.bedrock.streaming import (
+    RecipeTextCheckpointWriter,
+    stream_recipe_text,
+)
+from service.drink.local.bedrock import FakeBedrockRuntime
+from service.drink.prompts.recipe_prompt import render_partial_recipe_text
+
+
+class RecordingTable:
+    def __init__(self):
+        self.updates = []
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+
+
+REQUEST_BODY = {"anthropic_version": "bedrock-2023-05-31", "max_tokens": 100, "messages": [{"role": "user", "content": "prompt"}]}
+
+
+def test_stream_assembles_full_text():
+    """Test that deltas are concatenated into the complete recipe."""
+    bedrock = FakeBedrockRuntime(text="Shake well and serve over ice.", chunk_size=4)
+
+    text = stream_recipe_text(bedrock, "model", REQUEST_BODY)
+
+    assert text == "Shake well and serve over ice."
+    assert bedrock.calls[0]["operation"] == "invoke_model_with_response_stream"
+
+
+def test_first_chunk_is_checkpointed_immediately_and_final_text_last():
+    """Test that clients see the first tokens right away and the final checkpoint holds the whole text."""
+    bedrock = FakeBedrockRuntime(text="abcdefghij", chunk_size=3)
+    checkpoints = []
+
+    stream_recipe_text(bedrock, "model", REQUEST_BODY, on_checkpoint=checkpoints.append, checkpoint_interval_seconds=60)
+
+    assert checkpoints == ["abc", "abcdefghij"]
+
+
+def test_every_chunk_checkpointed_without_interval():
+    """Test that a zero interval checkpoints each chunk without duplicating the final one."""
+    bedrock = FakeBedrockRuntime(text="abcdef", chunk_size=2)
+    checkpoints = []
+
+    stream_recipe_text(bedrock, "model", REQUEST_BODY, on_checkpoint=checkpoints.append, checkpoint_interval_seconds=0)
+
+    assert checkpoints == ["ab", "abcd", "abcdef"]
+
+
+def test_checkpoint_writer_updates_only_the_recipe_item():
+    """Test that checkpoints store the rendered partial text on the item, and write stores the final text as is."""
+    table = RecordingTable()
+    writer = RecipeTextCheckpointWriter(table, "1", render=render_partial_recipe_text)
+
+    writer('{"name":"Fizz","ingredients":["so')
+    writer.write("Fizz\n\nIngredients:\n- soda")
+
+    assert table.updates[0]["Key"] == {"recipe_id": "1"}
+    assert [update["ExpressionAttributeValues"][":text"] for update in table.updates] == ["Fizz", "Fizz\n\nIngredients:\n- soda"]
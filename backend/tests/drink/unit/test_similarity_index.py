@@ -0,0 +1,197 @@
+"""
+Tests for the request similarity index, its S3 snapshots and the index build lambda.
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from botocore.exceptions import ClientError
+from service.drink.cache.similarity_index import (
+    SimilarityIndex,
+    SimilarityIndexCache,
+    index_entry,
+    put_pending_recipe,
+    vectorize_request,
+)
+from service.drink.clients import register_client
+from service.drink.handlers import (
+    handle_build_similarity_index,
+    handle_generate_recipe_text,
+)
+
+REQUEST = {"customer_name": "Ana", "mood": "happy", "flavor": "fruity", "fruit": ["mango", "pineapple"], "liquids": ["soda"]}
+# With more ingredients, a request that changes a single field scores well above the threshold
+LARGE_REQUEST = {
+    **REQUEST,
+    "fruit": ["mango", "pineapple", "strawberry", "passion fruit"],
+    "liquids": ["soda", "orange juice"],
+    "syrups": ["honey", "grenadine"],
+    "leaves": ["mint"],
+}
+
+
+class LambdaContext:
+    function_name = "BuildSimilarityIndexFunction"
+    memory_limit_in_mb = 2048
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:BuildSimilarityIndexFunction"
+    aws_request_id = "request-id"
+
+
+class InMemoryS3Client:
+    """Minimal stand-in for the S3 operations used by the similarity index."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not found"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, "rb") as source:
+            self.objects[Key] = source.read()
+
+    def download_file(self, Bucket, Key, Filename):
+        with open(Filename, "wb") as target:
+            target.write(self.objects[Key])
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {"Contents": [{"Key": key} for key in sorted(client.objects) if key.startswith(Prefix)]}
+
+        return Paginator()
+
+
+def test_vectors_ignore_order_case_and_customer():
+    """Test that equivalent requests map to the same unit vector."""
+    other = {**REQUEST, "customer_name": "Bruno", "fruit": ["Pineapple ", "MANGO"]}
+
+    assert np.allclose(vectorize_request(REQUEST), vectorize_request(other))
+    assert np.linalg.norm(vectorize_request(REQUEST)) == pytest.approx(1.0)
+
+
+def test_similar_requests_score_higher_than_unrelated_ones():
+    """Test that one extra ingredient keeps the request close while a different drink is far away."""
+    base = vectorize_request(REQUEST)
+    with_mint = vectorize_request({**REQUEST, "leaves": ["mint"]})
+    unrelated = vectorize_request({"mood": "calm", "flavor": "bitter", "fruit": ["lemon"], "liquids": ["tonic water"]})
+
+    assert base @ with_mint > 0.85
+    assert base @ unrelated < 0.3
+
+
+def test_query_returns_best_matches_in_order():
+    """Test that queries cover both snapshot vectors and recipes added afterwards."""
+    requests = [REQUEST, {**REQUEST, "leaves": ["mint"]}, {**REQUEST, "flavor": "citric", "fruit": ["lemon"]}]
+    index = SimilarityIndex(np.stack([vectorize_request(requests[0])]), [{"recipe_id": "r0"}])
+    index.add(vectorize_request(requests[1]), {"recipe_id": "r1"})
+    index.add(vectorize_request(requests[2]), {"recipe_id": "r2"})
+
+    matches = index.query(vectorize_request({**REQUEST, "leaves": ["mint"]}), top_k=2)
+
+    assert [match.entry["recipe_id"] for match in matches] == ["r1", "r0"]
+    assert matches[0].score == pytest.approx(1.0)
+    assert SimilarityIndex().query(vectorize_request(REQUEST)) == []
+
+
+def test_saved_index_loads_memory_mapped(tmp_path):
+    """Test that a saved index, including added recipes, loads back as a read-only memory map."""
+    index = SimilarityIndex()
+    index.add(vectorize_request(REQUEST), {"recipe_id": "r0", "s3_key": "recipes/r0/recipe.txt"})
+    index.save(str(tmp_path))
+
+    loaded = SimilarityIndex.load(str(tmp_path))
+
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.entries == [{"recipe_id": "r0", "s3_key": "recipes/r0/recipe.txt"}]
+    assert loaded.query(vectorize_request(REQUEST))[0].score == pytest.approx(1.0)
+
+
+def test_build_lambda_publishes_pending_recipes_for_other_containers(tmp_path, monkeypatch):
+    """Test that pending recipes are consolidated into a snapshot that a container cache then loads."""
+    s3 = InMemoryS3Client()
+    register_client("s3", s3)
+    monkeypatch.setattr(handle_build_similarity_index, "RECIPES_BUCKET", "recipes-bucket")
+    cache = SimilarityIndexCache(lambda: s3, "recipes-bucket", str(tmp_path / "cache"), refresh_seconds=0)
+
+    assert len(cache.get()) == 0
+
+    put_pending_recipe(s3, "recipes-bucket", "r0", REQUEST, "recipes/r0/recipe.txt")
+    put_pending_recipe(s3, "recipes-bucket", "r0", REQUEST, "recipes/r0/recipe.txt")
+    first = handle_build_similarity_index.lambda_handler({}, LambdaContext())
+    put_pending_recipe(s3, "recipes-bucket", "r1", {**REQUEST, "liquids": ["tonic water"]}, "recipes/r1/recipe.txt")
+    monkeypatch.setattr(handle_build_similarity_index.time, "gmtime", lambda: (2030, 1, 1, 0, 0, 0, 1, 1, 0))
+    second = handle_build_similarity_index.lambda_handler({}, LambdaContext())
+
+    assert first["size"] == 1 and second["size"] == 2
+    assert not any(key.startswith("similarity-index/pending/") for key in s3.objects)
+    assert not any(key.startswith(f"{first['snapshot']}/") for key in s3.objects)
+
+    index = cache.get()
+    assert cache.snapshot == second["snapshot"]
+    assert index.query(vectorize_request(REQUEST))[0].entry == index_entry("r0", REQUEST, "recipes/r0/recipe.txt")
+    assert handle_build_similarity_index.lambda_handler({}, LambdaContext()) == {"snapshot": None, "added": 0}
+
+
+def test_text_handler_reuses_recipe_above_threshold(monkeypatch):
+    """Test that the text handler returns a stored recipe when the request asks for a subset of its ingredients."""
+    index = SimilarityIndex()
+    stored = {**REQUEST, "leaves": ["mint"]}
+    index.add(vectorize_request(stored), index_entry("r0", stored, "recipes/r0/recipe.txt"))
+    monkeypatch.setattr(handle_generate_recipe_text.similarity_index, "get", lambda: index)
+
+    similar = handle_generate_recipe_text.find_similar_recipe({**REQUEST, "fruit": ["Mango ", "pineapple"]}, threshold=0.85)
+
+    assert similar["s3_key"] == "recipes/r0/recipe.txt"
+    assert similar["cache_hit"] is True and similar["similar_recipe_id"] == "r0"
+    assert handle_generate_recipe_text.find_similar_recipe({**REQUEST, "flavor": "citric", "fruit": ["lemon"]}, threshold=0.85) is None
+
+
+@pytest.mark.parametrize(
+    "requested",
+    [
+        {**LARGE_REQUEST, "mood": "sad"},
+        {**LARGE_REQUEST, "flavor": "bitter"},
+        {**LARGE_REQUEST, "leaves": ["basil"]},
+        {**LARGE_REQUEST, "fruit": ["mango", "pineapple", "lime", "passion fruit"]},
+        {**LARGE_REQUEST, "mood": "sad", "flavor": "bitter"},
+        {**LARGE_REQUEST, "leaves": ["mint", "basil"]},
+    ],
+    ids=["mood", "flavor", "mint-to-basil", "strawberry-to-lime", "mood-and-flavor", "extra-ingredient"],
+)
+def test_text_handler_does_not_reuse_recipe_for_a_different_request(monkeypatch, requested):
+    """Test that a close vector is not reused when the mood or flavor differs or an asked-for ingredient is missing."""
+    index = SimilarityIndex()
+    index.add(vectorize_request(LARGE_REQUEST), index_entry("r0", LARGE_REQUEST, "recipes/r0/recipe.txt"))
+    monkeypatch.setattr(handle_generate_recipe_text.similarity_index, "get", lambda: index)
+
+    assert index.query(vectorize_request(requested))[0].score >= 0.85
+    assert handle_generate_recipe_text.find_similar_recipe(requested, threshold=0.85) is None
+
+
+def test_text_handler_skips_incompatible_neighbour_for_a_compatible_one(monkeypatch):
+    """Test that a compatible recipe further down the candidates is reused when the nearest one contradicts the request."""
+    index = SimilarityIndex()
+    index.add(vectorize_request({**REQUEST, "mood": "sad"}), index_entry("r0", {**REQUEST, "mood": "sad"}, "recipes/r0/recipe.txt"))
+    covering = {**REQUEST, "liquids": ["soda", "tonic water"]}
+    index.add(vectorize_request(covering), index_entry("r1", covering, "recipes/r1/recipe.txt"))
+    # Entries written before the request was stored alongside them are never reused
+    index.add(vectorize_request(REQUEST), {"recipe_id": "r2", "s3_key": "recipes/r2/recipe.txt"})
+    monkeypatch.setattr(handle_generate_recipe_text.similarity_index, "get", lambda: index)
+
+    assert handle_generate_recipe_text.find_similar_recipe(REQUEST, threshold=0.85)["similar_recipe_id"] == "r1"
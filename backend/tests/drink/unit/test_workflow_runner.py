@@ -0,0 +1,196 @@
+"""
+Tests for the in-process workflow runner and the single-Lambda pipeline handler.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from service.drink.bedrock.rate_limiter import BedrockOverloadedError
+from service.drink.clients import register_client
+from service.drink.handlers import handle_run_workflow
+from service.drink.local.dynamodb import InMemoryTable
+from service.drink.workflow.runner import (
+    COMPLETED_RECIPE_FIELDS,
+    InProcessWorkflow,
+    RetryPolicy,
+)
+
+EXECUTION_INPUT = {"recipe_id": "r1", "timestamp": "2024-01-01T00:00:00", "request": {"customer_name": "Ana", "fruit": ["mango"]}}
+
+
+class LambdaContext:
+    function_name = "RunWorkflowFunction"
+    memory_limit_in_mb = 1024
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:RunWorkflowFunction"
+    aws_request_id = "request-id"
+
+
+class StubDynamoDBResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+class RecordingHandlers:
+    """Stand-ins for the workflow lambdas that record the events they receive."""
+
+    def __init__(self, failures=None):
+        self.events = []
+        self.failures = failures or {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, event):
+        with self._lock:
+            self.events.append((name, copy.deepcopy(event)))
+            failures = self.failures.get(name)
+            if failures:
+                raise failures.pop(0)
+
+    def persist(self, event, context):
+        self._record("persist", event)
+        return event
+
+    def text(self, event, context):
+        self._record("text", event)
+        event["recipe"] = {"s3_key": f"recipes/{event['recipe_id']}/recipe.txt", "cache_hit": False}
+        return event
+
+    def image(self, event, context):
+        self._record(f"image:{event['image_profile']}", event)
+        event.setdefault("recipe", {}).update({"image_s3_key": f"images/{event['image_profile']}.jpg", "image_quality": event["image_profile"]})
+        return event
+
+    def notification(self, event, context):
+        self._record("notification", event)
+        event["notification"] = {"status": "SENT"}
+        return event
+
+    def as_dict(self):
+        return {"persist": self.persist, "text": self.text, "image": self.image, "notification": self.notification}
+
+
+@pytest.fixture
+def recipes_table():
+    table = InMemoryTable("recipe_id")
+    table.items["r1"] = {"recipe_id": "r1", "status": "PROCESSING"}
+    register_client("dynamodb-resource", StubDynamoDBResource(table))
+    return table
+
+
+def create_workflow(handlers, sleeps=None, **kwargs):
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    return InProcessWorkflow(
+        handlers=handlers.as_dict(),
+        recipes_table="recipes-table",
+        retry_policy=RetryPolicy(jitter=False),
+        sleep=sleep if sleeps is not None else asyncio.sleep,
+        **kwargs,
+    )
+
+
+def test_execution_follows_state_machine_order_and_merges_parallel_branches(recipes_table):
+    """Test that the runner chains the handlers like the state machine and marks the recipe completed."""
+    handlers = RecordingHandlers()
+
+    result = create_workflow(handlers).execute(EXECUTION_INPUT)
+
+    names = [name for name, _ in handlers.events]
+    assert result.status == "SUCCEEDED"
+    assert names[0] == "persist" and set(names[1:3]) == {"text", "image:draft"} and names[3:] == ["image:full", "notification"]
+    assert result.output["recipe"] == {
+        "s3_key": "recipes/r1/recipe.txt",
+        "cache_hit": False,
+        "image_s3_key": "images/full.jpg",
+        "image_quality": "full",
+    }
+    assert result.output["notification"] == {"status": "SENT"}
+    assert dict(handlers.events)["image:draft"] == {**EXECUTION_INPUT, "image_profile": "draft"}
+    assert dict(handlers.events)["image:full"]["recipe"]["image_quality"] == "draft"
+    # The email links to the final image, rendered before the notification
+    assert dict(handlers.events)["notification"]["recipe"]["image_s3_key"] == "images/full.jpg"
+    assert recipes_table.items["r1"]["status"] == "COMPLETED"
+    assert recipes_table.items["r1"]["recipe_s3_key"] == "recipes/r1/recipe.txt"
+    # Same attributes the state machine's MarkRecipeCompleted writes
+    assert set(COMPLETED_RECIPE_FIELDS) <= set(recipes_table.items["r1"])
+
+
+def test_bedrock_overload_is_retried_with_exponential_backoff(recipes_table):
+    """Test that BedrockOverloadedError is retried with the state machine backoff while other errors are not."""
+    sleeps = []
+    handlers = RecordingHandlers({"text": [BedrockOverloadedError("busy"), BedrockOverloadedError("busy")]})
+
+    result = create_workflow(handlers, sleeps).execute(EXECUTION_INPUT)
+
+    assert result.status == "SUCCEEDED"
+    assert result.retries["text"] == 2
+    assert sleeps == [5.0, 10.0]
+
+
+def test_failed_branch_marks_recipe_failed(recipes_table):
+    """Test that a failing parallel branch is caught, marks the recipe as FAILED and skips the notification."""
+    handlers = RecordingHandlers({"image:draft": [ValueError("bad prompt")]})
+
+    result = create_workflow(handlers).execute(EXECUTION_INPUT)
+
+    assert result.status == "FAILED"
+    assert result.error == {"Error": "ValueError", "Cause": "bad prompt"}
+    assert recipes_table.items["r1"]["status"] == "FAILED"
+    assert "notification" not in [name for name, _ in handlers.events]
+
+
+def test_full_quality_failure_keeps_draft(recipes_table):
+    """Test that a failure rendering the final image does not fail the execution and still notifies with the draft."""
+    handlers = RecordingHandlers({"image:full": [RuntimeError("render failed")]})
+
+    result = create_workflow(handlers).execute(EXECUTION_INPUT)
+
+    assert result.status == "SUCCEEDED"
+    assert recipes_table.items["r1"]["status"] == "COMPLETED"
+    notified = dict(handlers.events)["notification"]
+    assert notified["recipe"]["image_s3_key"] == "images/draft.jpg"
+    assert notified["error"] == {"Error": "RuntimeError", "Cause": "render failed"}
+
+
+def test_run_many_bounds_concurrent_executions():
+    """Test that run_many keeps at most `concurrency` executions in flight."""
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def persist(event, context):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return event
+
+    handlers = RecordingHandlers()
+    workflow = InProcessWorkflow(handlers={**handlers.as_dict(), "persist": persist}, render_full_image=False)
+    inputs = [{**EXECUTION_INPUT, "recipe_id": f"r{index}"} for index in range(12)]
+
+    results = asyncio.run(workflow.run_many(inputs, concurrency=3))
+    workflow.close()
+
+    assert [result.recipe_id for result in results] == [f"r{index}" for index in range(12)]
+    assert all(result.status == "SUCCEEDED" for result in results)
+    assert peak[0] == 3
+
+
+def test_pipeline_lambda_reports_failure_without_raising(monkeypatch, recipes_table):
+    """Test that the single-Lambda handler returns the failed status instead of triggering a full retry."""
+    handlers = RecordingHandlers({"text": [ValueError("boom")]})
+    monkeypatch.setattr(handle_run_workflow, "workflow", create_workflow(handlers))
+
+    response = handle_run_workflow.lambda_handler(EXECUTION_INPUT, LambdaContext())
+
+    assert response == {"recipe_id": "r1", "status": "FAILED", "error": {"Error": "ValueError", "Cause": "boom"}}